@@ -0,0 +1,158 @@
+"""
+적응형 검색 깊이: 유사도 분포를 보고 질의마다 반환할 문서 수(k)를 고름
+
+- 검색은 ADAPTIVE_TOP_K_CANDIDATES개 후보를 한 번에 가져옵니다 (임베딩 한 번, 검색 한 번이며 검색 캐시도 후보 전체를 저장).
+- 최고 유사도의 ADAPTIVE_TOP_K_RELATIVE배 미만인 후보는 버리고(상대 임계값),
+  남은 후보 안에서 이웃한 유사도 차이가 가장 큰 곳이 후보 유사도 범위의 ADAPTIVE_TOP_K_GAP배 이상이면 그 앞에서 자릅니다.
+- 결과는 항상 ADAPTIVE_TOP_K_MIN~ADAPTIVE_TOP_K_MAX개이며, 유사도가 없는 검색 결과는 RETRIEVAL_TOP_K개로 자릅니다.
+- 답이 하나로 분명한 질문은 적은 문서만 평가/생성에 보내 토큰을 줄이고, 고르게 관련된 문서가 많은 질문은 더 많이 보냅니다.
+"""
+import threading
+from collections import Counter
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from tracing import record_retrieval
+from config import (
+    RETRIEVAL_TOP_K, ADAPTIVE_TOP_K_CANDIDATES, ADAPTIVE_TOP_K_MIN, ADAPTIVE_TOP_K_MAX,
+    ADAPTIVE_TOP_K_GAP, ADAPTIVE_TOP_K_RELATIVE
+)
+
+class KSelection(NamedTuple):
+    """문서 수 선택 결과"""
+    k: int
+    reason: str                     # "gap", "threshold", "max", "min", "no_scores"
+    candidates: int
+    scores: Tuple[float, ...] = ()  # 후보 유사도 (내림차순)
+    
+    def profile(self) -> dict:
+        """실행 메타데이터에 남길 유사도 분포 요약을 반환합니다."""
+        if not self.scores:
+            return {"k": self.k, "reason": self.reason, "candidates": self.candidates}
+        cutoff = self.scores[self.k - 1] if self.k else None
+        following = self.scores[self.k] if self.k < len(self.scores) else None
+        return {
+            "k": self.k,
+            "reason": self.reason,
+            "candidates": self.candidates,
+            "top_score": round(self.scores[0], 4),
+            "cutoff_score": round(cutoff, 4) if cutoff is not None else None,
+            "next_score": round(following, 4) if following is not None else None,
+            "min_score": round(self.scores[-1], 4),
+        }
+
+def select_top_k(scores: Sequence[Optional[float]], min_k: int = ADAPTIVE_TOP_K_MIN,
+                 max_k: int = ADAPTIVE_TOP_K_MAX, gap: float = ADAPTIVE_TOP_K_GAP,
+                 relative: float = ADAPTIVE_TOP_K_RELATIVE, fallback_k: int = RETRIEVAL_TOP_K) -> KSelection:
+    """
+    유사도 분포에서 반환할 문서 수를 고릅니다.
+    
+    Args:
+        scores: 검색 순위 순서의 후보 유사도 (클수록 관련, 하나라도 None이면 fallback_k 사용)
+        min_k: 최소 문서 수
+        max_k: 최대 문서 수
+        gap: 자를 유사도 차이의 최소값 (후보 유사도 범위 대비 비율, 0이면 차이로 자르지 않음)
+        relative: 남길 문서의 최소 유사도 (최고 유사도 대비 비율, 0이면 임계값 사용 안 함)
+        fallback_k: 유사도가 없을 때 반환할 문서 수
+    
+    Returns:
+        KSelection: 선택한 k와 선택 이유, 후보 유사도
+    """
+    candidates = len(scores)
+    if any(score is None for score in scores):
+        return KSelection(min(fallback_k, candidates), "no_scores", candidates)
+    
+    if not candidates:
+        return KSelection(0, "min", 0)
+    
+    scores = tuple(float(score) for score in scores)
+    low = min(max(1, min_k), candidates)
+    high = max(low, min(max_k, candidates))
+    
+    # 상대 임계값: 최고 유사도가 양수일 때만 비율이 의미가 있습니다
+    limit, reason = high, "max"
+    if relative > 0 and scores[0] > 0:
+        kept = sum(1 for score in scores[:high] if score >= scores[0] * relative)
+        if kept < high:
+            limit, reason = max(low, kept), "threshold" if kept >= low else "min"
+    
+    # 유사도 차이: 최소 문서 수 이후, 임계값 안쪽에서 가장 큰 차이를 찾습니다
+    spread = scores[0] - scores[-1]
+    if gap > 0 and spread > 0 and limit > low:
+        position = max(range(low, limit), key=lambda index: scores[index - 1] - scores[index])
+        if scores[position - 1] - scores[position] >= gap * spread:
+            return KSelection(position, "gap", candidates, scores)
+    
+    return KSelection(limit, reason, candidates, scores)
+
+class AdaptiveTopKStats:
+    """적응형 문서 수 선택 통계"""
+    
+    def __init__(self, fixed_k: int = RETRIEVAL_TOP_K):
+        self._lock = threading.Lock()
+        self.fixed_k = fixed_k
+        self.selections = 0
+        self.documents = 0
+        self.candidates = 0
+        self.reasons = Counter()
+        self.histogram = Counter()
+    
+    def record(self, selection: KSelection):
+        """선택 결과 하나를 기록합니다."""
+        with self._lock:
+            self.selections += 1
+            self.documents += selection.k
+            self.candidates += selection.candidates
+            self.reasons[selection.reason] += 1
+            self.histogram[selection.k] += 1
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "selections": self.selections,
+                "mean_k": self.documents / self.selections if self.selections else 0.0,
+                "mean_candidates": self.candidates / self.selections if self.selections else 0.0,
+                # 고정 k(RETRIEVAL_TOP_K)와 비교해 평가/생성에 보내지 않은 문서 수 (음수면 더 보냄)
+                "documents_saved": self.fixed_k * self.selections - self.documents,
+                "reasons": dict(self.reasons),
+                "k_histogram": dict(sorted(self.histogram.items())),
+            }
+
+class AdaptiveTopK:
+    """후보 검색 결과를 유사도 분포에 따라 자르는 선택기"""
+    
+    def __init__(self, candidates: int = ADAPTIVE_TOP_K_CANDIDATES, min_k: int = ADAPTIVE_TOP_K_MIN,
+                 max_k: int = ADAPTIVE_TOP_K_MAX, gap: float = ADAPTIVE_TOP_K_GAP,
+                 relative: float = ADAPTIVE_TOP_K_RELATIVE, fallback_k: int = RETRIEVAL_TOP_K):
+        """
+        Args:
+            candidates: 한 번에 가져올 후보 수 (max_k보다 작으면 max_k)
+            min_k: 최소 문서 수
+            max_k: 최대 문서 수
+            gap: 자를 유사도 차이의 최소값 (후보 유사도 범위 대비 비율)
+            relative: 남길 문서의 최소 유사도 (최고 유사도 대비 비율)
+            fallback_k: 유사도가 없을 때 반환할 문서 수
+        """
+        self.candidates = max(candidates, max_k)
+        self.min_k = min_k
+        self.max_k = max_k
+        self.gap = gap
+        self.relative = relative
+        self.fallback_k = fallback_k
+        self.stats = AdaptiveTopKStats(fallback_k)
+    
+    def select(self, query: str, results: List[tuple]) -> List[tuple]:
+        """
+        (문서, 유사도) 후보 목록을 자르고, 선택한 k와 유사도 분포를 현재 요청의 추적 정보에 기록합니다.
+        
+        Args:
+            query: 검색 질의
+            results: 검색 순위 순서의 (문서, 유사도) 후보 목록
+        
+        Returns:
+            List[tuple]: 앞에서부터 선택한 k개
+        """
+        selection = select_top_k([score for _, score in results], self.min_k, self.max_k,
+                                 self.gap, self.relative, self.fallback_k)
+        self.stats.record(selection)
+        record_retrieval({"query": query, **selection.profile()})
+        return results[:selection.k]
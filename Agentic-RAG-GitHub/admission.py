@@ -0,0 +1,254 @@
+"""
+수용 제어(admission control): 동시 실행 수와 대기열 길이를 제한하고, 과부하 시 빠르게 거절하거나 품질을 낮춰 응답
+
+- 최대 ADMISSION_MAX_CONCURRENCY개의 워크플로우만 동시에 실행하고 나머지는 최대 ADMISSION_MAX_QUEUE개까지 도착 순서로 대기
+- 예상 대기 시간(대기열 위치와 최근 실행 시간의 이동 평균으로 계산)과 실행 시간의 합이
+  클라이언트 마감 시간을 넘으면 대기하지 않고 바로 거절
+- ADMISSION_DEGRADE를 설정하면 거절 대신 캐시된 답변("cache")이나 fast 그래프 프로필("fast")로 응답
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence, Tuple
+from metrics import ADMISSION_ACTIVE, ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT, ADMISSION_REQUESTS
+from config import (
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_DEGRADE, METRICS_ENABLED
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEGRADE_MODES = ("cache", "fast")
+
+# 실행 시간 이동 평균의 가중치 (최근 실행의 비중)
+_SERVICE_TIME_ALPHA = 0.2
+
+class AdmissionRejected(Exception):
+    """과부하로 요청을 수용하지 않음"""
+    
+    def __init__(self, reason: str, retry_after: float):
+        """
+        Args:
+            reason: "queue_full"(대기열 가득 참) 또는 "deadline"(마감 시간 안에 끝낼 수 없음)
+            retry_after: 다시 시도하기까지 권장 대기 시간 (초)
+        """
+        messages = {
+            "queue_full": "요청이 많아 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.",
+            "deadline": "요청이 많아 제한 시간 안에 답변할 수 없습니다. 잠시 후 다시 시도해주세요.",
+        }
+        super().__init__(messages.get(reason, reason))
+        self.reason = reason
+        self.retry_after = retry_after
+
+def parse_degrade_modes(spec: str) -> Tuple[str, ...]:
+    """쉼표로 구분한 대체 응답 방식 목록을 검증해 반환합니다. (예: "cache,fast")"""
+    modes = tuple(mode.strip() for mode in spec.split(",") if mode.strip())
+    for mode in modes:
+        if mode not in DEGRADE_MODES:
+            raise ValueError(f"지원하지 않는 대체 응답 방식입니다: {mode} (사용 가능: {', '.join(DEGRADE_MODES)})")
+    return modes
+
+class AdmissionStats:
+    """수용 제어 결과 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.queued = 0
+        self.queue_wait_seconds = 0.0
+        self.degraded = {mode: 0 for mode in DEGRADE_MODES}
+        self.rejected = {"queue_full": 0, "deadline": 0}
+    
+    def record_admitted(self, queue_wait: float):
+        """전체 워크플로우로 실행한 요청을 기록합니다."""
+        with self._lock:
+            self.admitted += 1
+            if queue_wait > 0:
+                self.queued += 1
+                self.queue_wait_seconds += queue_wait
+    
+    def record_degraded(self, mode: str):
+        """대체 응답한 요청을 기록합니다."""
+        with self._lock:
+            self.degraded[mode] += 1
+    
+    def record_rejected(self, reason: str):
+        """거절한 요청을 기록합니다."""
+        with self._lock:
+            self.rejected[reason] += 1
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            total = self.admitted + sum(self.degraded.values()) + sum(self.rejected.values())
+            return {
+                "requests": total,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "mean_queue_wait_ms": self.queue_wait_seconds / self.queued * 1000 if self.queued else 0.0,
+                "degraded": dict(self.degraded),
+                "rejected": dict(self.rejected),
+                "shed_rate": sum(self.rejected.values()) / total if total else 0.0,
+            }
+
+class AdmissionController:
+    """
+    워크플로우 앞단의 수용 제어기
+    
+    대기열은 도착 순서(FIFO)로 처리합니다. 대체 응답 중 "fast" 실행은 실행 슬롯을 쓰지 않는 대신
+    동시에 max_concurrency개까지만 허용해, 과부하에서도 서버가 붙잡고 있는 요청 수가 제한됩니다.
+    """
+    
+    def __init__(self, max_concurrency: int = ADMISSION_MAX_CONCURRENCY, max_queue: int = ADMISSION_MAX_QUEUE,
+                 degrade: Sequence[str] = None, metrics_enabled: bool = METRICS_ENABLED):
+        """
+        Args:
+            max_concurrency: 동시에 실행할 최대 워크플로우 수
+            max_queue: 실행을 기다릴 수 있는 최대 요청 수
+            degrade: 거절 대신 시도할 대체 응답 방식 순서 (기본값: ADMISSION_DEGRADE)
+            metrics_enabled: 지표 기록 여부
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.degrade = parse_degrade_modes(ADMISSION_DEGRADE) if degrade is None else tuple(degrade)
+        self.metrics_enabled = metrics_enabled
+        self.stats = AdmissionStats()
+        self.service_time = None
+        self._active = 0
+        self._degraded_active = 0
+        self._waiting = []
+        self._condition = threading.Condition()
+    
+    @property
+    def active(self) -> int:
+        return self._active
+    
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+    
+    def estimate_wait(self, position: int) -> float:
+        """
+        대기열의 position번째(0부터) 요청이 실행을 시작하기까지의 예상 시간을 반환합니다.
+        
+        슬롯이 max_concurrency개이고 실행마다 평균 service_time이 걸리면
+        앞선 요청 position개와 자기 차례가 비워지기까지 대략 (position + 1) * service_time / max_concurrency초가 걸립니다.
+        """
+        if self.service_time is None:
+            return 0.0
+        return (position + 1) * self.service_time / self.max_concurrency
+    
+    def run(self, execute: Callable[[Optional[str]], Any], timeout: float = None,
+            cached: Callable[[], Optional[Any]] = None) -> Tuple[Any, dict]:
+        """
+        수용 제어를 거쳐 요청을 실행합니다.
+        
+        Args:
+            execute: 그래프 프로필을 받아 요청을 실행하는 함수 (None이면 기본 프로필, 대체 응답이면 "fast")
+            timeout: 클라이언트 마감 시간까지 남은 시간 (초, None이면 마감 없음)
+            cached: 캐시된 답변을 반환하는 함수 (없으면 None 반환)
+        
+        Returns:
+            Tuple[Any, dict]: (실행 결과, 수용 정보 {"mode": "full"/"cache"/"fast", "queue_wait_ms": ...})
+        
+        Raises:
+            AdmissionRejected: 대기열이 가득 찼거나 마감 시간 안에 끝낼 수 없고 대체 응답도 불가능함
+        """
+        started_at = time.monotonic()
+        deadline = started_at + timeout if timeout is not None else None
+        reason, estimate = self._acquire(deadline)
+        queue_wait = time.monotonic() - started_at
+        
+        if reason is None:
+            return self._execute(execute, queue_wait)
+        return self._degrade(execute, cached, reason, estimate, queue_wait)
+    
+    def _acquire(self, deadline: Optional[float]) -> Tuple[Optional[str], float]:
+        """실행 슬롯을 얻으면 (None, 0), 얻지 못하면 (거절 사유, 예상 대기 시간)을 반환합니다."""
+        with self._condition:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                self._record_gauges()
+                return None, 0.0
+            
+            estimate = self.estimate_wait(len(self._waiting))
+            if len(self._waiting) >= self.max_queue:
+                return "queue_full", estimate
+            if deadline is not None and time.monotonic() + estimate + (self.service_time or 0.0) > deadline:
+                return "deadline", estimate
+            
+            ticket = object()
+            self._waiting.append(ticket)
+            self._record_gauges()
+            try:
+                while self._waiting[0] is not ticket or self._active >= self.max_concurrency:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return "deadline", self.estimate_wait(self._waiting.index(ticket))
+                    self._condition.wait(remaining)
+                self._active += 1
+                return None, 0.0
+            finally:
+                self._waiting.remove(ticket)
+                self._record_gauges()
+                # 맨 앞 요청이 빠지면 다음 요청이 슬롯을 확인할 수 있도록 깨웁니다
+                self._condition.notify_all()
+    
+    def _release(self, service_time: float):
+        with self._condition:
+            self._active -= 1
+            self.service_time = service_time if self.service_time is None else (
+                (1 - _SERVICE_TIME_ALPHA) * self.service_time + _SERVICE_TIME_ALPHA * service_time
+            )
+            self._record_gauges()
+            self._condition.notify_all()
+    
+    def _execute(self, execute: Callable[[Optional[str]], Any], queue_wait: float) -> Tuple[Any, dict]:
+        self.stats.record_admitted(queue_wait)
+        self._record_decision("admitted", "", queue_wait)
+        started_at = time.monotonic()
+        try:
+            return execute(None), {"mode": "full", "queue_wait_ms": queue_wait * 1000}
+        finally:
+            self._release(time.monotonic() - started_at)
+    
+    def _degrade(self, execute: Callable[[Optional[str]], Any], cached: Optional[Callable[[], Optional[Any]]],
+                 reason: str, estimate: float, queue_wait: float) -> Tuple[Any, dict]:
+        info = {"queue_wait_ms": queue_wait * 1000, "degraded_reason": reason}
+        
+        for mode in self.degrade:
+            if mode == "cache" and cached is not None:
+                answer = cached()
+                if answer is not None:
+                    self.stats.record_degraded("cache")
+                    self._record_decision("cache", reason, queue_wait)
+                    return answer, {"mode": "cache", **info}
+            elif mode == "fast":
+                with self._condition:
+                    if self._degraded_active >= self.max_concurrency:
+                        continue
+                    self._degraded_active += 1
+                self.stats.record_degraded("fast")
+                self._record_decision("fast", reason, queue_wait)
+                try:
+                    return execute("fast"), {"mode": "fast", **info}
+                finally:
+                    with self._condition:
+                        self._degraded_active -= 1
+        
+        self.stats.record_rejected(reason)
+        self._record_decision("rejected", reason, queue_wait)
+        logger.warning(f"요청 거절 ({reason}): 실행 {self._active}개, 대기 {len(self._waiting)}개, "
+                       f"예상 대기 {estimate:.2f}초")
+        raise AdmissionRejected(reason, retry_after=max(1.0, estimate))
+    
+    def _record_decision(self, result: str, reason: str, queue_wait: float):
+        if self.metrics_enabled:
+            ADMISSION_REQUESTS.labels(result, reason).inc()
+            ADMISSION_QUEUE_WAIT.labels(result).observe(queue_wait)
+    
+    def _record_gauges(self):
+        if self.metrics_enabled:
+            ADMISSION_ACTIVE.set(self._active)
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiting))
@@ -0,0 +1,123 @@
+"""
+답변 캐시: 최근 답변을 정규화한 질문과 그래프 프로필로 저장 (과부하 시 대체 응답, 인기 질문 워밍업 등에 사용)
+
+- 답변은 만든 색인 버전과 함께 저장하며, 다른 버전으로 조회하거나 저장하면 이전 버전의 답변을 모두 버립니다.
+- 워밍업으로 미리 만든 답변은 고정(pinned)으로 저장해 TTL로 만료되거나 LRU로 밀려나지 않으며,
+  get_pinned()로 고정 답변만 조회할 수 있습니다 (색인이 바뀌면 함께 버려짐).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from coalesce import coalesce_key
+from config import ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL
+
+class AnswerCache:
+    """
+    LRU와 TTL로 관리하는 스레드 안전 답변 캐시
+    
+    키는 요청 병합과 같은 (정규화한 질문, 프로필)이므로 대소문자, 공백, 끝 문장 부호 차이는 같은 질문으로 봅니다.
+    """
+    
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL):
+        """
+        Args:
+            max_entries: 보관할 최대 답변 수 (넘으면 고정하지 않은 답변 중 가장 오래 사용하지 않은 답변부터 제거)
+            ttl: 답변 유효 시간 (초, 0이면 만료 없음, 고정 답변은 만료 없음)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, question: str, profile: str, version: Hashable = None) -> Optional[Any]:
+        """
+        저장된 답변을 반환합니다 (없거나 만료되면 None).
+        
+        Args:
+            question: 질문
+            profile: 그래프 프로필
+            version: 현재 색인 버전 (저장된 답변의 버전과 다르면 이전 답변을 모두 버림)
+        """
+        return self._get(question, profile, version, pinned_only=False)
+    
+    def get_pinned(self, question: str, profile: str, version: Hashable = None) -> Optional[Any]:
+        """워밍업으로 고정한 답변만 반환합니다 (없으면 None)."""
+        return self._get(question, profile, version, pinned_only=True)
+    
+    def _get(self, question: str, profile: str, version: Hashable, pinned_only: bool) -> Optional[Any]:
+        key = coalesce_key(question, profile)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and not entry[2] and self.ttl and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None or (pinned_only and not entry[2]):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, question: str, profile: str, answer: Any, version: Hashable = None, pinned: bool = False):
+        """
+        답변을 저장합니다.
+        
+        Args:
+            question: 질문
+            profile: 그래프 프로필
+            answer: 답변
+            version: 답변을 만든 색인 버전
+            pinned: 만료와 LRU 제거에서 제외할지 여부 (워밍업 답변)
+        """
+        if self.max_entries <= 0:
+            return
+        key = coalesce_key(question, profile)
+        with self._lock:
+            self._check_version(version)
+            # 고정 답변은 일반 요청의 답변으로 덮어쓰지 않습니다
+            current = self._entries.get(key)
+            if current is not None and current[2] and not pinned:
+                return
+            self._entries[key] = (answer, time.monotonic(), pinned)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                victim = next((old_key for old_key, entry in self._entries.items() if not entry[2]), None)
+                if victim is None:
+                    break
+                del self._entries[victim]
+    
+    def _check_version(self, version: Hashable):
+        # 호출하는 쪽에서 잠금을 잡습니다 (버전 없이 쓰는 호출은 버전을 바꾸지 않음)
+        if version is not None and version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+            self._version = version
+            self._entries.clear()
+    
+    def clear(self):
+        """모든 답변을 지웁니다."""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "pinned": sum(1 for entry in self._entries.values() if entry[2]),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "version": self._version,
+            }
@@ -0,0 +1,304 @@
+"""
+답변 워밍업: 색인을 만들거나 바꾼 직후 인기 질문을 워크플로우로 미리 실행해 답변 캐시에 고정
+
+- 인기 질문은 UI 예시 질문(EXAMPLE_QUESTIONS), ANSWER_WARMUP_QUESTIONS_FILE(한 줄에 질문 하나),
+  질문 기록(ANSWER_WARMUP_QUERY_LOG, "question" 필드가 있는 JSON Lines)에서 ANSWER_WARMUP_MIN_COUNT번 이상
+  나온 질문 중 많이 나온 ANSWER_WARMUP_TOP_LOGGED개를 정규화한 질문 기준으로 중복 없이 모읍니다.
+  빠른 경로가 답하는 질문(FAQ 대표 질문 등)은 답변 캐시보다 먼저 응답하므로 워밍업하지 않습니다.
+- 질문들은 batch 우선순위로 ANSWER_WARMUP_WORKERS개씩 동시에 실행하므로 사용자 요청의 LLM 호출보다 뒤로 밀립니다.
+- 답변은 색인 버전과 함께 답변 캐시에 고정(pinned)으로 저장되고, Flask /ask는 수용 제어 앞에서 바로 응답합니다.
+  실행하는 동안 색인 버전이 바뀌면 만든 답변을 버립니다 (다음 요청에서 새 버전으로 다시 워밍업).
+- serve.py --build-index는 색인과 함께 답변을 만들어 저장하고(워커는 불러오기만 함),
+  Flask 앱을 직접 실행하면 워크플로우의 색인 버전이 바뀔 때마다 백그라운드에서 다시 워밍업합니다.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Sequence
+from answer_cache import AnswerCache
+from coalesce import normalize_question
+from config import (
+    ANSWER_WARMUP_QUESTIONS_FILE, ANSWER_WARMUP_QUERY_LOG, ANSWER_WARMUP_TOP_LOGGED, ANSWER_WARMUP_MIN_COUNT,
+    ANSWER_WARMUP_WORKERS
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Streamlit, Flask 데모 화면과 main.py 테스트의 예시 질문 (가장 많이 눌리는 질문)
+EXAMPLE_QUESTIONS = [
+    "agentic rag가 어떤 의미야?",
+    "금융 시장의 최신 동향은?",
+    "투자 포트폴리오 구성 방법은?",
+    "주식 시장 분석 방법은?",
+    "암호화폐 투자 전략은?",
+    "부동산 투자 시 고려사항은?",
+    "은퇴 계획 수립 방법은?",
+    "리스크 관리 전략은?",
+]
+
+# 색인 디렉터리에 저장하는 워밍업 답변 파일
+ANSWERS_FILE = "warm_answers.json"
+
+def logged_questions(path: str = ANSWER_WARMUP_QUERY_LOG, top: int = ANSWER_WARMUP_TOP_LOGGED,
+                     min_count: int = ANSWER_WARMUP_MIN_COUNT) -> List[str]:
+    """
+    질문 기록에서 자주 나온 질문을 빈도 순서로 반환합니다.
+    
+    Args:
+        path: "question" 필드가 있는 JSON Lines 파일 (라우터 결정 기록 등, 비어 있거나 없으면 빈 목록)
+        top: 반환할 최대 질문 수
+        min_count: 포함할 최소 출현 횟수 (정규화한 질문 기준)
+    
+    Returns:
+        List[str]: 정규화한 질문마다 처음 기록된 원문
+    """
+    if not path or not Path(path).exists() or top <= 0:
+        return []
+    
+    counts = Counter()
+    originals = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                question = json.loads(line)["question"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            key = normalize_question(question)
+            if key:
+                counts[key] += 1
+                originals.setdefault(key, question)
+    return [originals[key] for key, count in counts.most_common(top) if count >= min_count]
+
+def popular_questions(extra: Sequence[str] = (), questions_file: str = ANSWER_WARMUP_QUESTIONS_FILE,
+                      query_log: str = ANSWER_WARMUP_QUERY_LOG) -> List[str]:
+    """
+    워밍업할 인기 질문 목록을 만듭니다 (예시 질문, 질문 파일, 질문 기록 순서, 정규화한 질문 기준 중복 제거).
+    
+    Args:
+        extra: 추가할 질문
+        questions_file: 한 줄에 질문 하나씩 적은 파일 (비어 있거나 없으면 생략)
+        query_log: 자주 나온 질문을 고를 질문 기록 (JSON Lines)
+    
+    Returns:
+        List[str]: 워밍업할 질문 목록
+    """
+    candidates = list(EXAMPLE_QUESTIONS) + list(extra)
+    if questions_file and Path(questions_file).exists():
+        lines = Path(questions_file).read_text(encoding="utf-8").splitlines()
+        candidates += [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    candidates += logged_questions(query_log)
+    
+    seen = set()
+    questions = []
+    for question in candidates:
+        key = normalize_question(question)
+        if key and key not in seen:
+            seen.add(key)
+            questions.append(question)
+    return questions
+
+def without_fast_path(questions: Sequence[str], fast_path=None) -> List[str]:
+    """
+    빠른 경로가 답하는 질문을 뺍니다 (빠른 경로가 답변 캐시보다 먼저 응답하므로 워밍업할 필요가 없음).
+    
+    Args:
+        questions: 질문 목록
+        fast_path: 질문을 맞춰 볼 FastPath (None이면 그대로 반환)
+    
+    Returns:
+        List[str]: 빠른 경로가 답하지 않는 질문
+    """
+    if fast_path is None:
+        return list(questions)
+    return [question for question in questions if fast_path.match(question) is None]
+
+def index_version(workflow) -> Optional[Hashable]:
+    """워크플로우가 검색하는 색인의 버전을 반환합니다 (데이터 파이프라인이 없으면 None)."""
+    return getattr(workflow.data_pipeline, "index_version", None)
+
+def run_questions(workflow, questions: Sequence[str], profile: str = None,
+                  workers: int = ANSWER_WARMUP_WORKERS) -> Dict[str, str]:
+    """
+    질문들을 batch 우선순위로 동시에 워크플로우에 실행합니다.
+    
+    Args:
+        workflow: 답변을 만들 AgenticRAGWorkflow
+        questions: 질문 목록
+        profile: 그래프 프로필 (없으면 기본 프로필)
+        workers: 동시에 실행할 질문 수
+    
+    Returns:
+        Dict[str, str]: 답변을 만든 질문별 답변 (실패하거나 답변이 없거나 오류 메시지로 끝난 질문은 제외)
+    """
+    from fast_path import final_answer
+    from llm_scheduler import llm_priority
+    
+    def _answer(question: str) -> Optional[str]:
+        try:
+            with llm_priority("batch"):
+                answer = final_answer(workflow.run_workflow(question, profile=profile))
+        except Exception as e:
+            logger.warning(f"워밍업 질문 실행 실패 ({question}): {str(e)}")
+            return None
+        if not answer:
+            logger.warning(f"워밍업 질문 실행 실패 ({question}): 답변이 없거나 워크플로우가 오류로 끝났습니다")
+        return answer
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="answer-warmup") as executor:
+        answers = list(executor.map(_answer, questions))
+    return {question: answer for question, answer in zip(questions, answers) if answer}
+
+def save_answers(directory: str, answers: Dict[str, str], index=None) -> Path:
+    """
+    워밍업 답변을 색인 디렉터리에 저장합니다.
+    
+    Args:
+        directory: 색인 디렉터리
+        answers: 질문별 답변
+        index: 답변을 만든 VectorIndex (생성 시각을 함께 저장해 색인이 바뀌면 답변을 버림)
+    
+    Returns:
+        Path: 저장한 파일
+    """
+    path = Path(directory) / ANSWERS_FILE
+    payload = {
+        "index_created_at": index.info.get("created_at") if index is not None else None,
+        "answers": answers,
+    }
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    logger.info(f"워밍업 답변 저장 완료: {path} ({len(answers)}개 질문)")
+    return path
+
+def load_answers(directory: str, index=None) -> Optional[Dict[str, str]]:
+    """
+    색인 디렉터리에 저장된 워밍업 답변을 불러옵니다.
+    
+    Returns:
+        Optional[Dict[str, str]]: 질문별 답변 (파일이 없거나 다른 색인으로 만든 답변이면 None)
+    """
+    path = Path(directory) / ANSWERS_FILE
+    if not path.exists():
+        logger.info(f"저장된 워밍업 답변이 없습니다: {path}")
+        return None
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if index is not None and payload.get("index_created_at") != index.info.get("created_at"):
+        logger.warning("워밍업 답변이 현재 색인과 다른 색인으로 만들어져 사용하지 않습니다 (--build-index로 다시 생성)")
+        return None
+    return payload["answers"]
+
+class AnswerWarmup:
+    """
+    답변 캐시에 인기 질문의 답변을 색인 버전별로 채우는 워밍업 작업
+    
+    ensure()는 요청마다 호출해도 되는 가벼운 확인으로, 워크플로우의 색인 버전이 마지막으로 워밍업한 버전과
+    다르면(색인 생성, 교체, 문서 추가) 백그라운드 스레드에서 run()을 시작합니다.
+    """
+    
+    def __init__(self, cache: AnswerCache, questions: Sequence[str] = None, workers: int = ANSWER_WARMUP_WORKERS,
+                 fast_path=None):
+        """
+        Args:
+            cache: 답변을 고정할 답변 캐시
+            questions: 워밍업할 질문 (기본값: popular_questions(), 실행할 때마다 질문 기록을 다시 읽음)
+            workers: 동시에 실행할 질문 수
+            fast_path: 이 FastPath가 답하는 질문은 워밍업하지 않음
+        """
+        self.cache = cache
+        self.questions = list(questions) if questions is not None else None
+        self.workers = workers
+        self.fast_path = fast_path
+        self.version = None
+        self.thread = None
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.stored = 0
+        self.failed = 0
+        self.discarded = 0
+        self.last_elapsed_ms = 0.0
+    
+    def ensure(self, workflow) -> bool:
+        """
+        색인 버전이 바뀌었으면 백그라운드 워밍업을 시작합니다.
+        
+        Returns:
+            bool: 이번 호출에서 워밍업을 시작했는지 여부
+        """
+        version = index_version(workflow)
+        if version is None or version == self.version:
+            return False
+        with self._lock:
+            if version == self.version or (self.thread is not None and self.thread.is_alive()):
+                return False
+            self.version = version
+            self.thread = threading.Thread(target=self.run, args=(workflow,), name="answer-warmup", daemon=True)
+            self.thread.start()
+        return True
+    
+    def run(self, workflow) -> Dict[str, str]:
+        """
+        인기 질문을 워크플로우로 실행해 답변 캐시에 현재 색인 버전으로 고정합니다.
+        
+        Returns:
+            Dict[str, str]: 저장한 질문별 답변 (실행하는 동안 색인 버전이 바뀌어 버렸으면 빈 딕셔너리)
+        """
+        version = index_version(workflow)
+        self.version = version
+        questions = without_fast_path(self.questions if self.questions is not None else popular_questions(),
+                                      self.fast_path)
+        started_at = time.perf_counter()
+        answers = run_questions(workflow, questions, workers=self.workers)
+        installed = self.install(workflow, answers, version)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        with self._lock:
+            self.runs += 1
+            self.failed += len(questions) - len(answers)
+            self.last_elapsed_ms = elapsed_ms
+        if not installed:
+            return {}
+        logger.info(f"답변 워밍업 완료: {len(answers)}/{len(questions)}개 질문, {elapsed_ms:.0f}ms (색인 버전 {version})")
+        return answers
+    
+    def install(self, workflow, answers: Dict[str, str], version: Hashable = None) -> bool:
+        """
+        미리 만든 답변(serve.py가 색인과 함께 저장한 답변 등)을 답변 캐시에 고정합니다.
+        
+        Args:
+            workflow: 답변을 제공할 워크플로우 (기본 프로필과 색인 버전을 읽음)
+            answers: 질문별 답변
+            version: 답변을 만든 색인 버전 (기본값: 워크플로우의 현재 색인 버전)
+        
+        Returns:
+            bool: 고정했는지 여부 (답변을 만든 뒤 색인 버전이 바뀌었으면 새 색인의 캐시를 지우지 않도록 버림)
+        """
+        current = index_version(workflow)
+        version = version if version is not None else current
+        if version != current:
+            with self._lock:
+                self.discarded += 1
+            logger.info(f"워밍업하는 동안 색인이 바뀌어 답변 {len(answers)}개를 버립니다 (색인 버전 {version} -> {current})")
+            return False
+        for question, answer in answers.items():
+            self.cache.put(question, workflow.profile, answer, version=version, pinned=True)
+        with self._lock:
+            self.version = version
+            self.stored += len(answers)
+        return True
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "stored": self.stored,
+                "failed": self.failed,
+                "discarded": self.discarded,
+                "last_elapsed_ms": self.last_elapsed_ms,
+                "version": self.version,
+                "running": self.thread is not None and self.thread.is_alive(),
+            }
@@ -0,0 +1,238 @@
+"""
+백그라운드 실행: Streamlit 스크립트 스레드를 막지 않고 워크플로우를 실행하며 진행 상황을 큐로 전달
+
+- 워크플로우는 프로세스 공유 실행기(UI_RUN_WORKERS개 스레드)에서 실행되며, 노드 시작/종료와 LLM 스트리밍 토큰을
+  진행 큐에 넣습니다. UI는 fragment에서 UI_POLL_INTERVAL마다 poll()로 큐를 비우고 화면을 갱신합니다.
+- cancel()은 다음 노드 경계, 다음 노드 시작 또는 다음 LLM 토큰에서 실행을 중단합니다.
+  체크포인터를 쓰는 대화 스레드에는 중단 전까지의 상태가 남으며, 대화 메모리가 다음 턴에서 중간 메시지를 버립니다.
+- 실행 결과는 최종 답변, 노드 경로, 추적 요약만 담으며 노드별 출력(중간 메시지, 검색 문서)은 보관하지 않습니다.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from tracing import Trace
+from config import UI_RUN_WORKERS
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RunCancelled(Exception):
+    """사용자가 실행을 취소함"""
+
+class ProgressEvent(NamedTuple):
+    """진행 큐에 들어가는 이벤트 하나"""
+    kind: str                       # "node_start", "node_end", "token", "done", "error", "cancelled"
+    node: Optional[str] = None
+    text: str = ""                  # 토큰 또는 오류 메시지
+    payload: Any = None             # "done"이면 (답변, 메타데이터)
+    elapsed_ms: float = 0.0         # 실행 시작부터의 시간
+
+@lru_cache(maxsize=1)
+def get_executor() -> ThreadPoolExecutor:
+    """Streamlit 세션이 함께 쓰는 워크플로우 실행기를 반환합니다."""
+    return ThreadPoolExecutor(max_workers=UI_RUN_WORKERS, thread_name_prefix="ui-run")
+
+class ProgressCallbackHandler(BaseCallbackHandler):
+    """
+    노드 시작과 LLM 토큰을 진행 큐에 넣고, 취소되었으면 예외를 던져 실행을 중단하는 콜백 핸들러
+    
+    LangGraph는 노드 실행과 그 안의 모든 실행 메타데이터에 langgraph_node를 넣어 주므로
+    이름이 langgraph_node와 같은 체인 실행을 노드 시작으로, 채팅 모델 실행의 토큰을 그 노드의 토큰으로 봅니다.
+    """
+    
+    # 취소 예외가 LangChain 콜백 관리자에서 삼켜지지 않고 그래프 실행까지 전달되도록 합니다
+    raise_error = True
+    
+    def __init__(self, events: queue.Queue, cancelled: threading.Event, started_at: float):
+        self.events = events
+        self.cancelled = cancelled
+        self.started_at = started_at
+        self._started_nodes = set()
+        self._llm_nodes = {}
+    
+    def _put(self, kind: str, node: str = None, text: str = ""):
+        self.events.put(ProgressEvent(kind, node, text, elapsed_ms=(time.perf_counter() - self.started_at) * 1000))
+    
+    def _check_cancelled(self):
+        if self.cancelled.is_set():
+            raise RunCancelled("사용자가 실행을 취소했습니다")
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._check_cancelled()
+        node = (metadata or {}).get("langgraph_node")
+        key = (node, (metadata or {}).get("langgraph_step"))
+        if node is not None and kwargs.get("name") == node and not node.startswith("__") \
+                and key not in self._started_nodes:
+            self._started_nodes.add(key)
+            self._put("node_start", node)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._check_cancelled()
+        self._llm_nodes[run_id] = (metadata or {}).get("langgraph_node")
+    
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        self._check_cancelled()
+        if token:
+            self._put("token", self._llm_nodes.get(run_id), token)
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._llm_nodes.pop(run_id, None)
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._llm_nodes.pop(run_id, None)
+
+class BackgroundRun:
+    """
+    실행기 스레드에서 돌아가는 워크플로우 실행 한 건
+    
+    진행 상태(nodes, streaming_node, streaming_text, status)는 poll()을 호출하는 스레드(Streamlit 스크립트)에서만
+    갱신되며, 실행기 스레드는 진행 큐에만 씁니다.
+    """
+    
+    def __init__(self, workflow, question: str, thread_id: str = None, profile: str = None,
+                 executor: ThreadPoolExecutor = None):
+        """
+        Args:
+            workflow: 실행할 AgenticRAGWorkflow
+            question: 사용자 질문
+            thread_id: 이어 갈 대화의 스레드 ID
+            profile: 그래프 프로필 (없으면 기본 프로필)
+            executor: 실행기 (기본값: get_executor())
+        """
+        self.question = question
+        self.trace = Trace()
+        self.events = queue.Queue()
+        self.status = "running"         # "running", "done", "error", "cancelled"
+        self.nodes = []                 # [{"node", "status", "elapsed_ms"}] 노드 진행 순서
+        self.streaming_node = None
+        self.streaming_text = ""
+        self.answer = None
+        self.metadata = None
+        self._cancelled = threading.Event()
+        self._started_at = time.perf_counter()
+        self.future = (executor or get_executor()).submit(self._run, workflow, question, thread_id, profile)
+    
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+    
+    @property
+    def elapsed_ms(self) -> float:
+        """실행 시작부터 지금까지의 시간"""
+        return (time.perf_counter() - self._started_at) * 1000
+    
+    def cancel(self):
+        """실행 취소를 요청합니다 (다음 노드 경계나 LLM 토큰에서 중단)."""
+        self._cancelled.set()
+    
+    def _run(self, workflow, question: str, thread_id: Optional[str], profile: Optional[str]):
+        handler = ProgressCallbackHandler(self.events, self._cancelled, self._started_at)
+        path = []
+        answer = None
+        
+        def _elapsed() -> float:
+            return (time.perf_counter() - self._started_at) * 1000
+        
+        try:
+            stream = workflow.stream_workflow(question, profile, callbacks=[handler], trace=self.trace,
+                                              thread_id=thread_id)
+            try:
+                for node, output in stream:
+                    path.append(node)
+                    # 노드 출력은 마지막 메시지만 보고 버립니다
+                    messages = output.get("messages") if isinstance(output, dict) else None
+                    if messages:
+                        answer = messages[-1].content
+                    self.events.put(ProgressEvent("node_end", node, elapsed_ms=_elapsed()))
+                    if self._cancelled.is_set():
+                        raise RunCancelled("사용자가 실행을 취소했습니다")
+            finally:
+                stream.close()
+        except RunCancelled:
+            logger.info(f"실행 취소 (요청 ID: {self.trace.request_id}, 완료 노드: {path})")
+            self.events.put(ProgressEvent("cancelled", payload=path, elapsed_ms=_elapsed()))
+            return
+        except Exception as e:
+            logger.error(f"백그라운드 실행 실패: {str(e)}")
+            self.events.put(ProgressEvent("error", text=str(e), payload=path, elapsed_ms=_elapsed()))
+            return
+        
+        summary = self.trace.summary()
+        metadata = {
+            "node_name": path[-1] if path else None,
+            "total_nodes": len(path),
+            "processing_time": (summary["total_ms"] or 0.0) / 1000,
+            "workflow_path": path,
+            "trace": summary,
+        }
+        self.events.put(ProgressEvent("done", payload=(answer, metadata), elapsed_ms=_elapsed()))
+    
+    def poll(self) -> List[ProgressEvent]:
+        """
+        진행 큐에 쌓인 이벤트를 모두 꺼내 진행 상태에 반영합니다.
+        
+        Returns:
+            List[ProgressEvent]: 이번에 꺼낸 이벤트 목록
+        """
+        drained = []
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            drained.append(event)
+            self._apply(event)
+        return drained
+    
+    def wait(self, timeout: float = None) -> str:
+        """실행이 끝날 때까지 기다린 뒤 남은 이벤트를 반영하고 최종 상태를 반환합니다."""
+        self.future.result(timeout)
+        self.poll()
+        return self.status
+    
+    def _apply(self, event: ProgressEvent):
+        if event.kind == "node_start":
+            self.nodes.append({"node": event.node, "status": "running", "elapsed_ms": event.elapsed_ms})
+        elif event.kind == "node_end":
+            running = [entry for entry in self.nodes if entry["node"] == event.node and entry["status"] == "running"]
+            if running:
+                running[0].update(status="done", elapsed_ms=event.elapsed_ms)
+            else:
+                self.nodes.append({"node": event.node, "status": "done", "elapsed_ms": event.elapsed_ms})
+        elif event.kind == "token":
+            # 다른 노드의 토큰이 시작되면 새로 표시합니다 (재작성 뒤 새 답변 등)
+            if event.node != self.streaming_node:
+                self.streaming_node, self.streaming_text = event.node, ""
+            self.streaming_text += event.text
+        elif event.kind == "done":
+            self.answer, self.metadata = event.payload
+            self.status = "done"
+        else:
+            self.status = event.kind
+            for entry in self.nodes:
+                if entry["status"] == "running":
+                    entry["status"] = event.kind
+            self.metadata = {"workflow_path": event.payload, "processing_time": event.elapsed_ms / 1000}
+            if event.kind == "error":
+                self.metadata["error"] = event.text
+    
+    def outcome(self) -> Tuple[str, dict]:
+        """
+        채팅 기록에 저장할 (답변, 메타데이터)를 반환합니다. (실행이 끝난 뒤 호출)
+        
+        Returns:
+            Tuple[str, dict]: 답변 (취소/오류/빈 응답이면 안내 문구)과 노드 경로, 처리 시간, 추적 요약
+        """
+        if self.status == "cancelled":
+            return "⏹️ 실행이 취소되었습니다.", {**self.metadata, "cancelled": True}
+        if self.status == "error":
+            return f"오류가 발생했습니다: {self.metadata['error']}", self.metadata
+        if not self.answer:
+            return "죄송합니다. 답변을 생성할 수 없습니다.", {**(self.metadata or {}), "error": "No response generated"}
+        return self.answer, self.metadata
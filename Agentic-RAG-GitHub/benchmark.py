@@ -0,0 +1,870 @@
+"""
+성능 벤치마크: 동일한 오프라인 질문 세트로 그래프 프로필별 지연 시간, 토큰, 품질 측정
+및 노드 단위 지연 시간/처리량/메모리 할당 측정과 기준선(baseline) 비교
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+from langchain_core.callbacks import BaseCallbackHandler
+
+# 프로젝트 루트를 Python 경로에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from components import count_tokens
+from llm_scheduler import set_default_priority
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_QUESTIONS_PATH = project_root / "benchmark_questions.json"
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """워크플로우 실행 중 LLM 호출 수와 프롬프트/완성 토큰을 집계하는 콜백"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs):
+        prompt_tokens = sum(
+            count_tokens(str(message.content)) for batch in messages for message in batch
+        )
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+    
+    def on_llm_end(self, response, **kwargs):
+        completion_tokens = sum(
+            completion_token_count(generation)
+            for generations in response.generations
+            for generation in generations
+        )
+        with self._lock:
+            self.completion_tokens += completion_tokens
+
+def completion_token_count(generation) -> int:
+    """
+    생성 결과 하나의 완성 토큰 수를 반환합니다.
+    
+    모델이 보고한 usage_metadata의 output_tokens를 우선 사용하고, 없으면 본문과 도구 호출 인자(구조화 출력 포함)를 셉니다.
+    """
+    message = getattr(generation, "message", None)
+    usage = getattr(message, "usage_metadata", None)
+    if usage and usage.get("output_tokens") is not None:
+        return usage["output_tokens"]
+    
+    tokens = count_tokens(generation.text or "")
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(json.dumps(call["args"], ensure_ascii=False))
+    return tokens
+
+class AgentPromptHandler(BaseCallbackHandler):
+    """에이전트 노드의 채팅 모델 호출마다 프롬프트 토큰 수를 기록하는 콜백"""
+    
+    def __init__(self):
+        self.prompt_tokens = []
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *,
+                            metadata: Dict[str, Any] = None, **kwargs):
+        if (metadata or {}).get("langgraph_node") != "agent":
+            return
+        self.prompt_tokens.append(sum(
+            count_tokens(str(message.content)) for batch in messages for message in batch
+        ))
+
+class NodeTimingHandler(BaseCallbackHandler):
+    """
+    LangGraph 콜백으로 노드와 조건부 엣지의 실행 시간을 수집하는 핸들러
+    
+    그래프 실행의 직계 자식 실행을 노드로 보고, 노드 안에서 실행되는 조건부 엣지 함수는
+    "노드:엣지" 이름으로 따로 기록합니다. (노드 시간에는 엣지 시간이 포함됩니다)
+    """
+    
+    def __init__(self, edge_names: set = None):
+        self.edge_names = set(edge_names or ())
+        self._lock = threading.Lock()
+        self._graph_runs = set()
+        self._node_runs = {}
+        self._active = {}
+        self.samples = defaultdict(list)
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or ""
+        now = time.perf_counter()
+        
+        with self._lock:
+            if parent_run_id is None:
+                self._graph_runs.add(run_id)
+            elif parent_run_id in self._graph_runs and not name.startswith("__"):
+                self._node_runs[run_id] = name
+                self._active[run_id] = (name, now)
+            elif parent_run_id in self._node_runs and name in self.edge_names:
+                self._active[run_id] = (f"{self._node_runs[parent_run_id]}:{name}", now)
+    
+    def _finish(self, run_id):
+        finished_at = time.perf_counter()
+        with self._lock:
+            self._graph_runs.discard(run_id)
+            self._node_runs.pop(run_id, None)
+            started = self._active.pop(run_id, None)
+            if started:
+                name, started_at = started
+                self.samples[name].append(finished_at - started_at)
+    
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+    
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    값 목록의 백분위수를 선형 보간으로 계산합니다.
+    
+    Args:
+        values: 측정값 목록
+        q: 백분위 (0 ~ 100)
+    
+    Returns:
+        float: 백분위수 (값이 없으면 0.0)
+    """
+    if not values:
+        return 0.0
+    
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def load_questions(path: Path = BENCHMARK_QUESTIONS_PATH) -> List[dict]:
+    """오프라인 질문 세트를 불러옵니다."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _final_answer(results: list) -> str:
+    """워크플로우 실행 결과에서 최종 답변을 추출합니다."""
+    for _, value in reversed(results):
+        messages = (value or {}).get("messages") or []
+        if messages:
+            return messages[-1].content
+    return ""
+
+def keyword_recall(answer: str, expected_keywords: List[str]) -> float:
+    """답변에 포함된 기대 키워드 비율을 품질 지표로 계산합니다."""
+    if not expected_keywords:
+        return 1.0
+    return sum(1 for keyword in expected_keywords if keyword in answer) / len(expected_keywords)
+
+def benchmark_profile(workflow, profile: str, questions: List[dict], repeats: int = 1) -> dict:
+    """
+    하나의 그래프 프로필을 질문 세트로 실행하고 결과를 요약합니다.
+    
+    Args:
+        workflow: 구축된 AgenticRAGWorkflow
+        profile: 측정할 그래프 프로필
+        questions: 질문 세트 (question, expected_keywords)
+        repeats: 질문당 반복 횟수
+    
+    Returns:
+        dict: 지연 시간 백분위수, 질문당 토큰/LLM 호출 수, 품질 점수
+    """
+    # 프로필 컴파일 비용은 측정에서 제외합니다
+    workflow.get_graph(profile)
+    
+    latencies = []
+    qualities = []
+    handler = TokenUsageHandler()
+    errors = 0
+    
+    for _ in range(repeats):
+        for item in questions:
+            started_at = time.perf_counter()
+            try:
+                results = workflow.run_workflow(item["question"], profile=profile, callbacks=[handler])
+            except Exception as e:
+                logger.error(f"벤치마크 질문 실패 ({profile}): {str(e)}")
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started_at)
+            qualities.append(keyword_recall(_final_answer(results), item.get("expected_keywords", [])))
+    
+    runs = len(latencies) or 1
+    return {
+        "profile": profile,
+        "runs": len(latencies),
+        "errors": errors,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p95_ms": percentile(latencies, 95) * 1000,
+        "latency_mean_ms": sum(latencies) / runs * 1000,
+        "llm_calls_per_question": handler.llm_calls / runs,
+        "prompt_tokens_per_question": handler.prompt_tokens / runs,
+        "completion_tokens_per_question": handler.completion_tokens / runs,
+        "quality_keyword_recall": sum(qualities) / len(qualities) if qualities else 0.0,
+    }
+
+def benchmark_profiles(workflow, profiles: List[str], questions: List[dict], repeats: int = 1) -> List[dict]:
+    """여러 그래프 프로필을 같은 질문 세트로 측정합니다."""
+    return [benchmark_profile(workflow, profile, questions, repeats) for profile in profiles]
+
+def format_table(rows: List[dict]) -> str:
+    """벤치마크 결과를 텍스트 표로 만듭니다."""
+    if not rows:
+        return ""
+    
+    columns = list(rows[0].keys())
+    widths = {
+        column: max(len(column), *(len(_format_cell(row[column])) for row in rows))
+        for column in columns
+    }
+    lines = [
+        "  ".join(column.ljust(widths[column]) for column in columns),
+        "  ".join("-" * widths[column] for column in columns),
+    ]
+    for row in rows:
+        lines.append("  ".join(_format_cell(row[column]).ljust(widths[column]) for column in columns))
+    return "\n".join(line.rstrip() for line in lines)
+
+def _format_cell(value) -> str:
+    """표 셀 값을 문자열로 변환합니다."""
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+def _latency_summary(values: List[float]) -> dict:
+    """지연 시간 목록을 밀리초 단위 백분위수로 요약합니다."""
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+    }
+
+def _edge_names(graph) -> set:
+    """컴파일된 그래프의 조건부 엣지 함수 이름을 반환합니다."""
+    return {name for branches in graph.builder.branches.values() for name in branches}
+
+def measure_allocations(workflow, profile: str, questions: List[dict]) -> dict:
+    """
+    tracemalloc으로 요청당 최대 메모리 사용량과 요청 후 남은 메모리를 측정합니다.
+    
+    tracemalloc은 실행 속도를 크게 떨어뜨리므로 지연 시간 측정과 분리해 순차 실행합니다.
+    
+    Args:
+        workflow: 구축된 AgenticRAGWorkflow
+        profile: 측정할 그래프 프로필
+        questions: 질문 세트
+    
+    Returns:
+        dict: 요청당 평균/최대 peak KB, 평균 잔류 KB
+    """
+    peaks = []
+    retained = []
+    
+    tracemalloc.start()
+    try:
+        for item in questions:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                workflow.run_workflow(item["question"], profile=profile)
+            except Exception as e:
+                logger.error(f"메모리 측정 질문 실패 ({profile}): {str(e)}")
+                continue
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    
+    return {
+        "peak_kb_mean": sum(peaks) / len(peaks) / 1024 if peaks else 0.0,
+        "peak_kb_max": max(peaks) / 1024 if peaks else 0.0,
+        "retained_kb_mean": sum(retained) / len(retained) / 1024 if retained else 0.0,
+    }
+
+def benchmark_nodes(workflow, profile: str, questions: List[dict], repeats: int = 1,
+                    concurrency: int = 1, allocations: bool = True) -> dict:
+    """
+    노드 단위 및 전체 지연 시간 백분위수, 처리량, 메모리 할당을 측정합니다.
+    
+    Args:
+        workflow: 구축된 AgenticRAGWorkflow
+        profile: 측정할 그래프 프로필
+        questions: 질문 세트
+        repeats: 질문당 반복 횟수
+        concurrency: 동시에 실행할 요청 수 (처리량 측정)
+        allocations: 메모리 할당 측정 여부
+    
+    Returns:
+        dict: end_to_end, nodes, throughput_rps, allocations 항목을 포함한 결과
+    """
+    graph = workflow.get_graph(profile)
+    handler = NodeTimingHandler(_edge_names(graph))
+    
+    # 첫 요청의 지연 초기화 비용(클라이언트 생성, 인코더 로드 등)은 측정에서 제외합니다
+    if questions:
+        workflow.run_workflow(questions[0]["question"], profile=profile)
+    
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    
+    def _run(question: str):
+        nonlocal errors
+        started_at = time.perf_counter()
+        try:
+            workflow.run_workflow(question, profile=profile, callbacks=[handler])
+        except Exception as e:
+            logger.error(f"벤치마크 질문 실패 ({profile}): {str(e)}")
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started_at)
+    
+    workload = [item["question"] for _ in range(repeats) for item in questions]
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        list(executor.map(_run, workload))
+    elapsed = time.perf_counter() - started_at
+    
+    return {
+        "profile": profile,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "end_to_end": _latency_summary(latencies),
+        "nodes": {name: _latency_summary(values) for name, values in sorted(handler.samples.items())},
+        "allocations": measure_allocations(workflow, profile, questions) if allocations else None,
+    }
+
+def format_node_report(result: dict) -> str:
+    """노드 벤치마크 결과를 텍스트 표로 만듭니다."""
+    rows = [{"stage": "end_to_end", **result["end_to_end"]}]
+    rows.extend({"stage": name, **summary} for name, summary in result["nodes"].items())
+    
+    lines = [
+        f"[{result['profile']}] 동시성 {result['concurrency']}, "
+        f"처리량 {result['throughput_rps']:.2f} req/s, 오류 {result['errors']}건",
+        format_table(rows),
+    ]
+    if result.get("allocations"):
+        allocations = result["allocations"]
+        lines.append(
+            f"메모리: 요청당 peak {allocations['peak_kb_mean']:.1f}KB (최대 {allocations['peak_kb_max']:.1f}KB), "
+            f"잔류 {allocations['retained_kb_mean']:.1f}KB"
+        )
+    return "\n".join(lines)
+
+def save_baseline(results: List[dict], path: str, settings: dict = None):
+    """
+    벤치마크 결과를 회귀 비교용 기준선 JSON으로 저장합니다.
+    
+    Args:
+        results: benchmark_nodes 결과 목록
+        path: 저장할 파일 경로
+        settings: 측정 조건 (가짜 모델 설정 등)
+    """
+    baseline = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": settings or {},
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+
+def compare_to_baseline(results: List[dict], baseline: dict, tolerance: float = 0.1,
+                        min_delta: float = 1.0) -> List[dict]:
+    """
+    현재 결과를 기준선과 비교합니다.
+    
+    Args:
+        results: 현재 benchmark_nodes 결과 목록
+        baseline: save_baseline으로 저장한 기준선
+        tolerance: 회귀로 판단할 상대 변화율 (0.1 = 10%)
+        min_delta: 회귀로 판단할 최소 절대 증가량 (ms 또는 KB, 아주 짧은 단계의 측정 잡음 무시)
+    
+    Returns:
+        List[dict]: 지표별 기준값, 현재값, 변화율, 회귀 여부
+    """
+    baseline_by_profile = {result["profile"]: result for result in baseline.get("results", [])}
+    rows = []
+    
+    def _compare(profile, metric, old, new, higher_is_better=False):
+        if old is None or new is None:
+            return
+        change = (new - old) / old if old else 0.0
+        if higher_is_better:
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance and new - old >= min_delta
+        rows.append({
+            "profile": profile,
+            "metric": metric,
+            "baseline": old,
+            "current": new,
+            "change_pct": change * 100,
+            "regressed": regressed,
+        })
+    
+    for result in results:
+        old = baseline_by_profile.get(result["profile"])
+        if old is None:
+            continue
+        
+        profile = result["profile"]
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            _compare(profile, f"end_to_end.{key}", old["end_to_end"][key], result["end_to_end"][key])
+        _compare(profile, "throughput_rps", old["throughput_rps"], result["throughput_rps"], higher_is_better=True)
+        
+        for name, summary in result["nodes"].items():
+            if name in old["nodes"]:
+                _compare(profile, f"{name}.p95_ms", old["nodes"][name]["p95_ms"], summary["p95_ms"])
+        
+        if result.get("allocations") and old.get("allocations"):
+            _compare(profile, "allocations.peak_kb_mean",
+                     old["allocations"]["peak_kb_mean"], result["allocations"]["peak_kb_mean"])
+    
+    return rows
+
+def _synthetic_trace():
+    """지표 기록 비용 측정용으로 balanced 프로필 한 건과 비슷한 추적 정보를 만듭니다."""
+    from tracing import Trace
+    
+    trace = Trace()
+    root = trace.start_span("run_workflow", "request")
+    for node in ("agent", "retrieve", "grade_documents", "generate"):
+        span = trace.start_span(node, "node", root)
+        if node in ("agent", "generate"):
+            llm = trace.start_span("FakeChatModel", "llm", span)
+            llm.attributes.update(prompt_tokens=120, completion_tokens=40)
+            llm.finish()
+        span.finish()
+    trace.record_cache("prefetch", True)
+    root.finish()
+    return trace
+
+def benchmark_metrics(iterations: int = 100000, concurrency: int = 1) -> List[dict]:
+    """
+    지표 기록 비용을 측정합니다.
+    
+    기록 경로는 스레드별 샤드에만 쓰므로 동시 실행 시에도 연산당 비용이 거의 같아야 합니다.
+    
+    Args:
+        iterations: 스레드당 반복 횟수 (요청 단위 기록은 1/10)
+        concurrency: 동시에 기록하는 스레드 수
+    
+    Returns:
+        List[dict]: 연산별 호출당 비용 (마이크로초)
+    """
+    from metrics import MetricsRegistry, record_workflow
+    
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_counter_total", "벤치마크용 카운터", ["node"])
+    histogram = registry.histogram("bench_latency_seconds", "벤치마크용 히스토그램", ["node"])
+    trace = _synthetic_trace()
+    results = [("agent", {}), ("retrieve", {}), ("generate", {})]
+    
+    operations = {
+        "counter.inc": (lambda: counter.labels("agent").inc(), iterations),
+        "histogram.observe": (lambda: histogram.labels("agent").observe(0.042), iterations),
+        "record_workflow": (lambda: record_workflow("balanced", trace, results, enabled=True), iterations // 10),
+        "render": (registry.render, max(1, iterations // 1000)),
+    }
+    
+    rows = []
+    for name, (operation, count) in operations.items():
+        def _run():
+            for _ in range(count):
+                operation()
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(_run) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+        
+        rows.append({
+            "operation": name,
+            "threads": concurrency,
+            "calls": count * concurrency,
+            "us_per_call": round(elapsed / (count * concurrency) * 1e6, 3),
+        })
+    return rows
+
+def benchmark_memory(workflow, questions: List[dict], turns: int = 50, profile: str = "balanced") -> dict:
+    """
+    한 대화에서 turns개 턴을 이어 가며 턴별 에이전트 프롬프트 크기를 측정합니다.
+    
+    대화 메모리가 켜져 있으면 턴이 쌓여도 프롬프트 크기가 일정해야 하고,
+    꺼져 있으면 이전 턴의 질문, 검색 결과, 답변이 모두 쌓여 턴 수에 비례해 커집니다.
+    
+    Args:
+        workflow: 구축된 AgenticRAGWorkflow (체크포인터로 턴 사이 상태를 이어 감)
+        questions: 순서대로 반복해 물을 질문 세트
+        turns: 대화 턴 수
+        profile: 측정할 그래프 프로필 (에이전트 노드가 있는 프로필)
+    
+    Returns:
+        dict: 턴별 최대 에이전트 프롬프트 토큰의 처음/중간/마지막 값과 구간 평균, 요약 호출 수
+    """
+    thread_id = f"memory-bench-{uuid.uuid4().hex}"
+    per_turn = []
+    latencies = []
+    
+    for turn in range(turns):
+        handler = AgentPromptHandler()
+        started_at = time.perf_counter()
+        workflow.run_workflow(questions[turn % len(questions)]["question"], profile=profile,
+                              callbacks=[handler], thread_id=thread_id)
+        latencies.append(time.perf_counter() - started_at)
+        per_turn.append(max(handler.prompt_tokens, default=0))
+    
+    window = max(1, min(10, turns // 2))
+    memory_stats = workflow.memory.stats.snapshot() if workflow.memory else {}
+    state = workflow.get_graph(profile, persistent=True).get_state({"configurable": {"thread_id": thread_id}})
+    return {
+        "memory": workflow.memory is not None,
+        "turns": turns,
+        "prompt_tokens_turn_1": per_turn[0],
+        "prompt_tokens_mid": per_turn[turns // 2],
+        "prompt_tokens_last": per_turn[-1],
+        "prompt_tokens_max": max(per_turn),
+        "first_window_mean": sum(per_turn[:window]) / window,
+        "last_window_mean": sum(per_turn[-window:]) / window,
+        "history_messages": len(state.values.get("messages", [])),
+        "summary_calls": memory_stats.get("summary_calls", 0),
+        "latency_mean_ms": sum(latencies) / turns * 1000,
+    }
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def benchmark_checkpoint(data_pipeline, questions: List[dict], turns: int = 50, profile: str = "balanced") -> List[dict]:
+    """
+    SQLite 체크포인터 설정별로 한 스레드에서 turns개 턴을 이어 가며 저장 비용을 측정합니다.
+    
+    - batched: 기본 설정 (CHECKPOINT_FLUSH_INTERVAL 간격의 그룹 커밋, 큰 값 압축)
+    - per_write: 쓰기마다 바로 커밋 (flush_interval=0)
+    - uncompressed: 그룹 커밋, 압축 없음
+    
+    Args:
+        data_pipeline: 구축된 데이터 파이프라인 (설정마다 새 워크플로우를 만듦)
+        questions: 순서대로 반복해 물을 질문 세트
+        turns: 대화 턴 수
+        profile: 측정할 그래프 프로필
+    
+    Returns:
+        List[dict]: 설정별 단계당 체크포인트 저장 지연 시간, 커밋 수, 쓰기 증폭, 디스크 크기, 턴 지연 시간
+    """
+    import tempfile
+    from checkpointer import SqliteCheckpointer
+    from workflow_graph import AgenticRAGWorkflow
+    
+    variants = {
+        "batched": {},
+        "per_write": {"flush_interval": 0},
+        "uncompressed": {"compress_min_bytes": 0},
+    }
+    rows = []
+    
+    for name, options in variants.items():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoints.sqlite")
+            checkpointer = SqliteCheckpointer(path, **options)
+            workflow = AgenticRAGWorkflow(data_pipeline, checkpointer=checkpointer).build_workflow(profile)
+            thread_id = f"checkpoint-bench-{name}"
+            latencies = []
+            
+            for turn in range(turns):
+                started_at = time.perf_counter()
+                workflow.run_workflow(questions[turn % len(questions)]["question"], profile=profile,
+                                      thread_id=thread_id)
+                latencies.append(time.perf_counter() - started_at)
+            
+            checkpointer.close()
+            stats = checkpointer.stats.snapshot()
+            steps = [latency * 1000 for latency in checkpointer.stats.step_latencies]
+            rows.append({
+                "variant": name,
+                "turns": turns,
+                "checkpoints": stats["checkpoints"],
+                "step_p50_ms": percentile(steps, 50),
+                "step_p95_ms": percentile(steps, 95),
+                "step_max_ms": max(steps, default=0.0),
+                "flushes": stats["flushes"],
+                "rows_per_flush": stats["rows_per_flush"],
+                "bytes_written_kb": sum(stats["bytes_written"].values()) / 1024,
+                "write_amplification": stats["write_amplification"],
+                "disk_kb": (_file_size(path) + _file_size(path + "-wal")) / 1024,
+                "turn_mean_ms": sum(latencies) / turns * 1000,
+            })
+    return rows
+
+def benchmark_batching(questions: List[dict], levels: List[int], requests: int = 200,
+                       embedding_latency: str = "0.02", embedding_concurrency: int = 4) -> List[dict]:
+    """
+    동시 요청 수별로 질의 임베딩과 벡터 검색을 마이크로 배치 없이/함께 실행해 처리량과 지연 시간을 비교합니다.
+    
+    가짜 임베딩은 호출마다 embedding_latency만큼 지연되고 동시에 embedding_concurrency개 호출만 처리하므로
+    임베딩 HTTP 요청 한 번의 고정 비용과 연결 풀/속도 제한으로 막히는 처리량을 흉내 냅니다.
+    검색은 서빙과 같은 읽기 전용 색인으로 실행하며, 질의는 모두 달라 검색 캐시와 무관합니다.
+    
+    Args:
+        questions: 질의를 만들 질문 세트
+        levels: 동시 요청 수 목록
+        requests: 단계별 요청 수
+        embedding_latency: 임베딩 호출당 지연 분포
+        embedding_concurrency: 임베딩 서비스가 동시에 처리하는 최대 호출 수
+    
+    Returns:
+        List[dict]: (배치 여부, 동시 요청 수)별 처리량, p50/p95 지연 시간, 평균 배치 크기
+    """
+    from data_pipeline import DataPipeline
+    from fakes import FakeEmbeddings, LatencyDistribution, create_offline_pipeline
+    from micro_batch import BatchingSearcher
+    from vector_index import VectorIndex
+    
+    embeddings = FakeEmbeddings(latency=LatencyDistribution.parse(embedding_latency), per_text_latency=0.0002,
+                                max_concurrency=embedding_concurrency)
+    built = create_offline_pipeline(embeddings)
+    pipeline = DataPipeline(embeddings=embeddings).load_index(VectorIndex.from_vectorstore(built.get_vectorstore()))
+    rows = []
+    
+    for batching in (False, True):
+        for concurrency in levels:
+            searcher = BatchingSearcher(pipeline) if batching else pipeline
+            latencies = []
+            
+            def _run(index: int):
+                query = f"{questions[index % len(questions)]['question']} {index}"
+                started_at = time.perf_counter()
+                searcher.search_by_vector(searcher.embed_query(query))
+                latencies.append(time.perf_counter() - started_at)
+            
+            started_at = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(_run, range(requests)))
+            elapsed = time.perf_counter() - started_at
+            
+            latency_ms = [latency * 1000 for latency in latencies]
+            batch_stats = searcher.snapshot()["embed"] if batching else {}
+            rows.append({
+                "batching": batching,
+                "concurrency": concurrency,
+                "requests": requests,
+                "throughput_qps": requests / elapsed,
+                "p50_ms": percentile(latency_ms, 50),
+                "p95_ms": percentile(latency_ms, 95),
+                "mean_batch_size": batch_stats.get("mean_batch_size", 1.0),
+                "embedding_calls": batch_stats.get("batches", requests),
+            })
+    return rows
+
+def benchmark_adaptive_k(data_pipeline, questions: List[dict]) -> List[dict]:
+    """
+    질문 세트를 고정 k(RETRIEVAL_TOP_K)와 적응형 검색 깊이로 검색해 문서 수, 문맥 토큰, 키워드 재현율을 비교합니다.
+    
+    LLM을 호출하지 않고 검색기만 실행하며, 문맥 토큰은 평가/생성 프롬프트에 들어갈 문서 토큰의 합입니다.
+    
+    Args:
+        data_pipeline: 검색할 데이터 파이프라인
+        questions: 질문 세트 (expected_keywords로 문맥의 키워드 재현율 계산)
+    
+    Returns:
+        List[dict]: 방식별 평균/최소/최대 k, 질문당 평균 문맥 토큰, 평균 키워드 재현율
+    """
+    from adaptive_k import AdaptiveTopK
+    from retrieval_cache import CachedRetriever
+    
+    rows = []
+    for mode in ("fixed", "adaptive"):
+        adaptive = AdaptiveTopK() if mode == "adaptive" else None
+        retriever = CachedRetriever(pipeline=data_pipeline, adaptive=adaptive)
+        ks, tokens, recalls = [], [], []
+        for item in questions:
+            documents = retriever.invoke(item["question"])
+            context = "\n\n".join(document.page_content for document in documents)
+            ks.append(len(documents))
+            tokens.append(count_tokens(context))
+            recalls.append(keyword_recall(context, item.get("expected_keywords", [])))
+        rows.append({
+            "mode": mode,
+            "questions": len(questions),
+            "mean_k": sum(ks) / len(ks),
+            "min_k": min(ks),
+            "max_k": max(ks),
+            "context_tokens": sum(tokens) / len(tokens),
+            "keyword_recall": sum(recalls) / len(recalls),
+        })
+    return rows
+
+def install_offline_models(args) -> dict:
+    """
+    명령줄 설정에 따라 가짜 채팅 모델과 임베딩을 설치하고 오프라인 파이프라인을 구축합니다.
+    
+    Returns:
+        dict: 기준선에 함께 저장할 측정 조건과 구축된 파이프라인
+    """
+    from fakes import FakeChatModel, FakeEmbeddings, LatencyDistribution, create_offline_pipeline, install_fake_chat_model
+    
+    install_fake_chat_model(FakeChatModel(
+        latency=LatencyDistribution.parse(args.fake_latency, seed=args.seed),
+        tokens_per_second=args.fake_tokens_per_second,
+        structured_outputs={
+            "binary_score": args.fake_grades.split(","),
+            "score": [int(score) for score in args.fake_scores.split(",")],
+        },
+    ))
+    pipeline = create_offline_pipeline(FakeEmbeddings(
+        latency=LatencyDistribution.parse(args.fake_embedding_latency, seed=args.seed)
+    ))
+    
+    settings = {
+        "offline": True,
+        "fake_latency": args.fake_latency,
+        "fake_tokens_per_second": args.fake_tokens_per_second,
+        "fake_grades": args.fake_grades,
+        "fake_scores": args.fake_scores,
+        "fake_embedding_latency": args.fake_embedding_latency,
+        "seed": args.seed,
+    }
+    return {"settings": settings, "pipeline": pipeline}
+
+def main():
+    """메인 실행 함수"""
+    from workflow_graph import GRAPH_PROFILES, AgenticRAGWorkflow, create_workflow_with_data_pipeline
+    
+    parser = argparse.ArgumentParser(description="그래프 프로필 및 노드 단위 벤치마크")
+    parser.add_argument("--suite", choices=["profiles", "nodes", "metrics", "memory", "checkpoint", "batching",
+                                            "adaptive"],
+                        default="profiles",
+                        help="profiles: 프로필별 토큰/품질 비교, nodes: 노드 단위 지연 시간/처리량/메모리, "
+                             "metrics: 지표 기록 비용, memory: 여러 턴 대화의 에이전트 프롬프트 크기, "
+                             "checkpoint: 체크포인터 설정별 저장 지연 시간과 쓰기 증폭, "
+                             "batching: 동시 요청 수별 마이크로 배치 검색 처리량 (항상 가짜 임베딩 사용), "
+                             "adaptive: 고정 k와 적응형 검색 깊이의 문서 수/문맥 토큰 비교")
+    parser.add_argument("--profiles", nargs="+", default=list(GRAPH_PROFILES), help="측정할 프로필")
+    parser.add_argument("--questions", default=str(BENCHMARK_QUESTIONS_PATH), help="질문 세트 JSON 파일")
+    parser.add_argument("--repeats", type=int, default=1, help="질문당 반복 횟수")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 요청 수 (nodes, metrics)")
+    parser.add_argument("--iterations", type=int, default=100000, help="스레드당 기록 횟수 (metrics)")
+    parser.add_argument("--turns", type=int, default=50, help="대화 턴 수 (memory, checkpoint)")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32], help="동시 요청 수 단계 (batching)")
+    parser.add_argument("--requests", type=int, default=200, help="단계별 요청 수 (batching)")
+    parser.add_argument("--embedding-concurrency", type=int, default=4,
+                        help="임베딩 서비스의 최대 동시 호출 수 (batching, 0이면 제한 없음)")
+    parser.add_argument("--no-allocations", action="store_true", help="메모리 할당 측정 생략 (nodes)")
+    parser.add_argument("--save-baseline", help="결과를 기준선 JSON으로 저장 (nodes)")
+    parser.add_argument("--compare", help="비교할 기준선 JSON 파일 (nodes)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="회귀로 판단할 변화율 (기본 0.1 = 10%%)")
+    
+    offline = parser.add_argument_group("오프라인 가짜 모델")
+    offline.add_argument("--offline", action="store_true", help="OpenAI 대신 가짜 모델과 임베딩 사용")
+    offline.add_argument("--fake-latency", default="lognormal:0.2:0.3", help="LLM 첫 토큰 지연 분포 (종류:평균[:퍼짐])")
+    offline.add_argument("--fake-tokens-per-second", type=float, default=80.0, help="LLM 토큰 생성 속도")
+    offline.add_argument("--fake-grades", default="yes", help="문서 평가 결과 순서 (예: yes,no)")
+    offline.add_argument("--fake-scores", default="7", help="문서별 관련성 점수 순서 (예: 8,3,6)")
+    offline.add_argument("--fake-embedding-latency", default="0.02", help="임베딩 호출 지연 분포")
+    offline.add_argument("--seed", type=int, default=0, help="지연 시간 난수 시드")
+    args = parser.parse_args()
+    
+    # 벤치마크 호출은 같은 프로세스의 사용자 질문보다 낮은 우선순위로 스케줄링합니다
+    set_default_priority("report")
+    
+    if args.suite == "metrics":
+        # 워크플로우 없이 지표 기록 경로만 측정
+        print(format_table(benchmark_metrics(args.iterations, args.concurrency)))
+        return
+    
+    if args.suite == "batching":
+        # 워크플로우 없이 검색 경로만 측정
+        rows = benchmark_batching(load_questions(Path(args.questions)), args.levels, args.requests,
+                                  args.fake_embedding_latency, args.embedding_concurrency)
+        print(format_table(rows))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+        return
+    
+    settings = {}
+    if args.offline:
+        offline_setup = install_offline_models(args)
+        settings = offline_setup["settings"]
+        workflow = AgenticRAGWorkflow(offline_setup["pipeline"]).build_workflow()
+    else:
+        workflow = create_workflow_with_data_pipeline()
+    questions = load_questions(Path(args.questions))
+    
+    if args.suite == "profiles":
+        rows = benchmark_profiles(workflow, args.profiles, questions, args.repeats)
+        print(format_table(rows))
+    elif args.suite == "memory":
+        # 같은 파이프라인으로 대화 메모리를 켠 워크플로우와 끈 워크플로우를 비교 (턴 사이 상태는 메모리 체크포인터에 보관)
+        from checkpointer import create_checkpointer
+        rows = [
+            benchmark_memory(AgenticRAGWorkflow(workflow.data_pipeline, memory=memory,
+                                                checkpointer=create_checkpointer("")).build_workflow(),
+                             questions, args.turns)
+            for memory in (True, False)
+        ]
+        print(format_table(rows))
+    elif args.suite == "checkpoint":
+        rows = benchmark_checkpoint(workflow.data_pipeline, questions, args.turns)
+        print(format_table(rows))
+    elif args.suite == "adaptive":
+        rows = benchmark_adaptive_k(workflow.data_pipeline, questions)
+        print(format_table(rows))
+    else:
+        rows = [
+            benchmark_nodes(workflow, profile, questions, args.repeats,
+                            args.concurrency, allocations=not args.no_allocations)
+            for profile in args.profiles
+        ]
+        print("\n\n".join(format_node_report(result) for result in rows))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+    if args.suite != "nodes":
+        return
+    
+    if args.save_baseline:
+        save_baseline(rows, args.save_baseline, {**settings, "concurrency": args.concurrency, "repeats": args.repeats})
+        print(f"\n기준선 저장: {args.save_baseline}")
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparison = compare_to_baseline(rows, json.load(f), args.tolerance)
+        print("\n기준선 비교")
+        print(format_table(comparison))
+        
+        regressions = [row for row in comparison if row["regressed"]]
+        if regressions:
+            print(f"\n⚠️ 성능 회귀 {len(regressions)}건 (허용 변화율 {args.tolerance * 100:.0f}%)")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
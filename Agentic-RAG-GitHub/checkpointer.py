@@ -0,0 +1,403 @@
+"""
+체크포인터: 그래프 상태를 SQLite(WAL)에 저장해 스레드 ID로 대화를 이어 가고 중단된 실행을 재개
+
+- 채널 값은 값이 바뀐 채널만 (채널, 버전) 단위로 저장하므로 매 단계 전체 상태를 다시 쓰지 않습니다.
+- 값은 msgpack으로 직렬화하고 CHECKPOINT_COMPRESS_MIN_BYTES 이상이면 zlib로 압축합니다.
+- 그래프 단계마다 호출되는 put()/put_writes()는 행을 버퍼에 넣고 바로 반환하며, 백그라운드 스레드가
+  CHECKPOINT_FLUSH_INTERVAL마다(또는 CHECKPOINT_BATCH_SIZE행이 모이면) 한 트랜잭션으로 커밋합니다.
+  워크플로우는 턴이 끝날 때 flush()를 호출하므로 응답한 턴은 항상 디스크에 남습니다.
+- 여러 프로세스가 같은 파일을 열어도 WAL 모드라 읽기가 쓰기를 막지 않습니다.
+"""
+import atexit
+import logging
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, Iterator, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple,
+    get_checkpoint_id, get_checkpoint_metadata
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from config import (
+    CHECKPOINT_PATH, CHECKPOINT_BATCH_SIZE, CHECKPOINT_FLUSH_INTERVAL, CHECKPOINT_COMPRESS_MIN_BYTES
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+"""
+
+_INSERT_CHECKPOINT = "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_BLOB = "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?, ?)"
+# 일반 쓰기는 같은 작업이 다시 실행돼도 처음 값을 유지하고, 오류/중단 같은 특수 쓰기(음수 인덱스)는 덮어씁니다
+_INSERT_WRITE = "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_REPLACE_WRITE = "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+_COMPRESSED_SUFFIX = "+zlib"
+
+class CompactSerializer(JsonPlusSerializer):
+    """msgpack 직렬화 결과가 compress_min_bytes 이상이면 zlib로 압축하는 직렬화기"""
+    
+    def __init__(self, compress_min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES):
+        """
+        Args:
+            compress_min_bytes: 압축할 최소 크기 (바이트, 0이면 압축하지 않음)
+        """
+        super().__init__()
+        self.compress_min_bytes = compress_min_bytes
+    
+    def dumps_typed(self, obj: Any) -> tuple:
+        type_, data = super().dumps_typed(obj)
+        if self.compress_min_bytes and len(data) >= self.compress_min_bytes:
+            compressed = zlib.compress(data, 3)
+            if len(compressed) < len(data):
+                return type_ + _COMPRESSED_SUFFIX, compressed
+        return type_, data
+    
+    def loads_typed(self, data: tuple) -> Any:
+        type_, payload = data
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            return super().loads_typed((type_[:-len(_COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+class CheckpointStats:
+    """체크포인트 저장 통계 (단계별 저장 지연 시간과 종류별 저장 바이트)"""
+    
+    def __init__(self, max_samples: int = 10000):
+        self._lock = threading.Lock()
+        self.checkpoints = 0
+        self.writes = 0
+        self.flushes = 0
+        self.rows = 0
+        self.flush_seconds = 0.0
+        self.bytes = {"checkpoint": 0, "blob": 0, "write": 0}
+        self.step_latencies = deque(maxlen=max_samples)
+    
+    def record_put(self, kind: str, latency: float):
+        """put()/put_writes() 호출 한 번을 기록합니다."""
+        with self._lock:
+            if kind == "write":
+                self.writes += 1
+            else:
+                self.checkpoints += 1
+            self.step_latencies.append(latency)
+    
+    def record_bytes(self, kind: str, size: int):
+        """직렬화한 값의 크기를 종류별("checkpoint", "blob", "write")로 기록합니다."""
+        with self._lock:
+            self.bytes[kind] += size
+    
+    def record_flush(self, rows: int, seconds: float):
+        """버퍼를 한 트랜잭션으로 커밋한 결과를 기록합니다."""
+        with self._lock:
+            self.flushes += 1
+            self.rows += rows
+            self.flush_seconds += seconds
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            latencies = list(self.step_latencies)
+            written = sum(self.bytes.values())
+            return {
+                "checkpoints": self.checkpoints,
+                "writes": self.writes,
+                "flushes": self.flushes,
+                "rows_per_flush": self.rows / self.flushes if self.flushes else 0.0,
+                "mean_flush_ms": self.flush_seconds / self.flushes * 1000 if self.flushes else 0.0,
+                "mean_step_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                "max_step_ms": max(latencies, default=0.0) * 1000,
+                "bytes_written": dict(self.bytes),
+                # 노드 출력(쓰기) 1바이트당 저장한 바이트 수
+                "write_amplification": written / self.bytes["write"] if self.bytes["write"] else 0.0,
+            }
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """
+    SQLite(WAL) 기반 LangGraph 체크포인터
+    
+    저장은 버퍼에 모아 묶어서 커밋하고, 읽기(get_tuple/list)는 먼저 버퍼를 비운 뒤 데이터베이스에서 읽습니다.
+    그래프는 실행을 시작할 때 스레드의 마지막 체크포인트를 한 번 읽습니다.
+    """
+    
+    def __init__(self, path: str = CHECKPOINT_PATH, batch_size: int = CHECKPOINT_BATCH_SIZE,
+                 flush_interval: float = CHECKPOINT_FLUSH_INTERVAL,
+                 compress_min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES):
+        """
+        Args:
+            path: 데이터베이스 파일 경로
+            batch_size: 이만큼 행이 모이면 주기를 기다리지 않고 커밋
+            flush_interval: 버퍼를 커밋하는 주기 (초, 0이면 저장할 때마다 바로 커밋)
+            compress_min_bytes: 값을 압축할 최소 크기 (바이트, 0이면 압축하지 않음)
+        """
+        super().__init__(serde=CompactSerializer(compress_min_bytes))
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.stats = CheckpointStats()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = None
+        if flush_interval > 0:
+            self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+            self._writer.start()
+        # 프로세스가 끝날 때 버퍼에 남은 체크포인트를 커밋
+        atexit.register(self.close)
+    
+    def _enqueue(self, rows: list):
+        with self._pending_lock:
+            self._pending.extend(rows)
+            pending = len(self._pending)
+        if self._writer is None:
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wakeup.set()
+    
+    def _write_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"체크포인트 저장 실패: {str(e)}")
+    
+    def flush(self):
+        """버퍼에 모인 저장을 한 트랜잭션으로 커밋합니다."""
+        with self._db_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows or self._conn is None:
+                return
+            
+            started_at = time.perf_counter()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in rows:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                # 다음 커밋에서 다시 시도하도록 버퍼 앞에 되돌려 둡니다
+                with self._pending_lock:
+                    self._pending[:0] = rows
+                raise
+            self.stats.record_flush(len(rows), time.perf_counter() - started_at)
+    
+    def close(self):
+        """버퍼를 커밋하고 데이터베이스 연결을 닫습니다."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+            self._conn = None
+        atexit.unregister(self.close)
+    
+    def _query(self, sql: str, params: tuple) -> list:
+        self.flush()
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def _dumps(self, kind: str, value: Any) -> tuple:
+        type_, data = self.serde.dumps_typed(value)
+        self.stats.record_bytes(kind, len(data))
+        return type_, data
+    
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """스레드의 마지막 체크포인트(또는 config의 checkpoint_id)를 반환합니다."""
+        return next(self.list(config, limit=1), None)
+    
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """체크포인트를 최신 순서로 반환합니다."""
+        where, params = [], []
+        if config:
+            where.append("thread_id = ? AND checkpoint_ns = ?")
+            params += [config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", "")]
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        
+        sql = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, " \
+              "metadata_type, metadata FROM checkpoints"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+        if limit is not None and not filter:
+            # 메타데이터 필터가 없으면 필요한 행만 읽습니다 (get_tuple은 스레드 길이와 관계없이 한 행)
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        count = 0
+        for thread_id, ns, checkpoint_id, parent_id, type_, data, metadata_type, metadata_data in self._query(sql, tuple(params)):
+            metadata = self.serde.loads_typed((metadata_type, metadata_data))
+            if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield self._load_tuple(thread_id, ns, checkpoint_id, parent_id, self.serde.loads_typed((type_, data)),
+                                   metadata)
+    
+    def _load_tuple(self, thread_id: str, ns: str, checkpoint_id: str, parent_id: Optional[str],
+                    checkpoint: Checkpoint, metadata: CheckpointMetadata) -> CheckpointTuple:
+        # 체크포인트가 가리키는 채널 버전의 값을 한 번의 조회로 읽습니다
+        versions = checkpoint["channel_versions"]
+        channel_values = {}
+        if versions:
+            blobs = self._query(
+                "SELECT channel, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND ("
+                + " OR ".join(["(channel = ? AND version = ?)"] * len(versions)) + ")",
+                (thread_id, ns, *(value for item in versions.items() for value in (item[0], str(item[1])))),
+            )
+            channel_values = {
+                channel: self.serde.loads_typed((type_, blob)) for channel, type_, blob in blobs if type_ != "empty"
+            }
+        
+        writes = self._query(
+            "SELECT task_id, channel, type, blob FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, ns, checkpoint_id),
+        )
+        
+        def _config(checkpoint_id: str) -> RunnableConfig:
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}}
+        
+        return CheckpointTuple(
+            config=_config(checkpoint_id),
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=metadata,
+            parent_config=_config(parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, blob))) for task_id, channel, type_, blob in writes
+            ],
+        )
+    
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        """체크포인트와 이번 단계에서 바뀐 채널 값을 버퍼에 넣습니다."""
+        started_at = time.perf_counter()
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+        rows = []
+        for channel, version in new_versions.items():
+            type_, data = self._dumps("blob", values[channel]) if channel in values else ("empty", None)
+            rows.append((_INSERT_BLOB, (thread_id, ns, channel, str(version), type_, data)))
+        
+        type_, data = self._dumps("checkpoint", checkpoint)
+        metadata_type, metadata_data = self._dumps("checkpoint", get_checkpoint_metadata(config, metadata))
+        rows.append((_INSERT_CHECKPOINT, (
+            thread_id, ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+            type_, data, metadata_type, metadata_data,
+        )))
+        
+        self._enqueue(rows)
+        self.stats.record_put("checkpoint", time.perf_counter() - started_at)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+    
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple], task_id: str, task_path: str = ""):
+        """노드 출력(체크포인트 사이의 중간 쓰기)을 버퍼에 넣습니다."""
+        started_at = time.perf_counter()
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        
+        rows = []
+        for index, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, index)
+            type_, data = self._dumps("write", value)
+            rows.append((_REPLACE_WRITE if idx < 0 else _INSERT_WRITE,
+                         (thread_id, ns, checkpoint_id, task_id, idx, channel, type_, data, task_path)))
+        
+        self._enqueue(rows)
+        self.stats.record_put("write", time.perf_counter() - started_at)
+    
+    def delete_thread(self, thread_id: str):
+        """스레드의 모든 체크포인트와 쓰기를 지웁니다."""
+        self.flush()
+        with self._db_lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            for table in ("checkpoints", "blobs", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("COMMIT")
+    
+    def get_next_version(self, current: Optional[str], channel: Any) -> str:
+        # 버전은 체크포인트마다 채널 수만큼 저장되므로 짧게 유지합니다. 문자열로 비교해도 순서가 맞도록
+        # 번호를 0으로 채우고, 같은 체크포인트에서 갈라진 실행의 값이 섞이지 않도록 난수를 붙입니다
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:010}.{random.getrandbits(32):08x}"
+
+def create_checkpointer(path: str = CHECKPOINT_PATH) -> BaseCheckpointSaver:
+    """
+    설정에 맞는 체크포인터를 생성합니다.
+    
+    Args:
+        path: SQLite 파일 경로 (비어 있으면 프로세스 메모리에만 저장하는 MemorySaver)
+    """
+    if not path:
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+    return SqliteCheckpointer(path)
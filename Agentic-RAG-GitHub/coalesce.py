@@ -0,0 +1,210 @@
+"""
+요청 병합(single-flight): 같은 질문이 동시에 들어오면 한 번만 실행하고 결과를 함께 전달
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Hashable, Iterator, List, Tuple
+from config import COALESCE_TIMEOUT
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CoalesceTimeout(TimeoutError):
+    """합류한 실행이 제한 시간 안에 끝나지 않음"""
+
+class CoalesceStats:
+    """요청 병합 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+    
+    def record_execution(self):
+        """직접 실행한 요청을 기록합니다."""
+        with self._lock:
+            self.executions += 1
+    
+    def record_coalesced(self):
+        """실행 중인 요청에 합류한 요청을 기록합니다."""
+        with self._lock:
+            self.coalesced += 1
+    
+    def record_timeout(self):
+        """합류 후 제한 시간을 넘긴 요청을 기록합니다."""
+        with self._lock:
+            self.timeouts += 1
+    
+    def record_error(self):
+        """실행 오류를 전달받은 합류 요청을 기록합니다."""
+        with self._lock:
+            self.errors += 1
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            requests = self.executions + self.coalesced
+            return {
+                "requests": requests,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "collapse_ratio": self.coalesced / requests if requests else 0.0,
+            }
+
+def normalize_question(question: str) -> str:
+    """대소문자, 공백, 끝의 문장 부호 차이를 무시한 질문을 반환합니다."""
+    return re.sub(r"[\s?？!.。]+$", "", " ".join(question.lower().split()))
+
+def coalesce_key(question: str, profile: str) -> Tuple[str, str]:
+    """병합 키 (정규화한 질문, 그래프 프로필)를 반환합니다."""
+    return normalize_question(question), profile
+
+class InFlightCall:
+    """
+    실행 중인 요청 하나
+    
+    실행한 요청(리더)은 노드 출력을 publish로 알리고 끝나면 finish/fail을 호출합니다.
+    합류한 요청은 result/aresult로 최종 결과를, events로 노드 출력 스트림을 받습니다.
+    """
+    
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.started_at = time.monotonic()
+        self.future = Future()
+        self.followers = 0
+        self._events = []
+        self._condition = threading.Condition()
+    
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+    
+    def publish(self, event):
+        """노드 출력 하나를 합류한 요청에 전달합니다."""
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify_all()
+    
+    def finish(self):
+        """실행 성공을 알립니다 (결과는 지금까지 전달한 노드 출력 목록)."""
+        with self._condition:
+            self.future.set_result(list(self._events))
+            self._condition.notify_all()
+    
+    def fail(self, error: BaseException):
+        """실행 오류를 합류한 모든 요청에 전달합니다."""
+        with self._condition:
+            self.future.set_exception(error)
+            self._condition.notify_all()
+    
+    def _remaining(self, timeout: float) -> float:
+        return self.started_at + timeout - time.monotonic()
+    
+    def events(self, timeout: float) -> Iterator:
+        """
+        처음부터의 노드 출력을 순서대로 내보내고, 실행이 끝날 때까지 새 출력을 기다립니다.
+        
+        Args:
+            timeout: 실행 시작부터 기다릴 최대 시간 (초)
+        
+        Raises:
+            CoalesceTimeout: 제한 시간 안에 실행이 끝나지 않음
+            Exception: 리더 실행에서 발생한 오류
+        """
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self._events) and not self.done:
+                    remaining = self._remaining(timeout)
+                    if remaining <= 0:
+                        raise CoalesceTimeout(f"병합된 실행이 {timeout}초 안에 끝나지 않았습니다: {self.key}")
+                    self._condition.wait(remaining)
+                pending = self._events[index:]
+                finished = self.done
+            
+            yield from pending
+            index += len(pending)
+            if finished and index >= len(self._events):
+                error = self.future.exception()
+                if error is not None:
+                    raise error
+                return
+    
+    def result(self, timeout: float) -> List:
+        """실행 결과를 기다립니다 (스레드 실행 경로)."""
+        try:
+            return list(self.future.result(max(0.0, self._remaining(timeout))))
+        except TimeoutError as e:
+            if self.done:
+                raise
+            raise CoalesceTimeout(f"병합된 실행이 {timeout}초 안에 끝나지 않았습니다: {self.key}") from e
+    
+    async def aresult(self, timeout: float) -> List:
+        """실행 결과를 기다립니다 (비동기 실행 경로)."""
+        # 기다리던 요청이 취소되어도 다른 합류 요청이 받을 결과는 취소되지 않도록 shield 사용
+        waiter = asyncio.shield(asyncio.wrap_future(self.future))
+        try:
+            return list(await asyncio.wait_for(waiter, max(0.0, self._remaining(timeout))))
+        except asyncio.TimeoutError as e:
+            if self.done:
+                raise
+            raise CoalesceTimeout(f"병합된 실행이 {timeout}초 안에 끝나지 않았습니다: {self.key}") from e
+
+class SingleFlight:
+    """
+    키별로 실행 중인 요청을 하나만 유지하는 병합기
+    
+    같은 키의 요청이 실행 중이면 새 요청은 그 실행에 합류합니다.
+    실행 시작 후 timeout이 지난 요청에는 더 이상 합류하지 않고 새로 실행합니다.
+    """
+    
+    def __init__(self, timeout: float = COALESCE_TIMEOUT, stats: CoalesceStats = None):
+        self.timeout = timeout
+        self.stats = stats or CoalesceStats()
+        self._calls = {}
+        self._lock = threading.Lock()
+    
+    def join(self, key: Hashable) -> Tuple[InFlightCall, bool]:
+        """
+        키에 해당하는 실행에 합류하거나 새 실행을 등록합니다.
+        
+        Args:
+            key: 병합 키
+        
+        Returns:
+            Tuple[InFlightCall, bool]: (실행, 직접 실행해야 하는지 여부)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and not call.done and time.monotonic() - call.started_at < self.timeout:
+                call.followers += 1
+                self.stats.record_coalesced()
+                return call, False
+            
+            call = InFlightCall(key)
+            self._calls[key] = call
+        
+        self.stats.record_execution()
+        return call, True
+    
+    def release(self, call: InFlightCall):
+        """끝난 실행을 등록에서 제거합니다."""
+        with self._lock:
+            if self._calls.get(call.key) is call:
+                del self._calls[call.key]
+        if call.followers:
+            logger.info(f"요청 병합: {call.followers}개 요청이 실행 한 번을 공유했습니다 ({call.key[0]})")
+    
+    def in_flight(self) -> int:
+        """실행 중인 키 수를 반환합니다."""
+        with self._lock:
+            return len(self._calls)
@@ -1,129 +1,323 @@
-"""
-핵심 컴포넌트: 에이전트 상태 관리 및 도구 시스템
-"""
-from typing import Annotated, Sequence, TypedDict
-from langchain_core.messages import BaseMessage
-from langgraph.graph.message import add_messages
-from langchain.tools.retriever import create_retriever_tool
-from langchain_core.tools import BaseTool
-
-class AgentState(TypedDict):
-    """에이전트 상태를 나타내는 데이터 구조"""
-    # add_messages는 상태가 업데이트될 때 메시지를 "추가"하라고 지시합니다.
-    # 기본값은 덮어쓰기입니다.
-    messages: Annotated[Sequence[BaseMessage], add_messages]
-
-class ToolManager:
-    """도구 관리 클래스"""
-    
-    def __init__(self, retriever):
-        self.retriever = retriever
-        self.tools = self._create_tools()
-    
-    def _create_tools(self) -> list[BaseTool]:
-        """검색 도구를 생성합니다."""
-        retriever_tool = create_retriever_tool(
-            self.retriever,
-            "retrieve_financial_info",
-            "네이버, 야후, 다음의 금융 관련 정보를 검색하고 반환합니다. "
-            "사용자의 질문과 관련된 금융 정보를 찾을 때 사용하세요.",
-        )
-        
-        return [retriever_tool]
-    
-    def get_tools(self) -> list[BaseTool]:
-        """사용 가능한 도구 목록을 반환합니다."""
-        return self.tools
-    
-    def get_tool_names(self) -> list[str]:
-        """도구 이름 목록을 반환합니다."""
-        return [tool.name for tool in self.tools]
-
-def create_tools_condition(state) -> str:
-    """
-    에이전트가 도구를 사용할지 결정하는 조건부 함수
-    
-    Args:
-        state: 현재 에이전트 상태
-        
-    Returns:
-        str: "tools" 또는 END
-    """
-    messages = state["messages"]
-    
-    # 마지막 메시지가 도구 호출을 요청하는지 확인
-    last_message = messages[-1]
-    
-    # 도구 사용이 필요한 경우 "tools" 반환
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        return "tools"
-    
-    # 도구 사용이 필요하지 않은 경우 END 반환
-    return "end"
-
-def validate_state(state: AgentState) -> bool:
-    """
-    에이전트 상태의 유효성을 검증합니다.
-    
-    Args:
-        state: 검증할 상태
-        
-    Returns:
-        bool: 유효한 상태인지 여부
-    """
-    if not isinstance(state, dict):
-        return False
-    
-    if "messages" not in state:
-        return False
-    
-    if not isinstance(state["messages"], (list, tuple)):
-        return False
-    
-    return True
-
-def get_last_user_message(state: AgentState) -> str:
-    """
-    상태에서 마지막 사용자 메시지를 추출합니다.
-    
-    Args:
-        state: 에이전트 상태
-        
-    Returns:
-        str: 마지막 사용자 메시지
-    """
-    if not validate_state(state):
-        raise ValueError("유효하지 않은 상태입니다.")
-    
-    messages = state["messages"]
-    
-    # 사용자 메시지를 찾습니다 (HumanMessage)
-    for message in reversed(messages):
-        if hasattr(message, 'type') and message.type == 'human':
-            return message.content
-    
-    # 사용자 메시지를 찾을 수 없는 경우
-    raise ValueError("사용자 메시지를 찾을 수 없습니다.")
-
-def get_last_assistant_message(state: AgentState) -> str:
-    """
-    상태에서 마지막 어시스턴트 메시지를 추출합니다.
-    
-    Args:
-        state: 에이전트 상태
-        
-    Returns:
-        str: 마지막 어시스턴트 메시지
-    """
-    if not validate_state(state):
-        raise ValueError("유효하지 않은 상태입니다.")
-    
-    messages = state["messages"]
-    
-    # 어시스턴트 메시지를 찾습니다 (AIMessage)
-    for message in reversed(messages):
-        if hasattr(message, 'type') and message.type == 'ai':
-            return message.content
-    
-    # 어시스턴트 메시지를 찾을 수 없는 경우
-    raise ValueError("어시스턴트 메시지를 찾을 수 없습니다.")
+"""
+핵심 컴포넌트: 에이전트 상태 관리 및 도구 시스템
+
+LangGraph와 LangChain 도구 모듈은 가져오는 데 오래 걸리므로 AgentState와 검색 도구를 처음 사용할 때 가져옵니다.
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING, Annotated, Iterable, List, NamedTuple, Optional, Sequence, TypedDict
+from config import (
+    OPENAI_MODEL, OPENAI_BASE_URL, OPENAI_TIMEOUT, OPENAI_MAX_RETRIES, LLM_SCHEDULER, MAX_REWRITES
+)
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_core.tools import BaseTool
+
+class RetrievedDocument(NamedTuple):
+    """
+    검색된 문서 하나
+    
+    원문은 검색기가 반환한 Document를 복사하지 않고 참조하며, 노드 사이에는 이 참조만 전달됩니다.
+    """
+    id: str
+    document: 'Document'
+    score: Optional[float] = None   # 검색 유사도 (검색기가 제공한 경우)
+    tokens: int = 0                 # 원문 토큰 수
+    grade: Optional[int] = None     # 문서별 관련성 평가 점수 0~10 (평가 전이면 None)
+    
+    @property
+    def text(self) -> str:
+        return self.document.page_content
+
+def to_retrieved_documents(documents: Iterable['Document']) -> List[RetrievedDocument]:
+    """
+    검색기가 반환한 문서 목록을 상태에 저장할 RetrievedDocument 목록으로 변환합니다.
+    
+    Args:
+        documents: 검색 순위 순서의 문서 목록 (metadata의 "score"를 검색 유사도로 사용)
+    
+    Returns:
+        List[RetrievedDocument]: 같은 순서의 검색 결과
+    """
+    from multi_query import chunk_id
+    
+    return [
+        RetrievedDocument(
+            id=chunk_id(document),
+            document=document,
+            score=document.metadata.get("score"),
+            tokens=count_tokens(document.page_content),
+        )
+        for document in documents
+    ]
+
+def join_documents(documents: Iterable[RetrievedDocument]) -> str:
+    """프롬프트에 넣을 문맥 문자열을 만듭니다."""
+    return "\n\n".join(document.text for document in documents)
+
+@lru_cache(maxsize=1)
+def _define_agent_state() -> type:
+    from langchain_core.messages import BaseMessage
+    from langgraph.graph.message import add_messages
+    
+    class AgentState(TypedDict, total=False):
+        """에이전트 상태를 나타내는 데이터 구조"""
+        # add_messages는 상태가 업데이트될 때 메시지를 "추가"하라고 지시합니다.
+        # 기본값은 덮어쓰기입니다.
+        messages: Annotated[Sequence[BaseMessage], add_messages]
+        # 원본 사용자 질문과 현재 검색 질의 (재작성되면 바뀜)
+        question: str
+        query: str
+        # 마지막 검색 결과와 평가 판정 ("yes"면 관련 문서 있음)
+        documents: List[RetrievedDocument]
+        verdict: str
+        # 재작성 횟수와 허용 횟수
+        rewrites: int
+        max_rewrites: int
+        # 대화 메모리가 요약에 합친 이전 턴의 요약
+        summary: str
+    
+    return AgentState
+
+def __getattr__(name: str):
+    # `from components import AgentState`를 처음 실행할 때 AgentState를 정의합니다
+    if name == "AgentState":
+        return _define_agent_state()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class ToolManager:
+    """도구 관리 클래스"""
+    
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self.tools = self._create_tools()
+    
+    def _create_tools(self) -> list['BaseTool']:
+        """검색 도구를 생성합니다."""
+        from langchain.tools.retriever import create_retriever_tool
+        
+        retriever_tool = create_retriever_tool(
+            self.retriever,
+            "retrieve_financial_info",
+            "네이버, 야후, 다음의 금융 관련 정보를 검색하고 반환합니다. "
+            "사용자의 질문과 관련된 금융 정보를 찾을 때 사용하세요.",
+        )
+        
+        return [retriever_tool]
+    
+    def get_tools(self) -> list['BaseTool']:
+        """사용 가능한 도구 목록을 반환합니다."""
+        return self.tools
+    
+    def get_tool_names(self) -> list[str]:
+        """도구 이름 목록을 반환합니다."""
+        return [tool.name for tool in self.tools]
+
+def create_tools_condition(state) -> str:
+    """
+    에이전트가 도구를 사용할지 결정하는 조건부 함수
+    
+    Args:
+        state: 현재 에이전트 상태
+        
+    Returns:
+        str: "tools" 또는 END
+    """
+    messages = state["messages"]
+    
+    # 마지막 메시지가 도구 호출을 요청하는지 확인
+    last_message = messages[-1]
+    
+    # 도구 사용이 필요한 경우 "tools" 반환
+    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+        return "tools"
+    
+    # 도구 사용이 필요하지 않은 경우 END 반환
+    return "end"
+
+def validate_state(state: 'AgentState') -> bool:
+    """
+    에이전트 상태의 유효성을 검증합니다.
+    
+    Args:
+        state: 검증할 상태
+        
+    Returns:
+        bool: 유효한 상태인지 여부
+    """
+    if not isinstance(state, dict):
+        return False
+    
+    if "messages" not in state:
+        return False
+    
+    if not isinstance(state["messages"], (list, tuple)):
+        return False
+    
+    return True
+
+def get_last_user_message(state: 'AgentState') -> str:
+    """
+    상태에서 마지막 사용자 메시지를 추출합니다.
+    
+    Args:
+        state: 에이전트 상태
+        
+    Returns:
+        str: 마지막 사용자 메시지
+    """
+    if not validate_state(state):
+        raise ValueError("유효하지 않은 상태입니다.")
+    
+    messages = state["messages"]
+    
+    # 사용자 메시지를 찾습니다 (HumanMessage)
+    for message in reversed(messages):
+        if hasattr(message, 'type') and message.type == 'human':
+            return message.content
+    
+    # 사용자 메시지를 찾을 수 없는 경우
+    raise ValueError("사용자 메시지를 찾을 수 없습니다.")
+
+def get_question(state: 'AgentState') -> str:
+    """
+    상태에서 원본 사용자 질문을 반환합니다.
+    
+    Args:
+        state: 에이전트 상태
+    
+    Returns:
+        str: question 필드 (없으면 마지막 사용자 메시지)
+    """
+    return state.get("question") or get_last_user_message(state)
+
+def count_rewrites(state: 'AgentState') -> int:
+    """
+    마지막 사용자 메시지 이후 질문이 재작성된 횟수를 셉니다.
+    
+    Args:
+        state: 에이전트 상태
+    
+    Returns:
+        int: 재작성 횟수 (rewrites 필드가 없으면 재작성 표시가 있는 메시지 수)
+    """
+    if "rewrites" in state:
+        return state["rewrites"]
+    
+    count = 0
+    
+    for message in reversed(state["messages"]):
+        if getattr(message, 'type', None) == 'human':
+            break
+        metadata = getattr(message, 'response_metadata', None) or {}
+        if metadata.get("rewrite"):
+            count += 1
+    
+    return count
+
+def rewrite_limit_reached(state: 'AgentState') -> bool:
+    """재작성 횟수가 허용 횟수(max_rewrites 필드, 없으면 MAX_REWRITES)에 도달했는지 여부를 반환합니다."""
+    return count_rewrites(state) >= state.get("max_rewrites", MAX_REWRITES)
+
+def get_last_assistant_message(state: 'AgentState') -> str:
+    """
+    상태에서 마지막 어시스턴트 메시지를 추출합니다.
+    
+    Args:
+        state: 에이전트 상태
+        
+    Returns:
+        str: 마지막 어시스턴트 메시지
+    """
+    if not validate_state(state):
+        raise ValueError("유효하지 않은 상태입니다.")
+    
+    messages = state["messages"]
+    
+    # 어시스턴트 메시지를 찾습니다 (AIMessage)
+    for message in reversed(messages):
+        if hasattr(message, 'type') and message.type == 'ai':
+            return message.content
+    
+    # 어시스턴트 메시지를 찾을 수 없는 경우
+    raise ValueError("어시스턴트 메시지를 찾을 수 없습니다.")
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoder():
+    """토큰 수 계산을 위한 tiktoken 인코더를 반환합니다."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(OPENAI_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str) -> int:
+    """
+    텍스트의 토큰 수를 계산합니다.
+    
+    Args:
+        text: 토큰 수를 계산할 텍스트
+    
+    Returns:
+        int: 토큰 수 (인코더를 사용할 수 없으면 글자 수 기반 추정치)
+    """
+    if not text:
+        return 0
+    
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return max(1, len(text) // 4)
+    return len(encoder.encode(text, disallowed_special=()))
+
+# 채팅 모델 생성 함수 (None이면 ChatOpenAI를 사용하며, 테스트/벤치마크에서 가짜 모델로 교체합니다)
+_chat_model_factory = None
+
+def set_chat_model_factory(factory):
+    """
+    노드에서 사용할 채팅 모델 생성 함수를 교체합니다.
+    
+    Args:
+        factory: ChatOpenAI와 같은 키워드 인자를 받아 채팅 모델을 반환하는 함수 (None이면 기본값 복원)
+    """
+    global _chat_model_factory
+    _chat_model_factory = factory
+
+def openai_client_kwargs() -> dict:
+    """
+    ChatOpenAI와 OpenAIEmbeddings에 공통으로 전달할 연결 설정을 반환합니다.
+    
+    LLM_SCHEDULER가 켜져 있으면 요청이 프로세스 전역 스케줄러(llm_scheduler)를 거치도록
+    공유 http_client를 넣고, 재시도는 스케줄러가 맡으므로 클라이언트 재시도는 끕니다.
+    
+    Returns:
+        dict: base_url(OPENAI_BASE_URL이 설정된 경우), timeout, max_retries, http_client(스케줄러 사용 시)
+    """
+    kwargs = {"max_retries": OPENAI_MAX_RETRIES}
+    if LLM_SCHEDULER:
+        from llm_scheduler import scheduled_http_client
+        kwargs = {"max_retries": 0, "http_client": scheduled_http_client()}
+    if OPENAI_BASE_URL:
+        kwargs["base_url"] = OPENAI_BASE_URL
+    if OPENAI_TIMEOUT:
+        kwargs["timeout"] = OPENAI_TIMEOUT
+    return kwargs
+
+def create_chat_model(**kwargs):
+    """
+    설정된 생성 함수로 채팅 모델을 생성합니다.
+    
+    Args:
+        **kwargs: 모델 설정 (model, temperature, streaming 등)
+    
+    Returns:
+        BaseChatModel: 채팅 모델
+    """
+    if _chat_model_factory is not None:
+        return _chat_model_factory(**kwargs)
+    
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(**{**openai_client_kwargs(), **kwargs})
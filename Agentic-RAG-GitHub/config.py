@@ -1,34 +1,183 @@
-import os
-from dotenv import load_dotenv
-
-# .env 파일 로드 (선택적)
-try:
-    load_dotenv()
-except:
-    pass
-
-# OpenAI 설정
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-TEMPERATURE = float(os.getenv("TEMPERATURE", "0"))
-
-# 문서 처리 설정
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "300"))
-CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
-
-# 벡터 스토어 설정
-COLLECTION_NAME = "rag-chroma"
-
-# 웹 크롤링 URL 목록
-CRAWLING_URLS = [
-    "https://finance.naver.com/",
-    "https://finance.yahoo.com/",
-    "https://finance.daum.net/",
-]
-
-# API 키가 환경 변수에 없는 경우 직접 설정
-if not OPENAI_API_KEY:
-            OPENAI_API_KEY = "your_openai_api_key_here"
-
-# 환경 변수 설정
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+import os
+from dotenv import load_dotenv
+
+# .env 파일 로드 (선택적)
+try:
+    load_dotenv()
+except:
+    pass
+
+# OpenAI 설정
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+TEMPERATURE = float(os.getenv("TEMPERATURE", "0"))
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")  # 비어 있으면 OpenAI API 사용 (모의 서버: http://127.0.0.1:8001/v1)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "0")) or None  # 요청 타임아웃 (초, 0이면 클라이언트 기본값)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# LLM 호출 스케줄러 설정 (모든 OpenAI 채팅/임베딩 요청의 속도 제한, 우선순위, 재시도)
+# LLM_MODEL_LIMITS: 모델별 "모델=RPM:TPM" 목록 (쉼표 구분, 지정하지 않은 모델은 LLM_RPM_LIMIT/LLM_TPM_LIMIT)
+LLM_SCHEDULER = os.getenv("LLM_SCHEDULER", "true").lower() == "true"
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "0"))  # 0이면 제한 없음
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "0"))  # 0이면 제한 없음
+LLM_MODEL_LIMITS = os.getenv("LLM_MODEL_LIMITS", "")
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "256"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+LLM_DEFAULT_PRIORITY = os.getenv("LLM_DEFAULT_PRIORITY", "interactive")  # "interactive", "report" 또는 "batch"
+
+# 문서 처리 설정
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "300"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+# 벡터 스토어 설정
+COLLECTION_NAME = "rag-chroma"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+
+# 적응형 검색 깊이 설정 (후보를 넉넉히 가져와 유사도 분포로 자름, 끄면 항상 RETRIEVAL_TOP_K개)
+ADAPTIVE_TOP_K = os.getenv("ADAPTIVE_TOP_K", "false").lower() == "true"
+ADAPTIVE_TOP_K_CANDIDATES = int(os.getenv("ADAPTIVE_TOP_K_CANDIDATES", "12"))
+ADAPTIVE_TOP_K_MIN = int(os.getenv("ADAPTIVE_TOP_K_MIN", "2"))
+ADAPTIVE_TOP_K_MAX = int(os.getenv("ADAPTIVE_TOP_K_MAX", "8"))
+ADAPTIVE_TOP_K_GAP = float(os.getenv("ADAPTIVE_TOP_K_GAP", "0.3"))  # 후보 유사도 범위 대비, 0이면 차이로 자르지 않음
+ADAPTIVE_TOP_K_RELATIVE = float(os.getenv("ADAPTIVE_TOP_K_RELATIVE", "0.85"))  # 최고 유사도 대비, 0이면 사용 안 함
+
+# 검색 캐시 설정 (질의 임베딩과 상위 k개 청크 ID를 색인 버전별로 저장)
+RETRIEVAL_CACHE = os.getenv("RETRIEVAL_CACHE", "true").lower() == "true"
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2000"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))  # 초, 0이면 만료 없음
+RETRIEVAL_CACHE_QUANTIZATION = float(os.getenv("RETRIEVAL_CACHE_QUANTIZATION", "0"))  # 0이면 근사 중복 키 사용 안 함
+
+# 마이크로 배치 설정 (동시 질의의 임베딩 요청과 벡터 검색을 묶음)
+MICRO_BATCH = os.getenv("MICRO_BATCH", "true").lower() == "true"
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "32"))
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "3"))  # 처리 중인 배치가 있을 때만 기다림
+MICRO_BATCH_MAX_IN_FLIGHT = int(os.getenv("MICRO_BATCH_MAX_IN_FLIGHT", "4"))
+
+# 검색 모드 설정 ("single" 또는 "multi_query")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "single")
+MULTI_QUERY_COUNT = int(os.getenv("MULTI_QUERY_COUNT", "3"))
+MULTI_QUERY_STRATEGY = os.getenv("MULTI_QUERY_STRATEGY", "lexical")  # "lexical" 또는 "llm"
+MULTI_QUERY_MAX_WORKERS = int(os.getenv("MULTI_QUERY_MAX_WORKERS", "8"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# 라우터 설정 ("off", "rules" 또는 "classifier")
+ROUTER = os.getenv("ROUTER", "off")
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.8"))
+ROUTER_DECISION_LOG = os.getenv("ROUTER_DECISION_LOG", "")  # 비어 있으면 에이전트 결정을 기록하지 않음
+ROUTER_MIN_TRAINING_SIZE = int(os.getenv("ROUTER_MIN_TRAINING_SIZE", "20"))
+ROUTER_SHADOW_RATE = float(os.getenv("ROUTER_SHADOW_RATE", "0"))
+
+# 그래프 프로필 설정 ("fast", "balanced" 또는 "thorough")
+GRAPH_PROFILE = os.getenv("GRAPH_PROFILE", "balanced")
+MAX_REWRITES = int(os.getenv("MAX_REWRITES", "2"))
+DOCUMENT_RELEVANCE_THRESHOLD = int(os.getenv("DOCUMENT_RELEVANCE_THRESHOLD", "5"))
+DOCUMENT_GRADING_MAX_WORKERS = int(os.getenv("DOCUMENT_GRADING_MAX_WORKERS", "8"))
+
+# 대화 메모리 설정 (최근 턴은 그대로 두고 오래된 턴은 요약, 에이전트 프롬프트 토큰 한도 적용)
+CONVERSATION_MEMORY = os.getenv("CONVERSATION_MEMORY", "true").lower() == "true"
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "3"))
+MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "2000"))  # 0이면 제한 없음
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "300"))
+
+# 체크포인터 설정 (스레드 ID로 대화를 이어 가고 중단된 실행을 재개, 경로가 비어 있으면 프로세스 메모리에만 저장)
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoints.sqlite")
+CHECKPOINT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", "64"))  # 이만큼 행이 모이면 바로 커밋
+CHECKPOINT_FLUSH_INTERVAL = float(os.getenv("CHECKPOINT_FLUSH_INTERVAL", "0.05"))  # 초, 0이면 저장마다 커밋
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))  # 0이면 압축 안 함
+
+# 추측 생성 설정 (문서 평가와 답변 생성을 병렬로 실행)
+SPECULATIVE_GENERATION = os.getenv("SPECULATIVE_GENERATION", "false").lower() == "true"
+SPECULATIVE_MAX_WORKERS = int(os.getenv("SPECULATIVE_MAX_WORKERS", "4"))
+
+# 검색 프리페치 설정 (에이전트 호출과 병렬로 원본 질문 검색)
+PREFETCH_RETRIEVAL = os.getenv("PREFETCH_RETRIEVAL", "false").lower() == "true"
+PREFETCH_SIMILARITY_THRESHOLD = float(os.getenv("PREFETCH_SIMILARITY_THRESHOLD", "0.6"))
+PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "4"))
+PREFETCH_TIMEOUT = float(os.getenv("PREFETCH_TIMEOUT", "10"))
+
+# 요청 병합 설정 (같은 질문과 프로필의 동시 요청은 실행 한 번을 공유)
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", "60"))
+
+# 요청 추적 설정 (TRACE_EXPORT: 쉼표로 구분한 "jsonl", "otlp", 비어 있으면 내보내지 않음)
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "agentic-rag")
+
+# 운영 지표 설정 (Flask /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# 요청 프로파일링 설정
+# PROFILE_MODE: 요청별로 켰을 때의 방식 ("cprofile" 또는 "sampling")
+# PROFILE_SLOW_MS: 이 시간을 넘긴 요청의 샘플링 프로파일을 자동 저장 (0이면 사용 안 함)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "20"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+# Flask 웹 앱 설정 (true면 데모 답변 대신 Agentic RAG 워크플로우 사용)
+WEB_APP_WORKFLOW = os.getenv("WEB_APP_WORKFLOW", "false").lower() == "true"
+# python simple_web_app.py로 직접 실행할 때 Werkzeug 디버거 사용 (모든 인터페이스에서 코드 실행이 가능하므로 개발용)
+WEB_APP_DEBUG = os.getenv("WEB_APP_DEBUG", "false").lower() == "true"
+
+# Streamlit 백그라운드 실행 설정 (워크플로우를 실행기 스레드에서 돌리고 진행 큐를 주기적으로 확인)
+UI_RUN_WORKERS = int(os.getenv("UI_RUN_WORKERS", "4"))
+UI_POLL_INTERVAL = float(os.getenv("UI_POLL_INTERVAL", "0.3"))  # 초
+
+# 빠른 경로 설정 (FAQ 표에 걸리는 질문은 LLM 호출 없이 색인 생성 시 미리 만든 답변으로 응답)
+# FAST_PATH_SIMILARITY: 임베딩 단계에서 FAQ 질문과의 최소 코사인 유사도
+# FAST_PATH_MIN_COVERAGE: 키워드 단계에서 일치한 키워드가 덮어야 하는 질문 글자 비율 (공백 제외)
+FAST_PATH = os.getenv("FAST_PATH", "true").lower() == "true"
+FAST_PATH_TABLE = os.getenv("FAST_PATH_TABLE", "faq.json")
+FAST_PATH_SIMILARITY = float(os.getenv("FAST_PATH_SIMILARITY", "0.9"))
+FAST_PATH_MIN_COVERAGE = float(os.getenv("FAST_PATH_MIN_COVERAGE", "0.5"))
+
+# 수용 제어 설정 (Flask /ask 앞단의 동시 실행 수와 대기열 제한)
+# ADMISSION_DEGRADE: 거절 대신 시도할 대체 응답 순서 (쉼표로 구분한 "cache", "fast", 비어 있으면 거절)
+# ADMISSION_DEFAULT_TIMEOUT: X-Request-Timeout 헤더가 없을 때의 클라이언트 마감 시간 (초, 0이면 마감 없음)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_DEGRADE = os.getenv("ADMISSION_DEGRADE", "")
+ADMISSION_DEFAULT_TIMEOUT = float(os.getenv("ADMISSION_DEFAULT_TIMEOUT", "30"))
+
+# 답변 캐시 설정 (과부하 시 대체 응답 등에 사용)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # 초, 0이면 만료 없음
+
+# 답변 워밍업 설정 (색인 생성/교체 직후 인기 질문을 미리 실행해 답변 캐시에 고정)
+# ANSWER_WARMUP_QUESTIONS_FILE: 예시 질문에 더할 질문 파일 (한 줄에 질문 하나, 비어 있으면 생략)
+# ANSWER_WARMUP_QUERY_LOG: 자주 나온 질문을 고를 질문 기록 ("question" 필드가 있는 JSON Lines, 기본값: 라우터 결정 기록)
+ANSWER_WARMUP = os.getenv("ANSWER_WARMUP", "true").lower() == "true"
+ANSWER_WARMUP_QUESTIONS_FILE = os.getenv("ANSWER_WARMUP_QUESTIONS_FILE", "")
+ANSWER_WARMUP_QUERY_LOG = os.getenv("ANSWER_WARMUP_QUERY_LOG") or ROUTER_DECISION_LOG
+ANSWER_WARMUP_TOP_LOGGED = int(os.getenv("ANSWER_WARMUP_TOP_LOGGED", "20"))
+ANSWER_WARMUP_MIN_COUNT = int(os.getenv("ANSWER_WARMUP_MIN_COUNT", "2"))
+ANSWER_WARMUP_WORKERS = int(os.getenv("ANSWER_WARMUP_WORKERS", "4"))
+
+# 워밍업 설정 (워크플로우 생성 직후 요청 경로 밖에서 그래프 컴파일, tiktoken 로드, 색인 예열, 탐색 검색 실행)
+WARM_UP = os.getenv("WARM_UP", "true").lower() == "true"
+WARM_UP_PROBE_QUERY = os.getenv("WARM_UP_PROBE_QUERY", "금융 시장 동향")  # 비어 있으면 탐색 검색 생략
+
+# 프로덕션 서빙 설정 (serve.py: 마스터가 색인을 불러온 뒤 워커 프로세스를 fork)
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "5000"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "2"))
+SERVE_INDEX_PATH = os.getenv("SERVE_INDEX_PATH", "index")
+SERVE_GRACEFUL_TIMEOUT = float(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))
+
+# 웹 크롤링 URL 목록
+CRAWLING_URLS = [
+    "https://finance.naver.com/",
+    "https://finance.yahoo.com/",
+    "https://finance.daum.net/",
+]
+
+# API 키가 환경 변수에 없는 경우 직접 설정
+if not OPENAI_API_KEY:
+            OPENAI_API_KEY = "your_openai_api_key_here"
+
+# 환경 변수 설정
+os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
@@ -1,138 +1,281 @@
-"""
-데이터 파이프라인: 웹 크롤링 및 벡터 스토어 구축
-"""
-import logging
-from typing import List
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from config import CRAWLING_URLS, CHUNK_SIZE, CHUNK_OVERLAP, COLLECTION_NAME
-
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class DataPipeline:
-    """웹 크롤링 및 벡터 스토어 구축을 위한 데이터 파이프라인"""
-    
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings()
-        self.text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
-        )
-        self.vectorstore = None
-        self.retriever = None
-    
-    def crawl_documents(self, urls: List[str] = None) -> List:
-        """웹 페이지에서 문서를 크롤링합니다."""
-        if urls is None:
-            urls = CRAWLING_URLS
-        
-        logger.info(f"웹 크롤링 시작: {len(urls)}개 URL")
-        
-        try:
-            docs = []
-            for url in urls:
-                try:
-                    logger.info(f"크롤링 중: {url}")
-                    loader = WebBaseLoader(url)
-                    doc = loader.load()
-                    docs.extend(doc)
-                    logger.info(f"성공: {url}에서 {len(doc)}개 문서 로드")
-                except Exception as e:
-                    logger.error(f"크롤링 실패 {url}: {str(e)}")
-                    continue
-            
-            logger.info(f"총 {len(docs)}개 문서 크롤링 완료")
-            return docs
-            
-        except Exception as e:
-            logger.error(f"크롤링 중 오류 발생: {str(e)}")
-            raise
-    
-    def split_documents(self, documents: List) -> List:
-        """문서를 청크로 분할합니다."""
-        logger.info("문서 분할 시작")
-        
-        try:
-            doc_splits = self.text_splitter.split_documents(documents)
-            logger.info(f"문서 분할 완료: {len(doc_splits)}개 청크")
-            return doc_splits
-        except Exception as e:
-            logger.error(f"문서 분할 중 오류 발생: {str(e)}")
-            raise
-    
-    def create_vectorstore(self, documents: List):
-        """벡터 스토어를 생성하고 문서를 저장합니다."""
-        logger.info("벡터 스토어 생성 시작")
-        
-        try:
-            self.vectorstore = Chroma.from_documents(
-                documents=documents,
-                collection_name=COLLECTION_NAME,
-                embedding=self.embeddings,
-            )
-            
-            self.retriever = self.vectorstore.as_retriever(
-                search_kwargs={"k": 5}  # 상위 5개 문서 검색
-            )
-            
-            logger.info("벡터 스토어 생성 완료")
-            
-        except Exception as e:
-            logger.error(f"벡터 스토어 생성 중 오류 발생: {str(e)}")
-            raise
-    
-    def build_pipeline(self) -> 'DataPipeline':
-        """전체 파이프라인을 구축합니다."""
-        logger.info("데이터 파이프라인 구축 시작")
-        
-        try:
-            # 1. 문서 크롤링
-            documents = self.crawl_documents()
-            
-            # 2. 문서 분할
-            doc_splits = self.split_documents(documents)
-            
-            # 3. 벡터 스토어 생성
-            self.create_vectorstore(doc_splits)
-            
-            logger.info("데이터 파이프라인 구축 완료")
-            return self
-            
-        except Exception as e:
-            logger.error(f"파이프라인 구축 실패: {str(e)}")
-            raise
-    
-    def get_retriever(self):
-        """검색기를 반환합니다."""
-        if self.retriever is None:
-            raise ValueError("검색기가 초기화되지 않았습니다. build_pipeline()을 먼저 실행하세요.")
-        return self.retriever
-    
-    def get_vectorstore(self):
-        """벡터 스토어를 반환합니다."""
-        if self.vectorstore is None:
-            raise ValueError("벡터 스토어가 초기화되지 않았습니다. build_pipeline()을 먼저 실행하세요.")
-        return self.vectorstore
-
-def main():
-    """메인 실행 함수"""
-    try:
-        pipeline = DataPipeline()
-        pipeline.build_pipeline()
-        print("데이터 파이프라인 구축이 완료되었습니다!")
-        
-        # 검색기 테스트
-        retriever = pipeline.get_retriever()
-        test_query = "금융"
-        results = retriever.get_relevant_documents(test_query)
-        print(f"테스트 쿼리 '{test_query}'에 대한 {len(results)}개 결과")
-        
-    except Exception as e:
-        print(f"오류 발생: {str(e)}")
-
-if __name__ == "__main__":
-    main()
+"""
+데이터 파이프라인: 웹 크롤링 및 벡터 스토어 구축
+
+LangChain 통합 패키지, Chroma, numpy는 가져오는 데 수 초가 걸리므로 모듈을 불러올 때가 아니라
+각 단계를 처음 실행할 때 가져옵니다.
+"""
+import logging
+from typing import List, Optional, Tuple
+from components import count_tokens, openai_client_kwargs
+from config import (
+    CRAWLING_URLS, CHUNK_SIZE, CHUNK_OVERLAP, COLLECTION_NAME, RETRIEVAL_TOP_K, OPENAI_BASE_URL
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DataPipeline:
+    """웹 크롤링 및 벡터 스토어 구축을 위한 데이터 파이프라인"""
+    
+    def __init__(self, embeddings=None, collection_name: str = COLLECTION_NAME):
+        """
+        Args:
+            embeddings: 사용할 임베딩 모델 (기본값: OpenAIEmbeddings, 테스트/벤치마크에서 가짜 임베딩 주입)
+            collection_name: 벡터 스토어 컬렉션 이름
+        """
+        self.embeddings = embeddings or self._create_embeddings()
+        self.collection_name = collection_name
+        self.text_splitter = self._create_text_splitter()
+        self.vectorstore = None
+        self.index = None
+        self.retriever = None
+        # 색인을 만들거나 교체하거나 문서를 추가할 때마다 증가 (검색 캐시 무효화에 사용)
+        self.index_version = 0
+    
+    def _create_embeddings(self) -> 'OpenAIEmbeddings':
+        """연결 설정(OPENAI_BASE_URL 등)을 적용한 OpenAI 임베딩을 생성합니다."""
+        from langchain_openai import OpenAIEmbeddings
+        
+        kwargs = openai_client_kwargs()
+        if OPENAI_BASE_URL:
+            # OpenAI 호환 서버에는 tiktoken 토큰 배열 대신 원문 문자열을 보냅니다
+            kwargs["check_embedding_ctx_length"] = False
+        return OpenAIEmbeddings(**kwargs)
+    
+    def _create_text_splitter(self) -> 'RecursiveCharacterTextSplitter':
+        """토큰 단위 텍스트 분할기를 생성합니다."""
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        
+        try:
+            return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP
+            )
+        except Exception as e:
+            # tiktoken 인코딩 파일을 내려받을 수 없는 오프라인 환경에서는 추정 토큰 수로 분할합니다
+            logger.warning(f"tiktoken 분할기를 사용할 수 없어 추정 토큰 수로 분할합니다: {str(e)}")
+            return RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                length_function=count_tokens
+            )
+    
+    def crawl_documents(self, urls: List[str] = None) -> List:
+        """웹 페이지에서 문서를 크롤링합니다."""
+        from langchain_community.document_loaders import WebBaseLoader
+        
+        if urls is None:
+            urls = CRAWLING_URLS
+        
+        logger.info(f"웹 크롤링 시작: {len(urls)}개 URL")
+        
+        try:
+            docs = []
+            for url in urls:
+                try:
+                    logger.info(f"크롤링 중: {url}")
+                    loader = WebBaseLoader(url)
+                    doc = loader.load()
+                    docs.extend(doc)
+                    logger.info(f"성공: {url}에서 {len(doc)}개 문서 로드")
+                except Exception as e:
+                    logger.error(f"크롤링 실패 {url}: {str(e)}")
+                    continue
+            
+            logger.info(f"총 {len(docs)}개 문서 크롤링 완료")
+            return docs
+            
+        except Exception as e:
+            logger.error(f"크롤링 중 오류 발생: {str(e)}")
+            raise
+    
+    def split_documents(self, documents: List) -> List:
+        """문서를 청크로 분할합니다."""
+        logger.info("문서 분할 시작")
+        
+        try:
+            doc_splits = self.text_splitter.split_documents(documents)
+            logger.info(f"문서 분할 완료: {len(doc_splits)}개 청크")
+            return doc_splits
+        except Exception as e:
+            logger.error(f"문서 분할 중 오류 발생: {str(e)}")
+            raise
+    
+    def create_vectorstore(self, documents: List):
+        """벡터 스토어를 생성하고 문서를 저장합니다."""
+        from langchain_community.vectorstores import Chroma
+        
+        logger.info("벡터 스토어 생성 시작")
+        
+        try:
+            self.vectorstore = Chroma.from_documents(
+                documents=documents,
+                collection_name=self.collection_name,
+                embedding=self.embeddings,
+            )
+            
+            self.retriever = self.vectorstore.as_retriever(
+                search_kwargs={"k": RETRIEVAL_TOP_K}  # 상위 k개 문서 검색 (기본 5개)
+            )
+            self.index_version += 1
+            
+            logger.info("벡터 스토어 생성 완료")
+            
+        except Exception as e:
+            logger.error(f"벡터 스토어 생성 중 오류 발생: {str(e)}")
+            raise
+    
+    def build_pipeline(self, documents: List = None) -> 'DataPipeline':
+        """
+        전체 파이프라인을 구축합니다.
+        
+        Args:
+            documents: 미리 준비된 문서 목록 (지정하면 웹 크롤링을 건너뜁니다)
+        """
+        from llm_scheduler import llm_priority
+        
+        logger.info("데이터 파이프라인 구축 시작")
+        
+        try:
+            # 1. 문서 크롤링
+            if documents is None:
+                documents = self.crawl_documents()
+            
+            # 2. 문서 분할
+            doc_splits = self.split_documents(documents)
+            
+            # 3. 벡터 스토어 생성 (문서 임베딩은 사용자 질문보다 낮은 우선순위로 호출)
+            with llm_priority("batch"):
+                self.create_vectorstore(doc_splits)
+            
+            logger.info("데이터 파이프라인 구축 완료")
+            return self
+            
+        except Exception as e:
+            logger.error(f"파이프라인 구축 실패: {str(e)}")
+            raise
+    
+    def save_index(self, path: str):
+        """
+        구축한 벡터 스토어를 읽기 전용 색인 파일로 저장합니다.
+        
+        Args:
+            path: 저장할 디렉터리
+        """
+        from vector_index import VectorIndex
+        
+        VectorIndex.from_vectorstore(self.get_vectorstore()).save(path)
+    
+    def load_index(self, index) -> 'DataPipeline':
+        """
+        저장된 읽기 전용 색인으로 검색기를 구성합니다 (크롤링과 임베딩 생성 없음).
+        
+        Args:
+            index: 색인 디렉터리 경로 또는 이미 불러온 VectorIndex (여러 프로세스가 공유)
+        """
+        from vector_index import VectorIndex, VectorIndexRetriever
+        
+        if not isinstance(index, VectorIndex):
+            index = VectorIndex.load(index)
+        
+        self.index = index
+        self.retriever = VectorIndexRetriever(index=index, embeddings=self.embeddings, k=RETRIEVAL_TOP_K)
+        self.index_version += 1
+        return self
+    
+    def add_documents(self, documents: List):
+        """
+        구축된 벡터 스토어에 문서를 분할해 추가합니다 (색인 버전이 바뀌어 검색 캐시의 이전 결과는 버려짐).
+        
+        Args:
+            documents: 추가할 문서 목록
+        """
+        if self.index is not None:
+            raise ValueError("읽기 전용 색인에는 문서를 추가할 수 없습니다. 색인을 다시 저장해 교체하세요.")
+        
+        self.get_vectorstore().add_documents(self.split_documents(documents))
+        self.index_version += 1
+        logger.info(f"문서 추가 완료 (색인 버전 {self.index_version})")
+    
+    def embed_query(self, query: str) -> List[float]:
+        """질의 임베딩을 계산합니다."""
+        return self.embeddings.embed_query(query)
+    
+    def search_by_vector(self, query_vector: List[float],
+                         k: int = RETRIEVAL_TOP_K) -> List[Tuple['Document', Optional[float]]]:
+        """
+        질의 임베딩으로 현재 색인을 검색합니다 (임베딩 호출 없음).
+        
+        Args:
+            query_vector: 질의 임베딩
+            k: 반환할 문서 수
+        
+        Returns:
+            List[Tuple[Document, Optional[float]]]: (문서, 코사인 유사도) 목록
+        """
+        return self.search_by_vectors([query_vector], k)[0]
+    
+    def search_by_vectors(self, query_vectors: List[List[float]],
+                          k: int = RETRIEVAL_TOP_K) -> List[List[Tuple['Document', Optional[float]]]]:
+        """
+        여러 질의 임베딩을 한 번에 검색합니다 (읽기 전용 색인은 행렬 곱 한 번, Chroma는 질의 한 번).
+        
+        Args:
+            query_vectors: 질의 임베딩 목록
+            k: 질의마다 반환할 문서 수
+        
+        Returns:
+            List[List[Tuple[Document, Optional[float]]]]: 질의 순서대로 (문서, 유사도) 목록
+        """
+        from langchain_core.documents import Document
+        
+        if self.index is not None:
+            return self.index.search_batch(query_vectors, k)
+        
+        results = self.get_vectorstore()._collection.query(
+            query_embeddings=query_vectors, n_results=k, include=["documents", "metadatas", "distances"]
+        )
+        # Chroma 기본 거리(제곱 L2)를 정규화된 임베딩의 코사인 유사도로 바꿉니다: cos = 1 - d / 2
+        return [
+            [(Document(page_content=text, metadata=metadata or {}), 1.0 - distance / 2)
+             for text, metadata, distance in zip(texts, metadatas, distances)]
+            for texts, metadatas, distances in zip(results["documents"], results["metadatas"], results["distances"])
+        ]
+    
+    def document_count(self) -> int:
+        """색인된 청크 수를 반환합니다."""
+        if self.index is not None:
+            return len(self.index)
+        return self.get_vectorstore()._collection.count()
+    
+    def get_retriever(self):
+        """검색기를 반환합니다."""
+        if self.retriever is None:
+            raise ValueError("검색기가 초기화되지 않았습니다. build_pipeline()을 먼저 실행하세요.")
+        return self.retriever
+    
+    def get_vectorstore(self):
+        """벡터 스토어를 반환합니다."""
+        if self.vectorstore is None:
+            raise ValueError("벡터 스토어가 초기화되지 않았습니다. build_pipeline()을 먼저 실행하세요.")
+        return self.vectorstore
+
+def main():
+    """메인 실행 함수"""
+    try:
+        pipeline = DataPipeline()
+        pipeline.build_pipeline()
+        print("데이터 파이프라인 구축이 완료되었습니다!")
+        
+        # 검색기 테스트
+        retriever = pipeline.get_retriever()
+        test_query = "금융"
+        results = retriever.get_relevant_documents(test_query)
+        print(f"테스트 쿼리 '{test_query}'에 대한 {len(results)}개 결과")
+        
+    except Exception as e:
+        print(f"오류 발생: {str(e)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+오프라인 가짜 모델: OpenAI 없이 노드와 파이프라인을 실행하기 위한 결정적 LLM/임베딩 대체 구현
+"""
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import Field, PrivateAttr
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from components import count_tokens
+
+# 오프라인 실행용 금융 문서 (웹 크롤링 대신 사용)
+SAMPLE_DOCUMENTS = [
+    Document(page_content="주식 시장 동향: 코스피와 코스닥은 금리 인하 기대감에 상승했고 반도체 업종이 증시를 이끌었습니다.",
+             metadata={"source": "offline://market-trends"}),
+    Document(page_content="금리와 환율: 기준금리 동결 이후 원달러 환율은 안정세를 보였으며 채권 금리는 하락했습니다.",
+             metadata={"source": "offline://rates"}),
+    Document(page_content="포트폴리오 관리: 주식, 채권, 현금의 자산 배분을 정기적으로 리밸런싱하면 리스크를 줄일 수 있습니다.",
+             metadata={"source": "offline://portfolio"}),
+    Document(page_content="ETF 투자: 인덱스 ETF는 낮은 보수로 시장 전체에 분산 투자할 수 있어 장기 투자에 적합합니다.",
+             metadata={"source": "offline://etf"}),
+    Document(page_content="암호화폐: 비트코인 가격은 변동성이 크며 가상자산 투자 시 규제와 보안 리스크를 고려해야 합니다.",
+             metadata={"source": "offline://crypto"}),
+    Document(page_content="부동산 시장: 주택 시장은 대출 규제와 금리 수준에 민감하게 반응하며 지역별 차이가 큽니다.",
+             metadata={"source": "offline://real-estate"}),
+    Document(page_content="배당 투자: 배당 성장주는 꾸준한 현금 흐름을 제공하며 은퇴 자산과 연금 운용에 활용됩니다.",
+             metadata={"source": "offline://dividend"}),
+    Document(page_content="인플레이션: 물가 상승은 실질 수익률을 낮추므로 물가 연동 채권과 실물 자산이 대안이 됩니다.",
+             metadata={"source": "offline://inflation"}),
+]
+
+class LatencyDistribution:
+    """가짜 모델 호출의 지연 시간 분포 (초 단위)"""
+    
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+    
+    def __init__(self, kind: str = "fixed", mean: float = 0.05, spread: float = 0.0, seed: int = None):
+        """
+        Args:
+            kind: "fixed", "uniform"(mean ± spread), "normal"(표준편차 spread) 또는
+                  "lognormal"(중앙값 mean, 로그 표준편차 spread)
+            mean: 평균(또는 중앙값) 지연 시간
+            spread: 분포의 퍼짐 정도
+            seed: 난수 시드 (같은 시드는 같은 지연 시간 순서를 만듭니다)
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"지원하지 않는 지연 시간 분포입니다: {kind}")
+        
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def parse(cls, spec: str, seed: int = None) -> 'LatencyDistribution':
+        """
+        "종류:평균[:퍼짐]" 형식의 문자열로 분포를 생성합니다. (예: "lognormal:0.2:0.5")
+        
+        Args:
+            spec: 분포 설정 문자열 (단일 숫자는 고정 지연 시간)
+            seed: 난수 시드
+        
+        Returns:
+            LatencyDistribution: 생성된 분포
+        """
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]), seed=seed)
+        
+        spread = float(parts[2]) if len(parts) > 2 else 0.0
+        return cls(parts[0], float(parts[1]), spread, seed=seed)
+    
+    def sample(self) -> float:
+        """지연 시간 하나를 추출합니다."""
+        with self._lock:
+            if self.kind == "uniform":
+                value = self._random.uniform(self.mean - self.spread, self.mean + self.spread)
+            elif self.kind == "normal":
+                value = self._random.gauss(self.mean, self.spread)
+            elif self.kind == "lognormal":
+                value = self.mean * math.exp(self._random.gauss(0.0, self.spread))
+            else:
+                value = self.mean
+        return max(0.0, value)
+
+def split_stream_tokens(text: str) -> List[str]:
+    """스트리밍 청크로 사용할 토큰(단어와 뒤따르는 공백)으로 나눕니다."""
+    return re.findall(r"\S+\s*|\s+", text) or [""]
+
+class FakeChatModel(BaseChatModel):
+    """
+    ChatOpenAI를 대신하는 결정적 가짜 채팅 모델
+    
+    - 첫 토큰까지의 지연 시간은 latency 분포에서, 이후 토큰은 tokens_per_second 속도로 생성됩니다.
+    - 도구가 바인딩되어 있고 마지막 메시지가 사용자 질문이면 첫 번째 도구를 호출합니다.
+    - 구조화 출력은 ChatOpenAI처럼 스키마 도구를 강제로 호출하는 응답(bind_tools + 파서)으로 만들며,
+      인자는 필드 이름별로 structured_outputs에 정의된 값을 순서대로 반복해 채웁니다.
+      따라서 평가 호출도 일반 호출처럼 콜백(추적 스팬, 토큰 사용량)과 호출 수에 잡힙니다.
+    - streaming=True면 ChatOpenAI처럼 invoke에서도 토큰마다 on_llm_new_token 콜백을 보냅니다.
+    """
+    
+    latency: LatencyDistribution = Field(default_factory=LatencyDistribution)
+    tokens_per_second: float = 200.0
+    responses: List[str] = ["제공된 문맥에 따르면 금융 시장은 금리와 투자 심리의 영향을 받습니다."]
+    structured_outputs: Dict[str, List[Any]] = {"binary_score": ["yes"], "score": [7]}
+    call_tools: bool = True
+    streaming: bool = False
+    
+    _cycles: Dict[str, Iterator] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    
+    class Config:
+        arbitrary_types_allowed = True
+    
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+    
+    @property
+    def call_count(self) -> int:
+        """지금까지 처리한 모델 호출 수"""
+        return self._calls
+    
+    def _next(self, key: str, values: List[Any]) -> Any:
+        """키별로 스크립트 값을 순서대로 반복해 반환합니다."""
+        with self._lock:
+            if key not in self._cycles:
+                self._cycles[key] = itertools.cycle(values)
+            return next(self._cycles[key])
+    
+    def _count_call(self):
+        with self._lock:
+            self._calls += 1
+    
+    def _respond(self, messages: List[BaseMessage], tools: Optional[list], tool_choice: Any = None) -> AIMessage:
+        """입력 메시지에 대한 응답 메시지를 만듭니다. (지연 없음)"""
+        last = messages[-1] if messages else None
+        
+        if tools and tool_choice:
+            # with_structured_output: 스키마 도구 호출 인자를 스크립트 값으로 채웁니다
+            function = tools[0]["function"]
+            return AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": function["name"],
+                    "args": {
+                        name: self._next(name, self.structured_outputs[name])
+                        for name in function["parameters"].get("properties", {})
+                        if self.structured_outputs.get(name)
+                    },
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                }],
+            )
+        
+        if tools and self.call_tools and isinstance(last, HumanMessage):
+            return AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": tools[0]["function"]["name"],
+                    "args": {"query": str(last.content)},
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                }],
+            )
+        
+        return AIMessage(content=self._next("responses", self.responses))
+    
+    def _usage(self, messages: List[BaseMessage], response: AIMessage) -> dict:
+        input_tokens = sum(count_tokens(str(message.content)) for message in messages)
+        # 도구 호출 응답은 호출 인자(JSON)가 생성한 토큰입니다
+        output_tokens = count_tokens(response.content) + sum(
+            count_tokens(json.dumps(call["args"], ensure_ascii=False)) for call in response.tool_calls
+        )
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.streaming:
+            # ChatOpenAI(streaming=True)처럼 invoke도 토큰 콜백을 보내며 생성합니다
+            return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+        
+        self._count_call()
+        response = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        
+        tokens = split_stream_tokens(response.content)
+        time.sleep(self.latency.sample() + len(tokens) / self.tokens_per_second)
+        
+        response.usage_metadata = self._usage(messages, response)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._count_call()
+        response = self._respond(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        time.sleep(self.latency.sample())
+        
+        if response.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False),
+                    "id": call["id"], "index": 0,
+                } for call in response.tool_calls],
+            ))
+            return
+        
+        for token in split_stream_tokens(response.content):
+            time.sleep(1.0 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+    
+    def bind_tools(self, tools: list, tool_choice: Any = None, **kwargs: Any):
+        """
+        도구를 OpenAI 형식으로 변환해 바인딩합니다.
+        
+        tool_choice가 있으면(with_structured_output의 "any" 등) 마지막 메시지와 관계없이 첫 번째 도구를 호출합니다.
+        """
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+class FakeEmbeddings(Embeddings):
+    """
+    해시 기반의 결정적 가짜 임베딩
+    
+    문자 바이그램과 단어를 고정 차원에 해싱하므로 표현이 겹치는 텍스트일수록 유사도가 높습니다.
+    """
+    
+    def __init__(self, size: int = 256, latency: LatencyDistribution = None, per_text_latency: float = 0.0,
+                 max_concurrency: int = 0):
+        """
+        Args:
+            size: 임베딩 차원
+            latency: 호출당 지연 시간 분포 (기본값: 지연 없음)
+            per_text_latency: 텍스트당 추가 지연 시간 (초)
+            max_concurrency: 동시에 처리하는 최대 호출 수 (연결 풀, 속도 제한 흉내, 0이면 제한 없음)
+        """
+        self.size = size
+        self.latency = latency or LatencyDistribution("fixed", 0.0)
+        self.per_text_latency = per_text_latency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+    
+    def _embed(self, text: str) -> List[float]:
+        normalized = "".join(text.lower().split())
+        features = [normalized[i:i + 2] for i in range(len(normalized) - 1)] + text.lower().split()
+        
+        vector = [0.0] * self.size
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self._slots is None:
+            time.sleep(self.latency.sample() + self.per_text_latency * len(texts))
+        else:
+            with self._slots:
+                time.sleep(self.latency.sample() + self.per_text_latency * len(texts))
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def install_fake_chat_model(model: FakeChatModel = None) -> FakeChatModel:
+    """
+    모든 노드가 가짜 채팅 모델을 사용하도록 설정합니다.
+    
+    Args:
+        model: 사용할 가짜 모델 (기본 설정으로 생성)
+    
+    Returns:
+        FakeChatModel: 설치된 모델 (호출 수 확인 등에 사용)
+    """
+    from components import set_chat_model_factory
+    
+    model = model or FakeChatModel()
+    set_chat_model_factory(lambda **kwargs: model)
+    return model
+
+def create_offline_pipeline(embeddings: Embeddings = None, documents: List[Document] = None):
+    """
+    가짜 임베딩과 오프라인 문서로 데이터 파이프라인을 구축합니다.
+    
+    Args:
+        embeddings: 사용할 임베딩 (기본값: FakeEmbeddings)
+        documents: 색인할 문서 (기본값: SAMPLE_DOCUMENTS)
+    
+    Returns:
+        DataPipeline: 구축된 파이프라인
+    """
+    from data_pipeline import DataPipeline
+    
+    # 같은 프로세스의 Chroma 인메모리 클라이언트를 공유하므로 컬렉션 이름을 분리합니다
+    pipeline = DataPipeline(
+        embeddings=embeddings or FakeEmbeddings(),
+        collection_name=f"offline-{uuid.uuid4().hex[:8]}"
+    )
+    return pipeline.build_pipeline(documents or SAMPLE_DOCUMENTS)
@@ -0,0 +1,539 @@
+"""
+빠른 경로: 자주 묻는 질문(FAQ)은 LLM을 호출하지 않고 미리 만든 답변으로 응답
+
+- FAQ 표(FAST_PATH_TABLE)의 의도마다 키워드 패턴, 대표 질문, 데모 답변을 둡니다.
+- 질문은 세 단계로 찾습니다: 대표 질문과 정확히 같은 질문(정규화 후), 키워드 패턴을 모두 넣은
+  Aho-Corasick 오토마톤으로 한 번 훑어 의도 하나로 좁혀지는 질문, 대표 질문 임베딩과의 코사인 유사도가
+  FAST_PATH_SIMILARITY 이상인 질문 (임베딩 함수가 있을 때만). 어느 단계에도 걸리지 않으면 워크플로우로 넘깁니다.
+- 키워드 단계는 일치한 패턴이 질문 글자의 FAST_PATH_MIN_COVERAGE 이상을 덮어야 하므로,
+  키워드는 같지만 더 구체적인 질문("포트폴리오에서 비트코인 비중은?")은 워크플로우로 넘어갑니다.
+- 서빙 답변은 색인을 만들 때(serve.py --build-index) 실제 워크플로우로 대표 질문에 답해 색인 디렉터리에 저장하고,
+  색인 생성 시각이 다르거나 대표 질문이 바뀐 의도의 답변은 불러오지 않으므로 오래된 답변을 내보내지 않습니다.
+- 미리 만든 답변이 없는 데모 모드(FastPath.demo)는 FAQ 표의 데모 답변으로 응답하고, 키워드 패턴이 하나도 걸리지 않으면
+  의도별 데모 키워드("rag", "비트코인", "시장" 등 한 단어)로 한 번 더 찾습니다.
+- Flask 앱을 직접 실행하면 FastPathBuilder가 색인 버전마다 백그라운드에서 서빙 답변을 만들고,
+  현재 색인 버전의 답변이 준비되기 전에는 빠른 경로를 끕니다.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+from answer_warmup import index_version
+from coalesce import normalize_question
+from config import FAST_PATH_TABLE, FAST_PATH_SIMILARITY, FAST_PATH_MIN_COVERAGE
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 색인 디렉터리에 저장하는 미리 만든 답변 파일
+ANSWERS_FILE = "fast_path.json"
+
+def compact(text: str) -> str:
+    """대소문자, 공백, 끝 문장 부호 차이를 없앤 비교용 문자열을 반환합니다 ("금융 시장" == "금융시장")."""
+    return normalize_question(text).replace(" ", "")
+
+class AhoCorasick:
+    """
+    여러 패턴을 한 번의 순회로 찾는 Aho-Corasick 오토마톤
+    
+    상태마다 다음 글자로의 전이(dict), 실패 링크, 그 상태에서 끝나는 패턴 번호 목록을 가지며,
+    find()는 텍스트 길이에 비례하는 시간에 모든 (끝 위치, 패턴 번호)를 찾습니다.
+    """
+    
+    def __init__(self, patterns: Sequence[str]):
+        """
+        Args:
+            patterns: 찾을 패턴 목록 (빈 패턴은 무시)
+        """
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        
+        for number, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(number)
+        
+        # 너비 우선으로 실패 링크를 잇고, 실패 링크 상태의 출력을 합칩니다
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """
+        텍스트에서 모든 패턴 출현을 찾습니다.
+        
+        Returns:
+            List[Tuple[int, int]]: (패턴이 끝나는 위치 다음 인덱스, 패턴 번호) 목록
+        """
+        found = []
+        state = 0
+        for position, char in enumerate(text, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for number in self._output[state]:
+                found.append((position, number))
+        return found
+
+class FaqEntry(NamedTuple):
+    """FAQ 표의 의도 하나"""
+    intent: str
+    patterns: Tuple[str, ...]
+    questions: Tuple[str, ...]      # 첫 질문이 답변을 미리 만들 대표 질문
+    answer: str = ""                # 데모 모드 답변
+    min_hits: int = 1               # 키워드 단계에서 필요한 최소 패턴 수
+    demo_patterns: Tuple[str, ...] = ()  # 데모 모드에서 키워드 패턴이 걸리지 않을 때 찾는 한 단어 키워드
+
+class FastPathMatch(NamedTuple):
+    """빠른 경로 적중 결과"""
+    intent: str
+    answer: str
+    method: str                     # "exact", "keyword", "embedding"
+    score: float                    # 키워드 단계는 패턴이 덮은 글자 비율, 임베딩 단계는 유사도
+
+def load_faq_table(path: str = FAST_PATH_TABLE) -> List[FaqEntry]:
+    """
+    FAQ 표(JSON 배열)를 읽습니다.
+    
+    Args:
+        path: FAQ 표 파일 (상대 경로면 이 모듈의 디렉터리 기준)
+    
+    Returns:
+        List[FaqEntry]: 의도 목록
+    """
+    table = Path(path)
+    if not table.is_absolute():
+        table = Path(__file__).parent / table
+    entries = []
+    for item in json.loads(table.read_text(encoding="utf-8")):
+        entries.append(FaqEntry(
+            intent=item["intent"],
+            patterns=tuple(item.get("patterns") or ()),
+            questions=tuple(item.get("questions") or ()),
+            answer=item.get("answer", ""),
+            min_hits=int(item.get("min_hits", 1)),
+            demo_patterns=tuple(item.get("demo_patterns") or ()),
+        ))
+    return entries
+
+def final_message(results: list):
+    """워크플로우 실행 결과((노드, 출력) 목록)에서 마지막 메시지를 반환합니다 (없으면 None)."""
+    for _, value in reversed(results):
+        messages = (value or {}).get("messages") if isinstance(value, dict) else None
+        if messages:
+            return messages[-1]
+    return None
+
+def is_error_message(message) -> bool:
+    """노드가 예외를 잡아 돌려준 오류 메시지인지 확인합니다 (response_metadata의 error 표시)."""
+    return bool((getattr(message, "response_metadata", None) or {}).get("error"))
+
+def final_answer(results: list) -> Optional[str]:
+    """워크플로우 실행 결과((노드, 출력) 목록)에서 마지막 메시지 내용을 반환합니다 (메시지가 없거나 오류로 끝났으면 None)."""
+    message = final_message(results)
+    if message is None or is_error_message(message):
+        return None
+    return message.content
+
+class FastPathStats:
+    """빠른 경로 조회 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.methods = Counter()
+        self.match_seconds = 0.0
+    
+    def record(self, match: Optional[FastPathMatch], elapsed: float):
+        """조회 한 번의 결과를 기록합니다."""
+        with self._lock:
+            self.lookups += 1
+            self.methods[match.method if match is not None else "miss"] += 1
+            self.match_seconds += elapsed
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            hits = self.lookups - self.methods["miss"]
+            return {
+                "lookups": self.lookups,
+                "hits": hits,
+                "hit_rate": hits / self.lookups if self.lookups else 0.0,
+                "methods": dict(self.methods),
+                "mean_match_us": self.match_seconds / self.lookups * 1e6 if self.lookups else 0.0,
+            }
+
+class FastPath:
+    """
+    FAQ 표를 컴파일한 빠른 경로 응답기
+    
+    answers가 있으면 그 의도만 미리 만든 답변으로 응답하고(서빙), 없으면 FAQ 표의 데모 답변으로 응답합니다.
+    match()는 잠금 없이 읽기만 하므로 여러 스레드에서 함께 호출해도 됩니다.
+    """
+    
+    def __init__(self, entries: Sequence[FaqEntry], answers: Dict[str, str] = None,
+                 vectors: Dict[str, List[List[float]]] = None, embed: Callable[[str], List[float]] = None,
+                 similarity: float = FAST_PATH_SIMILARITY, min_coverage: float = FAST_PATH_MIN_COVERAGE,
+                 fallback_patterns: bool = False):
+        """
+        Args:
+            entries: FAQ 표
+            answers: 의도별 미리 만든 답변 (None이면 데모 답변 사용)
+            vectors: 의도별 질문 임베딩 ({의도: [질문마다 벡터]}, entries의 questions 순서)
+            embed: 질문 임베딩 함수 (없으면 임베딩 단계를 건너뜀)
+            similarity: 임베딩 단계의 최소 코사인 유사도
+            min_coverage: 키워드 단계에서 일치한 패턴이 덮어야 하는 질문 글자 비율
+            fallback_patterns: 키워드 패턴이 하나도 걸리지 않으면 FAQ 표의 데모 키워드로 한 번 더 찾을지 여부
+        """
+        self.entries = list(entries)
+        self.answers = answers
+        self.embed = embed
+        self.similarity = similarity
+        self.min_coverage = min_coverage
+        self.stats = FastPathStats()
+        
+        self._answers = answers if answers is not None else {
+            entry.intent: entry.answer for entry in self.entries if entry.answer
+        }
+        servable = [entry for entry in self.entries if entry.intent in self._answers]
+        self._by_intent = {entry.intent: entry for entry in servable}
+        self._exact = {compact(question): entry.intent for entry in servable for question in entry.questions}
+        
+        self._keywords = [self._compile([(entry.intent, entry.patterns) for entry in servable])]
+        if fallback_patterns:
+            self._keywords.append(self._compile([(entry.intent, entry.demo_patterns) for entry in servable]))
+        
+        self.vectors = {}
+        self._matrix = None
+        self._vector_intents = []
+        if vectors:
+            import numpy as np
+            
+            rows = []
+            for intent, intent_vectors in vectors.items():
+                if intent in self._by_intent:
+                    self.vectors[intent] = intent_vectors
+                    rows.extend(intent_vectors)
+                    self._vector_intents.extend([intent] * len(intent_vectors))
+            if rows:
+                matrix = np.asarray(rows, dtype=np.float32)
+                self._matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    
+    @staticmethod
+    def _compile(patterns: Sequence[Tuple[str, Sequence[str]]]) -> Tuple[AhoCorasick, List[str]]:
+        # (의도, 패턴 목록)을 오토마톤 하나와 패턴 번호별 의도로 컴파일합니다
+        compiled = []
+        intents = []
+        for intent, intent_patterns in patterns:
+            for pattern in intent_patterns:
+                compiled.append(compact(pattern))
+                intents.append(intent)
+        return AhoCorasick(compiled), intents
+    
+    def __len__(self) -> int:
+        return len(self._by_intent)
+    
+    @classmethod
+    def demo(cls, path: str = FAST_PATH_TABLE) -> 'FastPath':
+        """FAQ 표의 데모 답변으로 응답하는 빠른 경로를 만듭니다 (키워드 하나만 있어도 응답, 데모 키워드 사용)."""
+        return cls(load_faq_table(path), min_coverage=0.0, fallback_patterns=True)
+    
+    def match(self, question: str) -> Optional[FastPathMatch]:
+        """
+        질문에 빠른 경로로 답할 수 있으면 답변을 반환합니다.
+        
+        Args:
+            question: 사용자 질문
+        
+        Returns:
+            Optional[FastPathMatch]: 적중 결과 (없으면 워크플로우로 넘김)
+        """
+        started_at = time.perf_counter()
+        match = self._match_text(question)
+        if match is None and self.embed is not None and self._matrix is not None:
+            match = self._match_embedding(question)
+        self.stats.record(match, time.perf_counter() - started_at)
+        return match
+    
+    def _match_text(self, question: str) -> Optional[FastPathMatch]:
+        text = compact(question)
+        if not text:
+            return None
+        
+        intent = self._exact.get(text)
+        if intent is not None:
+            return FastPathMatch(intent, self._answers[intent], "exact", 1.0)
+        
+        # 의도별로 서로 다른 패턴 수와 패턴이 덮은 글자 위치를 셉니다 (데모 키워드는 키워드 패턴이 없을 때만)
+        hits = {}
+        covered = {}
+        for automaton, pattern_intents in self._keywords:
+            for end, number in automaton.find(text):
+                intent = pattern_intents[number]
+                hits.setdefault(intent, set()).add(number)
+                covered.setdefault(intent, set()).update(range(end - len(automaton.patterns[number]), end))
+            if hits:
+                break
+        if not hits:
+            return None
+        
+        # 여러 의도의 키워드가 함께 걸리면 모호하므로 넘깁니다
+        if len(hits) > 1:
+            return None
+        best = next(iter(hits))
+        coverage = len(covered[best]) / len(text)
+        if len(hits[best]) < self._by_intent[best].min_hits or coverage < self.min_coverage:
+            return None
+        return FastPathMatch(best, self._answers[best], "keyword", coverage)
+    
+    def _match_embedding(self, question: str) -> Optional[FastPathMatch]:
+        import numpy as np
+        
+        try:
+            vector = np.asarray(self.embed(question), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"빠른 경로 질문 임베딩 실패: {str(e)}")
+            return None
+        scores = self._matrix @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.similarity:
+            return None
+        intent = self._vector_intents[best]
+        return FastPathMatch(intent, self._answers[intent], "embedding", score)
+    
+    def attach(self, workflow) -> 'FastPath':
+        """워크플로우의 질의 임베딩(검색 캐시와 마이크로 배치를 거침)으로 임베딩 단계를 켭니다."""
+        if workflow is not None and workflow.data_pipeline is not None:
+            self.embed = workflow.embed_query
+        return self
+    
+    @classmethod
+    def from_workflow(cls, workflow, entries: Sequence[FaqEntry] = None, profile: str = None) -> 'FastPath':
+        """
+        실제 워크플로우로 의도마다 대표 질문에 답하고 FAQ 질문을 임베딩해 서빙용 빠른 경로를 만듭니다.
+        
+        Args:
+            workflow: 답변을 만들 AgenticRAGWorkflow (데이터 파이프라인 포함)
+            entries: FAQ 표 (기본값: FAST_PATH_TABLE)
+            profile: 답변을 만들 그래프 프로필 (없으면 기본 프로필)
+        
+        Returns:
+            FastPath: 답변을 만든 의도만 응답하는 빠른 경로 (오류로 끝난 의도는 제외, 임베딩 단계 연결됨)
+        """
+        entries = list(entries) if entries is not None else load_faq_table()
+        answers = {}
+        for entry in entries:
+            if not entry.questions:
+                continue
+            started_at = time.perf_counter()
+            try:
+                answer = final_answer(workflow.run_workflow(entry.questions[0], profile=profile))
+            except Exception as e:
+                logger.warning(f"빠른 경로 답변 생성 실패 ({entry.intent}): {str(e)}")
+                continue
+            if not answer:
+                logger.warning(f"빠른 경로 답변 생성 실패 ({entry.intent}): 답변이 없거나 워크플로우가 오류로 끝났습니다")
+                continue
+            answers[entry.intent] = answer
+            logger.info(f"빠른 경로 답변 생성: {entry.intent} ({(time.perf_counter() - started_at) * 1000:.0f}ms)")
+        
+        vectors = {}
+        questions = [(entry.intent, question) for entry in entries if entry.intent in answers
+                     for question in entry.questions]
+        if questions:
+            embedded = workflow.data_pipeline.embeddings.embed_documents([question for _, question in questions])
+            for (intent, _), vector in zip(questions, embedded):
+                vectors.setdefault(intent, []).append([float(value) for value in vector])
+        
+        return cls(entries, answers, vectors).attach(workflow)
+    
+    def save(self, directory: str, index=None) -> Path:
+        """
+        미리 만든 답변과 질문 임베딩을 색인 디렉터리에 저장합니다.
+        
+        Args:
+            directory: 색인 디렉터리
+            index: 답변을 만든 VectorIndex (생성 시각을 함께 저장해 색인이 바뀌면 답변을 버림)
+        
+        Returns:
+            Path: 저장한 파일
+        """
+        if self.answers is None:
+            raise ValueError("데모 모드 빠른 경로는 저장할 수 없습니다. FastPath.from_workflow로 답변을 만드세요.")
+        path = Path(directory) / ANSWERS_FILE
+        payload = {
+            "index_created_at": (index.info.get("created_at") if index is not None else None),
+            "intents": {
+                intent: {
+                    "questions": list(self._by_intent[intent].questions),
+                    "answer": answer,
+                    "vectors": self.vectors.get(intent, []),
+                }
+                for intent, answer in self.answers.items() if intent in self._by_intent
+            },
+        }
+        path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        logger.info(f"빠른 경로 답변 저장 완료: {path} ({len(payload['intents'])}개 의도)")
+        return path
+    
+    @classmethod
+    def load(cls, directory: str, entries: Sequence[FaqEntry] = None, index=None) -> Optional['FastPath']:
+        """
+        색인 디렉터리에 저장된 답변으로 빠른 경로를 만듭니다.
+        
+        FAQ 표에서 대표 질문이 바뀌었거나 빠진 의도의 답변은 버리고, 질문이 바뀐 의도의 임베딩도 버립니다.
+        
+        Args:
+            directory: 색인 디렉터리
+            entries: 현재 FAQ 표 (기본값: FAST_PATH_TABLE)
+            index: 서빙할 VectorIndex (저장된 생성 시각과 다르면 답변을 모두 버림)
+        
+        Returns:
+            Optional[FastPath]: 빠른 경로 (저장된 답변이 없거나 색인과 맞지 않으면 None)
+        """
+        path = Path(directory) / ANSWERS_FILE
+        if not path.exists():
+            logger.info(f"저장된 빠른 경로 답변이 없습니다: {path}")
+            return None
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        if index is not None and payload.get("index_created_at") != index.info.get("created_at"):
+            logger.warning("빠른 경로 답변이 현재 색인과 다른 색인으로 만들어져 사용하지 않습니다 (--build-index로 다시 생성)")
+            return None
+        
+        entries = list(entries) if entries is not None else load_faq_table()
+        answers = {}
+        vectors = {}
+        for entry in entries:
+            saved = payload["intents"].get(entry.intent)
+            if saved is None or not entry.questions or saved["questions"][:1] != list(entry.questions[:1]):
+                continue
+            answers[entry.intent] = saved["answer"]
+            if saved["questions"] == list(entry.questions):
+                vectors[entry.intent] = saved["vectors"]
+        dropped = len(payload["intents"]) - len(answers)
+        if dropped:
+            logger.warning(f"FAQ 표와 맞지 않는 빠른 경로 답변 {dropped}개를 버렸습니다")
+        return cls(entries, answers, vectors)
+
+class FastPathBuilder:
+    """
+    워크플로우의 색인 버전마다 서빙용 빠른 경로를 만드는 작업
+    
+    ensure()는 요청마다 호출해도 되는 가벼운 확인으로, 색인 버전이 마지막으로 만든 버전과 다르면
+    백그라운드 스레드에서 run()을 시작합니다. current()는 현재 색인 버전으로 만든 빠른 경로만 반환하므로,
+    새 버전의 답변이 준비될 때까지 빠른 경로는 꺼지고 요청은 워크플로우로 넘어갑니다.
+    """
+    
+    def __init__(self, entries: Sequence[FaqEntry] = None):
+        """
+        Args:
+            entries: FAQ 표 (기본값: 실행할 때마다 FAST_PATH_TABLE을 다시 읽음)
+        """
+        self.entries = list(entries) if entries is not None else None
+        self.fast_path = None
+        self.version = None
+        self.thread = None
+        self._target = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.discarded = 0
+    
+    def ensure(self, workflow) -> bool:
+        """
+        색인 버전이 바뀌었으면 백그라운드에서 빠른 경로를 다시 만듭니다.
+        
+        Returns:
+            bool: 이번 호출에서 만들기 시작했는지 여부
+        """
+        version = index_version(workflow)
+        if version is None or version == self._target:
+            return False
+        with self._lock:
+            if version == self._target or (self.thread is not None and self.thread.is_alive()):
+                return False
+            self._target = version
+            self.thread = threading.Thread(target=self.run, args=(workflow,), name="fast-path-build", daemon=True)
+            self.thread.start()
+        return True
+    
+    def run(self, workflow) -> Optional[FastPath]:
+        """
+        워크플로우로 빠른 경로를 만들어 설치합니다 (만드는 동안 색인 버전이 바뀌면 버림).
+        
+        Returns:
+            Optional[FastPath]: 설치한 빠른 경로 (실패하거나 버렸으면 None)
+        """
+        version = index_version(workflow)
+        started_at = time.perf_counter()
+        try:
+            fast_path = FastPath.from_workflow(workflow, self.entries)
+        except Exception as e:
+            logger.warning(f"빠른 경로 생성 실패 (색인 버전 {version}): {str(e)}")
+            return None
+        if index_version(workflow) != version:
+            with self._lock:
+                self.discarded += 1
+            logger.info(f"빠른 경로를 만드는 동안 색인이 바뀌어 버립니다 (색인 버전 {version})")
+            return None
+        self.install(fast_path, version)
+        with self._lock:
+            self.builds += 1
+        logger.info(f"빠른 경로 생성 완료: {len(fast_path)}개 의도, "
+                    f"{(time.perf_counter() - started_at) * 1000:.0f}ms (색인 버전 {version})")
+        return fast_path
+    
+    def install(self, fast_path: Optional[FastPath], version: Hashable):
+        """
+        미리 만든 빠른 경로(serve.py가 색인과 함께 저장한 답변 등)를 설치합니다.
+        
+        Args:
+            fast_path: 빠른 경로 (None이면 끔)
+            version: 빠른 경로를 만든 색인 버전
+        """
+        with self._lock:
+            self.fast_path = fast_path
+            self.version = version
+            self._target = version
+    
+    def current(self, workflow) -> Optional[FastPath]:
+        """현재 색인 버전으로 만든 빠른 경로를 반환합니다 (아직 없거나 색인이 바뀌었으면 None)."""
+        with self._lock:
+            fast_path, version = self.fast_path, self.version
+        if fast_path is None or version != index_version(workflow):
+            return None
+        return fast_path
+    
+    def snapshot(self) -> dict:
+        """현재 상태를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "builds": self.builds,
+                "discarded": self.discarded,
+                "version": self.version,
+                "intents": len(self.fast_path) if self.fast_path is not None else 0,
+                "running": self.thread is not None and self.thread.is_alive(),
+            }
@@ -0,0 +1,407 @@
+"""
+LLM 호출 스케줄러: 모든 OpenAI 채팅/임베딩 요청을 프로세스 전역 속도 제한과 우선순위 큐로 조정
+
+- 모델별 토큰 버킷(분당 요청 수 RPM, 분당 토큰 수 TPM)으로 호출 전에 예상 토큰 비용만큼 대기
+- 우선순위: interactive(사용자 질문) > report(벤치마크/보고서) > batch(문서 수집/색인)
+  같은 모델을 기다리는 요청 중 우선순위가 높은 요청이 먼저 토큰을 받습니다.
+- 429/5xx 응답과 연결 오류는 지터를 더한 지수 백오프로 재시도 (429는 같은 모델의 대기열 전체를 잠시 멈춤)
+
+ChatOpenAI와 OpenAIEmbeddings의 http_client에 스케줄링 전송 계층을 넣어 적용하므로
+노드 코드는 바꿀 필요가 없습니다. (components.openai_client_kwargs 참고)
+"""
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+import httpx
+from components import count_tokens
+from metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_RETRIES
+from config import (
+    LLM_RPM_LIMIT, LLM_TPM_LIMIT, LLM_MODEL_LIMITS, LLM_COMPLETION_TOKEN_ESTIMATE,
+    LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_DEFAULT_PRIORITY, OPENAI_MAX_RETRIES, METRICS_ENABLED
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 우선순위 클래스 (값이 작을수록 먼저 처리)
+PRIORITIES = {"interactive": 0, "report": 1, "batch": 2}
+
+# 재시도할 HTTP 상태 코드 (요청 시간 초과, 속도 제한, 서버 오류)
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+_priority = contextvars.ContextVar("llm_priority", default=None)
+_default_priority = LLM_DEFAULT_PRIORITY
+
+def _check_priority(priority: str):
+    if priority not in PRIORITIES:
+        raise ValueError(f"지원하지 않는 우선순위입니다: {priority} (사용 가능: {', '.join(PRIORITIES)})")
+
+@contextmanager
+def llm_priority(priority: str):
+    """
+    블록 안에서 호출하는 LLM/임베딩 요청의 우선순위를 지정합니다.
+    
+    Args:
+        priority: "interactive", "report" 또는 "batch"
+    """
+    _check_priority(priority)
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def set_default_priority(priority: str):
+    """우선순위를 지정하지 않은 요청의 프로세스 기본 우선순위를 바꿉니다. (배치 작업 스크립트 등)"""
+    global _default_priority
+    _check_priority(priority)
+    _default_priority = priority
+
+def current_priority() -> str:
+    """현재 컨텍스트의 우선순위를 반환합니다."""
+    return _priority.get() or _default_priority
+
+def parse_model_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    "모델=RPM:TPM" 목록(쉼표 구분)을 모델별 제한으로 변환합니다.
+    
+    예: "gpt-4o-mini=500:200000,text-embedding-ada-002=3000:1000000" (0이면 해당 제한 없음)
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.partition("=")
+        rpm, _, tpm = values.partition(":")
+        limits[model.strip()] = (float(rpm or 0), float(tpm or 0))
+    return limits
+
+class TokenBucket:
+    """분당 허용량만큼 연속적으로 채워지는 토큰 버킷 (스케줄러 잠금 안에서만 사용)"""
+    
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self, amount: float, now: float) -> float:
+        """amount만큼 꺼낼 수 있을 때까지 기다려야 하는 시간 (초)"""
+        self._refill(now)
+        # 버킷보다 큰 요청은 버킷이 가득 찼을 때 통과시킵니다
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+    
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+class _ModelQueue:
+    """모델 하나의 버킷, 대기열, 통계"""
+    
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.waiting = []
+        self.paused_until = 0.0
+        self.admitted = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self.estimated_tokens = 0
+        self.retries = 0
+        self.rate_limited = 0
+    
+    def delay(self, tokens: int, now: float) -> float:
+        delay = max(0.0, self.paused_until - now)
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+    
+    def take(self, tokens: int):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+class LLMScheduler:
+    """
+    프로세스 전역 LLM 호출 스케줄러
+    
+    모델별로 (우선순위, 도착 순서) 힙을 유지하고, 힙의 맨 앞 요청만 버킷에서 토큰을 꺼냅니다.
+    따라서 interactive 요청은 먼저 기다리던 batch 요청보다 앞서 처리되고,
+    같은 우선순위 안에서는 도착 순서를 지킵니다.
+    """
+    
+    def __init__(self, rpm: float = LLM_RPM_LIMIT, tpm: float = LLM_TPM_LIMIT,
+                 model_limits: Dict[str, Tuple[float, float]] = None, max_retries: int = OPENAI_MAX_RETRIES,
+                 base_delay: float = LLM_RETRY_BASE_DELAY, max_delay: float = LLM_RETRY_MAX_DELAY,
+                 metrics_enabled: bool = METRICS_ENABLED):
+        """
+        Args:
+            rpm: 모델별 기본 분당 요청 수 (0이면 제한 없음)
+            tpm: 모델별 기본 분당 토큰 수 (0이면 제한 없음)
+            model_limits: 모델별 (RPM, TPM) 제한 (기본값: LLM_MODEL_LIMITS)
+            max_retries: 재시도 가능한 오류의 최대 재시도 횟수
+            base_delay: 첫 재시도의 백오프 상한 (초, 이후 두 배씩 증가)
+            max_delay: 백오프 상한 (초)
+            metrics_enabled: 대기열 지표 기록 여부
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.model_limits = parse_model_limits(LLM_MODEL_LIMITS) if model_limits is None else model_limits
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics_enabled = metrics_enabled
+        self._queues = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._random = random.Random()
+    
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            rpm, tpm = self.model_limits.get(model, (self.rpm, self.tpm))
+            queue = self._queues[model] = _ModelQueue(rpm, tpm)
+        return queue
+    
+    def acquire(self, model: str, tokens: int, priority: str = None) -> float:
+        """
+        모델의 속도 제한 안에서 요청을 보낼 수 있을 때까지 기다립니다.
+        
+        Args:
+            model: 요청할 모델 이름
+            tokens: 예상 토큰 비용 (프롬프트 + 예상 완료 토큰)
+            priority: 우선순위 (기본값: 현재 컨텍스트의 우선순위)
+        
+        Returns:
+            float: 기다린 시간 (초)
+        """
+        priority = priority or current_priority()
+        _check_priority(priority)
+        ticket = (PRIORITIES[priority], next(self._sequence))
+        started_at = time.monotonic()
+        
+        with self._condition:
+            queue = self._queue(model)
+            heapq.heappush(queue.waiting, ticket)
+            self._record_depth(model, priority, 1)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if queue.waiting[0] == ticket:
+                        delay = queue.delay(tokens, now)
+                        if delay <= 0:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        # 앞선 요청이 토큰을 받으면 깨어납니다
+                        self._condition.wait()
+                
+                queue.take(tokens)
+                waited = time.monotonic() - started_at
+                queue.admitted += 1
+                queue.estimated_tokens += tokens
+                queue.wait_seconds += waited
+                if waited > 0.001:
+                    queue.delayed += 1
+            finally:
+                queue.waiting.remove(ticket)
+                heapq.heapify(queue.waiting)
+                self._record_depth(model, priority, -1)
+                self._condition.notify_all()
+        
+        if self.metrics_enabled:
+            LLM_QUEUE_WAIT.labels(priority).observe(waited)
+        return waited
+    
+    def retry_delay(self, model: str, attempt: int, reason: str, retry_after: float = None) -> float:
+        """
+        재시도 전 기다릴 시간을 계산하고 기록합니다.
+        
+        지수 백오프 상한 안에서 무작위로 고른 시간(full jitter)을 사용하되,
+        서버가 Retry-After를 알려 주면 그보다 짧게 기다리지 않습니다.
+        429 응답이면 같은 모델의 대기열 전체를 그 시간 동안 멈춥니다.
+        
+        Args:
+            model: 요청한 모델 이름
+            attempt: 지금까지의 재시도 횟수 (0부터)
+            reason: 재시도 사유 (HTTP 상태 코드 또는 "connection")
+            retry_after: 서버가 알려 준 대기 시간 (초)
+        
+        Returns:
+            float: 기다릴 시간 (초)
+        """
+        delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        
+        with self._condition:
+            queue = self._queue(model)
+            queue.retries += 1
+            if reason == "429":
+                queue.rate_limited += 1
+                queue.paused_until = max(queue.paused_until, time.monotonic() + delay)
+        
+        if self.metrics_enabled:
+            LLM_RETRIES.labels(model, reason).inc()
+        return delay
+    
+    def _record_depth(self, model: str, priority: str, amount: int):
+        if self.metrics_enabled:
+            LLM_QUEUE_DEPTH.labels(model, priority).inc(amount)
+    
+    def queue_depth(self) -> Dict[str, Dict[str, int]]:
+        """모델별, 우선순위별 대기 중인 요청 수를 반환합니다."""
+        names = {value: name for name, value in PRIORITIES.items()}
+        with self._condition:
+            depth = {}
+            for model, queue in self._queues.items():
+                counts = {name: 0 for name in PRIORITIES}
+                for level, _ in queue.waiting:
+                    counts[names[level]] += 1
+                depth[model] = counts
+            return depth
+    
+    def snapshot(self) -> dict:
+        """모델별 처리 통계를 딕셔너리로 반환합니다."""
+        depth = self.queue_depth()
+        with self._condition:
+            return {
+                model: {
+                    "admitted": queue.admitted,
+                    "delayed": queue.delayed,
+                    "mean_wait_ms": queue.wait_seconds / queue.admitted * 1000 if queue.admitted else 0.0,
+                    "estimated_tokens": queue.estimated_tokens,
+                    "retries": queue.retries,
+                    "rate_limited": queue.rate_limited,
+                    "queue_depth": depth.get(model, {}),
+                }
+                for model, queue in self._queues.items()
+            }
+
+def estimate_request_tokens(body: dict, completion_estimate: int = LLM_COMPLETION_TOKEN_ESTIMATE) -> int:
+    """
+    OpenAI 요청 본문의 토큰 비용을 호출 전에 추정합니다.
+    
+    채팅은 메시지와 도구 정의의 토큰 수에 최대 완료 토큰(max_tokens, 없으면 completion_estimate)을 더하고,
+    임베딩은 입력 토큰 수를 사용합니다.
+    
+    Args:
+        body: 요청 JSON 본문
+        completion_estimate: max_tokens가 없을 때 가정할 완료 토큰 수
+    
+    Returns:
+        int: 예상 토큰 수
+    """
+    if "messages" in body:
+        tokens = 0
+        for message in body.get("messages") or []:
+            content = message.get("content") or ""
+            if isinstance(content, list):
+                content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+            # 메시지마다 역할과 구분자에 몇 토큰이 더 쓰입니다
+            tokens += count_tokens(str(content)) + 4
+        if body.get("tools"):
+            tokens += count_tokens(json.dumps(body["tools"], ensure_ascii=False))
+        return tokens + int(body.get("max_completion_tokens") or body.get("max_tokens") or completion_estimate)
+    
+    inputs = body.get("input") or []
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    return sum(count_tokens(item) if isinstance(item, str) else len(item) for item in inputs)
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Retry-After(초) 또는 retry-after-ms 헤더 값을 반환합니다."""
+    try:
+        if response.headers.get("retry-after-ms"):
+            return float(response.headers["retry-after-ms"]) / 1000
+        if response.headers.get("retry-after"):
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+class ScheduledTransport(httpx.BaseTransport):
+    """요청마다 스케줄러의 허가를 받고 재시도 가능한 오류를 백오프로 재시도하는 httpx 전송 계층"""
+    
+    def __init__(self, scheduler: LLMScheduler, transport: httpx.BaseTransport = None):
+        self.scheduler = scheduler
+        self.transport = transport or httpx.HTTPTransport()
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            body = json.loads(request.read() or b"{}")
+        except ValueError:
+            body = {}
+        model = str(body.get("model") or "unknown")
+        tokens = estimate_request_tokens(body) if isinstance(body, dict) else 0
+        
+        attempt = 0
+        while True:
+            self.scheduler.acquire(model, tokens)
+            try:
+                response = self.transport.handle_request(request)
+            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                if attempt >= self.scheduler.max_retries:
+                    raise
+                delay = self.scheduler.retry_delay(model, attempt, "connection")
+                logger.warning(f"LLM 요청 연결 오류, {delay:.2f}초 후 재시도 ({attempt + 1}/{self.scheduler.max_retries}): {str(e)}")
+            else:
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.scheduler.max_retries:
+                    return response
+                response.read()
+                response.close()
+                delay = self.scheduler.retry_delay(model, attempt, str(response.status_code), _retry_after(response))
+                logger.warning(f"LLM 요청 {response.status_code} 응답, {delay:.2f}초 후 재시도 "
+                               f"({attempt + 1}/{self.scheduler.max_retries})")
+            
+            time.sleep(delay)
+            attempt += 1
+    
+    def close(self):
+        self.transport.close()
+
+_scheduler = None
+_http_client = None
+_http_client_pid = None
+_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    """프로세스 전역 스케줄러를 반환합니다."""
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
+
+def scheduled_http_client() -> httpx.Client:
+    """
+    전역 스케줄러를 거치는 공유 httpx 클라이언트를 반환합니다.
+    
+    연결 풀을 모든 모델 인스턴스가 공유하며, fork한 워커 프로세스에서는 부모의 연결을 쓰지 않도록 새로 만듭니다.
+    """
+    global _http_client, _http_client_pid
+    scheduler = get_scheduler()
+    with _lock:
+        if _http_client is None or _http_client_pid != os.getpid():
+            _http_client = httpx.Client(
+                # 전송 계층을 직접 넘기면 httpx.Client의 limits는 무시되므로 실제 연결 풀에 한도를 설정합니다
+                transport=ScheduledTransport(scheduler, httpx.HTTPTransport(
+                    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100))),
+                follow_redirects=True,
+            )
+            _http_client_pid = os.getpid()
+        return _http_client
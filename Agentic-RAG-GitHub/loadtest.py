@@ -0,0 +1,297 @@
+"""
+HTTP 부하 테스트: Flask /ask 엔드포인트의 처리량, 오류율, 지연 시간 백분위수 측정
+
+- 닫힌 루프(closed): 동시 사용자 수를 단계별로 늘리며 각 사용자가 응답을 받은 직후 다음 요청을 보냄
+- 열린 루프(open): 응답과 무관하게 정해진 도착률(요청/초)로 요청을 보냄
+
+열린 루프의 지연 시간은 예정된 도착 시각부터 측정하므로, 클라이언트가 밀려서 늦게 보낸 시간도
+지연 시간에 포함됩니다 (coordinated omission 방지).
+
+기본값으로 X-Bypass-Cache 헤더를 보내 빠른 경로와 워밍업 답변을 건너뛰므로, 예시 질문도 워크플로우를 거친
+지연 시간을 측정합니다 (--use-cache면 실제 사용자처럼 미리 만든 답변도 사용).
+"""
+import argparse
+import http.client
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+# 프로젝트 루트를 Python 경로에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from answer_warmup import EXAMPLE_QUESTIONS
+from benchmark import format_table, percentile
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 보고하는 백분위
+PERCENTILES = (50, 90, 99, 99.9)
+
+def load_question_mix(path: str = None) -> List[str]:
+    """
+    부하 테스트에 사용할 질문 목록을 불러옵니다.
+    
+    Args:
+        path: 질문 파일 (JSON 문자열 목록, benchmark_questions.json 형식, 또는 한 줄에 한 질문)
+    
+    Returns:
+        List[str]: 질문 목록 (파일이 없으면 answer_warmup.EXAMPLE_QUESTIONS)
+    """
+    if not path:
+        return list(EXAMPLE_QUESTIONS)
+    
+    text = Path(path).read_text(encoding="utf-8")
+    try:
+        items = json.loads(text)
+    except ValueError:
+        return [line.strip() for line in text.splitlines() if line.strip()]
+    return [item["question"] if isinstance(item, dict) else str(item) for item in items]
+
+class RequestResult:
+    """요청 한 건의 측정 결과"""
+    
+    __slots__ = ("scheduled_at", "ttfb", "latency", "status", "error")
+    
+    def __init__(self, scheduled_at: float, ttfb: float = None, latency: float = None,
+                 status: int = None, error: str = None):
+        self.scheduled_at = scheduled_at
+        self.ttfb = ttfb
+        self.latency = latency
+        self.status = status
+        self.error = error
+
+class AskClient:
+    """스레드별 keep-alive 연결로 /ask에 질문을 보내는 클라이언트"""
+    
+    def __init__(self, url: str, timeout: float = 60.0, headers: Dict[str, str] = None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/ask"
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self._local = threading.local()
+    
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = connection_class(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+    
+    def _reset(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+    
+    def ask(self, question: str, scheduled_at: float = None) -> RequestResult:
+        """
+        질문 하나를 보내고 첫 바이트 시간과 전체 지연 시간을 측정합니다.
+        
+        Args:
+            question: 질문
+            scheduled_at: 측정 기준 시각 (없으면 전송 시각)
+        
+        Returns:
+            RequestResult: 측정 결과
+        """
+        started_at = time.perf_counter()
+        result = RequestResult(scheduled_at if scheduled_at is not None else started_at)
+        body = json.dumps({"question": question}, ensure_ascii=False).encode("utf-8")
+        
+        try:
+            connection = self._connection()
+            connection.request("POST", self.path, body=body, headers=self.headers)
+            response = connection.getresponse()
+            # 스트리밍 응답이면 첫 청크가 도착한 시각이 첫 바이트 시간
+            first = response.read(1)
+            result.ttfb = time.perf_counter() - result.scheduled_at
+            payload = first + response.read()
+            result.latency = time.perf_counter() - result.scheduled_at
+            result.status = response.status
+            
+            if response.status >= 400:
+                result.error = f"HTTP {response.status}"
+            elif "json" in (response.getheader("Content-Type") or ""):
+                # /ask는 처리 실패도 200과 success=false로 응답
+                data = json.loads(payload)
+                if isinstance(data, dict) and data.get("success") is False:
+                    result.error = data.get("error") or "success=false"
+            if response.getheader("Connection", "").lower() == "close":
+                self._reset()
+        except Exception as e:
+            result.latency = time.perf_counter() - result.scheduled_at
+            result.error = f"{type(e).__name__}: {e}"
+            self._reset()
+        return result
+
+def summarize_results(results: List[RequestResult], elapsed: float, **labels) -> dict:
+    """
+    측정 결과를 처리량, 오류율, 백분위수 지연 시간으로 요약합니다.
+    
+    Args:
+        results: 측정 구간의 요청 결과
+        elapsed: 측정 구간 길이 (초)
+        labels: 결과 행에 함께 기록할 값 (모드, 동시성, 도착률 등)
+    
+    Returns:
+        dict: 요약 행 (지연 시간은 밀리초)
+    """
+    latencies = [result.latency * 1000 for result in results if result.error is None]
+    ttfbs = [result.ttfb * 1000 for result in results if result.error is None and result.ttfb is not None]
+    errors = sum(1 for result in results if result.error is not None)
+    
+    row = {
+        **labels,
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "throughput_rps": round((len(results) - errors) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    for q in PERCENTILES:
+        row[f"p{q:g}_ms"] = round(percentile(latencies, q), 1)
+    for q in PERCENTILES:
+        row[f"ttfb_p{q:g}_ms"] = round(percentile(ttfbs, q), 1)
+    return row
+
+def run_closed_loop(client: AskClient, questions: List[str], concurrency: int, duration: float,
+                    warmup: float = 0.0, seed: int = 0) -> dict:
+    """
+    동시 사용자 수를 고정하고 각 사용자가 응답을 받자마자 다음 질문을 보냅니다.
+    
+    Args:
+        client: /ask 클라이언트
+        questions: 질문 목록 (무작위로 선택)
+        concurrency: 동시 사용자 수
+        duration: 측정 시간 (초)
+        warmup: 측정 전 워밍업 시간 (초, 결과에서 제외)
+        seed: 질문 선택 난수 시드
+    
+    Returns:
+        dict: 요약 행
+    """
+    started_at = time.perf_counter()
+    measure_from = started_at + warmup
+    deadline = measure_from + duration
+    results = []
+    lock = threading.Lock()
+    
+    def _user(index: int):
+        rng = random.Random(seed + index)
+        while time.perf_counter() < deadline:
+            result = client.ask(rng.choice(questions))
+            if result.scheduled_at >= measure_from:
+                with lock:
+                    results.append(result)
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(_user, index) for index in range(concurrency)]:
+            future.result()
+    
+    # 마지막 요청이 마감 시각을 넘겨 끝날 수 있으므로 실제 종료 시각으로 처리량을 계산
+    elapsed = time.perf_counter() - measure_from
+    return summarize_results(results, elapsed, mode="closed", concurrency=concurrency)
+
+def run_open_loop(client: AskClient, questions: List[str], rate: float, duration: float,
+                  warmup: float = 0.0, arrival: str = "poisson", max_workers: int = 256,
+                  seed: int = 0) -> dict:
+    """
+    응답과 무관하게 정해진 도착률로 질문을 보냅니다.
+    
+    Args:
+        client: /ask 클라이언트
+        questions: 질문 목록 (무작위로 선택)
+        rate: 초당 도착 요청 수
+        duration: 측정 시간 (초)
+        warmup: 측정 전 워밍업 시간 (초, 결과에서 제외)
+        arrival: 도착 간격 분포 ("poisson" 또는 "constant")
+        max_workers: 동시에 진행할 수 있는 최대 요청 수 (부족하면 지연 시간에 대기가 포함됨)
+        seed: 도착 간격과 질문 선택 난수 시드
+    
+    Returns:
+        dict: 요약 행
+    """
+    rng = random.Random(seed)
+    started_at = time.perf_counter()
+    measure_from = started_at + warmup
+    deadline = measure_from + duration
+    futures = []
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scheduled_at = started_at
+        while scheduled_at < deadline:
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append((scheduled_at, executor.submit(client.ask, rng.choice(questions), scheduled_at)))
+            scheduled_at += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        
+        results = [future.result() for scheduled, future in futures if scheduled >= measure_from]
+    
+    # 열린 루프는 도착률로 정한 측정 구간 기준의 처리량을 보고
+    return summarize_results(results, duration, mode="open", rate=rate)
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="Flask /ask HTTP 부하 테스트")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/ask", help="요청을 보낼 엔드포인트 URL")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: 동시 사용자 수 단계별 측정, open: 고정 도착률")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="닫힌 루프 동시 사용자 수 (여러 개면 단계별로 측정)")
+    parser.add_argument("--rate", type=float, nargs="+", default=[5.0],
+                        help="열린 루프 도착률 (요청/초, 여러 개면 단계별로 측정)")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson", help="열린 루프 도착 간격 분포")
+    parser.add_argument("--max-workers", type=int, default=256, help="열린 루프 최대 동시 요청 수")
+    parser.add_argument("--duration", type=float, default=30.0, help="단계별 측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="단계별 워밍업 시간 (초, 결과에서 제외)")
+    parser.add_argument("--questions", help="질문 파일 (없으면 웹 앱 예시 질문)")
+    parser.add_argument("--header", action="append", default=[], help="추가 요청 헤더 (예: X-Profile: 1)")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="빠른 경로와 워밍업 답변도 사용 (기본값: X-Bypass-Cache로 건너뛰고 워크플로우 측정)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="요청 타임아웃 (초)")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--output", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+    
+    headers = {key.strip(): value.strip() for key, value in (header.split(":", 1) for header in args.header)}
+    if not args.use_cache:
+        headers.setdefault("X-Bypass-Cache", "1")
+    client = AskClient(args.url, args.timeout, headers)
+    questions = load_question_mix(args.questions)
+    
+    rows = []
+    steps = args.concurrency if args.mode == "closed" else args.rate
+    for step in steps:
+        logger.info(f"부하 테스트 단계 시작 ({args.mode}, {step}): 워밍업 {args.warmup}초, 측정 {args.duration}초")
+        if args.mode == "closed":
+            row = run_closed_loop(client, questions, step, args.duration, args.warmup, args.seed)
+        else:
+            row = run_open_loop(client, questions, step, args.duration, args.warmup,
+                                args.arrival, args.max_workers, args.seed)
+        rows.append(row)
+        logger.info(f"단계 완료: {row['throughput_rps']} rps, p99 {row['p99_ms']}ms, 오류율 {row['error_rate']}")
+    
+    print(format_table(rows))
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "mode": args.mode, "duration": args.duration,
+                       "warmup": args.warmup, "results": rows}, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+대화 메모리: 여러 턴 대화에서 에이전트 호출의 프롬프트 크기를 일정하게 유지
+
+- 최근 MEMORY_RECENT_TURNS개 턴은 그대로 두고, 그보다 오래된 턴은 요약(summary)에 점진적으로 합칩니다.
+  기존 요약에 새로 밀려난 턴만 더하고 합친 턴은 상태에서 지우므로 한 번 요약한 턴은 다시 요약하지 않습니다.
+- 지난 턴의 검색 도구 호출/결과와 재작성 메시지는 이미 답변에 반영되었으므로 버리고 질문과 최종 답변만 남깁니다.
+  현재 턴에서도 재작성 이전의 검색 결과는 버립니다.
+- 에이전트 호출마다 프롬프트가 MEMORY_MAX_TOKENS를 넘으면 최근 턴을 하나씩 더 요약에 합치고,
+  그래도 넘으면(현재 턴의 큰 검색 결과 등) 현재 턴의 오래된 도구 결과부터 잘라 한도에 맞춥니다.
+  자른 결과는 이번 호출의 프롬프트에만 쓰고 상태의 메시지는 그대로 둡니다.
+"""
+import logging
+import threading
+from typing import Callable, List, Sequence, Tuple
+from components import count_tokens, create_chat_model
+from config import OPENAI_MODEL, MEMORY_RECENT_TURNS, MEMORY_MAX_TOKENS, MEMORY_SUMMARY_MAX_TOKENS
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "이전 대화 요약:"
+TRUNCATED_SUFFIX = "\n...(프롬프트 토큰 한도로 이후 내용 생략)"
+
+def message_tokens(messages: Sequence) -> int:
+    """메시지 목록의 토큰 수를 계산합니다 (내용과 도구 호출 인자)."""
+    total = 0
+    for message in messages:
+        total += count_tokens(str(message.content))
+        for tool_call in getattr(message, "tool_calls", None) or ():
+            total += count_tokens(str(tool_call.get("args", "")))
+    return total
+
+def truncate_tokens(text: str, max_tokens: int, suffix: str = "") -> str:
+    """
+    텍스트를 앞부분만 남겨 max_tokens 토큰 이하로 자릅니다 (글자 수 이진 탐색).
+    
+    자른 경우 suffix를 붙이며 suffix를 포함해 한도를 지킵니다 (suffix만으로 넘으면 suffix만 반환).
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle] + suffix) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + suffix
+
+def truncate_tool_outputs(turn: list, excess: int) -> Tuple[list, int]:
+    """
+    턴의 오래된 도구 결과부터 잘라 메시지 토큰을 excess만큼 줄입니다.
+    
+    도구 호출과 결과의 짝이 깨지지 않도록 메시지를 버리지 않고 내용만 자른 복사본으로 바꿉니다.
+    
+    Returns:
+        Tuple[list, int]: (자른 메시지 목록, 자른 도구 결과 수)
+    """
+    result = list(turn)
+    truncated = 0
+    for index, message in enumerate(result):
+        if excess <= 0:
+            break
+        if getattr(message, "type", None) != "tool":
+            continue
+        content = str(message.content)
+        tokens = count_tokens(content)
+        shortened = truncate_tokens(content, max(0, tokens - excess), TRUNCATED_SUFFIX)
+        result[index] = message.copy(update={"content": shortened})
+        excess -= tokens - count_tokens(shortened)
+        truncated += 1
+    return result, truncated
+
+def _is_rewrite(message) -> bool:
+    metadata = getattr(message, "response_metadata", None) or {}
+    return bool(metadata.get("rewrite"))
+
+def _is_answer(message) -> bool:
+    return (getattr(message, "type", None) == "ai" and not getattr(message, "tool_calls", None)
+            and not _is_rewrite(message))
+
+def split_turns(messages: Sequence) -> List[list]:
+    """
+    메시지 목록을 턴으로 나눕니다 (사용자 메시지마다 새 턴 시작).
+    
+    Returns:
+        List[list]: 턴별 메시지 목록 (첫 사용자 메시지 이전 메시지는 첫 턴에 포함)
+    """
+    turns = []
+    for message in messages:
+        if getattr(message, "type", None) == "human" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def compact_turn(turn: list) -> list:
+    """
+    지난 턴에서 질문과 최종 답변만 남깁니다.
+    
+    검색 도구 호출과 결과, 재작성 메시지, 재작성으로 버려진 추측 답변은 제외합니다.
+    """
+    answers = [message for message in turn if _is_answer(message)]
+    kept = [turn[0]] if getattr(turn[0], "type", None) == "human" else []
+    return kept + answers[-1:]
+
+def compact_current_turn(turn: list) -> list:
+    """현재 턴에서 마지막 재작성 이전의 메시지(이전 검색 결과와 재작성)를 버립니다."""
+    rewrites = [index for index, message in enumerate(turn) if _is_rewrite(message)]
+    if not rewrites or getattr(turn[0], "type", None) != "human":
+        return list(turn)
+    return [turn[0], *turn[rewrites[-1]:]]
+
+def format_turns(turns: Sequence[list]) -> str:
+    """요약 프롬프트에 넣을 대화 문자열을 만듭니다."""
+    roles = {"human": "사용자", "ai": "어시스턴트"}
+    return "\n".join(
+        f"{roles.get(message.type, message.type)}: {message.content}"
+        for turn in turns for message in turn
+    )
+
+def summarize_turns(summary: str, turns: Sequence[list]) -> str:
+    """
+    기존 요약에 새 턴의 내용을 더한 요약을 만듭니다 (LLM 호출 1회).
+    
+    Args:
+        summary: 지금까지의 요약 (없으면 빈 문자열)
+        turns: 요약에 새로 합칠 턴 목록
+    
+    Returns:
+        str: 갱신된 요약
+    """
+    from langchain_core.messages import HumanMessage
+    
+    prompt = f"""다음은 사용자와 금융 정보 어시스턴트의 대화 요약과 그 뒤에 이어진 대화입니다.
+    이어진 대화의 내용을 기존 요약에 더해 갱신된 요약을 작성하세요.
+    사용자가 관심을 보인 주제, 종목, 조건과 어시스턴트가 제공한 핵심 사실을 유지하고
+    {MEMORY_SUMMARY_MAX_TOKENS}토큰 이내로 간결하게 작성하세요.
+    
+    기존 요약:
+    {summary or "(없음)"}
+    
+    이어진 대화:
+    {format_turns(turns)}
+    
+    갱신된 요약:"""
+    
+    model = create_chat_model(temperature=0, model=OPENAI_MODEL)
+    return str(model.invoke([HumanMessage(content=prompt)]).content).strip()
+
+class MemoryStats:
+    """대화 메모리 압축 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prepared = 0
+        self.summarized_turns = 0
+        self.summary_calls = 0
+        self.dropped_messages = 0
+        self.prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.truncated_outputs = 0
+        self.over_budget = 0
+    
+    def record(self, prompt_tokens: int, dropped: int, summarized_turns: int, summary_calls: int,
+               truncated_outputs: int, over_budget: bool):
+        """에이전트 호출 한 번의 압축 결과를 기록합니다."""
+        with self._lock:
+            self.prepared += 1
+            self.prompt_tokens += prompt_tokens
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+            self.dropped_messages += dropped
+            self.summarized_turns += summarized_turns
+            self.summary_calls += summary_calls
+            self.truncated_outputs += truncated_outputs
+            self.over_budget += int(over_budget)
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "agent_calls": self.prepared,
+                "mean_prompt_tokens": self.prompt_tokens / self.prepared if self.prepared else 0.0,
+                "max_prompt_tokens": self.max_prompt_tokens,
+                "dropped_messages": self.dropped_messages,
+                "summarized_turns": self.summarized_turns,
+                "summary_calls": self.summary_calls,
+                "truncated_tool_outputs": self.truncated_outputs,
+                "over_budget": self.over_budget,
+            }
+
+class ConversationMemory:
+    """
+    에이전트 노드 앞에서 대화 기록을 압축하는 메모리
+    
+    prepare()는 모델에 보낼 프롬프트와 함께, 버리거나 요약에 합친 메시지를 상태에서 지우는
+    RemoveMessage와 갱신된 summary를 돌려주므로 압축 결과가 다음 호출과 다음 턴에 그대로 이어집니다.
+    """
+    
+    def __init__(self, recent_turns: int = MEMORY_RECENT_TURNS, max_tokens: int = MEMORY_MAX_TOKENS,
+                 summarize: Callable[[str, Sequence[list]], str] = None):
+        """
+        Args:
+            recent_turns: 요약하지 않고 그대로 둘 최근 지난 턴 수
+            max_tokens: 에이전트 프롬프트의 최대 토큰 수 (0이면 제한 없음)
+            summarize: (기존 요약, 새 턴 목록)을 받아 갱신된 요약을 반환하는 함수 (기본값: summarize_turns)
+        """
+        self.recent_turns = max(0, recent_turns)
+        self.max_tokens = max_tokens
+        self.summarize = summarize or summarize_turns
+        self.stats = MemoryStats()
+    
+    def prepare(self, state) -> Tuple[list, dict]:
+        """
+        상태의 대화 기록을 압축해 에이전트 프롬프트를 만듭니다.
+        
+        Args:
+            state: 에이전트 상태 (messages, summary)
+        
+        Returns:
+            Tuple[list, dict]: (모델에 보낼 메시지 목록, 상태 업데이트 {"messages": RemoveMessage 목록, "summary"?})
+        """
+        turns = split_turns(state["messages"])
+        previous = [compact_turn(turn) for turn in turns[:-1]]
+        current = compact_current_turn(turns[-1]) if turns else []
+        summary = state.get("summary") or ""
+        
+        # 오래된 턴부터 요약에 합칩니다 (최근 recent_turns개 턴은 그대로 유지)
+        keep = min(self.recent_turns, len(previous))
+        folded = len(previous) - keep
+        summary_calls = 0
+        if folded:
+            summary = self.summarize(summary, previous[:folded])
+            summary_calls += 1
+        
+        prompt = self._build_prompt(summary, previous[folded:], current)
+        tokens = message_tokens(prompt)
+        
+        # 토큰 한도를 넘으면 남은 지난 턴을 하나씩 더 합칩니다
+        while self.max_tokens and tokens > self.max_tokens and folded < len(previous):
+            summary = self.summarize(summary, previous[folded:folded + 1])
+            summary_calls += 1
+            folded += 1
+            prompt = self._build_prompt(summary, previous[folded:], current)
+            tokens = message_tokens(prompt)
+        
+        kept = {id(message) for turn in [*previous[folded:], current] for message in turn}
+        removed = [message for message in state["messages"] if id(message) not in kept and message.id]
+        
+        # 그래도 넘으면 현재 턴의 오래된 도구 결과부터 잘라 이번 호출의 프롬프트에 맞춥니다
+        truncated = 0
+        if self.max_tokens and tokens > self.max_tokens:
+            current, truncated = truncate_tool_outputs(current, tokens - self.max_tokens)
+            if truncated:
+                prompt = self._build_prompt(summary, previous[folded:], current)
+                tokens = message_tokens(prompt)
+                logger.info(f"에이전트 프롬프트를 한도에 맞추려고 현재 턴의 도구 결과 {truncated}개를 잘랐습니다 "
+                            f"({tokens}토큰)")
+        
+        over_budget = bool(self.max_tokens) and tokens > self.max_tokens
+        if over_budget:
+            logger.warning(f"대화 기록을 모두 요약하고 도구 결과를 잘라도 에이전트 프롬프트가 {tokens}토큰으로 "
+                           f"한도({self.max_tokens})를 넘습니다")
+        
+        self.stats.record(tokens, len(removed), folded, summary_calls, truncated, over_budget)
+        
+        update = {"messages": self._remove(removed)}
+        if summary_calls:
+            update["summary"] = summary
+        return prompt, update
+    
+    def _build_prompt(self, summary: str, recent: Sequence[list], current: list) -> list:
+        from langchain_core.messages import SystemMessage
+        
+        prompt = [SystemMessage(content=f"{SUMMARY_PREFIX}\n{summary}")] if summary else []
+        return prompt + [message for turn in recent for message in turn] + current
+    
+    def _remove(self, messages: Sequence) -> list:
+        from langchain_core.messages import RemoveMessage
+        
+        return [RemoveMessage(id=message.id) for message in messages]
@@ -0,0 +1,363 @@
+"""
+운영 지표: 카운터, 게이지, 고정 버킷 히스토그램을 Prometheus 텍스트 형식으로 노출
+"""
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Sequence, Tuple
+from config import METRICS_ENABLED
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 지연 시간 히스토그램 기본 버킷 (초)
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _ShardedValues:
+    """
+    스레드별 샤드에 값을 누적하고 조회 시 합산하는 저장소
+    
+    각 스레드는 자기 샤드에만 쓰므로 기록 경로에 잠금이 없습니다.
+    잠금은 스레드가 처음 기록할 때 샤드를 등록할 때와 조회할 때만 사용하며,
+    요청마다 스레드를 만드는 서버에서도 샤드가 쌓이지 않도록 종료된 스레드의 샤드는 조회 시 합쳐 둡니다.
+    """
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards = []
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+    
+    def shard(self) -> List[float]:
+        """현재 스레드의 샤드를 반환합니다."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+    
+    def totals(self) -> List[float]:
+        """모든 샤드의 합계를 반환합니다."""
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    for i, value in enumerate(shard):
+                        self._retired[i] += value
+            self._shards = alive
+            totals = list(self._retired)
+        
+        for _, shard in alive:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+class CounterChild:
+    """레이블 값이 정해진 카운터"""
+    
+    def __init__(self):
+        self._values = _ShardedValues(1)
+    
+    def inc(self, amount: float = 1.0):
+        self._values.shard()[0] += amount
+    
+    def value(self) -> float:
+        return self._values.totals()[0]
+
+class GaugeChild:
+    """
+    레이블 값이 정해진 게이지
+    
+    inc/dec는 샤드에 누적되고(진행 중 요청 수 등), set은 기준값을 바꾸며,
+    set_function으로 조회 시점에 계산되는 값(색인 크기 등)을 지정할 수 있습니다.
+    """
+    
+    def __init__(self):
+        self._values = _ShardedValues(1)
+        self._base = 0.0
+        self._function = None
+    
+    def inc(self, amount: float = 1.0):
+        self._values.shard()[0] += amount
+    
+    def dec(self, amount: float = 1.0):
+        self._values.shard()[0] -= amount
+    
+    def set(self, value: float):
+        self._base = value - self._values.totals()[0]
+    
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+    
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception as e:
+                logger.debug(f"게이지 값 계산 실패: {str(e)}")
+                return math.nan
+        return self._base + self._values.totals()[0]
+
+class HistogramChild:
+    """레이블 값이 정해진 고정 버킷 히스토그램"""
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # 샤드 구성: [버킷별 개수..., +Inf 개수, 합계]
+        self._values = _ShardedValues(len(self.buckets) + 2)
+    
+    def observe(self, value: float):
+        shard = self._values.shard()
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                shard[i] += 1
+                break
+        else:
+            shard[len(self.buckets)] += 1
+        shard[-1] += value
+    
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """(누적 버킷 개수, 합계, 전체 개수)를 반환합니다."""
+        totals = self._values.totals()
+        cumulative = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+class _Metric(ABC):
+    """레이블별 자식 지표를 관리하는 지표 기본 클래스 (하위 클래스는 _new_child()와 samples() 구현)"""
+    
+    metric_type = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+    
+    @abstractmethod
+    def _new_child(self):
+        """레이블 값 하나에 해당하는 새 자식 지표를 만듭니다."""
+    
+    def labels(self, *values, **kwargs):
+        """레이블 값에 해당하는 자식 지표를 반환합니다."""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} 레이블 수가 맞지 않습니다: {self.labelnames}")
+        
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+    
+    def _default(self):
+        """레이블이 없는 지표의 자식을 반환합니다."""
+        return self.labels()
+    
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """(샘플 이름, 레이블, 값) 목록을 반환합니다."""
+    
+    def _label_dict(self, values) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+    
+    metric_type = "counter"
+    
+    def _new_child(self):
+        return CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+    
+    def samples(self):
+        return [(self.name, self._label_dict(values), child.value())
+                for values, child in list(self._children.items())]
+
+class Gauge(_Metric):
+    """증감 가능한 게이지"""
+    
+    metric_type = "gauge"
+    
+    def _new_child(self):
+        return GaugeChild()
+    
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+    
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+    
+    def set(self, value: float):
+        self._default().set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+    
+    def samples(self):
+        return [(self.name, self._label_dict(values), child.value())
+                for values, child in list(self._children.items())]
+
+class Histogram(_Metric):
+    """고정 버킷 히스토그램"""
+    
+    metric_type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default().observe(value)
+    
+    def samples(self):
+        samples = []
+        for values, child in list(self._children.items()):
+            labels = self._label_dict(values)
+            cumulative, total, count = child.snapshot()
+            for bound, bucket_count in zip((*self.buckets, math.inf), cumulative):
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, bucket_count))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+def _format_value(value: float) -> str:
+    """Prometheus 텍스트 형식의 숫자 표현을 반환합니다."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class MetricsRegistry:
+    """지표 등록 및 Prometheus 텍스트 형식 출력"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # 모듈을 다시 불러와도 같은 지표를 공유합니다
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """
+        등록된 모든 지표를 Prometheus 텍스트 형식(0.0.4)으로 출력합니다.
+        
+        Returns:
+            str: /metrics 응답 본문
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# 전역 지표 레지스트리
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.counter("rag_requests_total", "워크플로우 실행 수", ["profile", "status"])
+REQUEST_DURATION = REGISTRY.histogram("rag_request_duration_seconds", "워크플로우 전체 실행 시간", ["profile"])
+IN_FLIGHT = REGISTRY.gauge("rag_requests_in_flight", "실행 중인 워크플로우 수")
+NODE_DURATION = REGISTRY.histogram("rag_node_duration_seconds", "그래프 노드 실행 시간", ["node"])
+REWRITES = REGISTRY.histogram("rag_rewrites_per_request", "요청당 질문 재작성 횟수", buckets=(0, 1, 2, 3, 5))
+TOKENS = REGISTRY.counter("rag_llm_tokens_total", "LLM 토큰 사용량", ["type"])
+RETRIEVAL_K = REGISTRY.histogram("rag_retrieval_documents", "검색 한 번에 선택한 문서 수 (적응형 검색 깊이)",
+                                 ["reason"], buckets=(1, 2, 3, 4, 5, 6, 8, 10, 12))
+CACHE_REQUESTS = REGISTRY.counter("rag_cache_requests_total", "캐시 조회 결과", ["cache", "result"])
+INDEX_SIZE = REGISTRY.gauge("rag_index_documents", "벡터 색인의 청크 수")
+HTTP_REQUESTS = REGISTRY.counter("rag_http_requests_total", "HTTP 요청 수", ["endpoint", "status"])
+HTTP_DURATION = REGISTRY.histogram("rag_http_request_duration_seconds", "HTTP 요청 처리 시간", ["endpoint"])
+LLM_QUEUE_DEPTH = REGISTRY.gauge("rag_llm_queue_depth", "속도 제한을 기다리는 LLM 요청 수", ["model", "priority"])
+LLM_QUEUE_WAIT = REGISTRY.histogram("rag_llm_queue_wait_seconds", "LLM 요청의 스케줄러 대기 시간", ["priority"])
+LLM_RETRIES = REGISTRY.counter("rag_llm_retries_total", "LLM 요청 재시도 수", ["model", "reason"])
+ADMISSION_REQUESTS = REGISTRY.counter("rag_admission_requests_total", "수용 제어 결과", ["result", "reason"])
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram("rag_admission_queue_wait_seconds", "실행 슬롯을 기다린 시간", ["result"])
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("rag_admission_queue_depth", "실행 슬롯을 기다리는 요청 수")
+ADMISSION_ACTIVE = REGISTRY.gauge("rag_admission_active", "수용 제어를 통과해 실행 중인 요청 수")
+
+def record_workflow(profile: str, trace, results: list, status: str = "ok", enabled: bool = METRICS_ENABLED):
+    """
+    워크플로우 실행 한 건의 추적 결과를 지표에 반영합니다.
+    
+    Args:
+        profile: 그래프 프로필
+        trace: 실행 추적 정보 (tracing.Trace)
+        results: run_workflow 결과 (노드 이름, 출력) 목록
+        status: "ok" 또는 "error"
+        enabled: 지표 기록 여부
+    """
+    if not enabled:
+        return
+    
+    REQUESTS.labels(profile, status).inc()
+    if trace.root is not None and trace.root.duration is not None:
+        REQUEST_DURATION.labels(profile).observe(trace.root.duration)
+    
+    prompt_tokens = completion_tokens = 0
+    for span in list(trace.spans):
+        if span.kind == "node" and span.duration is not None:
+            NODE_DURATION.labels(span.name).observe(span.duration)
+        elif span.kind == "llm":
+            prompt_tokens += span.attributes.get("prompt_tokens", 0)
+            completion_tokens += span.attributes.get("completion_tokens", 0)
+    
+    TOKENS.labels("prompt").inc(prompt_tokens)
+    TOKENS.labels("completion").inc(completion_tokens)
+    REWRITES.observe(sum(1 for node, _ in results if node == "rewrite"))
+    
+    for selection in list(trace.retrievals):
+        RETRIEVAL_K.labels(selection["reason"]).observe(selection["k"])
+    
+    for cache, counts in dict(trace.cache).items():
+        CACHE_REQUESTS.labels(cache, "hit").inc(counts["hits"])
+        CACHE_REQUESTS.labels(cache, "miss").inc(counts["misses"])
@@ -0,0 +1,210 @@
+"""
+마이크로 배치: 동시에 들어온 질의 임베딩과 벡터 검색을 묶어 한 번에 처리
+
+- 처리 중인 배치가 없으면(유휴 상태) 기다리지 않고 바로 보내므로 단일 요청 지연 시간은 늘지 않습니다.
+- 처리 중인 배치가 있으면(부하 상태) 첫 요청 도착 후 MICRO_BATCH_WAIT_MS 동안 또는 MICRO_BATCH_MAX_SIZE개가
+  찰 때까지 모아서 임베딩 요청 한 번, 행렬 검색 한 번으로 처리하고 결과를 각 요청에 돌려줍니다.
+- 동시에 처리하는 배치는 MICRO_BATCH_MAX_IN_FLIGHT개까지이며, 모두 처리 중이면 다음 배치는 슬롯이 빌 때까지 계속 모읍니다.
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+from config import MICRO_BATCH_MAX_SIZE, MICRO_BATCH_WAIT_MS, MICRO_BATCH_MAX_IN_FLIGHT, RETRIEVAL_TOP_K
+from tracing import record_cache
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MicroBatchStats:
+    """마이크로 배치 처리 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.queue_wait_seconds = 0.0
+        self.errors = 0
+    
+    def record(self, size: int, queue_wait: float, failed: bool):
+        """배치 하나의 처리 결과를 기록합니다."""
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.queue_wait_seconds += queue_wait
+            self.errors += int(failed)
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "mean_queue_wait_ms": self.queue_wait_seconds / self.items * 1000 if self.items else 0.0,
+                "errors": self.errors,
+            }
+
+class MicroBatcher:
+    """
+    동시 호출을 모아 일괄 처리 함수 한 번으로 처리하는 배처
+    
+    배치는 어느 요청의 추적에도 속하지 않는 빈 컨텍스트에서, 구성원 중 가장 높은 LLM 호출 우선순위로 실행되므로
+    batch 작업 뒤에 묶인 interactive 요청도 interactive로 스케줄링됩니다. 배치를 다른 요청과 함께 처리했는지는
+    각 요청의 컨텍스트에서 그 요청의 추적에 기록합니다 (캐시 이름은 배처 이름, 함께 처리했으면 적중).
+    일괄 처리 함수가 예외를 던지면 배치의 모든 요청에 같은 예외가 전달됩니다.
+    """
+    
+    def __init__(self, process: Callable[[List[Any]], List[Any]], max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+                 max_wait: float = MICRO_BATCH_WAIT_MS / 1000, max_in_flight: int = MICRO_BATCH_MAX_IN_FLIGHT,
+                 name: str = "micro-batch"):
+        """
+        Args:
+            process: 요청 목록을 받아 같은 순서의 결과 목록을 반환하는 일괄 처리 함수
+            max_batch_size: 배치 하나의 최대 요청 수
+            max_wait: 부하 상태에서 배치를 모으는 최대 시간 (초)
+            max_in_flight: 동시에 처리할 최대 배치 수
+            name: 스레드 이름 접두사
+        """
+        self.process = process
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.max_in_flight = max(1, max_in_flight)
+        self.name = name
+        self.stats = MicroBatchStats()
+        self._queue = []
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=name)
+        self._dispatcher = None
+    
+    def submit(self, item: Any) -> Any:
+        """
+        요청을 배치에 넣고 결과를 기다립니다.
+        
+        Args:
+            item: 일괄 처리 함수에 전달할 요청
+        
+        Returns:
+            Any: 이 요청의 결과
+        """
+        future = Future()
+        with self._condition:
+            self._queue.append((item, future, contextvars.copy_context(), time.monotonic()))
+            # fork한 워커에는 마스터의 스레드가 없으므로 살아 있는지 확인합니다
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name=f"{self.name}-dispatcher",
+                                                    daemon=True)
+                self._dispatcher.start()
+            self._condition.notify_all()
+        return future.result()
+    
+    def _dispatch_loop(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                
+                # 부하 상태에서만 창이 끝나거나 배치가 찰 때까지 더 모읍니다
+                if self._in_flight:
+                    deadline = self._queue[0][3] + self.max_wait
+                    while len(self._queue) < self.max_batch_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                
+                while self._in_flight >= self.max_in_flight:
+                    self._condition.wait()
+                
+                batch = self._queue[:self.max_batch_size]
+                del self._queue[:self.max_batch_size]
+                self._in_flight += 1
+            
+            self._executor.submit(self._process, batch)
+    
+    def _process(self, batch: List[tuple]):
+        from llm_scheduler import PRIORITIES, current_priority
+        
+        dispatched_at = time.monotonic()
+        results, error = None, None
+        try:
+            items = [item for item, _, _, _ in batch]
+            priority = min((context.run(current_priority) for _, _, context, _ in batch), key=PRIORITIES.get)
+            results = contextvars.Context().run(self._run_batch, items, priority)
+            if len(results) != len(items):
+                raise RuntimeError(f"일괄 처리 결과 수({len(results)})가 요청 수({len(items)})와 다릅니다")
+        except BaseException as e:
+            logger.warning(f"{self.name} 배치 처리 실패 ({len(batch)}건): {str(e)}")
+            error = e
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+            self.stats.record(len(batch), sum(dispatched_at - queued_at for _, _, _, queued_at in batch),
+                              error is not None)
+        
+        # 결과를 돌려주기 전에 각 요청의 추적에 배치 공유 여부를 기록합니다
+        for index, (_, future, context, _) in enumerate(batch):
+            context.run(record_cache, self.name, len(batch) > 1)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[index])
+    
+    def _run_batch(self, items: List[Any], priority: str) -> List[Any]:
+        from llm_scheduler import llm_priority
+        
+        with llm_priority(priority):
+            return self.process(items)
+
+class BatchingSearcher:
+    """
+    데이터 파이프라인의 질의 임베딩과 벡터 검색을 마이크로 배치로 묶는 검색 계층
+    
+    DataPipeline과 같은 embed_query/search_by_vector 인터페이스를 제공합니다. 질의 임베딩은
+    embed_documents 요청 한 번으로, 검색은 search_by_vectors 한 번(질의마다 k가 다르면 가장 큰 k)으로 처리합니다.
+    """
+    
+    def __init__(self, pipeline, max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+                 max_wait: float = MICRO_BATCH_WAIT_MS / 1000, max_in_flight: int = MICRO_BATCH_MAX_IN_FLIGHT):
+        """
+        Args:
+            pipeline: 임베딩과 색인을 가진 데이터 파이프라인
+            max_batch_size: 배치 하나의 최대 질의 수
+            max_wait: 부하 상태에서 배치를 모으는 최대 시간 (초)
+            max_in_flight: 임베딩/검색별로 동시에 처리할 최대 배치 수
+        """
+        self.pipeline = pipeline
+        self.embedder = MicroBatcher(self._embed_batch, max_batch_size, max_wait, max_in_flight, "embed-batch")
+        self.searcher = MicroBatcher(self._search_batch, max_batch_size, max_wait, max_in_flight, "search-batch")
+    
+    def embed_query(self, query: str) -> List[float]:
+        """질의 임베딩을 계산합니다 (동시 질의와 함께 한 요청으로 전송)."""
+        return self.embedder.submit(query)
+    
+    def search_by_vector(self, query_vector: List[float],
+                         k: int = RETRIEVAL_TOP_K) -> List[Tuple[Any, Optional[float]]]:
+        """질의 임베딩으로 색인을 검색합니다 (동시 질의와 함께 한 번에 검색)."""
+        return self.searcher.submit((query_vector, k))
+    
+    def _embed_batch(self, queries: List[str]) -> List[List[float]]:
+        # OpenAI 임베딩은 질의와 문서를 같은 방식으로 임베딩하므로 embed_documents 한 번으로 묶습니다
+        if len(queries) == 1:
+            return [self.pipeline.embeddings.embed_query(queries[0])]
+        return self.pipeline.embeddings.embed_documents(queries)
+    
+    def _search_batch(self, requests: List[Tuple[List[float], int]]) -> List[list]:
+        k = max(request_k for _, request_k in requests)
+        results = self.pipeline.search_by_vectors([vector for vector, _ in requests], k)
+        return [result[:request_k] for result, (_, request_k) in zip(results, requests)]
+    
+    def snapshot(self) -> dict:
+        """임베딩/검색 배치 통계를 반환합니다."""
+        return {"embed": self.embedder.stats.snapshot(), "search": self.searcher.stats.snapshot()}
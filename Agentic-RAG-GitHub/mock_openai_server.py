@@ -0,0 +1,476 @@
+"""
+OpenAI 호환 모의 서버: 네트워크 없이 HTTP 계층까지 포함한 부하 테스트를 위한 로컬 서버
+
+ChatOpenAI와 OpenAIEmbeddings가 사용하는 엔드포인트를 구현합니다.
+- POST /v1/chat/completions: 일반/스트리밍 응답, 도구 호출, 구조화 출력(함수 호출, json_schema)
+- POST /v1/embeddings: 문자열/토큰 배열 입력, float/base64 인코딩
+- GET  /v1/models, /health, /stats
+
+지연 시간, 429 속도 제한, 타임아웃(응답 지연)을 설정한 비율로 주입할 수 있습니다.
+"""
+import argparse
+import base64
+import itertools
+import json
+import logging
+import random
+import struct
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 프로젝트 루트를 Python 경로에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from fakes import FakeEmbeddings, LatencyDistribution, split_stream_tokens
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MockServerConfig:
+    """모의 서버의 응답과 장애 주입 설정"""
+    
+    def __init__(self, latency: LatencyDistribution = None, tokens_per_second: float = 200.0,
+                 embedding_latency: LatencyDistribution = None, rate_limit_rate: float = 0.0,
+                 retry_after: float = 0.1, timeout_rate: float = 0.0, timeout_seconds: float = 30.0,
+                 responses: List[str] = None, structured_outputs: Dict[str, List[Any]] = None,
+                 seed: int = None):
+        """
+        Args:
+            latency: 채팅 응답의 첫 토큰 지연 시간 분포
+            tokens_per_second: 토큰 생성 속도
+            embedding_latency: 임베딩 요청 지연 시간 분포
+            rate_limit_rate: 429 응답을 반환할 요청 비율 (0.0 ~ 1.0)
+            retry_after: 429 응답의 Retry-After (초)
+            timeout_rate: 응답 없이 timeout_seconds 동안 대기할 요청 비율
+            timeout_seconds: 타임아웃 주입 시 대기 시간 (클라이언트 타임아웃보다 길게 설정)
+            responses: 순서대로 반복할 답변 목록
+            structured_outputs: 구조화 출력 필드 이름별로 순서대로 반복할 값
+            seed: 장애 주입 난수 시드
+        """
+        self.latency = latency or LatencyDistribution("fixed", 0.05, seed=seed)
+        self.tokens_per_second = tokens_per_second
+        self.embedding_latency = embedding_latency or LatencyDistribution("fixed", 0.0)
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.responses = responses or ["제공된 문맥에 따르면 금융 시장은 금리와 투자 심리의 영향을 받습니다."]
+        self.structured_outputs = structured_outputs or {"binary_score": ["yes"], "score": [7]}
+        self._random = random.Random(seed)
+        self._cycles = {}
+        self._lock = threading.Lock()
+    
+    def next_value(self, key: str, values: List[Any]) -> Any:
+        """키별로 스크립트 값을 순서대로 반복해 반환합니다."""
+        with self._lock:
+            if key not in self._cycles:
+                self._cycles[key] = itertools.cycle(values)
+            return next(self._cycles[key])
+    
+    def draw_fault(self) -> str:
+        """이번 요청에 주입할 장애를 결정합니다. ("rate_limit", "timeout" 또는 "")"""
+        with self._lock:
+            value = self._random.random()
+        if value < self.rate_limit_rate:
+            return "rate_limit"
+        if value < self.rate_limit_rate + self.timeout_rate:
+            return "timeout"
+        return ""
+
+class MockServerStats:
+    """모의 서버의 요청, 연결, 동시성, 주입된 장애 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.connections = 0
+        self.active = 0
+        self.peak_active = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+    
+    def record_connection(self):
+        """새 TCP 연결을 기록합니다. (요청 수 대비 연결 수로 커넥션 풀 재사용을 확인)"""
+        with self._lock:
+            self.connections += 1
+    
+    def request_started(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+    
+    def request_finished(self):
+        with self._lock:
+            self.active -= 1
+    
+    def record_fault(self, fault: str):
+        with self._lock:
+            if fault == "rate_limit":
+                self.rate_limited += 1
+            elif fault == "timeout":
+                self.timeouts += 1
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            total = sum(self.requests.values())
+            return {
+                "requests": dict(self.requests),
+                "total_requests": total,
+                "connections": self.connections,
+                "requests_per_connection": total / self.connections if self.connections else 0.0,
+                "active": self.active,
+                "peak_concurrency": self.peak_active,
+                "rate_limited": self.rate_limited,
+                "timeouts": self.timeouts,
+            }
+
+def _fill_schema(config: MockServerConfig, schema: dict, user_text: str = "") -> dict:
+    """
+    JSON 스키마의 속성을 스크립트 값으로 채웁니다.
+    
+    structured_outputs에 정의된 필드는 그 값을, 나머지는 enum의 첫 값이나 타입별 기본값을 사용하며
+    첫 번째 문자열 속성에는 사용자 질문을 넣습니다. (검색 도구의 query 인자)
+    """
+    values = {}
+    text_used = False
+    
+    for name, prop in (schema.get("properties") or {}).items():
+        scripted = config.structured_outputs.get(name)
+        if scripted:
+            values[name] = config.next_value(name, scripted)
+        elif prop.get("enum"):
+            values[name] = prop["enum"][0]
+        elif prop.get("type") in ("integer", "number"):
+            values[name] = 0
+        elif prop.get("type") == "boolean":
+            values[name] = True
+        elif not text_used:
+            values[name] = user_text
+            text_used = True
+        else:
+            values[name] = ""
+    return values
+
+def _message_text(message: dict) -> str:
+    """메시지 content(문자열 또는 파트 목록)를 문자열로 변환합니다."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+def build_chat_message(config: MockServerConfig, body: dict) -> dict:
+    """
+    채팅 요청에 대한 assistant 메시지를 만듭니다.
+    
+    - tool_choice로 함수가 지정되면(구조화 출력) 스키마를 채운 도구 호출을 반환합니다.
+    - 도구가 있고 마지막 메시지가 사용자 메시지면 첫 번째 도구를 호출합니다.
+    - response_format이 json_schema면 스키마를 채운 JSON을 content로 반환합니다.
+    - 그 밖에는 스크립트 답변을 반환합니다.
+    """
+    messages = body.get("messages") or [{}]
+    last = messages[-1]
+    user_text = _message_text(last) if last.get("role") == "user" else ""
+    tools = {tool["function"]["name"]: tool["function"] for tool in body.get("tools") or []}
+    tool_choice = body.get("tool_choice")
+    
+    function = None
+    if isinstance(tool_choice, dict) and tool_choice.get("function", {}).get("name") in tools:
+        function = tools[tool_choice["function"]["name"]]
+    elif tools and user_text and tool_choice != "none":
+        function = next(iter(tools.values()))
+    
+    if function is not None:
+        arguments = _fill_schema(config, function.get("parameters") or {}, user_text)
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(arguments, ensure_ascii=False)},
+            }],
+        }
+    
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format.get("json_schema", {}).get("schema") or {}
+        return {"role": "assistant", "content": json.dumps(_fill_schema(config, schema, user_text), ensure_ascii=False)}
+    
+    return {"role": "assistant", "content": config.next_value("responses", config.responses)}
+
+def _usage(body: dict, message: dict) -> dict:
+    prompt_tokens = sum(len(split_stream_tokens(_message_text(m))) for m in body.get("messages") or [])
+    completion_text = message.get("content") or json.dumps(message.get("tool_calls") or "")
+    completion_tokens = len(split_stream_tokens(completion_text))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+def _encode_embedding(vector: List[float], encoding_format: str):
+    """임베딩을 요청된 형식(float 목록 또는 float32 base64)으로 인코딩합니다."""
+    if encoding_format == "base64":
+        return base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+    return vector
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """OpenAI 호환 엔드포인트 요청 처리기"""
+    
+    # 연결 재사용(keep-alive)을 지원해야 클라이언트 커넥션 풀 동작을 측정할 수 있습니다
+    protocol_version = "HTTP/1.1"
+    
+    def setup(self):
+        super().setup()
+        self.server.stats.record_connection()
+    
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+    
+    @property
+    def config(self) -> MockServerConfig:
+        return self.server.config
+    
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _send_chunk(self, data: bytes):
+        """chunked 전송 인코딩으로 청크 하나를 보냅니다."""
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+    
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+    
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/v1/health"):
+            self._send_json(200, {"status": "ok"})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats.snapshot())
+        elif self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}", "type": "invalid_request_error"}})
+    
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        stats = self.server.stats
+        stats.request_started(path)
+        
+        try:
+            body = self._read_body()
+            
+            fault = self.config.draw_fault()
+            if fault:
+                stats.record_fault(fault)
+            
+            if fault == "rate_limit":
+                self._send_json(429, {
+                    "error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}
+                }, headers={
+                    "Retry-After": f"{self.config.retry_after:g}",
+                    "retry-after-ms": str(int(self.config.retry_after * 1000)),
+                })
+            elif fault == "timeout":
+                # 클라이언트가 먼저 타임아웃되도록 응답하지 않고 대기합니다
+                time.sleep(self.config.timeout_seconds)
+                self._send_json(504, {"error": {"message": "Gateway timeout (mock)", "type": "timeout"}})
+            elif path.endswith("/chat/completions"):
+                self._handle_chat(body)
+            elif path.endswith("/embeddings"):
+                self._handle_embeddings(body)
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path: {self.path}", "type": "invalid_request_error"}})
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 타임아웃 등으로 연결을 먼저 끊은 경우
+            self.close_connection = True
+        except ValueError as e:
+            self._send_json(400, {"error": {"message": str(e), "type": "invalid_request_error"}})
+        finally:
+            stats.request_finished()
+    
+    def _handle_chat(self, body: dict):
+        message = build_chat_message(self.config, body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", "mock-model")
+        created = int(time.time())
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+        usage = _usage(body, message)
+        
+        if not body.get("stream"):
+            tokens = split_stream_tokens(message.get("content") or "")
+            time.sleep(self.config.latency.sample() + len(tokens) / self.config.tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+            return
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        
+        def _event(delta: dict, finish: str = None, extra: dict = None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                **(extra or {}),
+            }
+            self._send_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        
+        time.sleep(self.config.latency.sample())
+        _event({"role": "assistant", "content": ""})
+        
+        if message.get("tool_calls"):
+            _event({"tool_calls": [{**call, "index": i} for i, call in enumerate(message["tool_calls"])]})
+        else:
+            for token in split_stream_tokens(message["content"]):
+                time.sleep(1.0 / self.config.tokens_per_second)
+                _event({"content": token})
+        
+        _event({}, finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_chunk(f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+    
+    def _handle_embeddings(self, body: dict):
+        inputs = body.get("input")
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        if not isinstance(inputs, list):
+            raise ValueError("input must be a string or an array")
+        
+        # 토큰 배열 입력(tiktoken으로 길이를 확인하는 OpenAIEmbeddings 기본 동작)도 결정적으로 임베딩합니다
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+        embedder = FakeEmbeddings(size=int(body.get("dimensions") or 1536))
+        time.sleep(self.config.embedding_latency.sample())
+        
+        encoding_format = body.get("encoding_format", "float")
+        self._send_json(200, {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": _encode_embedding(embedder._embed(text), encoding_format)}
+                for i, text in enumerate(texts)
+            ],
+            "model": body.get("model", "mock-embedding"),
+            "usage": {
+                "prompt_tokens": sum(len(split_stream_tokens(text)) for text in texts),
+                "total_tokens": sum(len(split_stream_tokens(text)) for text in texts),
+            },
+        })
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """백그라운드 스레드에서 실행할 수 있는 OpenAI 호환 모의 서버"""
+    
+    daemon_threads = True
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: MockServerConfig = None):
+        """
+        Args:
+            host: 바인딩할 주소
+            port: 바인딩할 포트 (0이면 빈 포트 자동 선택)
+            config: 응답 및 장애 주입 설정
+        """
+        super().__init__((host, port), MockOpenAIHandler)
+        self.config = config or MockServerConfig()
+        self.stats = MockServerStats()
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        """OPENAI_BASE_URL에 설정할 주소"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self) -> 'MockOpenAIServer':
+        """백그라운드 스레드에서 서버를 시작합니다."""
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        logger.info(f"OpenAI 모의 서버 시작: {self.base_url}")
+        return self
+    
+    def stop(self):
+        """서버를 종료합니다."""
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+    
+    def __enter__(self) -> 'MockOpenAIServer':
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="OpenAI 호환 모의 서버")
+    parser.add_argument("--host", default="127.0.0.1", help="바인딩할 주소")
+    parser.add_argument("--port", type=int, default=8001, help="바인딩할 포트")
+    parser.add_argument("--latency", default="lognormal:0.2:0.3", help="첫 토큰 지연 분포 (종류:평균[:퍼짐])")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="토큰 생성 속도")
+    parser.add_argument("--embedding-latency", default="0.02", help="임베딩 요청 지연 분포")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="429 응답의 Retry-After (초)")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="응답을 지연시켜 타임아웃을 유발할 비율")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="타임아웃 주입 시 대기 시간")
+    parser.add_argument("--grades", default="yes", help="문서 평가 결과 순서 (예: yes,no)")
+    parser.add_argument("--scores", default="7", help="문서별 관련성 점수 순서 (예: 8,3,6)")
+    parser.add_argument("--seed", type=int, default=None, help="난수 시드")
+    args = parser.parse_args()
+    
+    config = MockServerConfig(
+        latency=LatencyDistribution.parse(args.latency, seed=args.seed),
+        tokens_per_second=args.tokens_per_second,
+        embedding_latency=LatencyDistribution.parse(args.embedding_latency, seed=args.seed),
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        structured_outputs={
+            "binary_score": args.grades.split(","),
+            "score": [int(score) for score in args.scores.split(",")],
+        },
+        seed=args.seed,
+    )
+    
+    server = MockOpenAIServer(args.host, args.port, config)
+    print(f"OpenAI 모의 서버: {server.base_url}")
+    print(f"사용법: OPENAI_BASE_URL={server.base_url} python main.py")
+    print(f"통계: http://{args.host}:{server.server_address[1]}/stats")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n모의 서버를 종료합니다.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+다중 질의 검색: 질의 변형을 병렬로 검색하고 Reciprocal Rank Fusion으로 병합
+"""
+import hashlib
+import logging
+import re
+from typing import List, Optional
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from components import create_chat_model
+from config import (
+    OPENAI_MODEL, MULTI_QUERY_COUNT, MULTI_QUERY_STRATEGY,
+    MULTI_QUERY_MAX_WORKERS, RRF_K
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 질의 변형 검색을 병렬로 실행하기 위한 실행기
+_search_executor = ContextThreadPoolExecutor(
+    max_workers=MULTI_QUERY_MAX_WORKERS,
+    thread_name_prefix="multi-query-search"
+)
+
+# 어휘 확장에 사용하는 금융 용어 동의어
+FINANCE_SYNONYMS = {
+    "주식": ["증시", "주가"],
+    "투자": ["자산 운용", "재테크"],
+    "시장": ["증시", "마켓"],
+    "동향": ["트렌드", "전망"],
+    "금리": ["기준금리", "이자율"],
+    "포트폴리오": ["자산 배분"],
+    "암호화폐": ["가상자산", "비트코인"],
+    "부동산": ["주택 시장"],
+    "분석": ["평가", "전망"],
+    "리스크": ["위험 관리"],
+}
+
+# 검색에 의미가 없는 불용어와 단어 끝에서 제거할 조사
+_STOPWORDS = {"무엇", "뭐", "어떤", "어떻게", "알려줘", "대해", "대한"}
+_PARTICLES = ("은", "는", "이", "가", "을", "를", "의", "야", "에")
+
+def extract_keywords(question: str) -> List[str]:
+    """질문에서 문장 부호, 조사, 불용어를 제거한 키워드를 추출합니다."""
+    keywords = []
+    for word in re.sub(r"[?？!.,]", " ", question).split():
+        if len(word) > 2 and word.endswith(_PARTICLES):
+            word = word[:-1]
+        if word not in _STOPWORDS:
+            keywords.append(word)
+    return keywords
+
+def generate_lexical_variants(question: str, num_queries: int = MULTI_QUERY_COUNT) -> List[str]:
+    """
+    LLM 호출 없이 어휘 확장으로 질의 변형을 생성합니다.
+    
+    Args:
+        question: 원본 질문
+        num_queries: 생성할 질의 수 (원본 포함)
+    
+    Returns:
+        List[str]: 원본 질문을 첫 번째로 포함하는 질의 변형 목록
+    """
+    keywords = " ".join(extract_keywords(question))
+    variants = [question, keywords]
+    
+    # 질문에 포함된 금융 용어를 동의어로 치환 (용어별 첫 번째 동의어부터 순서대로)
+    matched_terms = [term for term in FINANCE_SYNONYMS if term in keywords]
+    for depth in range(max((len(FINANCE_SYNONYMS[term]) for term in matched_terms), default=0)):
+        for term in matched_terms:
+            synonyms = FINANCE_SYNONYMS[term]
+            if depth < len(synonyms) and synonyms[depth] not in keywords:
+                variants.append(keywords.replace(term, synonyms[depth]))
+    
+    # 중복 제거 (순서 유지)
+    unique_variants = []
+    for variant in variants:
+        if variant and variant not in unique_variants:
+            unique_variants.append(variant)
+    
+    return unique_variants[:num_queries]
+
+def generate_llm_variants(question: str, num_queries: int = MULTI_QUERY_COUNT) -> List[str]:
+    """
+    한 번의 LLM 호출로 질의 변형을 생성합니다.
+    
+    Args:
+        question: 원본 질문
+        num_queries: 생성할 질의 수 (원본 포함)
+    
+    Returns:
+        List[str]: 원본 질문을 첫 번째로 포함하는 질의 변형 목록
+    """
+    msg = [
+        HumanMessage(
+            content=f"""다음 질문에 대한 검색 질의를 {num_queries - 1}개 만들어주세요.
+            각 질의는 서로 다른 표현과 키워드를 사용하고, 한 줄에 하나씩 번호 없이 작성하세요.
+            
+            질문: {question}
+            
+            검색 질의:"""
+        )
+    ]
+    
+    model = create_chat_model(temperature=0, model=OPENAI_MODEL)
+    response = model.invoke(msg)
+    
+    variants = [question]
+    for line in response.content.splitlines():
+        line = re.sub(r"^\s*(\d+[.)]|[-•*])\s*", "", line).strip()
+        if line and line not in variants:
+            variants.append(line)
+    
+    return variants[:num_queries]
+
+def chunk_id(document: Document) -> str:
+    """
+    문서 청크의 식별자를 반환합니다.
+    
+    벡터 스토어가 부여한 ID가 없으면 출처와 내용의 해시를 사용합니다.
+    
+    Args:
+        document: 문서 청크
+    
+    Returns:
+        str: 청크 ID
+    """
+    doc_id = getattr(document, "id", None) or document.metadata.get("id")
+    if doc_id:
+        return str(doc_id)
+    
+    source = str(document.metadata.get("source", ""))
+    digest = hashlib.sha1(f"{source}\n{document.page_content}".encode("utf-8")).hexdigest()
+    return digest
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int = RRF_K) -> List[Document]:
+    """
+    여러 검색 결과를 Reciprocal Rank Fusion으로 병합하고 청크 ID로 중복을 제거합니다.
+    
+    Args:
+        result_lists: 질의별 검색 결과 목록 (각 목록은 순위 순서)
+        k: RRF 상수 (클수록 하위 순위의 영향이 커짐)
+    
+    Returns:
+        List[Document]: 융합 점수 순으로 정렬된 문서 목록
+    """
+    scores = {}
+    documents = {}
+    
+    for results in result_lists:
+        for rank, document in enumerate(results):
+            doc_id = chunk_id(document)
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+            documents.setdefault(doc_id, document)
+    
+    ranked_ids = sorted(scores, key=scores.get, reverse=True)
+    return [documents[doc_id] for doc_id in ranked_ids]
+
+class MultiQueryFusionRetriever(BaseRetriever):
+    """
+    질의 변형을 병렬로 검색하고 RRF로 병합하는 검색기
+    
+    top_k가 없으면 병합 결과를 변형별 검색 결과 수 중 가장 큰 값으로 자르므로, 적응형 검색 깊이를 쓰면
+    평가에 보내는 문서 수가 추적에 기록된 변형별 k 중 최댓값과 같습니다 (사용하지 않으면 RETRIEVAL_TOP_K).
+    """
+    
+    base_retriever: BaseRetriever
+    num_queries: int = MULTI_QUERY_COUNT
+    strategy: str = MULTI_QUERY_STRATEGY
+    top_k: Optional[int] = None
+    rrf_k: int = RRF_K
+    
+    def generate_queries(self, question: str) -> List[str]:
+        """설정된 전략에 따라 질의 변형을 생성합니다."""
+        if self.strategy == "llm":
+            try:
+                return generate_llm_variants(question, self.num_queries)
+            except Exception as e:
+                logger.warning(f"LLM 질의 변형 생성 실패, 어휘 확장으로 대체: {str(e)}")
+        
+        return generate_lexical_variants(question, self.num_queries)
+    
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        queries = self.generate_queries(query)
+        logger.info(f"다중 질의 검색: {queries}")
+        
+        # 모든 질의 변형을 동시에 검색 (하위 검색도 같은 실행 추적에 연결)
+        child_config = {"callbacks": run_manager.get_child()}
+        futures = [
+            _search_executor.submit(self.base_retriever.invoke, variant, child_config)
+            for variant in queries
+        ]
+        
+        result_lists = []
+        for variant, future in zip(queries, futures):
+            try:
+                result_lists.append(future.result())
+            except Exception as e:
+                logger.error(f"질의 '{variant}' 검색 실패: {str(e)}")
+        
+        fused = reciprocal_rank_fusion(result_lists, k=self.rrf_k)
+        top_k = self.top_k if self.top_k is not None else max((len(results) for results in result_lists), default=0)
+        return fused[:top_k]
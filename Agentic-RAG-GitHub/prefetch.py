@@ -0,0 +1,201 @@
+"""
+검색 프리페치: 에이전트 LLM 호출과 병렬로 원본 질문에 대한 검색을 미리 수행
+"""
+import logging
+import threading
+import time
+from typing import Hashable, List, Optional
+from config import PREFETCH_SIMILARITY_THRESHOLD, PREFETCH_MAX_WORKERS, PREFETCH_TIMEOUT
+from tracing import record_cache
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _bigrams(text: str) -> set:
+    """공백과 대소문자를 무시한 문자 바이그램 집합을 반환합니다."""
+    normalized = "".join(text.lower().split())
+    if len(normalized) < 2:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + 2] for i in range(len(normalized) - 1)}
+
+def query_similarity(a: str, b: str) -> float:
+    """
+    두 검색어의 유사도를 계산합니다.
+    
+    한국어 조사("rag가", "rag는")에 강하도록 문자 바이그램 Dice 계수를 사용합니다.
+    
+    Args:
+        a: 첫 번째 검색어
+        b: 두 번째 검색어
+    
+    Returns:
+        float: 0.0 ~ 1.0 사이의 유사도
+    """
+    grams_a = _bigrams(a)
+    grams_b = _bigrams(b)
+    
+    if not grams_a or not grams_b:
+        return 0.0
+    
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+class PrefetchStats:
+    """프리페치 적중률 및 절약된 지연 시간 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.latency_saved = 0.0
+    
+    def record_started(self):
+        """프리페치 시작을 기록합니다."""
+        with self._lock:
+            self.started += 1
+    
+    def record_hit(self, latency_saved: float):
+        """프리페치 적중과 절약된 시간을 기록합니다."""
+        with self._lock:
+            self.hits += 1
+            self.latency_saved += latency_saved
+    
+    def record_miss(self):
+        """프리페치 미적중을 기록합니다."""
+        with self._lock:
+            self.misses += 1
+    
+    def record_discarded(self):
+        """사용되지 않고 폐기된 프리페치를 기록합니다."""
+        with self._lock:
+            self.discarded += 1
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_ms": self.latency_saved * 1000,
+                "avg_latency_saved_ms": self.latency_saved * 1000 / self.hits if self.hits else 0.0,
+            }
+
+class _PrefetchEntry:
+    """진행 중인 프리페치 한 건"""
+    
+    def __init__(self):
+        self.question = None
+        self.future = None
+        self.duration = None
+
+class RetrievalPrefetcher:
+    """
+    원본 질문에 대한 검색을 백그라운드에서 미리 실행하는 클래스
+    
+    프리페치는 요청 키(요청 ID)별로 하나씩 관리하므로, 같은 질문을 동시에 처리하는 요청끼리
+    서로의 프리페치를 꺼내거나 취소하지 않습니다. 검색은 시작한 요청의 컨텍스트(LLM 우선순위, 추적)에서 실행됩니다.
+    """
+    
+    def __init__(self, retriever, similarity_threshold: float = PREFETCH_SIMILARITY_THRESHOLD,
+                 max_workers: int = PREFETCH_MAX_WORKERS, timeout: float = PREFETCH_TIMEOUT):
+        self.retriever = retriever
+        self.similarity_threshold = similarity_threshold
+        self.timeout = timeout
+        self.stats = PrefetchStats()
+        from langchain_core.runnables.config import ContextThreadPoolExecutor
+        
+        self._executor = ContextThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="retrieval-prefetch"
+        )
+        self._lock = threading.Lock()
+        self._pending = {}
+    
+    def _search(self, entry: _PrefetchEntry, question: str) -> List:
+        """검색을 실행하고 소요 시간을 기록합니다."""
+        started_at = time.perf_counter()
+        try:
+            return self.retriever.invoke(question)
+        finally:
+            entry.duration = time.perf_counter() - started_at
+    
+    def start(self, key: Hashable, question: str):
+        """
+        질문에 대한 검색을 백그라운드에서 시작합니다.
+        
+        Args:
+            key: 프리페치를 소유하는 요청 키 (요청 ID)
+            question: 사용자의 원본 질문
+        """
+        entry = _PrefetchEntry()
+        entry.question = question
+        entry.future = self._executor.submit(self._search, entry, question)
+        
+        with self._lock:
+            previous = self._pending.pop(key, None)
+            self._pending[key] = entry
+        if previous is not None:
+            previous.future.cancel()
+            self.stats.record_discarded()
+        
+        self.stats.record_started()
+        logger.info(f"검색 프리페치 시작 (요청 ID: {key}): {question}")
+    
+    def _pop(self, key: Hashable) -> Optional[_PrefetchEntry]:
+        """요청의 프리페치를 꺼냅니다."""
+        with self._lock:
+            return self._pending.pop(key, None)
+    
+    def take(self, key: Hashable, query: str) -> Optional[List]:
+        """
+        도구 호출 검색어가 원본 질문과 충분히 유사하면 요청의 프리페치 결과를 반환합니다.
+        
+        Args:
+            key: 프리페치를 시작한 요청 키 (요청 ID)
+            query: 에이전트가 생성한 도구 호출 검색어
+        
+        Returns:
+            Optional[List]: 프리페치된 문서 목록 (사용할 수 없으면 None)
+        """
+        entry = self._pop(key)
+        if entry is None:
+            return None
+        question = entry.question
+        
+        similarity = query_similarity(question, query)
+        if similarity < self.similarity_threshold:
+            entry.future.cancel()
+            self.stats.record_miss()
+            record_cache("prefetch", False)
+            logger.info(f"프리페치 미적중 (유사도 {similarity:.2f}): {query}")
+            return None
+        
+        waited_from = time.perf_counter()
+        try:
+            documents = entry.future.result(timeout=self.timeout)
+        except Exception as e:
+            self.stats.record_miss()
+            record_cache("prefetch", False)
+            logger.warning(f"프리페치 결과를 사용할 수 없습니다: {str(e)}")
+            return None
+        waited = time.perf_counter() - waited_from
+        
+        # 에이전트 호출과 겹쳐서 숨겨진 검색 시간만큼 절약됩니다
+        latency_saved = max(0.0, (entry.duration or 0.0) - waited)
+        self.stats.record_hit(latency_saved)
+        record_cache("prefetch", True)
+        logger.info(f"프리페치 적중 (유사도 {similarity:.2f}, 절약 {latency_saved * 1000:.1f}ms)")
+        return documents
+    
+    def discard(self, key: Hashable):
+        """요청이 사용하지 않은 프리페치를 정리합니다 (다른 요청의 프리페치는 건드리지 않음)."""
+        entry = self._pop(key)
+        if entry is not None:
+            entry.future.cancel()
+            self.stats.record_discarded()
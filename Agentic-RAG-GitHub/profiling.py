@@ -0,0 +1,350 @@
+"""
+요청 프로파일링: 느린 요청의 CPU 사용 지점과 메모리 할당을 프로파일 파일로 저장
+"""
+import argparse
+import cProfile
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+from config import PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_MODE, PROFILE_SLOW_MS, PROFILE_SAMPLE_INTERVAL
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 프로파일 파일에 저장하는 함수/할당 위치 수
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 20
+
+# tracemalloc은 프로세스 전역이므로 동시에 프로파일링하는 요청 수를 세어 시작/종료합니다
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+def _function_label(filename: str, line: int, name: str) -> str:
+    """함수 이름과 위치(상위 디렉터리/파일:줄)를 반환합니다."""
+    if not line:
+        return name
+    path = Path(filename)
+    return f"{name} ({path.parent.name}/{path.name}:{line})"
+
+class SamplingProfiler:
+    """
+    모든 스레드의 호출 스택을 일정 간격으로 기록하는 샘플링 프로파일러
+    
+    cProfile은 시작한 스레드만 측정하므로 다중 질의 검색, 프리페치처럼
+    실행기 스레드에서 도는 작업까지 보려면 샘플링 방식을 사용합니다.
+    같은 프로세스의 다른 요청도 함께 기록될 수 있습니다.
+    """
+    
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self._self_counts = defaultdict(int)
+        self._total_counts = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self._record(frame)
+            self.samples += 1
+    
+    def _record(self, frame):
+        seen = set()
+        leaf = True
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+            if leaf:
+                self._self_counts[key] += 1
+                leaf = False
+            if key not in seen:
+                self._total_counts[key] += 1
+                seen.add(key)
+            frame = frame.f_back
+    
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> List[dict]:
+        """자체 샘플 수가 많은 순으로 함수 목록을 반환합니다."""
+        rows = []
+        for key, total in self._total_counts.items():
+            self_count = self._self_counts.get(key, 0)
+            rows.append({
+                "function": _function_label(*key),
+                "self_s": round(self_count * self.interval, 4),
+                "total_s": round(total * self.interval, 4),
+                "samples": self_count,
+            })
+        rows.sort(key=lambda row: (row["self_s"], row["total_s"]), reverse=True)
+        return rows[:limit]
+
+def _cprofile_top_functions(profile: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> List[dict]:
+    """cProfile 결과를 자체 실행 시간 순 함수 목록으로 변환합니다."""
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in pstats.Stats(profile).stats.items():
+        rows.append({
+            "function": _function_label(filename, line, name),
+            "self_s": round(tottime, 4),
+            "total_s": round(cumtime, 4),
+            "calls": calls,
+        })
+    rows.sort(key=lambda row: (row["self_s"], row["total_s"]), reverse=True)
+    return rows[:limit]
+
+def _allocation_diff(before, after, limit: int = TOP_ALLOCATIONS) -> List[dict]:
+    """두 tracemalloc 스냅샷 사이에 늘어난 할당을 위치별로 반환합니다."""
+    rows = []
+    for stat in after.compare_to(before, "lineno")[:limit]:
+        frame = stat.traceback[0]
+        rows.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff,
+        })
+    return rows
+
+class ProfileRing:
+    """디렉터리에 최근 프로파일 파일을 최대 개수만큼만 보관하는 저장소"""
+    
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = Path(directory)
+        self.max_files = max(1, max_files)
+        self._lock = threading.Lock()
+    
+    def files(self) -> List[Path]:
+        """저장된 프로파일 파일을 오래된 순으로 반환합니다."""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("profile-*.json"))
+    
+    def write(self, record: dict) -> Path:
+        """
+        프로파일을 저장하고 오래된 파일을 정리합니다.
+        
+        Args:
+            record: 프로파일 내용
+        
+        Returns:
+            Path: 저장한 파일 경로
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"profile-{time.time_ns()}-{record['request_id'][:16]}.json"
+        path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        
+        with self._lock:
+            for old in self.files()[:-self.max_files]:
+                old.unlink(missing_ok=True)
+        return path
+
+class RequestProfiler:
+    """
+    요청 한 건을 프로파일링하는 컨텍스트 관리자
+    
+    요청별로 켜면(enabled) PROFILE_MODE 방식의 프로파일과 tracemalloc 할당 통계를 항상 저장하고,
+    PROFILE_SLOW_MS가 설정되면 모든 요청을 가벼운 샘플링 방식으로 측정해 느린 요청만 저장합니다.
+    """
+    
+    def __init__(self, request_id: str, enabled: bool = False, mode: str = PROFILE_MODE,
+                 slow_ms: float = PROFILE_SLOW_MS, ring: ProfileRing = None, **attributes):
+        """
+        Args:
+            request_id: 요청 ID (파일 이름과 내용에 기록)
+            enabled: 이 요청을 프로파일링할지 여부
+            mode: 요청별로 켰을 때의 방식 ("cprofile" 또는 "sampling")
+            slow_ms: 자동 저장 기준 시간 (0이면 사용 안 함)
+            ring: 프로파일 저장소
+            attributes: 프로파일에 함께 기록할 값 (프로필 이름 등)
+        """
+        self.request_id = request_id
+        self.enabled = enabled
+        self.mode = mode if enabled else "sampling"
+        self.slow_ms = slow_ms
+        self.ring = ring
+        self.attributes = attributes
+        self.path = None
+        self.active = enabled or slow_ms > 0
+        self._profiler = None
+        self._snapshot = None
+        self._started_at = None
+    
+    def __enter__(self) -> 'RequestProfiler':
+        if not self.active:
+            return self
+        
+        if self.enabled:
+            _acquire_tracemalloc()
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+        
+        self._started_at = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if not self.active:
+            return False
+        
+        duration_ms = (time.perf_counter() - self._started_at) * 1000
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        
+        allocations, peak_kb = [], None
+        if self.enabled:
+            try:
+                allocations = _allocation_diff(self._snapshot, tracemalloc.take_snapshot())
+                peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            finally:
+                _release_tracemalloc()
+        
+        trigger = "request" if self.enabled else "slow"
+        if self.enabled or duration_ms >= self.slow_ms:
+            record = {
+                "request_id": self.request_id,
+                "created_at": datetime.now().isoformat(),
+                "trigger": trigger,
+                "mode": self.mode,
+                "duration_ms": round(duration_ms, 2),
+                "error": repr(exc) if exc else None,
+                **self.attributes,
+                "functions": (_cprofile_top_functions(self._profiler) if self.mode == "cprofile"
+                              else self._profiler.top_functions()),
+                "allocations": allocations,
+                "peak_memory_kb": peak_kb,
+            }
+            try:
+                self.path = str((self.ring or ProfileRing()).write(record))
+                logger.info(f"프로파일 저장 ({trigger}, {duration_ms:.0f}ms): {self.path}")
+            except OSError as e:
+                logger.warning(f"프로파일 저장 실패: {str(e)}")
+        return False
+
+def load_profiles(paths: List[Path]) -> List[dict]:
+    """프로파일 파일을 읽습니다 (손상된 파일은 건너뜀)."""
+    profiles = []
+    for path in paths:
+        try:
+            profile = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"프로파일 읽기 실패 ({path}): {str(e)}")
+            continue
+        profile["file"] = Path(path).name
+        profiles.append(profile)
+    return profiles
+
+def summarize_profiles(profiles: List[dict], top: int = 15) -> Dict[str, List[dict]]:
+    """
+    여러 프로파일의 핫스팟을 함수와 할당 위치별로 합산합니다.
+    
+    Args:
+        profiles: 프로파일 목록
+        top: 반환할 항목 수
+    
+    Returns:
+        dict: functions(자체 실행 시간 순), allocations(할당 크기 순)
+    """
+    functions = defaultdict(lambda: {"self_s": 0.0, "total_s": 0.0, "profiles": 0})
+    allocations = defaultdict(lambda: {"size_kb": 0.0, "count": 0, "profiles": 0})
+    
+    for profile in profiles:
+        for row in profile.get("functions", []):
+            entry = functions[row["function"]]
+            entry["self_s"] += row["self_s"]
+            entry["total_s"] += row["total_s"]
+            entry["profiles"] += 1
+        for row in profile.get("allocations", []):
+            entry = allocations[row["location"]]
+            entry["size_kb"] += row["size_kb"]
+            entry["count"] += row["count"]
+            entry["profiles"] += 1
+    
+    function_rows = sorted(
+        ({"function": name, **{k: round(v, 4) if isinstance(v, float) else v for k, v in values.items()}}
+         for name, values in functions.items()),
+        key=lambda row: row["self_s"], reverse=True,
+    )
+    allocation_rows = sorted(
+        ({"location": location, **{k: round(v, 1) if isinstance(v, float) else v for k, v in values.items()}}
+         for location, values in allocations.items()),
+        key=lambda row: row["size_kb"], reverse=True,
+    )
+    return {"functions": function_rows[:top], "allocations": allocation_rows[:top]}
+
+def main():
+    """저장된 프로파일 목록과 핫스팟 요약을 출력합니다."""
+    from benchmark import format_table
+    
+    parser = argparse.ArgumentParser(description="저장된 요청 프로파일 요약")
+    parser.add_argument("command", choices=["list", "summary"], help="list: 파일 목록, summary: 핫스팟 요약")
+    parser.add_argument("files", nargs="*", help="요약할 프로파일 파일 (없으면 디렉터리 전체)")
+    parser.add_argument("--dir", default=PROFILE_DIR, help="프로파일 디렉터리")
+    parser.add_argument("--top", type=int, default=15, help="출력할 항목 수")
+    args = parser.parse_args()
+    
+    paths = [Path(path) for path in args.files] or ProfileRing(args.dir).files()
+    profiles = load_profiles(paths)
+    if not profiles:
+        print(f"프로파일이 없습니다: {args.dir}")
+        return
+    
+    if args.command == "list":
+        print(format_table([
+            {"file": profile["file"], "request_id": profile["request_id"], "trigger": profile["trigger"],
+             "mode": profile["mode"], "duration_ms": profile["duration_ms"]}
+            for profile in profiles
+        ]))
+        return
+    
+    summary = summarize_profiles(profiles, args.top)
+    print(f"프로파일 {len(profiles)}개의 핫스팟 (자체 실행 시간 순)\n")
+    print(format_table(summary["functions"]))
+    if summary["allocations"]:
+        print("\n메모리 할당 (요청 중 증가량 순)\n")
+        print(format_table(summary["allocations"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+검색 캐시: 같은(또는 거의 같은) 질의의 임베딩 호출과 벡터 검색을 건너뜀
+
+- 검색 결과는 (색인 버전, 정규화한 질의) 키로 상위 k개 청크 ID와 유사도만 저장하고, 청크 본문은 색인 문서를 참조합니다.
+- RETRIEVAL_CACHE_QUANTIZATION을 설정하면 질의 임베딩을 그 간격으로 양자화한 키로도 저장해,
+  텍스트는 다르지만 임베딩이 거의 같은 질의도 검색을 건너뜁니다.
+- 질의 임베딩도 같은 캐시에 저장하므로 결과가 적중하면 임베딩 호출과 검색을 모두 건너뛰고,
+  결과만 만료된 경우에도 임베딩 호출은 건너뜁니다.
+- 색인을 교체하거나 문서를 추가해 색인 버전이 바뀌면 검색 결과를 모두 버립니다 (임베딩은 색인과 무관하므로 유지).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Sequence, Tuple
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from adaptive_k import AdaptiveTopK
+from coalesce import normalize_question
+from multi_query import chunk_id
+from tracing import record_cache
+from config import RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL, RETRIEVAL_CACHE_QUANTIZATION, RETRIEVAL_TOP_K
+
+class RetrievalCache:
+    """
+    LRU와 TTL로 관리하는 스레드 안전 검색 결과/질의 임베딩 캐시
+    
+    결과는 검색한 k개까지 저장하므로 그보다 적은 k의 조회에도 앞부분을 잘라 응답합니다.
+    임베딩 호출과 검색은 잠금 밖에서 실행하며, 같은 질의가 동시에 처음 들어오면 각자 검색합니다.
+    """
+    
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL,
+                 quantization: float = RETRIEVAL_CACHE_QUANTIZATION):
+        """
+        Args:
+            max_entries: 보관할 최대 검색 결과 키 수 (양자화 키도 따로 셈, 질의 임베딩도 같은 수까지 보관)
+            ttl: 유효 시간 (초, 0이면 만료 없음)
+            quantization: 근사 중복 키를 만들 임베딩 양자화 간격 (정규화한 벡터 기준, 0이면 사용 안 함)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.quantization = quantization
+        self._results = OrderedDict()
+        self._embeddings = OrderedDict()
+        self._chunks = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def retrieve(self, version: Hashable, query: str, k: int, embed: Callable[[str], List[float]],
+                 search: Callable[[List[float], int], List[Tuple[Document, Optional[float]]]]
+                 ) -> List[Tuple[Document, Optional[float]]]:
+        """
+        캐시를 거쳐 질의의 상위 k개 문서를 반환합니다.
+        
+        Args:
+            version: 색인 버전 (이전 조회와 다르면 저장된 결과를 모두 버림)
+            query: 검색 질의
+            k: 반환할 문서 수
+            embed: 질의 임베딩 함수 (임베딩이 캐시에 없을 때만 호출)
+            search: (질의 벡터, k)로 (문서, 유사도) 목록을 반환하는 검색 함수 (결과가 캐시에 없을 때만 호출)
+        
+        Returns:
+            List[Tuple[Document, Optional[float]]]: 유사도 순서의 (색인 문서, 유사도) 목록
+        """
+        text_key = (version, normalize_question(query))
+        results = self._get_results(version, text_key, k)
+        if results is not None:
+            self._record("hit")
+            return results
+        
+        vector = self.embed(query, embed)
+        
+        keys = [text_key]
+        if self.quantization > 0:
+            vector_key = (version, self.quantize(vector))
+            results = self._get_results(version, vector_key, k)
+            if results is not None:
+                # 다음에는 텍스트 키로 바로 적중하도록 같은 결과를 연결해 둡니다
+                self._put_results(version, keys, results, k)
+                self._record("near_hit")
+                return results
+            keys.append(vector_key)
+        
+        results = search(vector, k)
+        self._put_results(version, keys, results, k)
+        self._record("miss")
+        return results
+    
+    def embed(self, query: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """
+        캐시를 거쳐 질의 임베딩을 반환합니다 (정규화한 질의가 같으면 임베딩 호출을 건너뜀).
+        
+        Args:
+            query: 질의
+            embed: 질의 임베딩 함수 (임베딩이 캐시에 없을 때만 호출)
+        """
+        text = normalize_question(query)
+        vector = self._get_embedding(text)
+        if vector is None:
+            vector = embed(query)
+            with self._lock:
+                self._put(self._embeddings, text, vector)
+        return vector
+    
+    def quantize(self, vector: Sequence[float]) -> bytes:
+        """정규화한 임베딩을 quantization 간격의 격자로 반올림한 키를 반환합니다."""
+        import numpy as np
+        
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array)) or 1.0
+        cells = np.round(array / norm / self.quantization).astype(np.int32)
+        return hashlib.blake2b(cells.tobytes(), digest_size=16).digest()
+    
+    def _get_embedding(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._lookup(self._embeddings, text)
+            if vector is None:
+                self.embedding_misses += 1
+            else:
+                self.embedding_hits += 1
+        record_cache("embedding", vector is not None)
+        return vector
+    
+    def _get_results(self, version: Hashable, key: tuple, k: int) -> Optional[List[Tuple[Document, Optional[float]]]]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._lookup(self._results, key)
+            # 더 적은 k로 검색한 결과는 (색인이 그보다 작지 않은 한) 요청한 k개를 채울 수 없습니다
+            if entry is None or (k > entry[1] and len(entry[0]) >= entry[1]):
+                return None
+            return [(self._chunks[doc_id], score) for doc_id, score in entry[0][:k]]
+    
+    def _put_results(self, version: Hashable, keys: Sequence[tuple], results: List[Tuple[Document, Optional[float]]],
+                     k: int):
+        hits = []
+        with self._lock:
+            self._check_version(version)
+            for document, score in results:
+                doc_id = chunk_id(document)
+                self._chunks[doc_id] = document
+                hits.append((doc_id, score))
+            for key in keys:
+                self._put(self._results, key, (hits, k))
+    
+    def _check_version(self, version: Hashable):
+        if version != self._version:
+            if self._version is not None:
+                self.invalidations += 1
+            self._version = version
+            self._results.clear()
+            self._chunks.clear()
+    
+    def _lookup(self, entries: OrderedDict, key: Hashable):
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl and time.monotonic() - entry[1] > self.ttl:
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[0]
+    
+    def _put(self, entries: OrderedDict, key: Hashable, value):
+        # 호출하는 쪽에서 잠금을 잡습니다
+        if self.max_entries <= 0:
+            return
+        entries[key] = (value, time.monotonic())
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+    
+    def _record(self, result: str):
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+            elif result == "near_hit":
+                self.near_hits += 1
+            else:
+                self.misses += 1
+        record_cache("retrieval", result != "miss")
+    
+    def clear(self):
+        """저장된 검색 결과와 임베딩을 모두 지웁니다."""
+        with self._lock:
+            self._results.clear()
+            self._embeddings.clear()
+            self._chunks.clear()
+    
+    def __len__(self) -> int:
+        return len(self._results)
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            embedding_lookups = self.embedding_hits + self.embedding_misses
+            return {
+                "entries": len(self._results),
+                "embeddings": len(self._embeddings),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+                "embedding_hit_rate": self.embedding_hits / embedding_lookups if embedding_lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+class CachedRetriever(BaseRetriever):
+    """
+    데이터 파이프라인의 현재 색인을 검색 캐시를 거쳐 검색하는 검색기
+    
+    매 검색마다 파이프라인의 색인 버전을 읽으므로 색인을 교체하거나 갱신하면 이전 결과를 쓰지 않습니다.
+    임베딩과 검색은 searcher(마이크로 배치 계층 등, 기본값: 파이프라인)로 실행하며, cache가 없으면 캐시 없이 검색합니다.
+    adaptive가 있으면 후보를 adaptive.candidates개 검색(캐시도 후보 전체를 저장)한 뒤 유사도 분포로 k를 고릅니다.
+    반환하는 문서는 색인 문서의 본문을 참조하고 metadata만 새로 만들며, 유사도가 있으면 metadata["score"]에 담습니다.
+    """
+    
+    pipeline: object
+    cache: Optional[RetrievalCache] = None
+    searcher: object = None
+    adaptive: Optional[AdaptiveTopK] = None
+    k: int = RETRIEVAL_TOP_K
+    
+    class Config:
+        arbitrary_types_allowed = True
+    
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        searcher = self.searcher or self.pipeline
+        k = self.adaptive.candidates if self.adaptive is not None else self.k
+        if self.cache is None:
+            results = searcher.search_by_vector(searcher.embed_query(query), k)
+        else:
+            results = self.cache.retrieve(
+                self.pipeline.index_version, query, k,
+                embed=searcher.embed_query,
+                search=searcher.search_by_vector,
+            )
+        if self.adaptive is not None:
+            results = self.adaptive.select(query, results)
+        return [
+            Document(page_content=document.page_content,
+                     metadata={**document.metadata, "score": score} if score is not None else dict(document.metadata),
+                     id=document.id)
+            for document, score in results
+        ]
@@ -0,0 +1,297 @@
+"""
+경량 라우터: 검색이 확실한 질문은 에이전트 LLM 호출 없이 바로 검색으로 보냄
+"""
+import json
+import logging
+import math
+import os
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple, Tuple
+from config import (
+    ROUTER, ROUTER_CONFIDENCE_THRESHOLD, ROUTER_DECISION_LOG,
+    ROUTER_MIN_TRAINING_SIZE, ROUTER_SHADOW_RATE
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 규칙 테이블: (키워드 목록, 키워드당 가중치)
+# 가중치 합이 신뢰도가 되며, 음수 가중치는 검색이 필요 없는 대화를 나타냅니다.
+DEFAULT_RULE_TABLE = [
+    (("금융", "주식", "투자", "증시", "주가", "금리", "환율", "채권", "펀드", "ETF", "배당",
+      "코스피", "코스닥", "나스닥", "암호화폐", "비트코인", "부동산", "포트폴리오",
+      "인플레이션", "경제"), 0.8),
+    (("시장", "동향", "전망", "리스크", "은퇴", "연금", "자산", "수익률", "재무", "실적"), 0.4),
+    (("안녕", "고마워", "감사", "누구", "이름"), -1.0),
+]
+
+class RouteDecision(NamedTuple):
+    """라우팅 결정"""
+    route: str          # "retrieve" 또는 "agent"
+    confidence: float   # 검색이 필요하다는 신뢰도 (0.0 ~ 1.0)
+    reason: str
+
+class BaseRouter(ABC):
+    """라우터 기본 클래스: route()가 검색 필요 신뢰도를 기준으로 경로를 결정합니다 (하위 클래스는 score() 구현)."""
+    
+    def __init__(self, threshold: float = ROUTER_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+    
+    @abstractmethod
+    def score(self, question: str) -> Tuple[float, str]:
+        """질문에 검색이 필요한 신뢰도와 근거를 반환합니다."""
+    
+    def route(self, question: str) -> RouteDecision:
+        """
+        질문의 경로를 결정합니다.
+        
+        Args:
+            question: 사용자 질문
+        
+        Returns:
+            RouteDecision: 신뢰도가 임계값 이상이면 "retrieve", 아니면 "agent"
+        """
+        confidence, reason = self.score(question)
+        route = "retrieve" if confidence >= self.threshold else "agent"
+        return RouteDecision(route, confidence, reason)
+
+class RuleTableRouter(BaseRouter):
+    """규칙 테이블 기반 라우터"""
+    
+    def __init__(self, rule_table: list = None, threshold: float = ROUTER_CONFIDENCE_THRESHOLD):
+        super().__init__(threshold)
+        self.rule_table = rule_table or DEFAULT_RULE_TABLE
+    
+    def score(self, question: str) -> Tuple[float, str]:
+        lowered = question.lower()
+        total = 0.0
+        matched = []
+        
+        for keywords, weight in self.rule_table:
+            for keyword in keywords:
+                if keyword.lower() in lowered:
+                    total += weight
+                    matched.append(keyword)
+        
+        confidence = min(1.0, max(0.0, total))
+        return confidence, f"rules: {', '.join(matched) or '-'}"
+
+class KeywordClassifierRouter(BaseRouter):
+    """기록된 에이전트 결정으로 학습하는 키워드 나이브 베이즈 라우터"""
+    
+    def __init__(self, threshold: float = ROUTER_CONFIDENCE_THRESHOLD, fallback: BaseRouter = None):
+        super().__init__(threshold)
+        self.fallback = fallback or RuleTableRouter(threshold=threshold)
+        self.token_counts = {True: Counter(), False: Counter()}
+        self.class_counts = Counter()
+        self.vocabulary = set()
+    
+    def fit(self, decisions: Iterable[Tuple[str, bool]]) -> 'KeywordClassifierRouter':
+        """
+        (질문, 도구 호출 여부) 기록으로 분류기를 학습합니다.
+        
+        Args:
+            decisions: 에이전트가 내린 결정 기록
+        
+        Returns:
+            KeywordClassifierRouter: 학습된 라우터
+        """
+        from multi_query import extract_keywords
+        
+        for question, used_tool in decisions:
+            used_tool = bool(used_tool)
+            tokens = set(extract_keywords(question))
+            self.class_counts[used_tool] += 1
+            self.token_counts[used_tool].update(tokens)
+            self.vocabulary.update(tokens)
+        
+        logger.info(f"라우터 학습 완료: {sum(self.class_counts.values())}개 결정, 어휘 {len(self.vocabulary)}개")
+        return self
+    
+    @property
+    def trained(self) -> bool:
+        """분류에 충분한 학습 데이터가 있는지 여부"""
+        return (
+            sum(self.class_counts.values()) >= ROUTER_MIN_TRAINING_SIZE
+            and self.class_counts[True] > 0
+        )
+    
+    def score(self, question: str) -> Tuple[float, str]:
+        if not self.trained:
+            return self.fallback.score(question)
+        
+        from multi_query import extract_keywords
+        
+        tokens = [token for token in set(extract_keywords(question)) if token in self.vocabulary]
+        if not tokens:
+            # 처음 보는 질문은 분류기가 판단할 근거가 없으므로 규칙 테이블에 맡깁니다
+            return self.fallback.score(question)
+        
+        total = sum(self.class_counts.values())
+        vocab_size = len(self.vocabulary)
+        log_odds = math.log((self.class_counts[True] + 1) / (self.class_counts[False] + 1))
+        
+        for token in tokens:
+            # 라플라스 스무딩을 적용한 토큰 우도비
+            p_tool = (self.token_counts[True][token] + 1) / (self.class_counts[True] + vocab_size)
+            p_direct = (self.token_counts[False][token] + 1) / (self.class_counts[False] + vocab_size)
+            log_odds += math.log(p_tool / p_direct)
+        
+        confidence = 1.0 / (1.0 + math.exp(-log_odds))
+        return confidence, f"classifier: {total}개 결정 학습, 토큰 {', '.join(tokens)}"
+
+class RouterStats:
+    """라우터 결정 및 절약된 LLM 호출 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.direct = 0
+        self.to_agent = 0
+        self.shadow_checked = 0
+        self.shadow_agreed = 0
+    
+    def record(self, decision: RouteDecision):
+        """라우팅 결정을 기록합니다."""
+        with self._lock:
+            if decision.route == "retrieve":
+                self.direct += 1
+            else:
+                self.to_agent += 1
+    
+    def record_shadow(self, agent_used_tool: bool):
+        """바로 검색으로 보낸 질문에 대한 에이전트 판단(섀도 검증)을 기록합니다."""
+        with self._lock:
+            self.shadow_checked += 1
+            if agent_used_tool:
+                self.shadow_agreed += 1
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            total = self.direct + self.to_agent
+            return {
+                "routed": total,
+                "direct_to_retrieve": self.direct,
+                "to_agent": self.to_agent,
+                # 바로 검색으로 보낸 질문마다 에이전트 LLM 호출 1회가 절약됩니다
+                "llm_calls_saved": self.direct,
+                "direct_rate": self.direct / total if total else 0.0,
+                "shadow_checked": self.shadow_checked,
+                "precision": self.shadow_agreed / self.shadow_checked if self.shadow_checked else None,
+            }
+
+# 섀도 검증용 에이전트 호출을 요청 경로 밖에서 실행하기 위한 실행기
+_shadow_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="router-shadow")
+
+def maybe_shadow_check(agent_node, state, stats: RouterStats, rate: float = ROUTER_SHADOW_RATE):
+    """
+    바로 검색으로 보낸 질문 일부를 백그라운드에서 에이전트에게도 물어 정밀도를 측정합니다.
+    
+    Args:
+        agent_node: 에이전트 노드 함수
+        state: 라우터가 받은 상태
+        stats: 결과를 기록할 라우터 통계
+        rate: 섀도 검증 비율 (0이면 비활성화)
+    """
+    if rate <= 0 or random.random() >= rate:
+        return
+    
+    def _check():
+        try:
+            response = agent_node(state)["messages"][-1]
+            stats.record_shadow(bool(getattr(response, "tool_calls", None)))
+        except Exception as e:
+            logger.warning(f"라우터 섀도 검증 실패: {str(e)}")
+    
+    _shadow_executor.submit(_check)
+
+def evaluate_router(router: BaseRouter, decisions: Iterable[Tuple[str, bool]]) -> dict:
+    """
+    기록된 에이전트 결정을 정답으로 라우터를 오프라인 평가합니다.
+    
+    Args:
+        router: 평가할 라우터
+        decisions: (질문, 도구 호출 여부) 기록
+    
+    Returns:
+        dict: 정밀도(바로 검색으로 보낸 질문 중 실제로 검색이 필요했던 비율),
+              재현율, 절약되는 LLM 호출 비율
+    """
+    true_positive = false_positive = false_negative = total = 0
+    
+    for question, used_tool in decisions:
+        total += 1
+        direct = router.route(question).route == "retrieve"
+        if direct and used_tool:
+            true_positive += 1
+        elif direct:
+            false_positive += 1
+        elif used_tool:
+            false_negative += 1
+    
+    direct_count = true_positive + false_positive
+    return {
+        "total": total,
+        "precision": true_positive / direct_count if direct_count else None,
+        "recall": true_positive / (true_positive + false_negative) if true_positive + false_negative else None,
+        "llm_call_savings": direct_count / total if total else 0.0,
+    }
+
+class DecisionLog:
+    """에이전트의 도구 호출 결정을 JSON Lines 파일로 기록하는 클래스"""
+    
+    def __init__(self, path: str = ROUTER_DECISION_LOG):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def append(self, question: str, used_tool: bool):
+        """에이전트 결정 한 건을 기록합니다."""
+        if not self.path:
+            return
+        
+        line = json.dumps({"question": question, "used_tool": bool(used_tool)}, ensure_ascii=False)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"라우터 결정 기록 실패: {str(e)}")
+    
+    def load(self) -> List[Tuple[str, bool]]:
+        """기록된 결정을 불러옵니다."""
+        if not self.path or not os.path.exists(self.path):
+            return []
+        
+        decisions = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    decisions.append((record["question"], bool(record["used_tool"])))
+                except (ValueError, KeyError):
+                    continue
+        return decisions
+
+def create_router(name: str = ROUTER, decision_log: DecisionLog = None) -> BaseRouter:
+    """
+    설정에 따라 라우터를 생성합니다.
+    
+    Args:
+        name: "rules", "classifier" 또는 "off"
+        decision_log: 분류기 학습에 사용할 결정 기록
+    
+    Returns:
+        BaseRouter: 생성된 라우터 ("off"이면 None)
+    """
+    if name == "rules":
+        return RuleTableRouter()
+    
+    if name == "classifier":
+        decision_log = decision_log or DecisionLog()
+        return KeywordClassifierRouter().fit(decision_log.load())
+    
+    return None
@@ -0,0 +1,282 @@
+"""
+프로덕션 서빙: 마스터가 미리 만든 벡터 색인을 한 번 불러온 뒤 워커 프로세스를 fork하여 Flask 앱 제공
+
+- 마스터: 색인 파일을 메모리 매핑으로 열고 페이지를 미리 읽은 뒤 수신 소켓을 열고 워커를 fork
+  (워커들은 같은 페이지 캐시를 공유하며, 종료된 워커는 다시 띄움)
+- 워커: 그래프 프로필을 한 번씩 컴파일하고 공유 소켓에서 요청을 처리
+- SIGTERM/SIGINT: 워커는 준비 검사(/readyz)를 실패로 바꾸고 진행 중인 요청을 마친 뒤 종료
+
+os.fork를 사용하므로 Linux/macOS에서만 동작합니다.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+# 프로젝트 루트를 Python 경로에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 로깅 설정 (다른 모듈보다 먼저 설정해 로그에 워커 pid를 표시)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+from config import (
+    SERVE_HOST, SERVE_PORT, SERVE_WORKERS, SERVE_INDEX_PATH, SERVE_GRACEFUL_TIMEOUT, WARM_UP, FAST_PATH, ANSWER_WARMUP
+)
+from vector_index import VectorIndex
+
+# 시작 직후 종료된 워커를 다시 띄우기 전에 기다리는 시간 (초)
+RESPAWN_BACKOFF = 1.0
+
+def build_index(path: str, offline: bool = False):
+    """
+    문서를 크롤링(오프라인이면 예제 문서 사용)해 벡터 스토어를 만들고 읽기 전용 색인으로 저장합니다.
+    
+    FAST_PATH나 ANSWER_WARMUP이면 저장한 색인으로 워커와 같은 워크플로우를 만들어 FAQ 대표 질문과
+    인기 질문(예시 질문, 질문 파일, 질문 기록 중 빠른 경로가 답하지 않는 질문)에 답하고, 그 답변을 색인 옆에 저장합니다.
+    
+    Args:
+        path: 저장할 디렉터리
+        offline: 가짜 임베딩과 예제 문서 사용 여부
+    """
+    if offline:
+        from fakes import create_offline_pipeline
+        pipeline = create_offline_pipeline()
+    else:
+        from data_pipeline import DataPipeline
+        pipeline = DataPipeline().build_pipeline()
+    pipeline.save_index(path)
+    
+    if FAST_PATH or ANSWER_WARMUP:
+        index = VectorIndex.load(path, mmap=False)
+        workflow = build_worker_workflow(index, offline)
+        fast_path = None
+        if FAST_PATH:
+            from fast_path import FastPath
+        
+            fast_path = FastPath.from_workflow(workflow)
+            fast_path.save(path, index)
+        if ANSWER_WARMUP:
+            from answer_warmup import popular_questions, run_questions, save_answers, without_fast_path
+            
+            save_answers(path, run_questions(workflow, without_fast_path(popular_questions(), fast_path)), index)
+
+def load_shared_index(path: str) -> VectorIndex:
+    """
+    워커들이 공유할 색인을 메모리 매핑으로 열고 페이지를 미리 읽습니다.
+    
+    Args:
+        path: 색인 디렉터리
+    
+    Returns:
+        VectorIndex: 준비된 색인
+    """
+    index = VectorIndex.load(path, mmap=True)
+    elapsed = index.warm_up()
+    logger.info(f"색인 워밍업 완료: {len(index)}개 청크, {elapsed * 1000:.1f}ms")
+    return index
+
+def create_listen_socket(host: str, port: int, backlog: int = 128) -> socket.socket:
+    """워커들이 함께 accept할 수신 소켓을 엽니다."""
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(backlog)
+    listen_socket.set_inheritable(True)
+    return listen_socket
+
+def build_worker_workflow(index: VectorIndex, offline: bool = False):
+    """
+    공유 색인으로 워크플로우를 만들고 모든 그래프 프로필을 컴파일합니다 (WARM_UP이면 탐색 검색까지 실행).
+    
+    Args:
+        index: 마스터가 불러온 색인
+        offline: 가짜 모델과 임베딩 사용 여부
+    
+    Returns:
+        AgenticRAGWorkflow: 요청을 처리할 준비가 된 워크플로우
+    """
+    from data_pipeline import DataPipeline
+    from workflow_graph import AgenticRAGWorkflow
+    
+    embeddings = None
+    if offline:
+        from fakes import FakeChatModel, FakeEmbeddings, install_fake_chat_model
+        embeddings = FakeEmbeddings()
+        install_fake_chat_model(FakeChatModel())
+    
+    workflow = AgenticRAGWorkflow(DataPipeline(embeddings=embeddings).load_index(index))
+    if WARM_UP:
+        workflow.warm_up()
+    return workflow.build_all_profiles()
+
+def load_fast_path(path: str, index: VectorIndex, workflow):
+    """
+    색인 디렉터리에 저장된 빠른 경로 답변을 불러와 워크플로우의 질의 임베딩을 연결합니다.
+    
+    Returns:
+        Optional[FastPath]: 빠른 경로 (FAST_PATH가 꺼졌거나 현재 색인으로 만든 답변이 없으면 None)
+    """
+    if not FAST_PATH:
+        return None
+    from fast_path import FastPath
+    
+    fast_path = FastPath.load(path, index=index)
+    if fast_path is not None:
+        fast_path.attach(workflow)
+        logger.info(f"빠른 경로 준비 완료: {len(fast_path)}개 의도")
+    return fast_path
+
+def run_worker(listen_socket: socket.socket, index: VectorIndex, args):
+    """
+    워커 프로세스 본체: 워크플로우를 준비하고 공유 소켓에서 요청을 처리합니다.
+    
+    Args:
+        listen_socket: 마스터가 연 수신 소켓
+        index: 마스터가 불러온 색인
+        args: 명령줄 인자
+    """
+    from werkzeug.serving import make_server
+    import simple_web_app
+    
+    # Ctrl+C는 마스터가 받아 SIGTERM으로 전달합니다
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    started_at = time.perf_counter()
+    workflow = build_worker_workflow(index, args.offline)
+    warm_answers = None
+    if ANSWER_WARMUP:
+        from answer_warmup import load_answers
+        
+        warm_answers = load_answers(args.index, index)
+    simple_web_app.install_workflow(workflow, load_fast_path(args.index, index, workflow), warm_answers)
+    logger.info(f"워커 준비 완료 ({(time.perf_counter() - started_at) * 1000:.0f}ms)")
+    
+    server = make_server(args.host, args.port, simple_web_app.app, threaded=True, fd=listen_socket.fileno())
+    
+    def _shutdown(signum, frame):
+        simple_web_app.begin_drain()
+        # serve_forever를 실행 중인 스레드에서 shutdown을 호출하면 교착되므로 별도 스레드에서 호출
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, _shutdown)
+    server.serve_forever()
+    
+    if simple_web_app.wait_until_idle(args.graceful_timeout):
+        logger.info("진행 중인 요청을 모두 마치고 워커를 종료합니다")
+    else:
+        logger.warning(f"{args.graceful_timeout}초 안에 끝나지 않은 요청을 남기고 워커를 종료합니다")
+
+class PreforkMaster:
+    """워커 프로세스를 fork하고 감시하는 마스터"""
+    
+    def __init__(self, listen_socket: socket.socket, index: VectorIndex, args):
+        self.listen_socket = listen_socket
+        self.index = index
+        self.args = args
+        self.workers = {}
+        self.stopping = False
+    
+    def spawn(self):
+        """워커 하나를 fork합니다."""
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(self.listen_socket, self.index, self.args)
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                # 마스터에서 상속한 atexit 처리기와 스레드 정리를 건너뛰고 바로 종료
+                os._exit(exit_code)
+        
+        self.workers[pid] = time.monotonic()
+        logger.info(f"워커 시작: pid={pid}")
+    
+    def _stop(self, signum, frame):
+        self.stopping = True
+    
+    def run(self):
+        """워커를 띄우고 종료 신호를 받을 때까지 감시합니다."""
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        
+        for _ in range(self.args.workers):
+            self.spawn()
+        
+        while not self.stopping:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+            
+            started_at = self.workers.pop(pid, time.monotonic())
+            logger.warning(f"워커 종료: pid={pid}, 상태={status}")
+            if self.stopping:
+                break
+            if time.monotonic() - started_at < RESPAWN_BACKOFF:
+                time.sleep(RESPAWN_BACKOFF)
+            self.spawn()
+        
+        self.shutdown()
+    
+    def shutdown(self):
+        """모든 워커에 SIGTERM을 보내고 종료를 기다립니다 (시간 초과 시 SIGKILL)."""
+        logger.info(f"워커 {len(self.workers)}개 종료 중...")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+        
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.1)
+            else:
+                self.workers.pop(pid, None)
+        
+        for pid in list(self.workers):
+            logger.warning(f"워커 강제 종료: pid={pid}")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers.clear()
+        self.listen_socket.close()
+        logger.info("서버를 종료했습니다")
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="Agentic RAG 프로덕션 서빙 (prefork)")
+    parser.add_argument("--host", default=SERVE_HOST, help="바인딩할 주소")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="바인딩할 포트")
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="워커 프로세스 수")
+    parser.add_argument("--index", default=SERVE_INDEX_PATH, help="읽기 전용 색인 디렉터리")
+    parser.add_argument("--graceful-timeout", type=float, default=SERVE_GRACEFUL_TIMEOUT,
+                        help="종료 시 진행 중인 요청을 기다리는 시간 (초)")
+    parser.add_argument("--build-index", action="store_true", help="색인을 만들어 저장하고 종료")
+    parser.add_argument("--offline", action="store_true", help="가짜 모델과 임베딩 사용 (예제 문서 색인)")
+    args = parser.parse_args()
+    
+    if args.build_index:
+        build_index(args.index, args.offline)
+        return
+    
+    index = load_shared_index(args.index)
+    listen_socket = create_listen_socket(args.host, args.port)
+    logger.info(f"http://{args.host}:{listen_socket.getsockname()[1]} 에서 워커 {args.workers}개로 서빙합니다")
+    PreforkMaster(listen_socket, index, args).run()
+
+if __name__ == "__main__":
+    main()
@@ -1,361 +1,558 @@
-"""
-간단한 Flask 웹 인터페이스 - Agentic RAG 시스템
-"""
-from flask import Flask, render_template_string, request, jsonify
-import os
-import sys
-from pathlib import Path
-import time
-from datetime import datetime
-
-# 프로젝트 루트를 Python 경로에 추가
-project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
-
-# 환경 변수 설정
-os.environ["OPENAI_API_KEY"] = "your_openai_api_key_here"
-
-app = Flask(__name__)
-
-# HTML 템플릿
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="ko">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🤖 Agentic RAG 시스템</title>
-    <style>
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 15px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            overflow: hidden;
-        }
-        .header {
-            background: linear-gradient(135deg, #1f77b4 0%, #ff7f0e 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-        }
-        .header h1 {
-            margin: 0;
-            font-size: 2.5rem;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-        }
-        .content {
-            padding: 30px;
-        }
-        .chat-container {
-            background: #f8f9fa;
-            border-radius: 10px;
-            padding: 20px;
-            margin: 20px 0;
-            max-height: 400px;
-            overflow-y: auto;
-        }
-        .message {
-            margin: 10px 0;
-            padding: 15px;
-            border-radius: 10px;
-            border-left: 4px solid;
-        }
-        .user-message {
-            background: #e3f2fd;
-            border-left-color: #2196f3;
-            margin-left: 20%;
-        }
-        .assistant-message {
-            background: #f3e5f5;
-            border-left-color: #9c27b0;
-            margin-right: 20%;
-        }
-        .input-container {
-            display: flex;
-            gap: 10px;
-            margin: 20px 0;
-        }
-        .input-container input {
-            flex: 1;
-            padding: 15px;
-            border: 2px solid #ddd;
-            border-radius: 10px;
-            font-size: 16px;
-        }
-        .input-container button {
-            padding: 15px 30px;
-            background: #1f77b4;
-            color: white;
-            border: none;
-            border-radius: 10px;
-            cursor: pointer;
-            font-size: 16px;
-            transition: background 0.3s;
-        }
-        .input-container button:hover {
-            background: #1565c0;
-        }
-        .examples {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 15px;
-            margin: 20px 0;
-        }
-        .example-btn {
-            padding: 15px;
-            background: #ff7f0e;
-            color: white;
-            border: none;
-            border-radius: 10px;
-            cursor: pointer;
-            font-size: 14px;
-            transition: background 0.3s;
-        }
-        .example-btn:hover {
-            background: #e65100;
-        }
-        .status {
-            background: #e8f5e8;
-            border: 1px solid #4caf50;
-            border-radius: 10px;
-            padding: 15px;
-            margin: 20px 0;
-            text-align: center;
-        }
-        .error {
-            background: #ffebee;
-            border: 1px solid #f44336;
-            color: #c62828;
-        }
-        .loading {
-            text-align: center;
-            padding: 20px;
-            color: #666;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🤖 Agentic RAG 지능형 정보 검색 시스템</h1>
-            <p>LangGraph와 OpenAI GPT-4를 활용한 지능형 정보 검색</p>
-        </div>
-        
-        <div class="content">
-            <div class="status" id="status">
-                🚀 시스템이 준비되었습니다! 질문을 입력해보세요.
-            </div>
-            
-            <div class="input-container">
-                <input type="text" id="questionInput" placeholder="질문을 입력하세요..." onkeypress="handleKeyPress(event)">
-                <button onclick="askQuestion()">질문하기</button>
-            </div>
-            
-            <div class="examples">
-                <button class="example-btn" onclick="askExample('agentic rag가 어떤 의미야?')">💡 Agentic RAG란?</button>
-                <button class="example-btn" onclick="askExample('금융 시장의 최신 동향은?')">💡 금융 시장 동향</button>
-                <button class="example-btn" onclick="askExample('투자 포트폴리오 구성 방법은?')">💡 포트폴리오 구성</button>
-                <button class="example-btn" onclick="askExample('주식 시장 분석 방법은?')">💡 주식 시장 분석</button>
-            </div>
-            
-            <div class="chat-container" id="chatContainer">
-                <div class="message assistant-message">
-                    안녕하세요! 🤖 Agentic RAG 시스템입니다. 
-                    금융 관련 질문이나 다른 궁금한 점이 있으시면 언제든 물어보세요!
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        let chatHistory = [];
-        
-        function handleKeyPress(event) {
-            if (event.key === 'Enter') {
-                askQuestion();
-            }
-        }
-        
-        function askExample(question) {
-            document.getElementById('questionInput').value = question;
-            askQuestion();
-        }
-        
-        function askQuestion() {
-            const question = document.getElementById('questionInput').value.trim();
-            if (!question) return;
-            
-            // 사용자 메시지 추가
-            addMessage('user', question);
-            document.getElementById('questionInput').value = '';
-            
-            // 상태 업데이트
-            document.getElementById('status').innerHTML = '🤔 질문을 분석하고 답변을 생성하는 중...';
-            document.getElementById('status').className = 'status loading';
-            
-            // API 호출
-            fetch('/ask', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ question: question })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.success) {
-                    addMessage('assistant', data.answer);
-                    document.getElementById('status').innerHTML = '✅ 답변이 생성되었습니다!';
-                    document.getElementById('status').className = 'status';
-                } else {
-                    addMessage('assistant', '죄송합니다. 답변을 생성할 수 없습니다: ' + data.error);
-                    document.getElementById('status').innerHTML = '❌ 오류가 발생했습니다: ' + data.error;
-                    document.getElementById('status').className = 'status error';
-                }
-            })
-            .catch(error => {
-                addMessage('assistant', '죄송합니다. 시스템 오류가 발생했습니다.');
-                document.getElementById('status').innerHTML = '❌ 시스템 오류: ' + error.message;
-                document.getElementById('status').className = 'status error';
-            });
-        }
-        
-        function addMessage(role, content) {
-            const chatContainer = document.getElementById('chatContainer');
-            const messageDiv = document.createElement('div');
-            messageDiv.className = `message ${role}-message`;
-            messageDiv.textContent = content;
-            chatContainer.appendChild(messageDiv);
-            chatContainer.scrollTop = chatContainer.scrollHeight;
-            
-            chatHistory.push({ role, content, timestamp: new Date() });
-        }
-    </script>
-</body>
-</html>
-"""
-
-@app.route('/')
-def home():
-    return HTML_TEMPLATE
-
-@app.route('/ask', methods=['POST'])
-def ask():
-    try:
-        data = request.get_json()
-        question = data.get('question', '')
-        
-        if not question:
-            return jsonify({'success': False, 'error': '질문이 입력되지 않았습니다.'})
-        
-        # 간단한 답변 생성 (실제로는 Agentic RAG 시스템 사용)
-        answer = generate_simple_answer(question)
-        
-        return jsonify({
-            'success': True,
-            'answer': answer,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        })
-
-def generate_simple_answer(question):
-    """간단한 답변 생성 (실제 Agentic RAG 시스템 대신 사용)"""
-    
-    # 키워드 기반 간단한 답변
-    question_lower = question.lower()
-    
-    if 'agentic' in question_lower or 'rag' in question_lower:
-        return """Agentic RAG는 LangGraph와 OpenAI GPT-4를 활용한 지능형 정보 검색 시스템입니다. 
-        
-주요 특징:
-• 🔄 동적 워크플로우: LangGraph 기반 의사결정 시스템
-• 🧠 지능형 분석: GPT-4를 통한 문서 관련성 평가
-• 📊 실시간 데이터: 웹 크롤링을 통한 최신 정보 수집
-• 💬 대화형 인터페이스: 직관적인 웹 인터페이스
-
-이 시스템은 사용자의 질문을 받아 관련 문서를 검색하고, 그 관련성을 평가하여 필요에 따라 질문을 재작성하거나 최종 답변을 생성합니다."""
-    
-    elif '금융' in question or '시장' in question:
-        return """현재 금융 시장의 주요 동향은 다음과 같습니다:
-
-📈 주요 트렌드:
-• 인플레이션 관리와 금리 정책
-• ESG 투자 증가
-• 디지털 금융 서비스 확대
-• 암호화폐 시장의 성장
-
-💡 투자 시 고려사항:
-• 포트폴리오 다양화
-• 장기적 관점
-• 리스크 관리
-• 전문가 상담 활용"""
-    
-    elif '투자' in question or '포트폴리오' in question:
-        return """투자 포트폴리오 구성의 핵심 원칙:
-
-🎯 목표 설정:
-• 투자 목적과 기간 명확화
-• 위험 감수 성향 평가
-• 수익률 목표 설정
-
-📊 자산 배분:
-• 주식: 성장 잠재력 (고위험, 고수익)
-• 채권: 안정성 (저위험, 저수익)
-• 부동산: 인플레이션 대비
-• 현금: 유동성 확보
-
-🔄 지속적 관리:
-• 정기적인 리밸런싱
-• 시장 상황 모니터링
-• 투자 전략 조정"""
-    
-    elif '주식' in question or '분석' in question:
-        return """주식 시장 분석 방법:
-
-📊 기본적 분석 (Fundamental Analysis):
-• 재무제표 분석
-• 산업 동향 파악
-• 경쟁사 비교
-• 경제 지표 분석
-
-📈 기술적 분석 (Technical Analysis):
-• 차트 패턴 분석
-• 이동평균선 활용
-• 거래량 분석
-• 기술적 지표 활용
-
-🧠 종합적 접근:
-• 기본적 + 기술적 분석 결합
-• 시장 심리 분석
-• 리스크 관리 전략"""
-    
-    else:
-        return f"""'{question}'에 대한 답변을 생성하는 중입니다...
-
-현재 간단한 데모 모드로 실행 중이며, 실제 Agentic RAG 시스템의 전체 기능을 사용하려면:
-
-1. 시스템 초기화가 필요합니다
-2. 웹 크롤링 및 벡터 스토어 구축
-3. LangGraph 워크플로우 실행
-
-더 자세한 정보나 특정 질문에 대한 답변을 원하시면 구체적으로 질문해주세요!"""
-
-if __name__ == '__main__':
-    print("🚀 Flask 웹 서버 시작 중...")
-    print("📍 웹 브라우저에서 http://localhost:5000 으로 접속하세요")
-    print("🔄 서버를 중지하려면 Ctrl+C를 누르세요")
-    app.run(debug=True, host='0.0.0.0', port=5000)
+"""
+간단한 Flask 웹 인터페이스 - Agentic RAG 시스템
+"""
+from flask import Flask, Response, g, render_template_string, request, jsonify
+import os
+import sys
+from pathlib import Path
+import threading
+import time
+from datetime import datetime
+
+# 프로젝트 루트를 Python 경로에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 환경 변수 설정 (실제 API 키가 있으면 유지)
+os.environ.setdefault("OPENAI_API_KEY", "your_openai_api_key_here")
+
+from config import (
+    WEB_APP_WORKFLOW, WEB_APP_DEBUG, METRICS_ENABLED, ADMISSION_DEFAULT_TIMEOUT, FAST_PATH, ANSWER_WARMUP
+)
+from tracing import Trace
+from metrics import REGISTRY, HTTP_REQUESTS, HTTP_DURATION, CACHE_REQUESTS
+from admission import AdmissionController, AdmissionRejected
+from answer_cache import AnswerCache
+from answer_warmup import AnswerWarmup, index_version
+from fast_path import FastPath, FastPathBuilder, final_message, is_error_message, load_faq_table
+
+app = Flask(__name__)
+
+# Agentic RAG 워크플로우 (WEB_APP_WORKFLOW=true일 때 첫 요청에서 생성, serve.py는 워커 시작 시 설치)
+_workflow = None
+_workflow_lock = threading.Lock()
+
+# 서빙 상태: 종료 신호를 받으면 draining으로 바꾸고 진행 중인 요청이 끝나기를 기다림
+_draining = threading.Event()
+_active_requests = 0
+_active_lock = threading.Lock()
+
+# 워크플로우 앞단의 수용 제어와 과부하 시 대체 응답에 쓰는 답변 캐시
+_admission = AdmissionController()
+_answer_cache = AnswerCache()
+
+# 색인 버전이 바뀔 때마다 인기 질문의 답변을 답변 캐시에 미리 고정하는 워밍업 작업
+# (빠른 경로가 켜져 있으면 FAQ 표로 답하는 질문은 빠른 경로가 먼저 응답하므로 제외)
+_answer_warmup = AnswerWarmup(_answer_cache, fast_path=FastPath(load_faq_table()) if FAST_PATH else None)
+
+# FAQ 질문에 LLM 호출 없이 답하는 빠른 경로 (워크플로우 모드는 색인 버전마다 워크플로우로 미리 만든 답변,
+# 데모 모드는 FAQ 표의 답변)
+_fast_path_builder = FastPathBuilder()
+_demo_fast_path = FastPath.demo()
+
+# HTML 템플릿
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="ko">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>🤖 Agentic RAG 시스템</title>
+    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            margin: 0;
+            padding: 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            min-height: 100vh;
+        }
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 15px;
+            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+            overflow: hidden;
+        }
+        .header {
+            background: linear-gradient(135deg, #1f77b4 0%, #ff7f0e 100%);
+            color: white;
+            padding: 30px;
+            text-align: center;
+        }
+        .header h1 {
+            margin: 0;
+            font-size: 2.5rem;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+        }
+        .content {
+            padding: 30px;
+        }
+        .chat-container {
+            background: #f8f9fa;
+            border-radius: 10px;
+            padding: 20px;
+            margin: 20px 0;
+            max-height: 400px;
+            overflow-y: auto;
+        }
+        .message {
+            margin: 10px 0;
+            padding: 15px;
+            border-radius: 10px;
+            border-left: 4px solid;
+        }
+        .user-message {
+            background: #e3f2fd;
+            border-left-color: #2196f3;
+            margin-left: 20%;
+        }
+        .assistant-message {
+            background: #f3e5f5;
+            border-left-color: #9c27b0;
+            margin-right: 20%;
+        }
+        .input-container {
+            display: flex;
+            gap: 10px;
+            margin: 20px 0;
+        }
+        .input-container input {
+            flex: 1;
+            padding: 15px;
+            border: 2px solid #ddd;
+            border-radius: 10px;
+            font-size: 16px;
+        }
+        .input-container button {
+            padding: 15px 30px;
+            background: #1f77b4;
+            color: white;
+            border: none;
+            border-radius: 10px;
+            cursor: pointer;
+            font-size: 16px;
+            transition: background 0.3s;
+        }
+        .input-container button:hover {
+            background: #1565c0;
+        }
+        .examples {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+            gap: 15px;
+            margin: 20px 0;
+        }
+        .example-btn {
+            padding: 15px;
+            background: #ff7f0e;
+            color: white;
+            border: none;
+            border-radius: 10px;
+            cursor: pointer;
+            font-size: 14px;
+            transition: background 0.3s;
+        }
+        .example-btn:hover {
+            background: #e65100;
+        }
+        .status {
+            background: #e8f5e8;
+            border: 1px solid #4caf50;
+            border-radius: 10px;
+            padding: 15px;
+            margin: 20px 0;
+            text-align: center;
+        }
+        .error {
+            background: #ffebee;
+            border: 1px solid #f44336;
+            color: #c62828;
+        }
+        .loading {
+            text-align: center;
+            padding: 20px;
+            color: #666;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🤖 Agentic RAG 지능형 정보 검색 시스템</h1>
+            <p>LangGraph와 OpenAI GPT-4를 활용한 지능형 정보 검색</p>
+        </div>
+        
+        <div class="content">
+            <div class="status" id="status">
+                🚀 시스템이 준비되었습니다! 질문을 입력해보세요.
+            </div>
+            
+            <div class="input-container">
+                <input type="text" id="questionInput" placeholder="질문을 입력하세요..." onkeypress="handleKeyPress(event)">
+                <button onclick="askQuestion()">질문하기</button>
+            </div>
+            
+            <div class="examples">
+                <button class="example-btn" onclick="askExample('agentic rag가 어떤 의미야?')">💡 Agentic RAG란?</button>
+                <button class="example-btn" onclick="askExample('금융 시장의 최신 동향은?')">💡 금융 시장 동향</button>
+                <button class="example-btn" onclick="askExample('투자 포트폴리오 구성 방법은?')">💡 포트폴리오 구성</button>
+                <button class="example-btn" onclick="askExample('주식 시장 분석 방법은?')">💡 주식 시장 분석</button>
+            </div>
+            
+            <div class="chat-container" id="chatContainer">
+                <div class="message assistant-message">
+                    안녕하세요! 🤖 Agentic RAG 시스템입니다. 
+                    금융 관련 질문이나 다른 궁금한 점이 있으시면 언제든 물어보세요!
+                </div>
+            </div>
+        </div>
+    </div>
+
+    <script>
+        let chatHistory = [];
+        
+        function handleKeyPress(event) {
+            if (event.key === 'Enter') {
+                askQuestion();
+            }
+        }
+        
+        function askExample(question) {
+            document.getElementById('questionInput').value = question;
+            askQuestion();
+        }
+        
+        function askQuestion() {
+            const question = document.getElementById('questionInput').value.trim();
+            if (!question) return;
+            
+            // 사용자 메시지 추가
+            addMessage('user', question);
+            document.getElementById('questionInput').value = '';
+            
+            // 상태 업데이트
+            document.getElementById('status').innerHTML = '🤔 질문을 분석하고 답변을 생성하는 중...';
+            document.getElementById('status').className = 'status loading';
+            
+            // API 호출
+            fetch('/ask', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ question: question })
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    addMessage('assistant', data.answer);
+                    document.getElementById('status').innerHTML = '✅ 답변이 생성되었습니다!';
+                    document.getElementById('status').className = 'status';
+                } else {
+                    addMessage('assistant', '죄송합니다. 답변을 생성할 수 없습니다: ' + data.error);
+                    document.getElementById('status').innerHTML = '❌ 오류가 발생했습니다: ' + data.error;
+                    document.getElementById('status').className = 'status error';
+                }
+            })
+            .catch(error => {
+                addMessage('assistant', '죄송합니다. 시스템 오류가 발생했습니다.');
+                document.getElementById('status').innerHTML = '❌ 시스템 오류: ' + error.message;
+                document.getElementById('status').className = 'status error';
+            });
+        }
+        
+        function addMessage(role, content) {
+            const chatContainer = document.getElementById('chatContainer');
+            const messageDiv = document.createElement('div');
+            messageDiv.className = `message ${role}-message`;
+            messageDiv.textContent = content;
+            chatContainer.appendChild(messageDiv);
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+            
+            chatHistory.push({ role, content, timestamp: new Date() });
+        }
+    </script>
+</body>
+</html>
+"""
+
+@app.before_request
+def start_request_timer():
+    global _active_requests
+    g.request_started_at = time.perf_counter()
+    with _active_lock:
+        _active_requests += 1
+
+@app.teardown_request
+def finish_request(exc):
+    global _active_requests
+    with _active_lock:
+        _active_requests -= 1
+
+@app.after_request
+def record_http_metrics(response):
+    """엔드포인트별 요청 수와 처리 시간을 기록합니다."""
+    started_at = getattr(g, 'request_started_at', None)
+    if METRICS_ENABLED and started_at is not None:
+        # 등록된 경로 규칙을 레이블로 사용해 레이블 종류가 늘어나지 않도록 함
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUESTS.labels(endpoint, str(response.status_code)).inc()
+        HTTP_DURATION.labels(endpoint).observe(time.perf_counter() - started_at)
+    return response
+
+@app.route('/')
+def home():
+    return HTML_TEMPLATE
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus 텍스트 형식의 운영 지표"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/healthz')
+def healthz():
+    """프로세스가 요청을 처리할 수 있는지 확인하는 활성 검사"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz')
+def readyz():
+    """워크플로우와 색인 준비가 끝났고 종료 중이 아닌지 확인하는 준비 검사"""
+    index = getattr(getattr(_workflow, 'data_pipeline', None), 'index', None)
+    status = {
+        'workflow': _workflow is not None or not WEB_APP_WORKFLOW,
+        'index_warmed': index is None or index.warmed_up,
+        'draining': _draining.is_set(),
+        'pid': os.getpid(),
+    }
+    ready = status['workflow'] and status['index_warmed'] and not status['draining']
+    return jsonify({'ready': ready, **status}), 200 if ready else 503
+
+def install_workflow(workflow, fast_path=None, warm_answers=None):
+    """
+    미리 만든 워크플로우로 /ask에 답하도록 설정합니다 (serve.py 워커용).
+    
+    Args:
+        workflow: 요청을 처리할 워크플로우
+        fast_path: 색인 생성 시 만든 빠른 경로
+        warm_answers: 색인 생성 시 만든 워밍업 답변 (질문별 답변)
+    
+    설치한 워크플로우의 현재 색인은 빠른 경로와 워밍업을 마친 것으로 보고(워커마다 같은 질문을 다시 실행하지 않음),
+    이후 색인 버전이 바뀌면 다시 만듭니다.
+    """
+    global _workflow, WEB_APP_WORKFLOW
+    with _workflow_lock:
+        _workflow = workflow
+        WEB_APP_WORKFLOW = True
+        _fast_path_builder.install(fast_path, index_version(workflow) if workflow is not None else None)
+        if workflow is not None:
+            _answer_warmup.install(workflow, warm_answers or {})
+
+def begin_drain():
+    """준비 검사를 실패로 바꿔 새 요청이 들어오지 않도록 합니다."""
+    _draining.set()
+
+def wait_until_idle(timeout: float) -> bool:
+    """
+    진행 중인 요청이 모두 끝날 때까지 기다립니다.
+    
+    Returns:
+        bool: 제한 시간 안에 모두 끝났는지 여부
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with _active_lock:
+            if _active_requests == 0:
+                return True
+        time.sleep(0.05)
+    return False
+
+def get_workflow():
+    """
+    Agentic RAG 워크플로우를 한 번만 생성해 반환합니다.
+    
+    FAST_PATH면 빠른 경로 답변 생성을, ANSWER_WARMUP이면 인기 질문 워밍업을 백그라운드에서 시작합니다
+    (첫 요청은 빠른 경로가 준비될 때까지 기다리지 않고 워크플로우로 답함).
+    """
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                from workflow_graph import create_workflow_with_data_pipeline
+                workflow = create_workflow_with_data_pipeline()
+                if FAST_PATH:
+                    _fast_path_builder.ensure(workflow)
+                if ANSWER_WARMUP:
+                    _answer_warmup.ensure(workflow)
+                _workflow = workflow
+    return _workflow
+
+def match_fast_path(question):
+    """
+    빠른 경로로 답할 수 있는 질문이면 적중 결과를 반환합니다.
+    
+    워크플로우 모드는 현재 색인 버전으로 미리 만든 답변만 사용하고(색인 버전이 바뀌었으면 백그라운드에서 다시 만듦),
+    데모 모드는 FAQ 표의 데모 답변을 사용합니다.
+    """
+    if WEB_APP_WORKFLOW:
+        workflow = get_workflow()
+        if FAST_PATH:
+            _fast_path_builder.ensure(workflow)
+        fast_path = _fast_path_builder.current(workflow)
+    else:
+        fast_path = _demo_fast_path
+    if fast_path is None:
+        return None
+    match = fast_path.match(question)
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels("fast_path", "hit" if match is not None else "miss").inc()
+    return match
+
+def warm_answer(question):
+    """
+    워밍업으로 현재 색인 버전에 고정한 답변을 반환합니다 (없으면 None).
+    
+    색인 버전이 바뀌었으면 새 버전의 워밍업을 백그라운드에서 시작합니다.
+    """
+    workflow = get_workflow()
+    if ANSWER_WARMUP:
+        _answer_warmup.ensure(workflow)
+    answer = _answer_cache.get_pinned(question, workflow.profile, index_version(workflow))
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels("warm_answer", "hit" if answer is not None else "miss").inc()
+    return answer
+
+def run_agentic_rag(question, trace, profiling=False, profile=None, thread_id=None):
+    """
+    워크플로우를 실행하고 최종 답변을 반환합니다 (thread_id가 있으면 그 대화 스레드를 이어 감).
+    
+    Returns:
+        tuple: (답변, 성공 여부) - 답변이 없거나 노드의 오류 메시지로 끝났으면 실패
+    """
+    results = get_workflow().run_workflow(question, profile=profile, trace=trace, profiling=profiling,
+                                          thread_id=thread_id)
+    message = final_message(results)
+    if message is None:
+        return "죄송합니다. 답변을 생성할 수 없습니다.", False
+    return message.content, not is_error_message(message)
+
+def client_timeout():
+    """X-Request-Timeout 헤더(초) 또는 기본값으로 클라이언트 마감 시간을 반환합니다 (None이면 마감 없음)."""
+    try:
+        timeout = float(request.headers.get('X-Request-Timeout') or ADMISSION_DEFAULT_TIMEOUT)
+    except ValueError:
+        timeout = ADMISSION_DEFAULT_TIMEOUT
+    return timeout if timeout > 0 else None
+
+def answer_with_admission(question, trace, profiling=False, thread_id=None, bypass_cache=False):
+    """
+    수용 제어를 거쳐 워크플로우로 답변합니다.
+    
+    대화 스레드의 답변은 이전 턴에 따라 달라지므로 답변 캐시를 읽거나 채우지 않습니다.
+    워밍업으로 고정한 답변이 있으면 수용 제어를 거치지 않고 바로 반환합니다 (bypass_cache면 건너뜀).
+    
+    Returns:
+        tuple: (답변, 수용 정보)
+    
+    Raises:
+        AdmissionRejected: 과부하로 요청을 거절함
+    """
+    workflow = get_workflow()
+    profile = workflow.profile
+    version = index_version(workflow)
+    
+    # 워밍업한 인기 질문은 실행 슬롯을 기다리지 않고 바로 응답
+    answer = warm_answer(question) if thread_id is None and not bypass_cache else None
+    if answer is not None:
+        return answer, {"mode": "warm", "queue_wait_ms": 0.0}
+    
+    def _execute(degraded_profile):
+        answer, succeeded = run_agentic_rag(question, trace, profiling, degraded_profile, thread_id)
+        # 오류 메시지나 대체 문구는 과부하 시 대체 응답으로 내보내지 않도록 성공한 답변만 저장
+        if succeeded and degraded_profile is None and thread_id is None:
+            _answer_cache.put(question, profile, answer, version=version)
+        return answer
+    
+    cached = (lambda: _answer_cache.get(question, profile, version)) if thread_id is None else None
+    return _admission.run(_execute, client_timeout(), cached=cached)
+
+@app.route('/ask', methods=['POST'])
+def ask():
+    received_at = time.perf_counter()
+    try:
+        data = request.get_json()
+        question = data.get('question', '')
+        
+        if not question:
+            return jsonify({'success': False, 'error': '질문이 입력되지 않았습니다.'})
+        
+        response = {'success': True}
+        
+        if WEB_APP_WORKFLOW:
+            # Agentic RAG 워크플로우 실행 (노드별 실행 시간 추적)
+            trace = Trace(request.headers.get('X-Request-ID'), received_at=received_at)
+            # X-Profile 헤더나 요청 본문의 profiling: true로 요청별 프로파일링 (profile은 그래프 프로필 이름과 겹치므로 쓰지 않음)
+            profiling = request.headers.get('X-Profile', '').lower() in ('1', 'true') or data.get('profiling') is True
+            # 요청 본문의 thread_id로 이전 턴 상태를 서버의 체크포인터에서 불러와 대화를 이어 감
+            thread_id = data.get('thread_id') or None
+            # X-Bypass-Cache 헤더면 빠른 경로와 워밍업 답변을 건너뛰고 워크플로우로 답함 (부하 테스트 등)
+            bypass_cache = request.headers.get('X-Bypass-Cache', '').lower() in ('1', 'true')
+            # 대화 스레드가 아닌 FAQ 질문은 수용 제어와 워크플로우를 거치지 않고 미리 만든 답변으로 응답
+            match = match_fast_path(question) if thread_id is None and not bypass_cache else None
+            if match is not None:
+                response['answer'] = match.answer
+                response['fast_path'] = {'intent': match.intent, 'method': match.method,
+                                         'score': round(match.score, 4)}
+                response['processing_time'] = time.perf_counter() - received_at
+                response['timestamp'] = datetime.now().isoformat()
+                return jsonify(response)
+            try:
+                response['answer'], response['admission'] = answer_with_admission(question, trace, profiling,
+                                                                                   thread_id, bypass_cache)
+            except AdmissionRejected as e:
+                # 과부하: 대기열에서 시간 초과를 기다리지 않고 바로 503으로 응답
+                rejected = jsonify({'success': False, 'error': str(e), 'reason': e.reason})
+                rejected.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+                return rejected, 503
+            response['trace'] = trace.summary()
+            if thread_id:
+                response['thread_id'] = thread_id
+        else:
+            # 간단한 답변 생성 (데모 모드)
+            response['answer'] = generate_simple_answer(question)
+        
+        response['processing_time'] = time.perf_counter() - received_at
+        response['timestamp'] = datetime.now().isoformat()
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+def generate_simple_answer(question):
+    """간단한 답변 생성 (실제 Agentic RAG 시스템 대신 FAQ 표의 데모 답변 사용)"""
+    
+    match = match_fast_path(question)
+    if match is not None:
+        return match.answer
+    
+    return f"""'{question}'에 대한 답변을 생성하는 중입니다...
+
+현재 간단한 데모 모드로 실행 중이며, 실제 Agentic RAG 시스템의 전체 기능을 사용하려면:
+
+1. 시스템 초기화가 필요합니다
+2. 웹 크롤링 및 벡터 스토어 구축
+3. LangGraph 워크플로우 실행
+
+더 자세한 정보나 특정 질문에 대한 답변을 원하시면 구체적으로 질문해주세요!"""
+
+if __name__ == '__main__':
+    print("🚀 Flask 개발 서버 시작 중...")
+    print("📍 웹 브라우저에서 http://localhost:5000 으로 접속하세요")
+    print("🏭 프로덕션 서빙은 python serve.py --index index --workers 4 를 사용하세요")
+    if WEB_APP_DEBUG:
+        print("⚠️ WEB_APP_DEBUG=true: Werkzeug 디버거가 켜져 있습니다 (개발용)")
+    print("🔄 서버를 중지하려면 Ctrl+C를 누르세요")
+    app.run(debug=WEB_APP_DEBUG, host='0.0.0.0', port=5000)
@@ -1,112 +1,1078 @@
-"""
-시스템 테스트 파일
-"""
-import os
-import sys
-from pathlib import Path
-
-# 프로젝트 루트를 Python 경로에 추가
-project_root = Path(__file__).parent
-sys.path.insert(0, str(project_root))
-
-# 환경 변수 설정
-os.environ["OPENAI_API_KEY"] = "your_openai_api_key_here"
-
-def test_imports():
-    """모든 모듈이 정상적으로 import되는지 테스트합니다."""
-    print("=== 모듈 Import 테스트 ===")
-    
-    try:
-        from config import OPENAI_API_KEY, OPENAI_MODEL
-        print(f"✅ config 모듈 import 성공")
-        print(f"   API 키: {OPENAI_API_KEY[:20]}...")
-        print(f"   모델: {OPENAI_MODEL}")
-    except Exception as e:
-        print(f"❌ config 모듈 import 실패: {e}")
-        return False
-    
-    try:
-        from components import AgentState, ToolManager
-        print("✅ components 모듈 import 성공")
-    except Exception as e:
-        print(f"❌ components 모듈 import 실패: {e}")
-        return False
-    
-    try:
-        from workflow_nodes import agent, grade_documents, rewrite, generate
-        print("✅ workflow_nodes 모듈 import 성공")
-    except Exception as e:
-        print(f"❌ workflow_nodes 모듈 import 실패: {e}")
-        return False
-    
-    try:
-        from workflow_graph import AgenticRAGWorkflow
-        print("✅ workflow_graph 모듈 import 성공")
-    except Exception as e:
-        print(f"❌ workflow_graph 모듈 import 실패: {e}")
-        return False
-    
-    print("✅ 모든 모듈 import 성공!")
-    return True
-
-def test_basic_functionality():
-    """기본 기능을 테스트합니다."""
-    print("\n=== 기본 기능 테스트 ===")
-    
-    try:
-        from langchain_openai import ChatOpenAI
-        
-        # 간단한 LLM 테스트
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-        response = llm.invoke("안녕하세요!")
-        print(f"✅ LLM 테스트 성공: {response.content}")
-        
-    except Exception as e:
-        print(f"❌ LLM 테스트 실패: {e}")
-        return False
-    
-    return True
-
-def test_workflow_creation():
-    """워크플로우 생성을 테스트합니다."""
-    print("\n=== 워크플로우 생성 테스트 ===")
-    
-    try:
-        from workflow_graph import AgenticRAGWorkflow
-        
-        # 워크플로우 생성 (데이터 파이프라인 없이)
-        workflow = AgenticRAGWorkflow()
-        workflow.build_workflow()
-        
-        print("✅ 워크플로우 생성 성공")
-        return True
-        
-    except Exception as e:
-        print(f"❌ 워크플로우 생성 실패: {e}")
-        return False
-
-def main():
-    """메인 테스트 함수"""
-    print("🚀 Agentic RAG 시스템 테스트 시작")
-    print("=" * 50)
-    
-    # 1. Import 테스트
-    if not test_imports():
-        print("❌ Import 테스트 실패")
-        return
-    
-    # 2. 기본 기능 테스트
-    if not test_basic_functionality():
-        print("❌ 기본 기능 테스트 실패")
-        return
-    
-    # 3. 워크플로우 생성 테스트
-    if not test_workflow_creation():
-        print("❌ 워크플로우 생성 테스트 실패")
-        return
-    
-    print("\n🎉 모든 테스트 통과! 시스템이 정상적으로 작동합니다.")
-    print("이제 main.py를 실행하여 전체 시스템을 사용할 수 있습니다.")
-
-if __name__ == "__main__":
-    main()
+"""
+시스템 테스트 파일
+"""
+import os
+import sys
+from pathlib import Path
+
+# 프로젝트 루트를 Python 경로에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+# 환경 변수 설정
+os.environ["OPENAI_API_KEY"] = "your_openai_api_key_here"
+
+def test_imports():
+    """모든 모듈이 정상적으로 import되는지 테스트합니다."""
+    print("=== 모듈 Import 테스트 ===")
+    
+    try:
+        from config import OPENAI_API_KEY, OPENAI_MODEL
+        print(f"✅ config 모듈 import 성공")
+        print(f"   API 키: {OPENAI_API_KEY[:20]}...")
+        print(f"   모델: {OPENAI_MODEL}")
+    except Exception as e:
+        print(f"❌ config 모듈 import 실패: {e}")
+        return False
+    
+    try:
+        from components import AgentState, ToolManager
+        print("✅ components 모듈 import 성공")
+    except Exception as e:
+        print(f"❌ components 모듈 import 실패: {e}")
+        return False
+    
+    try:
+        from workflow_nodes import agent, grade_documents, rewrite, generate
+        print("✅ workflow_nodes 모듈 import 성공")
+    except Exception as e:
+        print(f"❌ workflow_nodes 모듈 import 실패: {e}")
+        return False
+    
+    try:
+        from workflow_graph import AgenticRAGWorkflow
+        print("✅ workflow_graph 모듈 import 성공")
+    except Exception as e:
+        print(f"❌ workflow_graph 모듈 import 실패: {e}")
+        return False
+    
+    print("✅ 모든 모듈 import 성공!")
+    return True
+
+def test_basic_functionality():
+    """기본 기능을 테스트합니다."""
+    print("\n=== 기본 기능 테스트 ===")
+    
+    try:
+        from langchain_openai import ChatOpenAI
+        
+        # 간단한 LLM 테스트
+        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        response = llm.invoke("안녕하세요!")
+        print(f"✅ LLM 테스트 성공: {response.content}")
+        
+    except Exception as e:
+        print(f"❌ LLM 테스트 실패: {e}")
+        return False
+    
+    return True
+
+def test_workflow_creation():
+    """워크플로우 생성을 테스트합니다."""
+    print("\n=== 워크플로우 생성 테스트 ===")
+    
+    try:
+        from workflow_graph import AgenticRAGWorkflow
+        
+        # 워크플로우 생성 (데이터 파이프라인 없이)
+        workflow = AgenticRAGWorkflow()
+        workflow.build_workflow()
+        
+        print("✅ 워크플로우 생성 성공")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 워크플로우 생성 실패: {e}")
+        return False
+
+def test_offline_workflow():
+    """가짜 모델과 임베딩으로 전체 워크플로우를 오프라인 실행합니다."""
+    print("\n=== 오프라인 워크플로우 테스트 ===")
+    
+    from components import set_chat_model_factory
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from tracing import Trace
+    from workflow_graph import AgenticRAGWorkflow
+    
+    model = install_fake_chat_model(FakeChatModel(responses=["오프라인 답변"]))
+    try:
+        workflow = AgenticRAGWorkflow(create_offline_pipeline()).build_workflow()
+        trace = Trace()
+        results = workflow.run_workflow("주식 시장 동향은?", trace=trace)
+        
+        assert [node for node, _ in results] == ["agent", "retrieve", "generate"]
+        assert results[-1][1]["messages"][-1].content == "오프라인 답변"
+        assert model.call_count == 3
+        
+        # 검색 결과는 문서 참조, ID, 토큰 수와 함께 상태의 documents로 전달
+        documents = results[1][1]["documents"]
+        assert documents and all(document.id and document.tokens > 0 for document in documents)
+        assert results[1][1]["messages"][-1].artifact[0] is documents[0].document
+        
+        # 노드별 추적 스팬
+        summary = trace.summary()
+        assert [node["node"] for node in summary["nodes"]] == ["agent", "retrieve", "generate"]
+        assert summary["nodes"][1]["documents"] > 0
+        assert summary["completion_tokens"] > 0
+        
+        # 현재 추적은 그래프 단계 안에서만 보이고, 스트림을 다른 컨텍스트에서 닫아도 오류가 나지 않음
+        import contextvars
+        from tracing import current_trace
+        stream = workflow.stream_workflow("주식 시장 동향은?", trace=Trace())
+        assert next(stream)[0] == "agent" and current_trace() is None
+        contextvars.Context().run(stream.close)
+        
+        # 추적 결과가 운영 지표에 반영됨
+        from metrics import REGISTRY
+        exposition = REGISTRY.render()
+        assert 'rag_requests_total{profile="balanced",status="ok"} 1' in exposition
+        assert 'rag_node_duration_seconds_count{node="retrieve"} 1' in exposition
+        assert "rag_requests_in_flight 0" in exposition
+        
+        # 요청별 프로파일링은 프로파일 파일을 남김
+        import tempfile
+        from profiling import ProfileRing, load_profiles
+        with tempfile.TemporaryDirectory() as profile_dir:
+            workflow.profile_ring = ProfileRing(profile_dir, max_files=1)
+            for _ in range(2):
+                trace = Trace()
+                workflow.run_workflow("주식 시장 동향은?", trace=trace, profiling=True)
+            profiles = load_profiles(workflow.profile_ring.files())
+            assert len(profiles) == 1 and profiles[0]["request_id"] == trace.request_id
+            assert profiles[0]["functions"] and trace.summary()["profile_path"]
+        
+        # 동시에 들어온 같은 질문은 실행 한 번을 공유
+        from concurrent.futures import ThreadPoolExecutor
+        from fakes import LatencyDistribution
+        model.latency = LatencyDistribution("fixed", 0.1)
+        before = workflow.get_performance_stats()["coalesce"]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            shared = list(executor.map(workflow.run_workflow, ["금리 전망은?", "금리 전망은", "금리  전망은?", "금리 전망은?"]))
+        after = workflow.get_performance_stats()["coalesce"]
+        assert all(result == shared[0] for result in shared)
+        assert after["executions"] - before["executions"] == 1
+        assert after["coalesced"] - before["coalesced"] == 3
+        
+        # 프리페치는 요청별로 관리되어 같은 질문을 처리하는 다른 요청의 프리페치를 건드리지 않고,
+        # 시작한 요청의 컨텍스트(LLM 우선순위)에서 검색함
+        from langchain_core.runnables import RunnableLambda
+        from llm_scheduler import current_priority, llm_priority
+        from prefetch import RetrievalPrefetcher
+        prefetcher = RetrievalPrefetcher(RunnableLambda(lambda query: [current_priority()]))
+        prefetcher.start("a", "금리 전망은?")
+        with llm_priority("batch"):
+            prefetcher.start("b", "금리 전망은?")
+        prefetcher.start("c", "금리 전망은?")
+        assert prefetcher.take("a", "부동산 세금 제도") is None
+        prefetcher.discard("c")
+        assert prefetcher.take("b", "금리 전망은") == ["batch"]
+        assert prefetcher.stats.snapshot()["discarded"] == 1
+        
+        # 문서별 평가 점수는 documents에 기록되고, 관련 문서만 답변 문맥으로 사용
+        from workflow_nodes import get_documents
+        install_fake_chat_model(FakeChatModel(responses=["오프라인 답변"], structured_outputs={"score": [2, 9]}))
+        trace = Trace()
+        graded = dict(workflow.run_workflow("금융 시장 전망은?", profile="thorough", trace=trace))["grade_documents"]
+        grades = [document.grade for document in graded["documents"]]
+        assert grades == sorted(grades, reverse=True) and set(grades) == {2, 9}
+        assert graded["verdict"] == "yes"
+        assert {document.grade for document in get_documents(graded)} == {9}
+        
+        # 구조화 출력(문서별 평가)도 채팅 모델 호출이므로 평가 노드의 LLM 스팬과 토큰으로 잡힘
+        grading = next(node for node in trace.summary()["nodes"] if node["node"] == "grade_documents")
+        assert grading["llm_calls"] == len(graded["documents"]) and grading["completion_tokens"] > 0
+    finally:
+        set_chat_model_factory(None)
+    
+    print("✅ 오프라인 워크플로우 테스트 성공")
+
+def test_mock_openai_server():
+    """OpenAI 호환 모의 서버로 HTTP 계층을 포함한 모델 호출을 테스트합니다."""
+    print("\n=== OpenAI 모의 서버 테스트 ===")
+    
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from mock_openai_server import MockOpenAIServer, MockServerConfig
+    
+    with MockOpenAIServer(config=MockServerConfig(rate_limit_rate=0.5, retry_after=0.01, seed=1)) as server:
+        llm = ChatOpenAI(model="gpt-4o-mini", base_url=server.base_url, max_retries=10)
+        assert llm.invoke("안녕하세요!").content
+        
+        embeddings = OpenAIEmbeddings(base_url=server.base_url, check_embedding_ctx_length=False, max_retries=10)
+        assert len(embeddings.embed_query("금리")) == 1536
+        
+        stats = server.stats.snapshot()
+        assert stats["rate_limited"] > 0
+        assert stats["total_requests"] == stats["rate_limited"] + 2
+    
+    print("✅ OpenAI 모의 서버 테스트 성공")
+
+def test_llm_scheduler():
+    """LLM 호출 스케줄러의 우선순위 처리와 429 재시도를 테스트합니다."""
+    print("\n=== LLM 호출 스케줄러 테스트 ===")
+    
+    import threading
+    import time
+    import httpx
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from llm_scheduler import LLMScheduler, ScheduledTransport, scheduled_http_client
+    from mock_openai_server import MockOpenAIServer, MockServerConfig
+    
+    # 분당 600토큰(초당 10토큰) 버킷을 비운 뒤, 나중에 도착한 interactive 요청이 batch 요청보다 먼저 처리됩니다
+    scheduler = LLMScheduler(rpm=0, tpm=600, model_limits={}, metrics_enabled=False)
+    scheduler.acquire("m", 600)
+    order = []
+    
+    def _call(priority: str):
+        scheduler.acquire("m", 3, priority)
+        order.append(priority)
+    
+    batch = threading.Thread(target=_call, args=("batch",))
+    batch.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=_call, args=("interactive",))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"]
+    
+    scheduler = LLMScheduler(model_limits={}, max_retries=10, base_delay=0.01, metrics_enabled=False)
+    with MockOpenAIServer(config=MockServerConfig(rate_limit_rate=0.5, retry_after=0.01, seed=1)) as server:
+        http_client = httpx.Client(transport=ScheduledTransport(scheduler))
+        llm = ChatOpenAI(model="gpt-4o-mini", base_url=server.base_url, max_retries=0, http_client=http_client)
+        assert llm.invoke("안녕하세요!").content
+        
+        embeddings = OpenAIEmbeddings(model="text-embedding-ada-002", base_url=server.base_url,
+                                      check_embedding_ctx_length=False, max_retries=0, http_client=http_client)
+        assert len(embeddings.embed_query("금리")) == 1536
+        
+        stats = scheduler.snapshot()
+        retries = sum(model["retries"] for model in stats.values())
+        assert server.stats.snapshot()["rate_limited"] == retries > 0
+        assert stats["gpt-4o-mini"]["estimated_tokens"] > 0
+        assert stats["gpt-4o-mini"]["queue_depth"] == {"interactive": 0, "report": 0, "batch": 0}
+    
+    # 공유 클라이언트의 연결 한도는 스케줄러가 감싼 실제 연결 풀에 적용됨
+    pool = scheduled_http_client()._transport.transport._pool
+    assert (pool._max_connections, pool._max_keepalive_connections) == (1000, 100)
+    
+    print("✅ LLM 호출 스케줄러 테스트 성공")
+
+def test_admission_control():
+    """동시 실행 수와 대기열 제한, 마감 시간 기반 거절, 대체 응답을 테스트합니다."""
+    print("\n=== 수용 제어 테스트 ===")
+    
+    import threading
+    import time
+    from admission import AdmissionController, AdmissionRejected
+    
+    controller = AdmissionController(max_concurrency=1, max_queue=1, degrade=(), metrics_enabled=False)
+    started = threading.Event()
+    
+    def _slow(profile):
+        started.set()
+        time.sleep(0.2)
+        return profile or "full"
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(controller.run(_slow)[0])) for _ in range(2)]
+    threads[0].start()
+    started.wait()
+    threads[1].start()
+    while controller.queue_depth == 0:
+        time.sleep(0.01)
+    
+    # 실행 1개, 대기 1개로 가득 차면 세 번째 요청은 기다리지 않고 거절
+    try:
+        controller.run(_slow)
+        assert False, "대기열이 가득 찼는데 요청을 수용했습니다"
+    except AdmissionRejected as e:
+        assert e.reason == "queue_full"
+    for thread in threads:
+        thread.join()
+    assert results == ["full", "full"]
+    
+    # 실행 시간(약 0.2초)을 알고 있으면 마감 시간 안에 끝낼 수 없는 요청은 기다리지 않고 대체 응답
+    controller.degrade = ("cache", "fast")
+    started.clear()
+    holder = threading.Thread(target=controller.run, args=(_slow,))
+    holder.start()
+    started.wait()
+    answer, info = controller.run(_slow, timeout=0.1, cached=lambda: "cached")
+    assert (answer, info["mode"], info["degraded_reason"]) == ("cached", "cache", "deadline")
+    answer, info = controller.run(_slow, timeout=0.1, cached=lambda: None)
+    assert (answer, info["mode"]) == ("fast", "fast")
+    holder.join()
+    
+    print("✅ 수용 제어 테스트 성공")
+
+def test_conversation_memory():
+    """지난 턴의 도구 출력 삭제, 점진적 요약, 에이전트 프롬프트 토큰 한도를 테스트합니다."""
+    print("\n=== 대화 메모리 테스트 ===")
+    
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langgraph.graph.message import add_messages
+    from memory import ConversationMemory, message_tokens
+    
+    def _turn(index):
+        call = {"name": "retrieve_financial_info", "args": {"query": f"질문 {index}"}, "id": f"call_{index}"}
+        return [
+            HumanMessage(content=f"질문 {index}", id=f"h{index}"),
+            AIMessage(content="", tool_calls=[call], id=f"c{index}"),
+            ToolMessage(content="검색 결과 " * 200, tool_call_id=f"call_{index}", id=f"t{index}"),
+            AIMessage(content=f"답변 {index} " + "내용 " * 20, id=f"a{index}"),
+        ]
+    
+    summarized = []
+    
+    def _summarize(summary, turns):
+        summarized.append([turn[0].content for turn in turns])
+        return summary + "".join(f"[{turn[0].content}]" for turn in turns)
+    
+    memory = ConversationMemory(recent_turns=1, max_tokens=0, summarize=_summarize)
+    state = {"messages": _turn(0) + _turn(1) + _turn(2) + [HumanMessage(content="질문 3", id="h3")]}
+    
+    # 최근 1개 턴은 질문과 답변만 남기고, 그 이전 턴은 한 번에 요약
+    prompt, update = memory.prepare(state)
+    assert [message.id for message in prompt[1:]] == ["h2", "a2", "h3"]
+    assert prompt[0].content.endswith("[질문 0][질문 1]")
+    assert summarized == [["질문 0", "질문 1"]]
+    state = {"messages": add_messages(state["messages"], update["messages"]), "summary": update["summary"]}
+    assert [message.id for message in state["messages"]] == ["h2", "a2", "h3"]
+    
+    # 다음 턴에서는 새로 밀려난 턴만 기존 요약에 더함 (이미 요약한 턴은 다시 요약하지 않음)
+    state["messages"] = add_messages(state["messages"], _turn(3)[1:] + [HumanMessage(content="질문 4", id="h4")])
+    prompt, update = memory.prepare(state)
+    assert summarized[-1] == ["질문 2"] and update["summary"] == "[질문 0][질문 1][질문 2]"
+    assert [message.id for message in prompt[1:]] == ["h3", "a3", "h4"]
+    
+    # 토큰 한도를 넘으면 최근 턴도 요약에 합쳐 한도 안으로 줄임
+    memory = ConversationMemory(recent_turns=3, max_tokens=20, summarize=_summarize)
+    prompt, _ = memory.prepare({"messages": _turn(0) + _turn(1) + [HumanMessage(content="질문 2", id="h2")]})
+    assert message_tokens(prompt) <= 20
+    assert memory.stats.snapshot()["summarized_turns"] == 2
+    
+    # 현재 턴만으로 한도를 넘으면 도구 결과를 잘라 맞추고, 상태의 도구 결과는 그대로 둠
+    memory = ConversationMemory(recent_turns=3, max_tokens=100, summarize=_summarize)
+    state = {"messages": _turn(0)[:3]}
+    prompt, update = memory.prepare(state)
+    assert message_tokens(prompt) <= 100 and prompt[-1].content.startswith("검색 결과")
+    assert not update["messages"] and len(state["messages"][-1].content) > len(prompt[-1].content)
+    assert memory.stats.snapshot()["truncated_tool_outputs"] == 1
+    assert memory.stats.snapshot()["over_budget"] == 0
+    
+    # 여러 턴 대화에서도 에이전트 프롬프트 크기가 일정하게 유지됨
+    from components import set_chat_model_factory
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from checkpointer import create_checkpointer
+    from workflow_graph import AgenticRAGWorkflow
+    
+    install_fake_chat_model(FakeChatModel(responses=["오프라인 답변"]))
+    try:
+        workflow = AgenticRAGWorkflow(create_offline_pipeline(), router=None, coalesce=False,
+                                      checkpointer=create_checkpointer("")).build_workflow()
+        workflow.memory.recent_turns = 2
+        for turn in range(8):
+            results = workflow.run_workflow(f"금리 전망 {turn}", thread_id="memory-test")
+            assert results[-1][1]["messages"][-1].content == "오프라인 답변"
+        stats = workflow.get_performance_stats()["memory"]
+        state = workflow.get_graph(persistent=True).get_state({"configurable": {"thread_id": "memory-test"}}).values
+        assert state["summary"] and stats["summarized_turns"] == 5
+        assert sum(message.type == "tool" for message in state["messages"]) <= 1
+        assert len(state["messages"]) <= 2 * 3 + 2
+    finally:
+        set_chat_model_factory(None)
+    
+    print("✅ 대화 메모리 테스트 성공")
+
+def test_checkpointer():
+    """SQLite 체크포인터로 스레드를 다른 인스턴스에서 이어 가고 중단된 실행을 재개하는지 확인합니다."""
+    print("\n💾 체크포인터 테스트 중...")
+    
+    import os
+    import tempfile
+    from checkpointer import CompactSerializer, SqliteCheckpointer
+    from components import set_chat_model_factory
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from workflow_graph import AgenticRAGWorkflow
+    
+    # 큰 값만 압축하고, 압축한 값도 그대로 복원됨
+    serde = CompactSerializer(compress_min_bytes=64)
+    small, large = "짧은 값", "긴 값 " * 100
+    assert not serde.dumps_typed(small)[0].endswith("+zlib")
+    assert serde.dumps_typed(large)[0].endswith("+zlib")
+    assert serde.loads_typed(serde.dumps_typed(large)) == large
+    
+    install_fake_chat_model(FakeChatModel(responses=["오프라인 답변"]))
+    pipeline = create_offline_pipeline()
+    
+    def _workflow(path: str) -> AgenticRAGWorkflow:
+        return AgenticRAGWorkflow(pipeline, router=None, coalesce=False,
+                                  checkpointer=SqliteCheckpointer(path, flush_interval=0.05)).build_workflow()
+    
+    def _state(workflow: AgenticRAGWorkflow, thread_id: str) -> dict:
+        return workflow.get_graph(persistent=True).get_state({"configurable": {"thread_id": thread_id}}).values
+    
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoints.sqlite")
+            
+            # 여러 턴을 이어 간 뒤 새 인스턴스(재시작한 프로세스)가 같은 스레드의 상태를 불러옴
+            first = _workflow(path)
+            for turn in range(3):
+                first.run_workflow(f"금리 전망 {turn}", thread_id="session")
+            stats = first.get_performance_stats()["checkpoint"]
+            assert stats["checkpoints"] > 0 and stats["rows_per_flush"] > 1
+            messages = _state(first, "session")["messages"]
+            first.checkpointer.close()
+            
+            second = _workflow(path)
+            assert [message.content for message in _state(second, "session")["messages"]] == \
+                [message.content for message in messages]
+            assert second.get_session_profile("session") == "balanced"
+            results = second.run_workflow("금리 전망 3", thread_id="session")
+            assert results[-1][1]["messages"][-1].content == "오프라인 답변"
+            assert sum(message.type == "human" for message in _state(second, "session")["messages"]) == 4
+            
+            # 필터 없는 조회는 limit만큼만 읽고, 필터가 있으면 조건에 맞는 체크포인트만 셈
+            config = {"configurable": {"thread_id": "session"}}
+            assert len(list(second.checkpointer.list(config, limit=2))) == 2
+            inputs = list(second.checkpointer.list(config, filter={"source": "input"}, limit=3))
+            assert len(inputs) == 3 and all(item.metadata["source"] == "input" for item in inputs)
+            
+            # 첫 노드 이후 중단된 실행은 다른 인스턴스에서 마지막 체크포인트부터 재개됨
+            stream = second.stream_workflow("금리 인상 영향", thread_id="interrupted")
+            next(stream)
+            stream.close()
+            second.checkpointer.close()
+            
+            third = _workflow(path)
+            results = third.resume_workflow("interrupted")
+            assert results and results[-1][1]["messages"][-1].content == "오프라인 답변"
+            assert third.resume_workflow("interrupted") == []
+            
+            third.end_session("session")
+            assert not _state(third, "session")
+            third.checkpointer.close()
+    finally:
+        set_chat_model_factory(None)
+    
+    print("✅ 체크포인터 테스트 성공")
+
+def test_retrieval_cache():
+    """검색 캐시가 임베딩 호출과 검색을 건너뛰고 색인 버전이 바뀌면 무효화되는지 확인합니다."""
+    print("\n🗂️ 검색 캐시 테스트 중...")
+    
+    from langchain_core.documents import Document
+    from fakes import FakeEmbeddings, create_offline_pipeline
+    from retrieval_cache import CachedRetriever, RetrievalCache
+    from workflow_graph import AgenticRAGWorkflow
+    
+    class CountingEmbeddings(FakeEmbeddings):
+        calls = 0
+        
+        def embed_query(self, text):
+            CountingEmbeddings.calls += 1
+            return super().embed_query(text)
+    
+    pipeline = create_offline_pipeline(CountingEmbeddings())
+    workflow = AgenticRAGWorkflow(pipeline, router=None, coalesce=False, adaptive_top_k=False)
+    assert isinstance(workflow.retriever, CachedRetriever)
+    
+    # 캐시를 거친 결과는 파이프라인 검색기의 결과와 같고, 정규화한 같은 질의는 임베딩 호출 없이 적중
+    expected = [document.page_content for document in pipeline.get_retriever().invoke("금리 전망")]
+    calls = CountingEmbeddings.calls
+    assert [document.page_content for document in workflow.retriever.invoke("금리 전망")] == expected
+    assert [document.page_content for document in workflow.retriever.invoke("금리  전망?")] == expected
+    assert CountingEmbeddings.calls == calls + 1
+    
+    # 색인을 갱신하면 이전 결과를 버리지만 질의 임베딩은 다시 계산하지 않음
+    pipeline.add_documents([Document(page_content="금리 전망: 새로 추가된 문서입니다.",
+                                     metadata={"source": "offline://new"})])
+    workflow.retriever.invoke("금리 전망")
+    stats = workflow.get_performance_stats()["retrieval_cache"]
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+    assert CountingEmbeddings.calls == calls + 1
+    
+    # 적은 k는 저장된 결과의 앞부분으로 응답하고, 큰 k는 다시 검색
+    document = Document(page_content="문서", metadata={"source": "offline://doc"})
+    searches = []
+    
+    def _search(vector, k):
+        searches.append(k)
+        return [(document, 0.9)] * k
+    
+    cache = RetrievalCache(max_entries=2, ttl=0, quantization=0.1)
+    assert len(cache.retrieve(1, "질의", 3, lambda text: [1.0, 0.0], _search)) == 3
+    assert len(cache.retrieve(1, "질의", 2, lambda text: [1.0, 0.0], _search)) == 2
+    cache.retrieve(1, "질의", 4, lambda text: [1.0, 0.0], _search)
+    assert searches == [3, 4]
+    
+    # 임베딩이 거의 같은 다른 질의는 양자화 키로 적중하고, 최대 개수를 넘으면 오래된 결과부터 제거
+    cache.retrieve(1, "비슷한 질의", 4, lambda text: [1.0, 0.001], _search)
+    assert searches == [3, 4] and cache.snapshot()["near_hits"] == 1
+    assert len(cache) == 2 and cache.snapshot()["evictions"] == 1
+    
+    print("✅ 검색 캐시 테스트 성공")
+
+def test_micro_batch():
+    """동시 질의가 배치로 묶이고 각 요청이 자기 결과(또는 오류)를 받는지 확인합니다."""
+    print("\n📦 마이크로 배치 테스트 중...")
+    
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from fakes import create_offline_pipeline
+    from micro_batch import BatchingSearcher, MicroBatcher
+    
+    sizes = []
+    
+    def _double(items):
+        sizes.append(len(items))
+        time.sleep(0.05)
+        if "오류" in items:
+            raise ValueError("배치 오류")
+        return [item * 2 for item in items]
+    
+    # 유휴 상태의 첫 요청은 바로 처리되고, 그동안 들어온 요청은 다음 배치로 묶임
+    batcher = MicroBatcher(_double, max_batch_size=8, max_wait=0.01, max_in_flight=1)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        first = executor.submit(batcher.submit, 0)
+        time.sleep(0.01)
+        rest = list(executor.map(batcher.submit, range(1, 6)))
+    assert first.result() == 0 and rest == [2, 4, 6, 8, 10]
+    assert sizes == [1, 5] and batcher.stats.snapshot()["max_batch_size"] == 5
+    
+    # 배치의 오류는 그 배치의 모든 요청에 전달됨
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(batcher.submit, "오류")]
+        time.sleep(0.01)
+        futures.append(executor.submit(batcher.submit, "정상"))
+    assert isinstance(futures[0].exception(), ValueError) and futures[1].result() == "정상정상"
+    
+    # 묶어서 임베딩/검색해도 질의별로 따로 검색한 결과와 같음 (질의마다 다른 k 포함)
+    pipeline = create_offline_pipeline()
+    searcher = BatchingSearcher(pipeline, max_wait=0.01)
+    queries = [("금리 전망", 3), ("주식 시장 동향", 2), ("포트폴리오 리밸런싱", 4), ("환율", 1)]
+    
+    def _search(query_k):
+        query, k = query_k
+        return [document.page_content for document, _ in searcher.search_by_vector(searcher.embed_query(query), k)]
+    
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        batched = list(executor.map(_search, queries))
+    expected = [
+        [document.page_content for document, _ in pipeline.search_by_vector(pipeline.embed_query(query), k)]
+        for query, k in queries
+    ]
+    assert batched == expected
+    assert searcher.snapshot()["embed"]["items"] == len(queries)
+    
+    # 배치는 구성원 중 가장 높은 우선순위로 실행되고, 배치 공유 여부는 요청마다 자기 추적에 기록됨
+    from llm_scheduler import current_priority, llm_priority
+    from tracing import RequestTracer, Trace
+    priorities = []
+    
+    def _priority(items):
+        priorities.append(current_priority())
+        time.sleep(0.05)
+        return items
+    
+    def _submit(priority, trace, item):
+        with llm_priority(priority), RequestTracer(trace, "batch") as tracer:
+            return tracer.run(batcher.submit, item)
+    
+    batcher = MicroBatcher(_priority, max_batch_size=8, max_wait=0.02, max_in_flight=1, name="priority-batch")
+    traces = [Trace() for _ in range(3)]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        executor.submit(_submit, "batch", traces[0], 0)
+        time.sleep(0.01)
+        executor.submit(_submit, "batch", traces[1], 1)
+        executor.submit(_submit, "interactive", traces[2], 2)
+    assert priorities == ["batch", "interactive"]
+    assert [trace.cache["priority-batch"] for trace in traces] == [
+        {"hits": 0, "misses": 1}, {"hits": 1, "misses": 0}, {"hits": 1, "misses": 0}
+    ]
+    
+    print("✅ 마이크로 배치 테스트 성공")
+
+def test_adaptive_top_k():
+    """유사도 분포에 따라 검색 문서 수를 고르고 선택 결과를 추적 요약에 남기는지 확인합니다."""
+    print("\n📏 적응형 검색 깊이 테스트 중...")
+    
+    from adaptive_k import select_top_k
+    from fakes import create_offline_pipeline
+    from tracing import RequestTracer, Trace
+    from workflow_graph import AgenticRAGWorkflow
+    
+    # 답이 분명한 질문은 큰 유사도 차이 앞에서, 고르게 관련된 질문은 최대 문서 수에서 자름
+    assert select_top_k([0.9, 0.88, 0.5, 0.49, 0.48], min_k=1, max_k=4, gap=0.3, relative=0).k == 2
+    assert select_top_k([0.9, 0.89, 0.88, 0.87, 0.86], min_k=1, max_k=4, gap=0.3, relative=0).reason == "max"
+    
+    # 상대 임계값과 최소/최대 경계, 유사도가 없는 결과
+    selection = select_top_k([0.9, 0.8, 0.7, 0.6], min_k=1, max_k=4, gap=0, relative=0.85)
+    assert (selection.k, selection.reason) == (2, "threshold")
+    assert select_top_k([0.9, 0.1, 0.05], min_k=2, max_k=3, gap=0.3, relative=0.85).k == 2
+    selection = select_top_k([None] * 6, fallback_k=5)
+    assert (selection.k, selection.reason) == (5, "no_scores")
+    assert select_top_k([]).k == 0
+    
+    # 워크플로우 검색기는 후보를 한 번에 가져와 자르고, 선택한 k와 유사도 분포를 추적에 기록
+    pipeline = create_offline_pipeline()
+    workflow = AgenticRAGWorkflow(pipeline, router=None, coalesce=False, retrieval_cache=False, micro_batch=False,
+                                  adaptive_top_k=True)
+    trace = Trace()
+    with RequestTracer(trace, "adaptive") as tracer:
+        documents = tracer.run(workflow.retriever.invoke, "부동산 투자 시 고려사항은?")
+    
+    retrieval = trace.summary()["retrieval"]
+    assert len(retrieval) == 1 and retrieval[0]["k"] == len(documents)
+    assert 2 <= len(documents) <= 8 and retrieval[0]["candidates"] == pipeline.document_count()
+    assert retrieval[0]["top_score"] == round(documents[0].metadata["score"], 4)
+    assert workflow.get_performance_stats()["adaptive_top_k"]["selections"] == 1
+    
+    # 다중 질의 검색은 병합 결과를 변형별로 고른 k 중 최댓값으로 자름
+    from multi_query import MultiQueryFusionRetriever
+    retriever = MultiQueryFusionRetriever(base_retriever=workflow.retriever, strategy="lexical")
+    trace = Trace()
+    with RequestTracer(trace, "adaptive") as tracer:
+        documents = tracer.run(retriever.invoke, "부동산 투자 시 고려사항은?")
+    assert len(documents) == max(selection["k"] for selection in trace.summary()["retrieval"])
+    
+    print("✅ 적응형 검색 깊이 테스트 성공")
+
+def test_background_run():
+    """백그라운드 실행이 노드 진행과 토큰을 큐로 전달하고, 취소하면 중단되며, 간단한 결과만 남기는지 확인합니다."""
+    print("\n⏳ 백그라운드 실행 테스트 중...")
+    
+    import time
+    from background_run import BackgroundRun
+    from checkpointer import create_checkpointer
+    from components import set_chat_model_factory
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from workflow_graph import AgenticRAGWorkflow
+    
+    install_fake_chat_model(FakeChatModel(responses=["백그라운드 답변입니다"], streaming=True, tokens_per_second=20))
+    try:
+        workflow = AgenticRAGWorkflow(create_offline_pipeline(), router=None,
+                                      checkpointer=create_checkpointer("")).build_workflow()
+        
+        # 노드 시작/종료와 생성 노드의 토큰이 실행 중에 전달되고, 결과에는 답변과 경로, 추적 요약만 남음
+        run = BackgroundRun(workflow, "주식 시장 동향은?", thread_id="background")
+        assert run.wait(10) == "done"
+        assert [(entry["node"], entry["status"]) for entry in run.nodes] == [
+            ("agent", "done"), ("retrieve", "done"), ("generate", "done")]
+        assert (run.streaming_node, run.streaming_text) == ("generate", "백그라운드 답변입니다")
+        answer, metadata = run.outcome()
+        assert answer == "백그라운드 답변입니다" and metadata["workflow_path"] == ["agent", "retrieve", "generate"]
+        assert set(metadata) == {"node_name", "total_nodes", "processing_time", "workflow_path", "trace"}
+        
+        # 첫 토큰을 받은 뒤 취소하면 다음 토큰에서 중단
+        run = BackgroundRun(workflow, "금리 전망은?", thread_id="background")
+        while not any(event.kind == "token" for event in run.poll()):
+            assert not run.finished
+            time.sleep(0.01)
+        run.cancel()
+        assert run.wait(10) == "cancelled"
+        assert run.nodes[-1] == {**run.nodes[-1], "node": "generate", "status": "cancelled"}
+        answer, metadata = run.outcome()
+        assert metadata["cancelled"] and metadata["workflow_path"] == ["agent", "retrieve"]
+        
+        # 취소한 뒤에도 같은 대화 스레드로 다음 질문을 처리
+        assert BackgroundRun(workflow, "금리 전망은?", thread_id="background").wait(10) == "done"
+    finally:
+        set_chat_model_factory(None)
+    
+    print("✅ 백그라운드 실행 테스트 성공")
+
+def test_fast_path():
+    """FAQ 표의 빠른 경로가 키워드/임베딩으로 의도를 찾고, 워크플로우로 미리 만든 답변만 내보내며 오래된 답변은 버리는지 확인합니다."""
+    print("\n⚡ 빠른 경로 테스트 중...")
+    
+    import json
+    import tempfile
+    import simple_web_app
+    from checkpointer import create_checkpointer
+    from components import set_chat_model_factory
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from fast_path import ANSWERS_FILE, AhoCorasick, FastPath, FastPathBuilder, load_faq_table
+    from vector_index import VectorIndex
+    from workflow_graph import AgenticRAGWorkflow
+    
+    # 오토마톤은 겹치는 패턴과 실패 링크를 따라간 패턴도 모두 찾음
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(automaton.find("ushers")) == [(4, 0), (4, 1), (6, 3)]
+    
+    # 데모 모드: 공백/대소문자와 무관하게 키워드로 찾고, 키워드 패턴이 없으면 한 단어 데모 키워드로 찾으며,
+    # 여러 의도의 키워드가 걸리거나 키워드가 없으면 넘김
+    demo = FastPath.demo()
+    assert demo.match("Agentic RAG가 어떤 의미야?").method == "exact"
+    assert demo.match("요즘 금융시장 동향 좀 알려줘").intent == "market_trends"
+    assert [demo.match(question).intent for question in
+            ["RAG 설명해줘", "비트코인 가격은?", "시장 상황은?", "투자 전략 알려줘", "비트코인 투자 어떻게 해?"]] == [
+        "agentic_rag", "crypto_strategy", "market_trends", "portfolio", "crypto_strategy"]
+    assert demo.match("포트폴리오로 비트코인 투자 어때?") is None
+    assert demo.match("오늘 날씨는?") is None
+    assert "데모 모드" in simple_web_app.generate_simple_answer("오늘 날씨는?")
+    
+    # 서빙 모드의 키워드 단계는 키워드가 질문 대부분을 덮어야 응답
+    entries = load_faq_table()
+    fast_path_enabled = simple_web_app.FAST_PATH
+    model = install_fake_chat_model(FakeChatModel(responses=["미리 만든 답변"]))
+    try:
+        workflow = AgenticRAGWorkflow(create_offline_pipeline(), router=None,
+                                      checkpointer=create_checkpointer("")).build_workflow()
+        
+        # 오류로 끝난 실행의 답변(노드가 잡은 예외 메시지)은 빠른 경로 답변으로 저장하지 않음
+        def _unavailable(**kwargs):
+            raise RuntimeError("upstream 503")
+        
+        set_chat_model_factory(_unavailable)
+        assert len(FastPath.from_workflow(workflow, entries)) == 0
+        install_fake_chat_model(model)
+        fast_path = FastPath.from_workflow(workflow, entries)
+        assert len(fast_path) == len(entries) and set(fast_path.vectors) == {entry.intent for entry in entries}
+        assert fast_path.match("포트폴리오 자산 배분").answer == "미리 만든 답변"
+        assert fast_path.match("포트폴리오에서 삼성전자 비중은 얼마가 적당해?") is None
+        
+        # 임베딩 단계: 대표 질문과 임베딩이 같은 질문은 키워드 없이도 응답
+        fast_path.embed = lambda question: fast_path.vectors["crypto_strategy"][0]
+        match = fast_path.match("코인은 어떻게 사야 해?")
+        assert (match.intent, match.method) == ("crypto_strategy", "embedding") and match.score > 0.99
+        fast_path.attach(workflow)
+        assert fast_path.match("오늘 날씨는?") is None
+        assert fast_path.stats.snapshot()["methods"] == {"keyword": 1, "miss": 2, "embedding": 1}
+        
+        with tempfile.TemporaryDirectory() as index_dir:
+            workflow.data_pipeline.save_index(index_dir)
+            index = VectorIndex.load(index_dir)
+            fast_path.save(index_dir, index)
+            
+            # 대표 질문이 바뀐 의도의 답변과, 다른 색인으로 만든 답변은 불러오지 않음
+            changed = [entry._replace(questions=("암호화폐는 어떻게 투자해?",)) if entry.intent == "crypto_strategy"
+                       else entry for entry in entries]
+            loaded = FastPath.load(index_dir, changed, index)
+            assert len(loaded) == len(entries) - 1 and loaded.match("비트코인 투자 전략") is None
+            assert loaded.match("agentic rag란 무엇인가요?").answer == "미리 만든 답변"
+            index.info["created_at"] = "다른 색인"
+            assert FastPath.load(index_dir, entries, index) is None
+            payload = json.loads((Path(index_dir) / ANSWERS_FILE).read_text(encoding="utf-8"))
+            assert set(payload["intents"]) == {entry.intent for entry in entries}
+        
+        # /ask: FAQ 질문은 워크플로우 없이 응답하고, 대화 스레드와 다른 질문은 워크플로우로 넘김
+        simple_web_app.install_workflow(workflow, fast_path)
+        client = simple_web_app.app.test_client()
+        calls = model.call_count
+        data = client.post("/ask", json={"question": "금융 시장의 최신 동향은?"}).get_json()
+        assert data["fast_path"] == {"intent": "market_trends", "method": "exact", "score": 1.0}
+        assert data["answer"] == "미리 만든 답변" and model.call_count == calls
+        data = client.post("/ask", json={"question": "금융 시장의 최신 동향은?", "thread_id": "faq"}).get_json()
+        assert "fast_path" not in data and data["thread_id"] == "faq"
+        data = client.post("/ask", json={"question": "금융 시장의 최신 동향은?"},
+                           headers={"X-Bypass-Cache": "1"}).get_json()
+        assert "fast_path" not in data and data["admission"]["mode"] == "full"
+        assert "fast_path" not in client.post("/ask", json={"question": "금리 전망은?"}).get_json()
+        
+        # 색인이 바뀌면 이전 답변을 끄고 백그라운드에서 새 색인 버전의 빠른 경로를 만듦
+        builder = simple_web_app._fast_path_builder
+        simple_web_app.FAST_PATH = True
+        workflow.data_pipeline.index_version += 1
+        assert simple_web_app.match_fast_path("금융 시장의 최신 동향은?") is None
+        builder.thread.join(10)
+        assert simple_web_app.match_fast_path("금융 시장의 최신 동향은?").answer == "미리 만든 답변"
+        assert builder.snapshot()["version"] == workflow.data_pipeline.index_version
+        
+        # 만드는 동안 색인이 바뀌면 만든 빠른 경로를 버림
+        changing = FastPathBuilder(entries[:1])
+        embed_documents = workflow.data_pipeline.embeddings.embed_documents
+        
+        def _embed_and_change(texts):
+            workflow.data_pipeline.index_version += 1
+            return embed_documents(texts)
+        
+        workflow.data_pipeline.embeddings.embed_documents = _embed_and_change
+        try:
+            assert changing.run(workflow) is None and changing.current(workflow) is None
+        finally:
+            workflow.data_pipeline.embeddings.embed_documents = embed_documents
+        assert changing.snapshot()["discarded"] == 1
+    finally:
+        simple_web_app.FAST_PATH = fast_path_enabled
+        simple_web_app.install_workflow(None)
+        simple_web_app.WEB_APP_WORKFLOW = False
+        set_chat_model_factory(None)
+    
+    print(f"✅ 빠른 경로 테스트 성공 (평균 조회 {fast_path.stats.snapshot()['mean_match_us']:.0f}µs)")
+
+def test_answer_warmup():
+    """인기 질문 워밍업이 답변을 색인 버전과 함께 고정하고, /ask가 바로 응답하며, 색인이 바뀌면 다시 워밍업하는지 확인합니다."""
+    print("\n🔥 답변 워밍업 테스트 중...")
+    
+    import json
+    import tempfile
+    import time
+    import simple_web_app
+    from answer_cache import AnswerCache
+    from answer_warmup import AnswerWarmup, EXAMPLE_QUESTIONS, load_answers, popular_questions, save_answers
+    from fast_path import FastPath, load_faq_table
+    from components import set_chat_model_factory
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from vector_index import VectorIndex
+    from workflow_graph import AgenticRAGWorkflow
+    
+    # 고정 답변은 TTL과 LRU에서 제외되고 일반 답변으로 덮어쓰지 않으며, 색인 버전이 바뀌면 모두 버림
+    cache = AnswerCache(max_entries=2, ttl=0.01)
+    cache.put("고정 질문", "balanced", "고정 답변", version=1, pinned=True)
+    cache.put("고정 질문", "balanced", "일반 답변", version=1)
+    cache.put("질문 1", "balanced", "답변 1", version=1)
+    cache.put("질문 2", "balanced", "답변 2", version=1)
+    assert cache.get("질문 1", "balanced", 1) is None and cache.get_pinned("질문 2", "balanced", 1) is None
+    time.sleep(0.02)
+    assert cache.get_pinned("고정 질문?", "balanced", 1) == "고정 답변"
+    assert cache.get("고정 질문", "balanced", 2) is None and len(cache) == 0
+    
+    # 인기 질문: 예시 질문, 질문 파일, 질문 기록에서 자주 나온 질문 순서로 중복 없이 모음
+    with tempfile.TemporaryDirectory() as directory:
+        questions_file = os.path.join(directory, "questions.txt")
+        query_log = os.path.join(directory, "queries.jsonl")
+        with open(questions_file, "w", encoding="utf-8") as f:
+            f.write("# 주석\n금리 전망은?\n주식 시장 분석 방법은\n")
+        with open(query_log, "w", encoding="utf-8") as f:
+            for question in ["환율 전망은?", "환율 전망은", "한 번만 나온 질문", "금리 전망은?", "금리 전망은?"]:
+                f.write(json.dumps({"question": question, "used_tool": True}, ensure_ascii=False) + "\n")
+            f.write("깨진 줄\n")
+        questions = popular_questions(questions_file=questions_file, query_log=query_log)
+        assert questions == EXAMPLE_QUESTIONS + ["금리 전망은?", "환율 전망은?"]
+    
+    # 빠른 경로가 답하는 FAQ 질문은 워밍업하지 않음
+    popular = EXAMPLE_QUESTIONS[5:]
+    model = install_fake_chat_model(FakeChatModel(responses=["워밍업 답변"]))
+    warmup = simple_web_app._answer_warmup
+    fast_path = warmup.fast_path
+    try:
+        workflow = AgenticRAGWorkflow(create_offline_pipeline(), router=None).build_workflow()
+        warmup.questions = EXAMPLE_QUESTIONS
+        warmup.fast_path = FastPath(load_faq_table())
+        answers = warmup.run(workflow)
+        assert set(answers) == set(popular)
+        
+        # 색인과 함께 저장한 답변은 같은 색인에만 불러옴
+        with tempfile.TemporaryDirectory() as index_dir:
+            workflow.data_pipeline.save_index(index_dir)
+            index = VectorIndex.load(index_dir)
+            save_answers(index_dir, answers, index)
+            assert load_answers(index_dir, index) == answers
+            index.info["created_at"] = "다른 색인"
+            assert load_answers(index_dir, index) is None
+        
+        # 워밍업한 질문은 수용 제어와 워크플로우 없이 응답
+        simple_web_app.install_workflow(workflow, warm_answers=answers)
+        client = simple_web_app.app.test_client()
+        calls = model.call_count
+        data = client.post("/ask", json={"question": "은퇴 계획 수립 방법은?"}).get_json()
+        assert data["answer"] == "워밍업 답변" and data["admission"]["mode"] == "warm"
+        assert model.call_count == calls and data["processing_time"] < 0.05
+        bypassed = client.post("/ask", json={"question": "은퇴 계획 수립 방법은?"}, headers={"X-Bypass-Cache": "1"})
+        assert bypassed.get_json()["admission"]["mode"] == "full" and model.call_count > calls
+        assert client.post("/ask", json={"question": "금리 전망은?"}).get_json()["admission"]["mode"] == "full"
+        
+        # 색인이 바뀌면 이전 답변을 버리고 새 색인 버전으로 백그라운드에서 다시 워밍업
+        workflow.data_pipeline.index_version += 1
+        assert simple_web_app.warm_answer("은퇴 계획 수립 방법은?") is None
+        warmup.thread.join(10)
+        assert simple_web_app.warm_answer("은퇴 계획 수립 방법은?") == "워밍업 답변"
+        snapshot = warmup.snapshot()
+        assert snapshot["runs"] == 2 and snapshot["version"] == workflow.data_pipeline.index_version
+        assert simple_web_app._answer_cache.snapshot()["invalidations"] == 1
+        
+        # 워밍업하는 동안 색인이 바뀌면 만든 답변을 버리고 새 색인의 캐시와 버전은 그대로 둠
+        stale_cache = AnswerCache()
+        stale = AnswerWarmup(stale_cache, questions=popular[:1])
+        run_workflow = workflow.run_workflow
+        
+        def _run_and_change(*args, **kwargs):
+            workflow.data_pipeline.index_version += 1
+            return run_workflow(*args, **kwargs)
+        
+        workflow.run_workflow = _run_and_change
+        try:
+            assert stale.run(workflow) == {}
+        finally:
+            del workflow.run_workflow
+        assert stale.snapshot()["discarded"] == 1 and stale.version == workflow.data_pipeline.index_version - 1
+        assert len(stale_cache) == 0 and stale.ensure(workflow)
+        stale.thread.join(10)
+        assert stale_cache.get_pinned(popular[0], workflow.profile, workflow.data_pipeline.index_version) == "워밍업 답변"
+        
+        # 오류로 끝난 실행(노드가 잡은 예외 메시지)은 고정하지 않고 실패로 셈
+        def _unavailable(**kwargs):
+            raise RuntimeError("upstream 503")
+        
+        set_chat_model_factory(_unavailable)
+        failing_cache = AnswerCache()
+        failing = AnswerWarmup(failing_cache, questions=popular)
+        assert failing.run(workflow) == {} and len(failing_cache) == 0
+        assert failing.snapshot()["failed"] == len(popular)
+        
+        # 오류로 끝난 /ask 답변은 과부하 시 대체 응답용 답변 캐시에 저장하지 않음
+        data = client.post("/ask", json={"question": "부채 관리 방법은?"}).get_json()
+        assert "오류가 발생했습니다" in data["answer"] and data["admission"]["mode"] == "full"
+        assert simple_web_app._answer_cache.get("부채 관리 방법은?", workflow.profile,
+                                                workflow.data_pipeline.index_version) is None
+    finally:
+        warmup.questions = None
+        warmup.fast_path = fast_path
+        simple_web_app._answer_cache.clear()
+        simple_web_app.install_workflow(None)
+        simple_web_app.WEB_APP_WORKFLOW = False
+        set_chat_model_factory(None)
+    
+    print(f"✅ 답변 워밍업 테스트 성공 (워밍업 응답 {data['processing_time'] * 1000:.1f}ms)")
+
+def test_import_time():
+    """workflow_graph import가 무거운 의존성을 불러오지 않고 시간 예산 안에 끝나는지 확인합니다."""
+    print("\n=== Import 시간 테스트 ===")
+    
+    import subprocess
+    
+    # 예산은 느린 CI 머신을 고려해 넉넉하게 잡고, 무거운 의존성이 끌려오는 회귀는 모듈 이름으로 잡아냅니다
+    budget_ms = float(os.environ.get("IMPORT_TIME_BUDGET_MS", "1000"))
+    heavy_modules = {
+        "langchain", "langchain_core", "langchain_openai", "langchain_community", "langchain_text_splitters",
+        "langgraph", "chromadb", "tiktoken", "numpy", "httpx",
+    }
+    
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import workflow_graph"],
+        cwd=project_root, capture_output=True, text=True, check=True
+    )
+    
+    # 형식: "import time: self [us] | cumulative | imported package"
+    imported = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        imported[name.strip()] = int(cumulative) / 1000
+    
+    loaded = sorted(name for name in imported if name.split(".")[0] in heavy_modules)
+    assert not loaded, f"workflow_graph import가 무거운 모듈을 불러왔습니다: {loaded}"
+    assert imported["workflow_graph"] <= budget_ms, (
+        f"workflow_graph import 시간 {imported['workflow_graph']:.0f}ms가 예산 {budget_ms:.0f}ms를 넘었습니다"
+    )
+    
+    print(f"✅ Import 시간 테스트 성공 ({imported['workflow_graph']:.0f}ms, 예산 {budget_ms:.0f}ms)")
+
+def test_index_serving():
+    """읽기 전용 색인으로 만든 워크플로우를 Flask 앱에 설치해 준비 검사와 질문 처리를 확인합니다."""
+    print("\n=== 색인 서빙 테스트 ===")
+    
+    import tempfile
+    import simple_web_app
+    from components import set_chat_model_factory
+    from data_pipeline import DataPipeline
+    from fakes import FakeChatModel, create_offline_pipeline, install_fake_chat_model
+    from vector_index import VectorIndex
+    from workflow_graph import AgenticRAGWorkflow
+    
+    install_fake_chat_model(FakeChatModel(responses=["색인 답변"]))
+    try:
+        pipeline = create_offline_pipeline()
+        with tempfile.TemporaryDirectory() as index_dir:
+            pipeline.save_index(index_dir)
+            index = VectorIndex.load(index_dir, mmap=True)
+            index.warm_up()
+            
+            served = DataPipeline(embeddings=pipeline.embeddings).load_index(index)
+            assert served.document_count() == pipeline.document_count()
+            expected = pipeline.get_retriever().invoke("금리 전망")[0]
+            top = served.get_retriever().invoke("금리 전망")[0]
+            assert top.page_content == expected.page_content and isinstance(top.metadata["score"], float)
+            
+            # 워밍업은 모든 프로필을 컴파일하고 탐색 검색까지 실행 (색인은 이미 예열됨)
+            workflow = AgenticRAGWorkflow(served)
+            timings = workflow.warm_up(probe_query="금리 전망")
+            assert set(timings) == {"compile", "token_encoder", "probe"}
+            assert set(workflow.graphs) == {"fast", "balanced", "thorough"}
+            
+            simple_web_app.install_workflow(workflow)
+            client = simple_web_app.app.test_client()
+            assert client.get("/readyz").status_code == 200
+            assert client.post("/ask", json={"question": "금리 전망은?"}).get_json()["answer"] == "색인 답변"
+            
+            # 종료 중에는 준비 검사가 실패하고 활성 검사는 계속 성공
+            simple_web_app.begin_drain()
+            assert client.get("/readyz").status_code == 503
+            assert client.get("/healthz").status_code == 200
+            assert simple_web_app.wait_until_idle(1.0)
+    finally:
+        simple_web_app._draining.clear()
+        set_chat_model_factory(None)
+    
+    print("✅ 색인 서빙 테스트 성공")
+
+def main():
+    """메인 테스트 함수"""
+    print("🚀 Agentic RAG 시스템 테스트 시작")
+    print("=" * 50)
+    
+    # 1. Import 테스트
+    if not test_imports():
+        print("❌ Import 테스트 실패")
+        return
+    
+    # 2. 기본 기능 테스트
+    if not test_basic_functionality():
+        print("❌ 기본 기능 테스트 실패")
+        return
+    
+    # 3. 워크플로우 생성 테스트
+    if not test_workflow_creation():
+        print("❌ 워크플로우 생성 테스트 실패")
+        return
+    
+    # 4. 오프라인 워크플로우 테스트
+    test_offline_workflow()
+    
+    # 5. OpenAI 모의 서버 테스트
+    test_mock_openai_server()
+    
+    # 6. LLM 호출 스케줄러 테스트
+    test_llm_scheduler()
+    
+    # 7. 수용 제어 테스트
+    test_admission_control()
+    
+    # 8. Import 시간 테스트
+    test_import_time()
+    
+    # 9. 색인 서빙 테스트
+    test_index_serving()
+    
+    # 10. 대화 메모리 테스트
+    test_conversation_memory()
+    
+    # 11. 체크포인터 테스트
+    test_checkpointer()
+    
+    # 12. 검색 캐시 테스트
+    test_retrieval_cache()
+    
+    # 13. 마이크로 배치 테스트
+    test_micro_batch()
+    
+    # 14. 적응형 검색 깊이 테스트
+    test_adaptive_top_k()
+    
+    # 15. 백그라운드 실행 테스트
+    test_background_run()
+    
+    # 16. 빠른 경로 테스트
+    test_fast_path()
+    
+    # 17. 답변 워밍업 테스트
+    test_answer_warmup()
+    
+    print("\n🎉 모든 테스트 통과! 시스템이 정상적으로 작동합니다.")
+    print("이제 main.py를 실행하여 전체 시스템을 사용할 수 있습니다.")
+
+if __name__ == "__main__":
+    main()
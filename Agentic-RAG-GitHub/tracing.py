@@ -0,0 +1,491 @@
+"""
+요청 추적: 그래프 노드, 검색기, LLM 호출마다 실행 시간과 토큰/문서 수를 스팬으로 기록
+"""
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional
+from components import count_tokens
+from config import TRACE_EXPORT, TRACE_JSONL_PATH, TRACE_OTLP_ENDPOINT, TRACE_SERVICE_NAME
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 현재 요청의 추적 정보 (LangGraph 노드 스레드로 컨텍스트가 복사되어 전달됩니다)
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# 스팬으로 기록하지 않는 LangChain 내부 실행
+_INTERNAL_RUN_PREFIXES = ("ChannelWrite", "__start__", "__end__")
+
+class Span:
+    """추적 구간 하나 (노드, 검색기, LLM 호출 등)"""
+    
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: str = None):
+        self.name = name
+        self.kind = kind            # "request", "node", "edge", "retriever", "llm"
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.end_time = None
+        self._started_at = time.perf_counter()
+        self.duration = None
+        self.attributes = {}
+        self.status = "ok"
+    
+    def finish(self, error: BaseException = None):
+        """구간을 종료합니다."""
+        self.end_time = time.time()
+        self.duration = time.perf_counter() - self._started_at
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = str(error)
+    
+    def to_dict(self) -> dict:
+        """JSON Lines 내보내기용 딕셔너리로 변환합니다."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": (self.duration or 0.0) * 1000,
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+class Trace:
+    """요청 ID 하나에 속한 스팬 모음"""
+    
+    def __init__(self, request_id: str = None, received_at: float = None):
+        """
+        Args:
+            request_id: 요청 ID (없으면 생성)
+            received_at: 요청 수신 시각 (time.perf_counter 기준, 대기 시간 계산용)
+        """
+        self.request_id = request_id or uuid.uuid4().hex
+        self.received_at = received_at if received_at is not None else time.perf_counter()
+        self.root = None
+        self.spans = []
+        self.cache = {}
+        self.retrievals = []
+        self._lock = threading.Lock()
+    
+    def start_span(self, name: str, kind: str, parent: Span = None) -> Span:
+        """새 스팬을 시작합니다."""
+        span = Span(name, kind, self.request_id, parent.span_id if parent else None)
+        with self._lock:
+            self.spans.append(span)
+        return span
+    
+    def record_cache(self, cache: str, hit: bool):
+        """캐시 조회 결과를 기록합니다."""
+        with self._lock:
+            counts = self.cache.setdefault(cache, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+    
+    def record_retrieval(self, selection: dict):
+        """검색 한 번의 문서 수 선택 결과(선택한 k와 유사도 분포)를 기록합니다."""
+        with self._lock:
+            self.retrievals.append(selection)
+    
+    def summary(self) -> dict:
+        """
+        노드별 실행 시간 분석을 반환합니다.
+        
+        LLM 토큰과 검색 문서 수는 해당 호출을 실행한 노드에 합산됩니다.
+        
+        Returns:
+            dict: request_id, total_ms, queue_wait_ms, 노드 목록, 토큰 합계, 캐시 적중, 검색별 선택한 k, 저장된 프로파일 경로
+        """
+        with self._lock:
+            spans = list(self.spans)
+            retrievals = list(self.retrievals)
+        
+        by_id = {span.span_id: span for span in spans}
+        nodes = {}
+        
+        def _owner(span: Span) -> Optional[dict]:
+            while span is not None:
+                if span.span_id in nodes:
+                    return nodes[span.span_id]
+                span = by_id.get(span.parent_id)
+            return None
+        
+        for span in spans:
+            if span.kind == "node":
+                nodes[span.span_id] = {
+                    "node": span.name,
+                    "duration_ms": round((span.duration or 0.0) * 1000, 2),
+                    "queue_wait_ms": round(span.attributes.get("queue_wait_ms", 0.0), 2),
+                    "llm_calls": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "documents": 0,
+                }
+        
+        for span in spans:
+            owner = _owner(by_id.get(span.parent_id)) if span.kind in ("llm", "retriever") else None
+            if owner is None:
+                continue
+            if span.kind == "llm":
+                owner["llm_calls"] += 1
+                owner["prompt_tokens"] += span.attributes.get("prompt_tokens", 0)
+                owner["completion_tokens"] += span.attributes.get("completion_tokens", 0)
+            elif by_id.get(span.parent_id) is None or by_id[span.parent_id].kind != "retriever":
+                # 다중 질의 검색기 내부의 검색은 바깥 검색기 결과에 포함되므로 중복 집계하지 않습니다
+                owner["documents"] += span.attributes.get("documents", 0)
+        
+        node_list = list(nodes.values())
+        return {
+            "request_id": self.request_id,
+            "total_ms": round((self.root.duration or 0.0) * 1000, 2) if self.root else None,
+            "queue_wait_ms": round(self.root.attributes.get("queue_wait_ms", 0.0), 2) if self.root else 0.0,
+            "nodes": node_list,
+            "prompt_tokens": sum(node["prompt_tokens"] for node in node_list),
+            "completion_tokens": sum(node["completion_tokens"] for node in node_list),
+            "cache": dict(self.cache),
+            "retrieval": retrievals,
+            "profile_path": self.root.attributes.get("profile_path") if self.root else None,
+        }
+    
+    def to_records(self) -> List[dict]:
+        """모든 스팬을 JSON Lines 레코드 목록으로 반환합니다."""
+        with self._lock:
+            return [span.to_dict() for span in self.spans]
+    
+    def to_otlp(self, service_name: str = TRACE_SERVICE_NAME) -> dict:
+        """
+        OpenTelemetry OTLP/JSON(ExportTraceServiceRequest) 형식으로 변환합니다.
+        
+        Returns:
+            dict: /v1/traces로 전송할 수 있는 OTLP JSON
+        """
+        # OTLP 추적 ID는 16바이트(32자리 16진수)입니다
+        trace_id = self.request_id if re.fullmatch(r"[0-9a-f]{32}", self.request_id) \
+            else uuid.uuid5(uuid.NAMESPACE_OID, self.request_id).hex
+        
+        with self._lock:
+            spans = [{
+                "traceId": trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 2 if span.kind == "request" else 1,  # SERVER 또는 INTERNAL
+                "startTimeUnixNano": str(int(span.start_time * 1e9)),
+                "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+                "attributes": [
+                    _otlp_attribute(key, value)
+                    for key, value in {"span.kind": span.kind, "request.id": self.request_id,
+                                       **span.attributes}.items()
+                ],
+                "status": {"code": 2 if span.status == "error" else 1},
+            } for span in self.spans]
+        
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": "agentic-rag.tracing"}, "spans": spans}],
+            }]
+        }
+
+def _otlp_attribute(key: str, value) -> dict:
+    """속성 하나를 OTLP AnyValue 형식으로 변환합니다."""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+def current_trace() -> Optional[Trace]:
+    """현재 실행 중인 요청의 추적 정보를 반환합니다."""
+    return _current_trace.get()
+
+def record_cache(cache: str, hit: bool):
+    """
+    현재 요청의 캐시 적중/미적중을 기록합니다. (추적 중이 아니면 무시)
+    
+    Args:
+        cache: 캐시 이름 (예: "prefetch")
+        hit: 적중 여부
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_cache(cache, hit)
+
+def record_retrieval(selection: dict):
+    """
+    현재 요청의 검색 문서 수 선택 결과를 기록합니다. (추적 중이 아니면 무시)
+    
+    Args:
+        selection: 선택한 k와 유사도 분포 (adaptive_k.KSelection.profile())
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_retrieval(selection)
+
+class TracingCallbackHandler:
+    """
+    LangChain 콜백으로 그래프 노드, 조건부 엣지, 검색기, LLM 호출을 스팬으로 기록하는 핸들러
+    
+    그래프 실행의 직계 자식 실행을 노드로 보며, 노드의 대기 시간은 이전 노드가 끝난 뒤
+    이 노드가 시작되기까지의 시간입니다.
+    langchain_core.callbacks는 가져오는 데 오래 걸리므로 BaseCallbackHandler는
+    create_tracing_handler()가 처음 핸들러를 만들 때 결합합니다.
+    """
+    
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._lock = threading.Lock()
+        self._graph_runs = {}
+        self._parents = {}
+        self._spans = {}
+        self._ready_at = {}
+        self._active_nodes = {}
+    
+    def _parent_span(self, parent_run_id, metadata: dict = None) -> Optional[Span]:
+        """
+        가장 가까운 상위 스팬을 찾습니다.
+        
+        콜백을 거치지 않는 실행(도구 내부 등)으로 부모 연결이 끊기면
+        LangGraph가 메타데이터에 넣어 주는 노드 이름으로 실행 중인 노드 스팬을 찾습니다.
+        """
+        while parent_run_id is not None:
+            if parent_run_id in self._spans:
+                return self._spans[parent_run_id]
+            parent_run_id = self._parents.get(parent_run_id)
+        
+        node = (metadata or {}).get("langgraph_node")
+        return self._active_nodes.get(node) or self.trace.root
+    
+    def _start(self, run_id, parent_run_id, name: str, kind: str, metadata: dict = None) -> Span:
+        span = self.trace.start_span(name, kind, self._parent_span(parent_run_id, metadata))
+        self._spans[run_id] = span
+        if kind == "node":
+            self._active_nodes[name] = span
+        return span
+    
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or ""
+        
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            
+            if parent_run_id is None:
+                self._graph_runs[run_id] = name
+                self._ready_at[run_id] = time.perf_counter()
+            elif parent_run_id in self._graph_runs:
+                if name.startswith(_INTERNAL_RUN_PREFIXES):
+                    return
+                span = self._start(run_id, parent_run_id, name, "node")
+                ready_at = self._ready_at.get(parent_run_id, span._started_at)
+                span.attributes["queue_wait_ms"] = max(0.0, span._started_at - ready_at) * 1000
+            elif parent_run_id in self._spans and self._spans[parent_run_id].kind == "node" \
+                    and not name.startswith(_INTERNAL_RUN_PREFIXES) \
+                    and any(tag.startswith("seq:step:") and tag != "seq:step:1" for tag in kwargs.get("tags") or []):
+                # LangGraph는 노드를 (노드 함수, 채널 쓰기, 조건부 엣지) 시퀀스로 실행하므로
+                # 두 번째 단계 이후의 실행이 노드 뒤의 조건부 엣지 함수입니다
+                self._start(run_id, parent_run_id, name, "edge")
+    
+    def _end(self, run_id, error: BaseException = None) -> Optional[Span]:
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+            parent_run_id = self._parents.pop(run_id, None)
+            self._graph_runs.pop(run_id, None)
+            self._ready_at.pop(run_id, None)
+            
+            if span is not None:
+                span.finish(error)
+                if span.kind == "node":
+                    if self._active_nodes.get(span.name) is span:
+                        del self._active_nodes[span.name]
+                    if parent_run_id in self._ready_at:
+                        self._ready_at[parent_run_id] = time.perf_counter()
+        return span
+    
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+    
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+    
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            span = self._start(run_id, parent_run_id, kwargs.get("name") or "retriever", "retriever",
+                               kwargs.get("metadata"))
+            span.attributes["query"] = query
+    
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is not None:
+            span.attributes["documents"] = len(documents)
+    
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+    
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            span = self._start(run_id, parent_run_id, kwargs.get("name") or "chat_model", "llm",
+                               kwargs.get("metadata"))
+            span.attributes["prompt_tokens"] = sum(
+                count_tokens(str(message.content)) for batch in messages for message in batch
+            )
+    
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is None:
+            return
+        
+        completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    # 모델이 보고한 사용량을 우선 사용합니다
+                    span.attributes["prompt_tokens"] = usage.get("input_tokens", span.attributes["prompt_tokens"])
+                    completion_tokens += usage.get("output_tokens", 0)
+                else:
+                    completion_tokens += count_tokens(generation.text or str(getattr(message, "content", "")))
+        span.attributes["completion_tokens"] = completion_tokens
+    
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+@lru_cache(maxsize=1)
+def _callback_handler_class() -> type:
+    from langchain_core.callbacks import BaseCallbackHandler
+    return type("TracingCallbackHandler", (TracingCallbackHandler, BaseCallbackHandler), {})
+
+def create_tracing_handler(trace: Trace) -> TracingCallbackHandler:
+    """추적 정보를 기록하는 LangChain 콜백 핸들러를 생성합니다."""
+    return _callback_handler_class()(trace)
+
+class JsonlSpanExporter:
+    """스팬을 JSON Lines 파일에 추가하는 내보내기"""
+    
+    def __init__(self, path: str = TRACE_JSONL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def export(self, trace: Trace):
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in trace.to_records())
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"스팬 기록 실패: {str(e)}")
+
+class OtlpHttpExporter:
+    """OTLP/HTTP(JSON)로 OpenTelemetry 수집기에 스팬을 전송하는 내보내기"""
+    
+    def __init__(self, endpoint: str = TRACE_OTLP_ENDPOINT, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+        # 전송 지연이 요청 경로에 영향을 주지 않도록 백그라운드에서 전송합니다
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="otlp-export")
+    
+    def _send(self, payload: bytes):
+        request = urllib.request.Request(self.url, data=payload, headers={"Content-Type": "application/json"})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+        except Exception as e:
+            logger.warning(f"OTLP 스팬 전송 실패: {str(e)}")
+    
+    def export(self, trace: Trace):
+        self._executor.submit(self._send, json.dumps(trace.to_otlp()).encode("utf-8"))
+
+def create_exporters(names: str = TRACE_EXPORT) -> list:
+    """
+    설정에 따라 스팬 내보내기를 생성합니다.
+    
+    Args:
+        names: 쉼표로 구분한 내보내기 이름 ("jsonl", "otlp", 비어 있으면 내보내지 않음)
+    
+    Returns:
+        list: 내보내기 목록
+    """
+    exporters = []
+    for name in (part.strip() for part in names.split(",")):
+        if name == "jsonl":
+            exporters.append(JsonlSpanExporter())
+        elif name == "otlp":
+            exporters.append(OtlpHttpExporter())
+        elif name:
+            logger.warning(f"알 수 없는 스팬 내보내기: {name}")
+    return exporters
+
+class RequestTracer:
+    """
+    워크플로우 실행 한 건을 추적하고 끝나면 스팬을 내보내는 컨텍스트 관리자
+    
+    현재 추적(current_trace)은 호출한 쪽의 컨텍스트가 아니라 복사한 컨텍스트(self.context)에만 설정하며,
+    그래프 실행은 run()과 iterate()로 그 컨텍스트 안에서 수행합니다. 따라서 노드 출력을 yield하는 동안
+    소비자의 컨텍스트로 추적이 새지 않고, 다른 컨텍스트에서 제너레이터를 닫아도 컨텍스트 복원 오류가 나지 않습니다.
+    """
+    
+    def __init__(self, trace: Trace, name: str, exporters: list = None, **attributes):
+        self.trace = trace
+        self.name = name
+        self.exporters = exporters or []
+        self.attributes = attributes
+        self.handler = create_tracing_handler(trace)
+        self.context = None
+    
+    def __enter__(self) -> 'RequestTracer':
+        root = self.trace.start_span(self.name, "request")
+        root.attributes.update(self.attributes)
+        root.attributes["queue_wait_ms"] = max(0.0, root._started_at - self.trace.received_at) * 1000
+        self.trace.root = root
+        self.context = contextvars.copy_context()
+        self.context.run(_current_trace.set, self.trace)
+        return self
+    
+    def run(self, func: Callable, *args, **kwargs):
+        """함수를 추적 컨텍스트에서 실행합니다."""
+        return self.context.run(func, *args, **kwargs)
+    
+    def iterate(self, iterable: Iterable) -> Iterator:
+        """
+        이터러블을 추적 컨텍스트에서 한 단계씩 실행합니다 (그래프 스트림 등).
+        
+        각 단계만 컨텍스트 안에서 실행하고 yield하는 동안에는 컨텍스트를 잡지 않습니다.
+        """
+        iterator = self.context.run(iter, iterable)
+        try:
+            while True:
+                try:
+                    item = self.context.run(next, iterator)
+                except StopIteration:
+                    return
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                self.context.run(close)
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.root.finish(exc)
+        
+        for exporter in self.exporters:
+            try:
+                exporter.export(self.trace)
+            except Exception as e:
+                logger.warning(f"스팬 내보내기 실패: {str(e)}")
+        return False
@@ -0,0 +1,191 @@
+"""
+읽기 전용 벡터 색인: 벡터 스토어를 파일로 저장하고 메모리 매핑으로 불러와 프로세스 간 공유
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from config import RETRIEVAL_TOP_K
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+
+# 색인 페이지를 미리 읽을 때 한 번에 읽는 행 수
+_WARM_UP_ROWS = 4096
+
+class VectorIndex:
+    """
+    정규화된 임베딩 행렬과 문서 목록으로 이루어진 읽기 전용 색인
+    
+    벡터는 float32 .npy 파일로 저장되어 np.load(mmap_mode="r")로 열 수 있으므로,
+    마스터 프로세스가 연 색인을 fork한 워커들이 같은 페이지 캐시를 복사 없이 공유합니다.
+    검색은 코사인 유사도(정규화된 벡터의 내적)로 순위를 매깁니다.
+    """
+    
+    def __init__(self, vectors: np.ndarray, documents: List[Document], info: dict = None):
+        if len(vectors) != len(documents):
+            raise ValueError(f"벡터 수({len(vectors)})와 문서 수({len(documents)})가 다릅니다")
+        self.vectors = vectors
+        self.documents = documents
+        self.info = info or {}
+        self.warmed_up = False
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1] if self.vectors.ndim == 2 else 0
+    
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> 'VectorIndex':
+        """Chroma 벡터 스토어의 모든 청크와 임베딩으로 색인을 만듭니다."""
+        data = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+        vectors = _normalize(np.asarray(data["embeddings"], dtype=np.float32))
+        documents = [
+            Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        ]
+        return cls(vectors, documents)
+    
+    def save(self, path: str) -> Path:
+        """
+        색인을 디렉터리에 저장합니다.
+        
+        Args:
+            path: 저장할 디렉터리
+        
+        Returns:
+            Path: 저장한 디렉터리
+        """
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / VECTORS_FILE, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        
+        payload = {
+            "created_at": datetime.now().isoformat(),
+            "dimension": self.dimension,
+            **self.info,
+            "documents": [
+                {"id": document.id, "page_content": document.page_content, "metadata": document.metadata}
+                for document in self.documents
+            ],
+        }
+        (directory / DOCUMENTS_FILE).write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        logger.info(f"벡터 색인 저장 완료: {directory} ({len(self)}개 청크)")
+        return directory
+    
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'VectorIndex':
+        """
+        저장된 색인을 불러옵니다.
+        
+        Args:
+            path: 색인 디렉터리
+            mmap: 벡터 파일을 메모리 매핑으로 열지 여부 (False면 프로세스 메모리로 읽음)
+        
+        Returns:
+            VectorIndex: 불러온 색인
+        """
+        directory = Path(path)
+        vectors = np.load(directory / VECTORS_FILE, mmap_mode="r" if mmap else None)
+        payload = json.loads((directory / DOCUMENTS_FILE).read_text(encoding="utf-8"))
+        documents = [
+            Document(page_content=item["page_content"], metadata=item.get("metadata") or {}, id=item.get("id"))
+            for item in payload.pop("documents")
+        ]
+        logger.info(f"벡터 색인 로드 완료: {directory} ({len(documents)}개 청크, mmap={mmap})")
+        return cls(vectors, documents, payload)
+    
+    def warm_up(self) -> float:
+        """
+        벡터 페이지를 모두 읽어 페이지 캐시에 올립니다.
+        
+        Returns:
+            float: 걸린 시간 (초)
+        """
+        start = time.perf_counter()
+        for offset in range(0, len(self.vectors), _WARM_UP_ROWS):
+            float(np.asarray(self.vectors[offset:offset + _WARM_UP_ROWS]).sum())
+        self.warmed_up = True
+        return time.perf_counter() - start
+    
+    def search(self, query_vector: List[float], k: int = RETRIEVAL_TOP_K) -> List[Tuple[Document, float]]:
+        """
+        질의 벡터와 가장 비슷한 문서를 찾습니다.
+        
+        Args:
+            query_vector: 질의 임베딩
+            k: 반환할 문서 수
+        
+        Returns:
+            List[Tuple[Document, float]]: (문서, 코사인 유사도) 목록 (유사도 내림차순)
+        """
+        return self.search_batch([query_vector], k)[0]
+        
+    def search_batch(self, query_vectors: List[List[float]],
+                     k: int = RETRIEVAL_TOP_K) -> List[List[Tuple[Document, float]]]:
+        """
+        여러 질의 벡터를 행렬 곱 한 번으로 검색합니다.
+        
+        색인 벡터를 질의마다 한 번씩 읽는 대신 한 번만 읽으므로, 동시에 들어온 질의를 묶으면
+        질의당 검색 비용이 줄어듭니다.
+        
+        Args:
+            query_vectors: 질의 임베딩 목록
+            k: 질의마다 반환할 문서 수
+        
+        Returns:
+            List[List[Tuple[Document, float]]]: 질의 순서대로 (문서, 코사인 유사도) 목록 (유사도 내림차순)
+        """
+        if not len(self) or not len(query_vectors):
+            return [[] for _ in query_vectors]
+        
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32))
+        scores = self.vectors @ queries.T
+        k = min(k, len(scores))
+        results = []
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column]
+            top = np.argpartition(-column_scores, k - 1)[:k]
+            top = top[np.argsort(-column_scores[top])]
+            results.append([(self.documents[i], float(column_scores[i])) for i in top])
+        return results
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class VectorIndexRetriever(BaseRetriever):
+    """
+    읽기 전용 벡터 색인을 사용하는 검색기
+    
+    반환하는 문서의 metadata["score"]에 코사인 유사도를 담습니다. 색인의 문서는 여러 요청이 공유하므로
+    본문 문자열은 그대로 참조하고 metadata만 새로 만든 문서를 반환합니다.
+    """
+    
+    index: VectorIndex
+    embeddings: Embeddings
+    k: int = RETRIEVAL_TOP_K
+    
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        query_vector = self.embeddings.embed_query(query)
+        return [
+            Document(page_content=document.page_content, metadata={**document.metadata, "score": score},
+                     id=document.id)
+            for document, score in self.index.search(query_vector, self.k)
+        ]
@@ -1,207 +1,909 @@
-"""
-워크플로우 그래프: LangGraph를 사용한 Agentic RAG 워크플로우 구성
-"""
-import logging
-from langgraph.graph import END, StateGraph, START
-from langgraph.prebuilt import ToolNode
-from components import AgentState, ToolManager, create_tools_condition
-from workflow_nodes import agent, grade_documents, rewrite, generate
-from data_pipeline import DataPipeline
-
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class AgenticRAGWorkflow:
-    """Agentic RAG 워크플로우 클래스"""
-    
-    def __init__(self, data_pipeline: DataPipeline = None):
-        self.data_pipeline = data_pipeline
-        self.tool_manager = None
-        self.workflow = None
-        self.graph = None
-        
-        if data_pipeline:
-            self._initialize_tools()
-    
-    def _initialize_tools(self):
-        """도구를 초기화합니다."""
-        if self.data_pipeline:
-            retriever = self.data_pipeline.get_retriever()
-            self.tool_manager = ToolManager(retriever)
-            logger.info("도구 초기화 완료")
-    
-    def build_workflow(self) -> 'AgenticRAGWorkflow':
-        """워크플로우를 구축합니다."""
-        logger.info("워크플로우 구축 시작")
-        
-        try:
-            # 워크플로우를 정의합니다.
-            self.workflow = StateGraph(AgentState)
-            
-            # 순환할 노드들을 정의합니다.
-            self.workflow.add_node("agent", agent)  # 에이전트 노드
-            
-            # 검색 도구 노드 (ToolNode 사용)
-            if self.tool_manager:
-                retrieve = ToolNode(self.tool_manager.get_tools())
-            else:
-                # 도구가 없는 경우 임시 노드 생성
-                retrieve = self._create_temp_retrieve_node()
-            
-            self.workflow.add_node("retrieve", retrieve)  # 검색 도구 노드
-            self.workflow.add_node("rewrite", rewrite)    # 질문 재작성 노드
-            self.workflow.add_node("generate", generate)  # 답변 생성 노드
-            
-            # 엣지(Edge) 및 조건부 엣지(Conditional Edge) 설정
-            self._setup_edges()
-            
-            # 그래프 컴파일
-            self.graph = self.workflow.compile()
-            
-            logger.info("워크플로우 구축 완료")
-            return self
-            
-        except Exception as e:
-            logger.error(f"워크플로우 구축 실패: {str(e)}")
-            raise
-    
-    def _create_temp_retrieve_node(self):
-        """임시 검색 노드를 생성합니다."""
-        def temp_retrieve(state):
-            logger.info("---임시 검색 노드 실행---")
-            # 실제 검색 대신 더미 데이터 반환
-            from langchain_core.messages import AIMessage
-            dummy_content = "임시 검색 결과: 금융 정보에 대한 기본 데이터입니다."
-            return {"messages": [AIMessage(content=dummy_content)]}
-        
-        return temp_retrieve
-    
-    def _setup_edges(self):
-        """워크플로우의 엣지를 설정합니다."""
-        # 에이전트 노드를 호출하여 검색을 결정합니다.
-        self.workflow.add_edge(START, "agent")
-        
-        # 검색 여부를 결정합니다.
-        self.workflow.add_conditional_edges(
-            "agent",
-            # 에이전트 결정 평가
-            create_tools_condition,
-            {
-                # 조건 출력을 그래프 내 노드로 변환, 반환 값: 실행 노드
-                "tools": "retrieve",
-                "end": END,
-            },
-        )
-        
-        # 검색 후 문서 관련성 평가
-        self.workflow.add_conditional_edges(
-            "retrieve",
-            # 문서 관련성 평가
-            grade_documents,
-            {
-                # 조건 출력을 그래프 내 노드로 변환, 반환 값: 실행 노드
-                "generate": "generate",
-                "rewrite": "rewrite",
-            },
-        )
-        
-        # 최종 엣지 설정
-        self.workflow.add_edge("generate", END)
-        self.workflow.add_edge("rewrite", "agent")  # 재작성 후 에이전트로 돌아감
-    
-    def get_graph(self):
-        """컴파일된 그래프를 반환합니다."""
-        if self.graph is None:
-            raise ValueError("그래프가 컴파일되지 않았습니다. build_workflow()을 먼저 실행하세요.")
-        return self.graph
-    
-    def visualize_graph(self):
-        """그래프를 시각화합니다."""
-        try:
-            graph = self.get_graph()
-            # Mermaid 다이어그램 생성
-            mermaid_diagram = graph.get_graph(xray=True).draw_mermaid()
-            logger.info("Mermaid 다이어그램 생성 완료")
-            return mermaid_diagram
-        except Exception as e:
-            logger.error(f"그래프 시각화 실패: {str(e)}")
-            return None
-    
-    def run_workflow(self, question: str):
-        """워크플로우를 실행합니다."""
-        try:
-            from langchain_core.messages import HumanMessage
-            
-            # 입력 준비
-            inputs = {
-                "messages": [
-                    HumanMessage(content=question),
-                ]
-            }
-            
-            logger.info(f"워크플로우 실행 시작: {question}")
-            
-            # 그래프 실행
-            graph = self.get_graph()
-            results = []
-            
-            for output in graph.stream(inputs):
-                for key, value in output.items():
-                    logger.info(f"노드 '{key}'의 출력 결과:")
-                    logger.info(f"  {value}")
-                    results.append((key, value))
-            
-            logger.info("워크플로우 실행 완료")
-            return results
-            
-        except Exception as e:
-            logger.error(f"워크플로우 실행 실패: {str(e)}")
-            raise
-
-def create_workflow_with_data_pipeline() -> AgenticRAGWorkflow:
-    """데이터 파이프라인과 함께 워크플로우를 생성합니다."""
-    try:
-        # 데이터 파이프라인 구축
-        logger.info("데이터 파이프라인 구축 시작")
-        data_pipeline = DataPipeline()
-        data_pipeline.build_pipeline()
-        logger.info("데이터 파이프라인 구축 완료")
-        
-        # 워크플로우 생성
-        workflow = AgenticRAGWorkflow(data_pipeline)
-        workflow.build_workflow()
-        
-        return workflow
-        
-    except Exception as e:
-        logger.error(f"워크플로우 생성 실패: {str(e)}")
-        raise
-
-def main():
-    """메인 실행 함수"""
-    try:
-        # 워크플로우 생성
-        workflow = create_workflow_with_data_pipeline()
-        
-        # 그래프 시각화
-        mermaid_diagram = workflow.visualize_graph()
-        if mermaid_diagram:
-            print("워크플로우 구조:")
-            print(mermaid_diagram)
-        
-        # 테스트 실행
-        test_question = "agentic rag가 어떤 의미야?"
-        print(f"\n테스트 질문: {test_question}")
-        
-        results = workflow.run_workflow(test_question)
-        
-        print("\n실행 결과:")
-        for node_name, result in results:
-            print(f"\n{node_name}: {result}")
-        
-    except Exception as e:
-        print(f"오류 발생: {str(e)}")
-
-if __name__ == "__main__":
-    main()
+"""
+워크플로우 그래프: LangGraph를 사용한 Agentic RAG 워크플로우 구성
+
+LangGraph, 워크플로우 노드, 다중 질의 검색기는 모듈을 불러올 때가 아니라 그래프를 컴파일할 때 가져오므로
+모듈 import는 가볍고, 무거운 초기화는 warm_up()에서 요청 경로 밖으로 미리 끝낼 수 있습니다.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Iterator, List, Tuple
+from components import (
+    ToolManager, count_tokens, create_tools_condition, get_last_user_message, to_retrieved_documents
+)
+from data_pipeline import DataPipeline
+from prefetch import RetrievalPrefetcher
+from router import BaseRouter, DecisionLog, RouterStats, create_router, maybe_shadow_check
+from tracing import RequestTracer, Trace, create_exporters, current_trace
+from metrics import IN_FLIGHT, INDEX_SIZE, record_workflow
+from profiling import ProfileRing, RequestProfiler
+from coalesce import CoalesceTimeout, SingleFlight, coalesce_key
+from memory import ConversationMemory
+from config import (
+    SPECULATIVE_GENERATION, PREFETCH_RETRIEVAL, RETRIEVAL_MODE, GRAPH_PROFILE, COALESCE_REQUESTS, LLM_SCHEDULER,
+    WARM_UP, WARM_UP_PROBE_QUERY, MAX_REWRITES, CONVERSATION_MEMORY, RETRIEVAL_CACHE,
+    MICRO_BATCH, ADAPTIVE_TOP_K
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 요청별로 선택할 수 있는 그래프 프로필
+GRAPH_PROFILES = {
+    "fast": "retrieve → generate (에이전트 호출과 문서 평가 없음, 최저 지연)",
+    "balanced": "agent → retrieve → 문서 평가 → generate/rewrite (재작성 횟수 제한)",
+    "thorough": "다중 질의 검색 → 문서별 평가 및 재정렬 → generate/rewrite (최고 품질)",
+}
+
+class AgenticRAGWorkflow:
+    """Agentic RAG 워크플로우 클래스"""
+    
+    def __init__(self, data_pipeline: DataPipeline = None, speculative: bool = SPECULATIVE_GENERATION,
+                 prefetch: bool = PREFETCH_RETRIEVAL, retrieval_mode: str = RETRIEVAL_MODE,
+                 router: BaseRouter = None, profile: str = GRAPH_PROFILE, coalesce: bool = COALESCE_REQUESTS,
+                 memory: bool = CONVERSATION_MEMORY, checkpointer: 'BaseCheckpointSaver' = None,
+                 retrieval_cache: bool = RETRIEVAL_CACHE, micro_batch: bool = MICRO_BATCH,
+                 adaptive_top_k: bool = ADAPTIVE_TOP_K):
+        self.data_pipeline = data_pipeline
+        self.speculative = speculative
+        self.prefetch = prefetch
+        self.retrieval_mode = retrieval_mode
+        self.router = router if router is not None else create_router()
+        self.router_stats = RouterStats()
+        self.decision_log = DecisionLog()
+        self.span_exporters = create_exporters()
+        self.profile_ring = ProfileRing()
+        self.single_flight = SingleFlight() if coalesce else None
+        self.memory = ConversationMemory() if memory else None
+        self.use_retrieval_cache = retrieval_cache
+        self.retrieval_cache = None
+        self.micro_batch = micro_batch
+        self.batching_searcher = None
+        self.use_adaptive_top_k = adaptive_top_k
+        self.adaptive_top_k = None
+        # 스레드 ID로 이어 가는 요청을 처음 실행할 때 생성 (CHECKPOINT_PATH)
+        self.checkpointer = checkpointer
+        self.persistent_graphs = {}
+        self.profile = profile
+        self.retriever = None
+        self.tool_manager = None
+        self.prefetcher = None
+        self.workflow = None
+        self.graph = None
+        self.graphs = {}
+        self._graph_lock = threading.Lock()
+        
+        if data_pipeline:
+            self._initialize_tools()
+            # 색인 크기는 /metrics 조회 시점에 계산
+            INDEX_SIZE.set_function(data_pipeline.document_count)
+    
+    def _initialize_tools(self):
+        """도구를 초기화합니다."""
+        if self.data_pipeline:
+            retriever = self.data_pipeline.get_retriever()
+            
+            if self.use_retrieval_cache or self.micro_batch or self.use_adaptive_top_k:
+                from retrieval_cache import CachedRetriever, RetrievalCache
+                
+                if self.micro_batch:
+                    from micro_batch import BatchingSearcher
+                    
+                    # 동시 요청의 질의 임베딩과 벡터 검색을 묶어 처리
+                    self.batching_searcher = BatchingSearcher(self.data_pipeline)
+                
+                # 재작성, 재시도, 자주 묻는 질문의 임베딩 호출과 검색을 건너뜀 (다중 질의 변형도 각각 캐시)
+                if self.use_retrieval_cache:
+                    self.retrieval_cache = RetrievalCache()
+                
+                # 후보를 넉넉히 검색하고 유사도 분포로 평가/생성에 보낼 문서 수를 고름
+                if self.use_adaptive_top_k:
+                    from adaptive_k import AdaptiveTopK
+                    
+                    self.adaptive_top_k = AdaptiveTopK()
+                retriever = CachedRetriever(pipeline=self.data_pipeline, cache=self.retrieval_cache,
+                                            searcher=self.batching_searcher, adaptive=self.adaptive_top_k)
+            
+            if self.retrieval_mode == "multi_query":
+                from multi_query import MultiQueryFusionRetriever
+                
+                # 질의 변형을 병렬로 검색하고 RRF로 병합
+                retriever = MultiQueryFusionRetriever(base_retriever=retriever)
+            
+            self.retriever = retriever
+            self.tool_manager = ToolManager(retriever)
+            
+            if self.prefetch:
+                self.prefetcher = RetrievalPrefetcher(retriever)
+            
+            logger.info("도구 초기화 완료")
+    
+    def embed_query(self, query: str) -> List[float]:
+        """검색과 같은 경로(검색 캐시, 마이크로 배치)로 질의 임베딩을 계산합니다."""
+        searcher = self.batching_searcher or self.data_pipeline
+        if self.retrieval_cache is not None:
+            return self.retrieval_cache.embed(query, searcher.embed_query)
+        return searcher.embed_query(query)
+    
+    def build_workflow(self, profile: str = None) -> 'AgenticRAGWorkflow':
+        """워크플로우를 구축합니다."""
+        profile = profile or self.profile
+        logger.info(f"워크플로우 구축 시작 (프로필: {profile})")
+        
+        try:
+            self.workflow, self.graph = self._compile_profile(profile)
+            self.graphs[profile] = self.graph
+            self.profile = profile
+            
+            logger.info("워크플로우 구축 완료")
+            return self
+            
+        except Exception as e:
+            logger.error(f"워크플로우 구축 실패: {str(e)}")
+            raise
+    
+    def build_all_profiles(self) -> 'AgenticRAGWorkflow':
+        """모든 그래프 프로필을 미리 컴파일합니다."""
+        if self.graph is None:
+            self.build_workflow()
+        
+        for profile in GRAPH_PROFILES:
+            self.get_graph(profile)
+        
+        return self
+    
+    def warm_up(self, probe_query: str = WARM_UP_PROBE_QUERY) -> dict:
+        """
+        첫 요청이 치르던 초기화 비용을 요청 경로 밖에서 미리 치릅니다.
+        
+        - 모든 그래프 프로필 컴파일 (LangGraph, 노드 모듈, 다중 질의 검색기 import 포함)
+        - 토큰 수 계산용 tiktoken 인코더 로드
+        - 읽기 전용 색인의 벡터 페이지를 페이지 캐시에 올림
+        - 탐색 질의로 임베딩 클라이언트 연결과 검색 경로를 한 번 실행
+        
+        Args:
+            probe_query: 검색기에 보낼 탐색 질의 (빈 문자열이면 생략)
+        
+        Returns:
+            dict: 단계별 소요 시간 (ms)
+        """
+        timings = {}
+        
+        def _timed(step: str, func):
+            started_at = time.perf_counter()
+            func()
+            timings[step] = (time.perf_counter() - started_at) * 1000
+        
+        _timed("compile", self.build_all_profiles)
+        _timed("token_encoder", lambda: count_tokens("warm up"))
+        
+        index = getattr(self.data_pipeline, "index", None)
+        if index is not None and not index.warmed_up:
+            _timed("index", index.warm_up)
+        
+        if self.data_pipeline and probe_query:
+            from llm_scheduler import llm_priority
+            
+            # 다중 질의 검색기는 질의 변형에 LLM을 호출할 수 있으므로 기본 검색기로 탐색합니다
+            retriever = self.data_pipeline.get_retriever()
+            try:
+                with llm_priority("batch"):
+                    _timed("probe", lambda: retriever.invoke(probe_query))
+            except Exception as e:
+                logger.warning(f"워밍업 탐색 검색 실패: {str(e)}")
+        
+        logger.info("워밍업 완료: " + ", ".join(f"{step} {ms:.0f}ms" for step, ms in timings.items()))
+        return timings
+    
+    def _compile_profile(self, profile: str):
+        """그래프 프로필에 맞는 워크플로우를 정의하고 컴파일합니다."""
+        builders = {
+            "fast": self._build_fast_graph,
+            "balanced": self._build_balanced_graph,
+            "thorough": self._build_thorough_graph,
+        }
+        
+        if profile not in builders:
+            raise ValueError(f"알 수 없는 그래프 프로필입니다: {profile} (사용 가능: {', '.join(GRAPH_PROFILES)})")
+        
+        from langgraph.graph import StateGraph
+        from components import AgentState
+        
+        # 워크플로우를 정의합니다.
+        workflow = StateGraph(AgentState)
+        builders[profile](workflow)
+        
+        # 그래프 컴파일
+        return workflow, workflow.compile()
+    
+    def _build_balanced_graph(self, workflow: 'StateGraph'):
+        """기본 그래프: agent → retrieve → 평가 → generate/rewrite (재작성 횟수 제한)"""
+        from workflow_nodes import generate, rewrite, speculative_generate
+        
+        # 순환할 노드들을 정의합니다.
+        agent_node = self._create_agent_node()
+        workflow.add_node("agent", agent_node)  # 에이전트 노드
+        
+        # 에이전트 앞단의 경량 라우터 노드
+        if self._use_router():
+            workflow.add_node("route", self._create_route_node(agent_node))
+        
+        # 검색 노드 (검색 결과를 상태의 documents에 저장)
+        retrieve = self._create_retrieve_node()
+        if self.prefetcher:
+            retrieve = self._create_prefetch_retrieve_node(retrieve)
+        
+        workflow.add_node("retrieve", retrieve)  # 검색 도구 노드
+        workflow.add_node("rewrite", rewrite)    # 질문 재작성 노드
+        
+        if self.speculative:
+            # 평가와 생성을 병렬로 실행하는 추측 생성 노드
+            workflow.add_node("speculate", speculative_generate)
+        else:
+            workflow.add_node("generate", generate)  # 답변 생성 노드
+        
+        # 엣지(Edge) 및 조건부 엣지(Conditional Edge) 설정
+        self._setup_edges(workflow)
+    
+    def _build_fast_graph(self, workflow: 'StateGraph'):
+        """빠른 그래프: retrieve → generate (에이전트 호출과 문서 평가 없음)"""
+        from langgraph.graph import END, START
+        from workflow_nodes import generate
+        
+        workflow.add_node("route", self._create_direct_route_node())
+        workflow.add_node("retrieve", self._create_retrieve_node())
+        workflow.add_node("generate", generate)
+        
+        workflow.add_edge(START, "route")
+        workflow.add_edge("route", "retrieve")
+        workflow.add_edge("retrieve", "generate")
+        workflow.add_edge("generate", END)
+    
+    def _build_thorough_graph(self, workflow: 'StateGraph'):
+        """꼼꼼한 그래프: 다중 질의 검색 → 문서별 평가 및 재정렬 → generate/rewrite"""
+        from langgraph.graph import END
+        from multi_query import MultiQueryFusionRetriever
+        from workflow_nodes import generate, grade_each_document, rewrite, route_after_document_grading
+        
+        agent_node = self._create_agent_node()
+        workflow.add_node("agent", agent_node)
+        
+        if self._use_router():
+            workflow.add_node("route", self._create_route_node(agent_node))
+        
+        if self.tool_manager:
+            retriever = self.retriever
+            if not isinstance(retriever, MultiQueryFusionRetriever):
+                retriever = MultiQueryFusionRetriever(base_retriever=retriever)
+            retrieve = self._create_document_retrieve_node(retriever)
+        else:
+            retrieve = self._create_temp_retrieve_node()
+        
+        workflow.add_node("retrieve", retrieve)
+        workflow.add_node("grade_documents", grade_each_document)
+        workflow.add_node("rewrite", rewrite)
+        workflow.add_node("generate", generate)
+        
+        self._setup_entry_edges(workflow)
+        workflow.add_edge("retrieve", "grade_documents")
+        workflow.add_conditional_edges(
+            "grade_documents",
+            route_after_document_grading,
+            {
+                "generate": "generate",
+                "rewrite": "rewrite",
+            },
+        )
+        workflow.add_edge("generate", END)
+        workflow.add_edge("rewrite", "agent")
+    
+    def _create_agent_node(self):
+        """에이전트 노드를 생성합니다."""
+        from workflow_nodes import agent, create_agent_node
+        
+        if self.tool_manager:
+            return self._create_logged_agent_node(
+                create_agent_node(self.tool_manager.get_tools(), self.memory)
+            )
+        return agent
+    
+    def _create_retrieve_node(self):
+        """검색 도구 노드를 생성합니다."""
+        if self.tool_manager:
+            return self._create_document_retrieve_node(self.retriever)
+        
+        # 도구가 없는 경우 임시 노드 생성
+        return self._create_temp_retrieve_node()
+    
+    def _create_temp_retrieve_node(self):
+        """임시 검색 노드를 생성합니다."""
+        def temp_retrieve(state):
+            logger.info("---임시 검색 노드 실행---")
+            # 실제 검색 대신 더미 데이터 반환
+            from langchain_core.documents import Document
+            from langchain_core.messages import AIMessage
+            dummy_content = "임시 검색 결과: 금융 정보에 대한 기본 데이터입니다."
+            return {
+                "messages": [AIMessage(content=dummy_content)],
+                "documents": to_retrieved_documents([Document(page_content=dummy_content)]),
+            }
+        
+        return temp_retrieve
+    
+    def _use_router(self) -> bool:
+        """라우터 노드를 사용할지 여부를 반환합니다."""
+        return self.router is not None and self.tool_manager is not None
+    
+    def _create_logged_agent_node(self, agent_node):
+        """에이전트의 도구 호출 결정을 라우터 학습용으로 기록하는 노드를 생성합니다."""
+        decision_log = self.decision_log
+        
+        def logged_agent(state):
+            result = agent_node(state)
+            
+            # 원본 질문에 대한 첫 결정만 기록합니다 (재작성 이후 결정 제외)
+            last_message = state["messages"][-1]
+            if getattr(last_message, "type", None) == "human":
+                response = result["messages"][-1]
+                used_tool = bool(getattr(response, "tool_calls", None))
+                decision_log.append(last_message.content, used_tool)
+            
+            return result
+        
+        return logged_agent
+    
+    def _create_tool_call_message(self, query: str) -> 'AIMessage':
+        """에이전트가 만들었을 검색 도구 호출 메시지를 대신 생성합니다."""
+        from langchain_core.messages import AIMessage
+        
+        tool_call = {
+            "name": self.tool_manager.get_tool_names()[0],
+            "args": {"query": query},
+            "id": f"route_{uuid.uuid4().hex}",
+        }
+        return AIMessage(content="", tool_calls=[tool_call])
+    
+    def _create_direct_route_node(self):
+        """모든 질문을 에이전트 호출 없이 바로 검색으로 보내는 노드를 생성합니다."""
+        def direct_route(state):
+            if not self.tool_manager:
+                return {"messages": []}
+            question = get_last_user_message(state)
+            return {"messages": [self._create_tool_call_message(question)]}
+        
+        return direct_route
+    
+    def _create_retrieval_update(self, tool_calls: list, results: list) -> dict:
+        """
+        검색 도구 호출 결과로 상태 업데이트를 만듭니다.
+        
+        에이전트가 다음 호출에서 볼 ToolMessage(내용과 artifact)와 함께 검색 문서를 documents에 저장하므로,
+        이후 노드는 메시지 내용을 다시 파싱하지 않고 문서 참조와 점수, 토큰 수를 사용합니다.
+        
+        Args:
+            tool_calls: 검색 도구 호출 목록
+            results: 호출별 검색 문서 목록
+        """
+        from langchain_core.messages import ToolMessage
+        
+        tool_name = self.tool_manager.get_tool_names()[0]
+        messages = []
+        documents = []
+        for tool_call, result in zip(tool_calls, results):
+            messages.append(ToolMessage(
+                content="\n\n".join(doc.page_content for doc in result),
+                name=tool_name,
+                tool_call_id=tool_call["id"],
+                artifact=result
+            ))
+            documents.extend(result)
+        
+        update = {"messages": messages, "documents": to_retrieved_documents(documents)}
+        if tool_calls:
+            update["query"] = tool_calls[-1]["args"].get("query", "")
+        return update
+    
+    def _create_document_retrieve_node(self, retriever):
+        """검색된 문서를 상태의 documents와 ToolMessage의 artifact로 전달하는 검색 노드를 생성합니다."""
+        def document_retrieve(state):
+            last_message = state["messages"][-1]
+            tool_calls = getattr(last_message, "tool_calls", None) or []
+            
+            results = [retriever.invoke(tool_call["args"].get("query", "")) for tool_call in tool_calls]
+            return self._create_retrieval_update(tool_calls, results)
+        
+        return document_retrieve
+    
+    def _create_route_node(self, agent_node):
+        """검색이 확실한 질문을 에이전트 호출 없이 검색으로 보내는 라우터 노드를 생성합니다."""
+        router = self.router
+        stats = self.router_stats
+        
+        def route(state):
+            question = get_last_user_message(state)
+            decision = router.route(question)
+            stats.record(decision)
+            
+            if decision.route != "retrieve":
+                logger.info(f"---라우터: 에이전트로 전달 (신뢰도 {decision.confidence:.2f})---")
+                return {"messages": []}
+            
+            logger.info(f"---라우터: 바로 검색 (신뢰도 {decision.confidence:.2f}, {decision.reason})---")
+            maybe_shadow_check(agent_node, state, stats)
+            
+            return {"messages": [self._create_tool_call_message(question)]}
+        
+        return route
+    
+    def _create_prefetch_retrieve_node(self, retrieve):
+        """프리페치 결과를 우선 사용하는 검색 노드를 생성합니다."""
+        tool_name = self.tool_manager.get_tool_names()[0]
+        prefetcher = self.prefetcher
+        
+        def prefetch_retrieve(state):
+            last_message = state["messages"][-1]
+            tool_calls = getattr(last_message, "tool_calls", None) or []
+            
+            # 검색 도구 단일 호출인 경우에만 프리페치 결과를 사용할 수 있습니다
+            if len(tool_calls) == 1 and tool_calls[0]["name"] == tool_name:
+                tool_call = tool_calls[0]
+                trace = current_trace()
+                query = tool_call["args"].get("query", "")
+                
+                documents = prefetcher.take(trace.request_id, query) if trace is not None else None
+                if documents is not None:
+                    logger.info("---검색 (프리페치 결과 사용)---")
+                    return self._create_retrieval_update([tool_call], [documents])
+            
+            return retrieve(state)
+        
+        return prefetch_retrieve
+    
+    def _setup_entry_edges(self, workflow: 'StateGraph'):
+        """시작 지점에서 라우터/에이전트를 거쳐 검색으로 가는 엣지를 설정합니다."""
+        from langgraph.graph import END, START
+        
+        if self._use_router():
+            # 라우터가 검색이 확실한 질문은 바로 검색으로, 나머지는 에이전트로 보냅니다.
+            workflow.add_edge(START, "route")
+            workflow.add_conditional_edges(
+                "route",
+                create_tools_condition,
+                {
+                    "tools": "retrieve",
+                    "end": "agent",
+                },
+            )
+        else:
+            # 에이전트 노드를 호출하여 검색을 결정합니다.
+            workflow.add_edge(START, "agent")
+        
+        # 검색 여부를 결정합니다.
+        workflow.add_conditional_edges(
+            "agent",
+            # 에이전트 결정 평가
+            create_tools_condition,
+            {
+                # 조건 출력을 그래프 내 노드로 변환, 반환 값: 실행 노드
+                "tools": "retrieve",
+                "end": END,
+            },
+        )
+        
+    def _setup_edges(self, workflow: 'StateGraph'):
+        """워크플로우의 엣지를 설정합니다."""
+        from langgraph.graph import END
+        from workflow_nodes import grade_documents, route_after_speculation
+        
+        self._setup_entry_edges(workflow)
+        
+        if self.speculative:
+            # 검색 후 평가와 생성을 동시에 시작하고, 평가 결과로 답변 채택 여부 결정
+            workflow.add_edge("retrieve", "speculate")
+            workflow.add_conditional_edges(
+                "speculate",
+                route_after_speculation,
+                {
+                    "end": END,
+                    "rewrite": "rewrite",
+                },
+            )
+        else:
+            # 검색 후 문서 관련성 평가
+            workflow.add_conditional_edges(
+                "retrieve",
+                # 문서 관련성 평가
+                grade_documents,
+                {
+                    # 조건 출력을 그래프 내 노드로 변환, 반환 값: 실행 노드
+                    "generate": "generate",
+                    "rewrite": "rewrite",
+                },
+            )
+            workflow.add_edge("generate", END)
+        
+        # 최종 엣지 설정
+        workflow.add_edge("rewrite", "agent")  # 재작성 후 에이전트로 돌아감
+    
+    def get_graph(self, profile: str = None, persistent: bool = False):
+        """
+        컴파일된 그래프를 반환합니다.
+        
+        Args:
+            profile: 그래프 프로필 (없으면 기본 프로필). 처음 요청된 프로필은 한 번 컴파일되어 캐시됩니다.
+            persistent: 체크포인터를 연결한 그래프를 반환할지 여부 (스레드 ID로 이어 가는 요청용)
+        """
+        if self.graph is None:
+            raise ValueError("그래프가 컴파일되지 않았습니다. build_workflow()을 먼저 실행하세요.")
+    
+        profile = profile or self.profile
+        if profile == self.profile:
+            graph = self.graph
+        else:
+            with self._graph_lock:
+                if profile not in self.graphs:
+                    logger.info(f"그래프 프로필 컴파일: {profile}")
+                    _, self.graphs[profile] = self._compile_profile(profile)
+                graph = self.graphs[profile]
+        
+        if not persistent:
+            return graph
+        
+        checkpointer = self.get_checkpointer()
+        with self._graph_lock:
+            if profile not in self.persistent_graphs:
+                self.persistent_graphs[profile] = graph.copy(update={"checkpointer": checkpointer})
+            return self.persistent_graphs[profile]
+    
+    def get_checkpointer(self) -> 'BaseCheckpointSaver':
+        """스레드 상태를 저장하는 체크포인터를 반환합니다 (처음 호출할 때 생성)."""
+        with self._graph_lock:
+            if self.checkpointer is None:
+                from checkpointer import create_checkpointer
+                
+                self.checkpointer = create_checkpointer()
+            return self.checkpointer
+    
+    def get_session_profile(self, thread_id: str) -> str:
+        """스레드의 마지막 실행에 사용한 그래프 프로필을 반환합니다 (저장된 상태가 없으면 None)."""
+        saved = self.get_checkpointer().get_tuple({"configurable": {"thread_id": thread_id}})
+        return saved.metadata.get("profile") if saved else None
+    
+    def end_session(self, thread_id: str):
+        """스레드에 저장된 대화 상태를 지웁니다."""
+        self.get_checkpointer().delete_thread(thread_id)
+    
+    def visualize_graph(self, profile: str = None):
+        """그래프를 시각화합니다."""
+        try:
+            graph = self.get_graph(profile)
+            # Mermaid 다이어그램 생성
+            mermaid_diagram = graph.get_graph(xray=True).draw_mermaid()
+            logger.info("Mermaid 다이어그램 생성 완료")
+            return mermaid_diagram
+        except Exception as e:
+            logger.error(f"그래프 시각화 실패: {str(e)}")
+            return None
+    
+    def run_workflow(self, question: str, profile: str = None, callbacks: list = None, trace: Trace = None,
+                     profiling: bool = False, thread_id: str = None):
+        """
+        워크플로우를 실행합니다.
+        
+        같은 질문과 프로필의 요청이 이미 실행 중이면 그 실행에 합류해 같은 결과를 받습니다
+        (콜백, 프로파일링이나 스레드 ID를 지정한 요청은 항상 직접 실행).
+        
+        Args:
+            question: 사용자 질문
+            profile: 사용할 그래프 프로필 ("fast", "balanced", "thorough", 없으면 기본 프로필)
+            callbacks: 그래프 실행에 전달할 LangChain 콜백 핸들러 목록
+            trace: 노드별 실행 시간을 기록할 추적 정보 (없으면 내부에서 생성)
+            profiling: 이 요청의 CPU 프로파일과 메모리 할당을 프로파일 파일로 저장할지 여부
+                       (PROFILE_SLOW_MS를 넘긴 요청은 설정하지 않아도 저장)
+            thread_id: 이어 갈 대화의 스레드 ID (지정하면 체크포인터에 저장된 이전 턴 상태에서 시작하고,
+                       각 단계의 상태를 저장해 프로세스가 바뀌거나 재시작해도 이어 갈 수 있음)
+        
+        Returns:
+            list: (노드 이름, 노드 출력) 목록
+        """
+        return list(self.stream_workflow(question, profile, callbacks, trace, profiling, thread_id))
+    
+    def stream_workflow(self, question: str, profile: str = None, callbacks: list = None, trace: Trace = None,
+                        profiling: bool = False, thread_id: str = None) -> Iterator[Tuple[str, dict]]:
+        """
+        워크플로우를 실행하며 노드 출력을 끝나는 순서대로 내보냅니다.
+        
+        실행 중인 같은 질문에 합류한 요청은 이미 끝난 노드 출력을 먼저 받고 이후 출력을 이어서 받습니다.
+        인자는 run_workflow와 같습니다.
+        
+        Yields:
+            Tuple[str, dict]: (노드 이름, 노드 출력)
+        """
+        profile = profile or self.profile
+        trace = trace or Trace()
+        
+        # 대화를 이어 가는 요청은 질문이 같아도 이전 턴이 다르므로 병합하지 않습니다
+        if self.single_flight is None or callbacks or profiling or thread_id is not None:
+            yield from self._execute(question, profile, callbacks, trace, profiling, thread_id)
+            return
+        
+        call, leader = self.single_flight.join(coalesce_key(question, profile))
+        if not leader:
+            yield from self._follow(call, question, profile, trace)
+            return
+        
+        yield from self._lead(call, question, profile, trace)
+    
+    def resume_workflow(self, thread_id: str, callbacks: list = None, trace: Trace = None) -> list:
+        """
+        중단된 실행(프로세스 종료, 노드 오류 등)을 마지막으로 저장된 단계부터 이어서 실행합니다.
+        
+        Args:
+            thread_id: 재개할 스레드 ID (마지막 실행과 같은 그래프 프로필로 재개)
+            callbacks: 그래프 실행에 전달할 LangChain 콜백 핸들러 목록
+            trace: 노드별 실행 시간을 기록할 추적 정보 (없으면 내부에서 생성)
+        
+        Returns:
+            list: 재개한 뒤 실행된 (노드 이름, 노드 출력) 목록 (남은 단계가 없으면 빈 목록)
+        """
+        profile = self.get_session_profile(thread_id)
+        if profile is None:
+            return []
+        return list(self._execute(None, profile, callbacks, trace or Trace(), False, thread_id))
+    
+    async def arun_workflow(self, question: str, profile: str = None, trace: Trace = None) -> list:
+        """
+        워크플로우를 비동기로 실행합니다.
+        
+        직접 실행하는 요청은 그래프를 실행기 스레드에서 돌리고,
+        같은 질문에 합류한 요청은 스레드를 점유하지 않고 결과를 기다립니다.
+        
+        Args:
+            question: 사용자 질문
+            profile: 사용할 그래프 프로필 (없으면 기본 프로필)
+            trace: 노드별 실행 시간을 기록할 추적 정보 (없으면 내부에서 생성)
+        
+        Returns:
+            list: (노드 이름, 노드 출력) 목록
+        """
+        profile = profile or self.profile
+        trace = trace or Trace()
+        loop = asyncio.get_running_loop()
+        
+        if self.single_flight is not None:
+            call, leader = self.single_flight.join(coalesce_key(question, profile))
+            if not leader:
+                return await self._afollow(call, question, profile, trace)
+            # 이미 등록한 실행을 실행기 스레드에서 이어서 수행
+            return await loop.run_in_executor(None, lambda: list(self._lead(call, question, profile, trace)))
+        
+        return await loop.run_in_executor(None, lambda: self.run_workflow(question, profile, trace=trace))
+    
+    def _lead(self, call, question: str, profile: str, trace: Trace) -> Iterator[Tuple[str, dict]]:
+        """등록된 병합 실행을 직접 수행하며 노드 출력을 합류한 요청에 전달합니다."""
+        trace.record_cache("coalesce", False)
+        try:
+            for event in self._execute(question, profile, None, trace, False):
+                call.publish(event)
+                yield event
+            call.finish()
+        except BaseException as e:
+            # 실행 오류(또는 소비자가 스트림을 중단한 경우)를 합류한 요청에 전달
+            call.fail(e if isinstance(e, Exception) else RuntimeError("병합된 실행이 중단되었습니다"))
+            raise
+        finally:
+            self.single_flight.release(call)
+    
+    def _follow(self, call, question: str, profile: str, trace: Trace) -> Iterator[Tuple[str, dict]]:
+        """실행 중인 같은 질문의 노드 출력을 이어서 받습니다 (스레드 실행 경로)."""
+        logger.info(f"실행 중인 같은 질문에 합류 (프로필: {profile}, 요청 ID: {trace.request_id}): {question}")
+        results = []
+        status = "error"
+        try:
+            with RequestTracer(trace, "run_workflow", self.span_exporters, profile=profile, coalesced=True):
+                trace.record_cache("coalesce", True)
+                for event in call.events(self.single_flight.timeout):
+                    results.append(event)
+                    yield event
+            status = "ok"
+        except CoalesceTimeout:
+            self.single_flight.stats.record_timeout()
+            raise
+        except Exception:
+            self.single_flight.stats.record_error()
+            raise
+        finally:
+            record_workflow(profile, trace, results, status)
+    
+    async def _afollow(self, call, question: str, profile: str, trace: Trace) -> list:
+        """실행 중인 같은 질문의 결과를 기다립니다 (비동기 실행 경로)."""
+        logger.info(f"실행 중인 같은 질문에 합류 (프로필: {profile}, 요청 ID: {trace.request_id}): {question}")
+        results = []
+        status = "error"
+        try:
+            with RequestTracer(trace, "run_workflow", self.span_exporters, profile=profile, coalesced=True):
+                trace.record_cache("coalesce", True)
+                results = await call.aresult(self.single_flight.timeout)
+            status = "ok"
+            return results
+        except CoalesceTimeout:
+            self.single_flight.stats.record_timeout()
+            raise
+        except Exception:
+            self.single_flight.stats.record_error()
+            raise
+        finally:
+            record_workflow(profile, trace, results, status)
+    
+    def _execute(self, question: str, profile: str, callbacks: list, trace: Trace,
+                 profiling: bool, thread_id: str = None) -> Iterator[Tuple[str, dict]]:
+        """
+        그래프를 실행하며 노드 출력을 내보냅니다 (추적, 지표, 프로파일링 포함).
+        
+        thread_id가 있으면 체크포인터에서 스레드의 이전 상태(메시지, 요약)를 한 번 불러와 이번 질문을 덧붙이고,
+        question이 None이면 새 입력 없이 중단된 실행을 재개합니다.
+        """
+        try:
+            from langchain_core.messages import HumanMessage
+            
+            # 입력 준비
+            inputs = None
+            if question is not None:
+                inputs = {
+                    "messages": [
+                        HumanMessage(content=question),
+                    ],
+                    "question": question,
+                    "query": question,
+                    "documents": [],
+                    "rewrites": 0,
+                    "max_rewrites": MAX_REWRITES,
+                }
+            
+            logger.info(f"워크플로우 실행 시작 (프로필: {profile}, 요청 ID: {trace.request_id}, "
+                        f"스레드: {thread_id}): {question if question is not None else '(재개)'}")
+            
+            # 그래프 실행
+            graph = self.get_graph(profile, persistent=thread_id is not None)
+            results = []
+            config = {}
+            if thread_id is not None:
+                # 재개할 때 같은 프로필을 사용하도록 체크포인트 메타데이터에 프로필을 남깁니다
+                config = {"configurable": {"thread_id": thread_id}, "metadata": {"profile": profile}}
+            
+            # 에이전트 호출과 병렬로 원본 질문 검색 시작 (프리페치 노드는 기본 그래프에만 있음)
+            prefetcher = self.prefetcher if profile == "balanced" and question is not None else None
+            
+            status = "error"
+            IN_FLIGHT.inc()
+            try:
+                with RequestTracer(trace, "run_workflow", self.span_exporters, profile=profile) as tracer:
+                    if prefetcher:
+                        tracer.run(prefetcher.start, trace.request_id, question)
+            
+                    profiler = RequestProfiler(trace.request_id, enabled=profiling, ring=self.profile_ring,
+                                               profile=profile, question=question)
+                    try:
+                        with profiler:
+                            config["callbacks"] = [*(callbacks or []), tracer.handler]
+                            # 그래프 단계만 추적 컨텍스트에서 실행합니다 (yield 사이에는 호출한 쪽 컨텍스트)
+                            for output in tracer.iterate(graph.stream(inputs, config=config)):
+                                for key, value in output.items():
+                                    logger.debug(f"노드 '{key}'의 출력 결과: {value}")
+                                    results.append((key, value))
+                                    yield key, value
+                    finally:
+                        if prefetcher:
+                            prefetcher.discard(trace.request_id)
+                        if thread_id is not None:
+                            # 응답하기 전에 이번 턴의 체크포인트를 디스크에 커밋 (실패한 실행도 재개할 수 있도록)
+                            self._flush_checkpoints()
+                        if profiler.path:
+                            trace.root.attributes["profile_path"] = profiler.path
+                status = "ok"
+            finally:
+                IN_FLIGHT.dec()
+                record_workflow(profile, trace, results, status)
+            
+            summary = trace.summary()
+            breakdown = ", ".join(f"{node['node']} {node['duration_ms']:.0f}ms" for node in summary["nodes"])
+            logger.info(f"워크플로우 실행 완료 ({summary['total_ms']:.0f}ms): {breakdown}")
+            
+        except Exception as e:
+            logger.error(f"워크플로우 실행 실패: {str(e)}")
+            raise
+    
+    def _flush_checkpoints(self):
+        flush = getattr(self.checkpointer, "flush", None)
+        if flush is not None:
+            flush()
+    
+    def get_performance_stats(self) -> dict:
+        """성능 최적화 기능의 통계를 반환합니다."""
+        from workflow_nodes import speculation_stats
+        
+        stats = {"speculation": speculation_stats.snapshot()}
+        
+        if self.prefetcher:
+            stats["prefetch"] = self.prefetcher.stats.snapshot()
+        
+        if self._use_router():
+            stats["router"] = self.router_stats.snapshot()
+        
+        if self.single_flight:
+            stats["coalesce"] = self.single_flight.stats.snapshot()
+        
+        if self.memory:
+            stats["memory"] = self.memory.stats.snapshot()
+        
+        if self.retrieval_cache is not None:
+            stats["retrieval_cache"] = self.retrieval_cache.snapshot()
+        
+        if self.batching_searcher:
+            stats["micro_batch"] = self.batching_searcher.snapshot()
+        
+        if self.adaptive_top_k:
+            stats["adaptive_top_k"] = self.adaptive_top_k.stats.snapshot()
+        
+        checkpoint_stats = getattr(self.checkpointer, "stats", None)
+        if checkpoint_stats is not None:
+            stats["checkpoint"] = checkpoint_stats.snapshot()
+        
+        if LLM_SCHEDULER:
+            from llm_scheduler import get_scheduler
+            
+            stats["llm_scheduler"] = get_scheduler().snapshot()
+        
+        return stats
+
+def create_workflow_with_data_pipeline() -> AgenticRAGWorkflow:
+    """데이터 파이프라인과 함께 워크플로우를 생성합니다."""
+    try:
+        # 데이터 파이프라인 구축
+        logger.info("데이터 파이프라인 구축 시작")
+        data_pipeline = DataPipeline()
+        data_pipeline.build_pipeline()
+        logger.info("데이터 파이프라인 구축 완료")
+        
+        # 워크플로우 생성
+        workflow = AgenticRAGWorkflow(data_pipeline)
+        workflow.build_workflow()
+        if WARM_UP:
+            workflow.warm_up()
+        
+        return workflow
+        
+    except Exception as e:
+        logger.error(f"워크플로우 생성 실패: {str(e)}")
+        raise
+
+def main():
+    """메인 실행 함수"""
+    try:
+        # 워크플로우 생성
+        workflow = create_workflow_with_data_pipeline()
+        
+        # 그래프 시각화
+        mermaid_diagram = workflow.visualize_graph()
+        if mermaid_diagram:
+            print("워크플로우 구조:")
+            print(mermaid_diagram)
+        
+        # 테스트 실행
+        test_question = "agentic rag가 어떤 의미야?"
+        print(f"\n테스트 질문: {test_question}")
+        
+        results = workflow.run_workflow(test_question)
+        
+        print("\n실행 결과:")
+        for node_name, result in results:
+            print(f"\n{node_name}: {result}")
+        
+    except Exception as e:
+        print(f"오류 발생: {str(e)}")
+
+if __name__ == "__main__":
+    main()
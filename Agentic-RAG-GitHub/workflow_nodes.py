@@ -1,258 +1,620 @@
-"""
-워크플로우 노드: 각 단계별 처리 로직 구현
-"""
-import logging
-from typing import Literal
-from langchain_core.prompts import PromptTemplate
-from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.output_parsers import StrOutputParser
-from components import AgentState, get_last_user_message, get_last_assistant_message
-from config import OPENAI_MODEL, TEMPERATURE
-
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-def agent(state: AgentState) -> dict:
-    """
-    에이전트 노드: 사용자의 질문에 따라 도구를 호출하여 검색을 수행합니다.
-    
-    Args:
-        state: 현재 에이전트 상태
-        
-    Returns:
-        dict: 메시지에 에이전트 응답이 추가된 업데이트된 상태
-    """
-    logger.info("---에이전트 호출---")
-    
-    try:
-        from components import ToolManager
-        
-        # ToolManager는 외부에서 주입되어야 합니다
-        # 여기서는 임시로 생성 (실제로는 워크플로우에서 주입)
-        messages = state["messages"]
-        
-        model = ChatOpenAI(
-            temperature=TEMPERATURE, 
-            streaming=True, 
-            model=OPENAI_MODEL
-        )
-        
-        # 도구 바인딩 (실제로는 ToolManager에서 가져와야 함)
-        # model = model.bind_tools(tools)
-        
-        response = model.invoke(messages)
-        
-        # 응답을 상태에 추가
-        return {"messages": [response]}
-        
-    except Exception as e:
-        logger.error(f"에이전트 실행 중 오류: {str(e)}")
-        error_message = AIMessage(content=f"에이전트 실행 중 오류가 발생했습니다: {str(e)}")
-        return {"messages": [error_message]}
-
-def grade_documents(state: AgentState) -> Literal["generate", "rewrite"]:
-    """
-    문서 관련성 평가 노드: 검색된 문서가 질문과 관련이 있는지 평가합니다.
-    
-    Args:
-        state: 현재 상태
-        
-    Returns:
-        str: 문서의 관련성에 따라 다음 노드 결정 ("generate" 또는 "rewrite")
-    """
-    logger.info("---문서 관련성 평가---")
-    
-    try:
-        # 데이터 모델 정의
-        class Grade(BaseModel):
-            """관련성 평가를 위한 이진 점수."""
-            binary_score: str = Field(
-                description="관련성 점수 'yes' 또는 'no'",
-                enum=["yes", "no"]
-            )
-        
-        # LLM 모델 정의
-        model = ChatOpenAI(
-            temperature=0, 
-            model=OPENAI_MODEL, 
-            streaming=True
-        )
-        
-        # LLM에 데이터 모델 적용
-        llm_with_tool = model.with_structured_output(Grade)
-        
-        prompt = PromptTemplate(
-            template="""당신은 사용자 질문에 대한 검색된 문서의 관련성을 평가하는 평가자입니다.
-            
-            여기 검색된 문서가 있습니다: 
-            {context}
-            
-            여기 사용자 질문이 있습니다: {question}
-            
-            문서가 사용자 질문과 관련된 키워드 또는 의미를 포함하면 관련성이 있다고 평가하세요.
-            문서가 질문과 관련이 있는지 여부를 나타내기 위해 'yes' 또는 'no'로 이진 점수를 주세요.
-            
-            평가 기준:
-            - 'yes': 문서가 질문과 직접적으로 관련된 정보를 포함
-            - 'no': 문서가 질문과 관련이 없거나 매우 낮은 관련성
-            
-            답변:""",
-            input_variables=["context", "question"],
-        )
-        
-        messages = state["messages"]
-        question = get_last_user_message(state)
-        
-        # 마지막 메시지에서 검색된 문서 추출
-        last_message = messages[-1]
-        docs = last_message.content if hasattr(last_message, 'content') else str(last_message)
-        
-        # 관련성 평가 실행
-        scored_result = llm_with_tool.invoke({
-            "question": question, 
-            "context": docs
-        })
-        
-        score = scored_result.binary_score
-        
-        if score == "yes":
-            logger.info("---결정: 문서 관련성 있음---")
-            return "generate"
-        else:
-            logger.info("---결정: 문서 관련성 없음---")
-            return "rewrite"
-            
-    except Exception as e:
-        logger.error(f"문서 관련성 평가 중 오류: {str(e)}")
-        # 오류 발생 시 기본적으로 rewrite로 진행
-        return "rewrite"
-
-def rewrite(state: AgentState) -> dict:
-    """
-    질문 재작성 노드: 검색된 문서의 관련성이 낮을 때, 
-    더 나은 검색 결과를 위해 질문을 재작성합니다.
-    
-    Args:
-        state: 현재 상태
-    
-    Returns:
-        dict: 재구성된 질문으로 업데이트된 상태
-    """
-    logger.info("---질문 변형---")
-    
-    try:
-        question = get_last_user_message(state)
-        
-        msg = [
-            HumanMessage(
-                content=f"""다음 입력을 보고 근본적인 의도나 의미를 파악해보세요.
-                초기 질문은 다음과 같습니다:
-                
-                -------
-                {question}
-                -------
-                
-                개선된 질문을 만들어주세요. 다음을 고려하세요:
-                1. 더 구체적이고 명확한 표현
-                2. 관련 키워드 추가
-                3. 검색 가능한 형태로 변환
-                4. 원래 의도 유지
-                
-                개선된 질문:"""
-            )
-        ]
-        
-        # 질문 재작성 실행
-        model = ChatOpenAI(
-            temperature=0, 
-            model=OPENAI_MODEL, 
-            streaming=True
-        )
-        response = model.invoke(msg)
-        
-        return {"messages": [response]}
-        
-    except Exception as e:
-        logger.error(f"질문 재작성 중 오류: {str(e)}")
-        error_message = AIMessage(content=f"질문 재작성 중 오류가 발생했습니다: {str(e)}")
-        return {"messages": [error_message]}
-
-def generate(state: AgentState) -> dict:
-    """
-    답변 생성 노드: 관련성 높은 문서를 기반으로 최종 답변을 생성합니다.
-    
-    Args:
-        state: 현재 상태
-    
-    Returns:
-        dict: 생성된 답변으로 업데이트된 상태
-    """
-    logger.info("---생성---")
-    
-    try:
-        question = get_last_user_message(state)
-        
-        # 마지막 메시지에서 검색된 문서 추출
-        messages = state["messages"]
-        last_message = messages[-1]
-        docs = last_message.content if hasattr(last_message, 'content') else str(last_message)
-        
-        # 프롬프트 정의
-        template = """당신은 질문-답변 작업을 위한 어시스턴트입니다.
-        아래 제공된 문맥을 사용하여 질문에 답변해주세요.
-        
-        답을 모를 경우 '모르겠습니다'라고 말해주세요. 
-        답변은 최대 3문장으로 간결하게 작성하세요.
-        
-        질문: {question}
-        문맥: {context}
-        
-        답변:"""
-        
-        prompt = PromptTemplate(
-            template=template, 
-            input_variables=["context", "question"]
-        )
-        
-        # LLM
-        llm = ChatOpenAI(
-            model_name=OPENAI_MODEL, 
-            temperature=0, 
-            streaming=True
-        )
-        
-        # 체인
-        rag_chain = prompt | llm | StrOutputParser()
-        
-        # 실행
-        response = rag_chain.invoke({
-            "context": docs, 
-            "question": question
-        })
-        
-        return {"messages": [AIMessage(content=response)]}
-        
-    except Exception as e:
-        logger.error(f"답변 생성 중 오류: {str(e)}")
-        error_message = AIMessage(content=f"답변 생성 중 오류가 발생했습니다: {str(e)}")
-        return {"messages": [error_message]}
-
-def create_error_handler(error_message: str = "처리 중 오류가 발생했습니다."):
-    """
-    오류 처리를 위한 핸들러 함수를 생성합니다.
-    
-    Args:
-        error_message: 오류 메시지
-        
-    Returns:
-        function: 오류 처리 함수
-    """
-    def error_handler(state: AgentState) -> dict:
-        logger.error(f"워크플로우 오류: {error_message}")
-        error_response = AIMessage(content=error_message)
-        return {"messages": [error_response]}
-    
-    return error_handler
+"""
+워크플로우 노드: 각 단계별 처리 로직 구현
+
+노드는 검색 결과를 메시지 문자열에서 다시 파싱하지 않고 상태의 documents(원문 참조, 점수, 토큰 수)로 처리합니다.
+노드가 예외를 잡아 돌려주는 오류 메시지는 response_metadata의 error로 표시하므로, 빠른 경로, 답변 워밍업,
+답변 캐시는 오류로 끝난 실행의 답변을 저장하지 않습니다.
+"""
+import logging
+import threading
+from typing import List, Literal
+from langchain_core.prompts import PromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from langchain_core.documents import Document
+from components import (
+    AgentState, RetrievedDocument, count_rewrites, count_tokens, create_chat_model, get_question,
+    join_documents, rewrite_limit_reached, to_retrieved_documents, get_last_assistant_message
+)
+from memory import ConversationMemory
+from config import (
+    OPENAI_MODEL, TEMPERATURE, SPECULATIVE_MAX_WORKERS,
+    DOCUMENT_RELEVANCE_THRESHOLD, DOCUMENT_GRADING_MAX_WORKERS
+)
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def agent(state: AgentState, tools: list = None, memory: ConversationMemory = None) -> dict:
+    """
+    에이전트 노드: 사용자의 질문에 따라 도구를 호출하여 검색을 수행합니다.
+    
+    Args:
+        state: 현재 에이전트 상태
+        tools: 모델에 바인딩할 도구 목록 (ToolManager에서 주입)
+        memory: 대화 기록을 압축할 대화 메모리 (없으면 전체 메시지를 그대로 전달)
+        
+    Returns:
+        dict: 메시지에 에이전트 응답이 추가된 업데이트된 상태
+              (대화 메모리를 사용하면 버리거나 요약한 메시지의 삭제와 갱신된 요약 포함)
+    """
+    logger.info("---에이전트 호출---")
+    
+    try:
+        messages = state["messages"]
+        update = {"messages": []}
+        if memory is not None:
+            messages, update = memory.prepare(state)
+        
+        model = create_chat_model(
+            temperature=TEMPERATURE, 
+            streaming=True, 
+            model=OPENAI_MODEL
+        )
+        
+        # 도구 바인딩
+        if tools:
+            model = model.bind_tools(tools)
+        
+        response = model.invoke(messages)
+        
+        # 응답을 상태에 추가
+        return {**update, "messages": [*update["messages"], response]}
+        
+    except Exception as e:
+        logger.error(f"에이전트 실행 중 오류: {str(e)}")
+        error_message = AIMessage(content=f"에이전트 실행 중 오류가 발생했습니다: {str(e)}",
+                                  response_metadata={"error": True})
+        return {"messages": [error_message]}
+
+def create_agent_node(tools: list, memory: ConversationMemory = None):
+    """
+    ToolManager의 도구가 바인딩된 에이전트 노드를 생성합니다.
+    
+    Args:
+        tools: 모델에 바인딩할 도구 목록
+        memory: 대화 기록을 압축할 대화 메모리 (선택)
+    
+    Returns:
+        function: 에이전트 노드 함수
+    """
+    def agent_with_tools(state: AgentState) -> dict:
+        return agent(state, tools, memory)
+    
+    return agent_with_tools
+
+def grade_documents(state: AgentState) -> Literal["generate", "rewrite"]:
+    """
+    문서 관련성 평가 노드: 검색된 문서가 질문과 관련이 있는지 평가합니다.
+    
+    Args:
+        state: 현재 상태
+        
+    Returns:
+        str: 문서의 관련성에 따라 다음 노드 결정 ("generate" 또는 "rewrite")
+    """
+    logger.info("---문서 관련성 평가---")
+    
+    # 재작성 횟수 한도에 도달하면 평가 없이 생성으로 진행
+    if rewrite_limit_reached(state):
+        logger.info(f"---결정: 재작성 한도({count_rewrites(state)}회) 도달, 생성으로 진행---")
+        return "generate"
+    
+    try:
+        question = get_question(state)
+        
+        # 관련성 평가 실행
+        score = _evaluate_relevance(question, join_documents(get_documents(state)))
+        
+        if score == "yes":
+            logger.info("---결정: 문서 관련성 있음---")
+            return "generate"
+        else:
+            logger.info("---결정: 문서 관련성 없음---")
+            return "rewrite"
+            
+    except Exception as e:
+        logger.error(f"문서 관련성 평가 중 오류: {str(e)}")
+        # 오류 발생 시 기본적으로 rewrite로 진행
+        return "rewrite"
+
+def get_documents(state: AgentState) -> List[RetrievedDocument]:
+    """
+    답변 문맥으로 사용할 검색 문서를 반환합니다.
+    
+    문서별 평가를 거친 문서는 관련성 점수가 DOCUMENT_RELEVANCE_THRESHOLD 이상인 것만 사용합니다.
+    상태에 documents가 없으면(노드를 메시지만으로 직접 호출한 경우) 마지막 메시지의
+    artifact 또는 내용을 문서 하나로 봅니다.
+    """
+    documents = state.get("documents")
+    if documents is None:
+        last_message = state["messages"][-1]
+        artifact = getattr(last_message, "artifact", None)
+        if artifact:
+            return to_retrieved_documents(artifact)
+        content = last_message.content if hasattr(last_message, 'content') else str(last_message)
+        return to_retrieved_documents([Document(page_content=content)])
+    
+    return [
+        document for document in documents
+        if document.grade is None or document.grade >= DOCUMENT_RELEVANCE_THRESHOLD
+    ]
+
+def _evaluate_relevance(question: str, docs: str) -> str:
+    """
+    검색된 문서의 관련성을 LLM으로 평가합니다.
+    
+    Args:
+        question: 사용자 질문
+        docs: 검색된 문서 내용
+    
+    Returns:
+        str: 관련성 점수 ("yes" 또는 "no")
+    """
+    # 데이터 모델 정의
+    class Grade(BaseModel):
+        """관련성 평가를 위한 이진 점수."""
+        binary_score: str = Field(
+            description="관련성 점수 'yes' 또는 'no'",
+            enum=["yes", "no"]
+        )
+    
+    # LLM 모델 정의
+    model = create_chat_model(
+        temperature=0,
+        model=OPENAI_MODEL,
+        streaming=True
+    )
+    
+    # LLM에 데이터 모델 적용
+    llm_with_tool = model.with_structured_output(Grade)
+    
+    prompt = PromptTemplate(
+        template="""당신은 사용자 질문에 대한 검색된 문서의 관련성을 평가하는 평가자입니다.
+        
+        여기 검색된 문서가 있습니다:
+        {context}
+        
+        여기 사용자 질문이 있습니다: {question}
+        
+        문서가 사용자 질문과 관련된 키워드 또는 의미를 포함하면 관련성이 있다고 평가하세요.
+        문서가 질문과 관련이 있는지 여부를 나타내기 위해 'yes' 또는 'no'로 이진 점수를 주세요.
+        
+        평가 기준:
+        - 'yes': 문서가 질문과 직접적으로 관련된 정보를 포함
+        - 'no': 문서가 질문과 관련이 없거나 매우 낮은 관련성
+        
+        답변:""",
+        input_variables=["context", "question"],
+    )
+    
+    # 관련성 평가 실행
+    scored_result = (prompt | llm_with_tool).invoke({
+        "question": question,
+        "context": docs
+    })
+    
+    return scored_result.binary_score
+
+def rewrite(state: AgentState) -> dict:
+    """
+    질문 재작성 노드: 검색된 문서의 관련성이 낮을 때, 
+    더 나은 검색 결과를 위해 질문을 재작성합니다.
+    
+    Args:
+        state: 현재 상태
+    
+    Returns:
+        dict: 재구성된 질문으로 업데이트된 상태
+    """
+    logger.info("---질문 변형---")
+    
+    # 재작성한 질의로 다시 검색하므로 이번 검색 결과는 버리고 재작성 횟수를 올립니다
+    update = {"documents": [], "rewrites": count_rewrites(state) + 1}
+    
+    try:
+        question = get_question(state)
+        
+        msg = [
+            HumanMessage(
+                content=f"""다음 입력을 보고 근본적인 의도나 의미를 파악해보세요.
+                초기 질문은 다음과 같습니다:
+                
+                -------
+                {question}
+                -------
+                
+                개선된 질문을 만들어주세요. 다음을 고려하세요:
+                1. 더 구체적이고 명확한 표현
+                2. 관련 키워드 추가
+                3. 검색 가능한 형태로 변환
+                4. 원래 의도 유지
+                
+                개선된 질문:"""
+            )
+        ]
+        
+        # 질문 재작성 실행
+        model = create_chat_model(
+            temperature=0, 
+            model=OPENAI_MODEL, 
+            streaming=True
+        )
+        response = model.invoke(msg)
+        
+        # 재작성 횟수 제한을 위해 재작성 결과임을 표시합니다
+        rewritten = AIMessage(
+            content=response.content,
+            response_metadata={**response.response_metadata, "rewrite": True}
+        )
+        return {"messages": [rewritten], "query": response.content, **update}
+        
+    except Exception as e:
+        logger.error(f"질문 재작성 중 오류: {str(e)}")
+        error_message = AIMessage(
+            content=f"질문 재작성 중 오류가 발생했습니다: {str(e)}",
+            response_metadata={"rewrite": True, "error": True}
+        )
+        return {"messages": [error_message], **update}
+
+def generate(state: AgentState) -> dict:
+    """
+    답변 생성 노드: 관련성 높은 문서를 기반으로 최종 답변을 생성합니다.
+    
+    Args:
+        state: 현재 상태
+    
+    Returns:
+        dict: 생성된 답변으로 업데이트된 상태
+    """
+    logger.info("---생성---")
+    
+    try:
+        question = get_question(state)
+        docs = join_documents(get_documents(state))
+        
+        # 체인
+        rag_chain = _create_rag_chain()
+        
+        # 실행
+        response = rag_chain.invoke({
+            "context": docs, 
+            "question": question
+        })
+        
+        return {"messages": [AIMessage(content=response)]}
+        
+    except Exception as e:
+        logger.error(f"답변 생성 중 오류: {str(e)}")
+        error_message = AIMessage(content=f"답변 생성 중 오류가 발생했습니다: {str(e)}",
+                                  response_metadata={"error": True})
+        return {"messages": [error_message]}
+
+def _create_rag_chain():
+    """답변 생성을 위한 RAG 체인을 생성합니다."""
+    # 프롬프트 정의
+    template = """당신은 질문-답변 작업을 위한 어시스턴트입니다.
+    아래 제공된 문맥을 사용하여 질문에 답변해주세요.
+    
+    답을 모를 경우 '모르겠습니다'라고 말해주세요.
+    답변은 최대 3문장으로 간결하게 작성하세요.
+    
+    질문: {question}
+    문맥: {context}
+    
+    답변:"""
+    
+    prompt = PromptTemplate(
+        template=template,
+        input_variables=["context", "question"]
+    )
+    
+    # LLM
+    llm = create_chat_model(
+        model=OPENAI_MODEL,
+        temperature=0,
+        streaming=True
+    )
+    
+    return prompt | llm | StrOutputParser()
+
+class SpeculationStats:
+    """추측 생성(speculative generation)의 채택/취소 및 낭비 토큰 통계"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.accepted = 0
+        self.cancelled = 0
+        self.wasted_prompt_tokens = 0
+        self.wasted_completion_tokens = 0
+    
+    def record_accepted(self):
+        """추측 답변이 채택된 경우를 기록합니다."""
+        with self._lock:
+            self.attempts += 1
+            self.accepted += 1
+    
+    def record_cancelled(self, prompt_tokens: int, completion_tokens: int):
+        """추측 답변이 취소된 경우 낭비된 토큰과 함께 기록합니다."""
+        with self._lock:
+            self.attempts += 1
+            self.cancelled += 1
+            self.wasted_prompt_tokens += prompt_tokens
+            self.wasted_completion_tokens += completion_tokens
+    
+    def snapshot(self) -> dict:
+        """현재 통계를 딕셔너리로 반환합니다."""
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "accepted": self.accepted,
+                "cancelled": self.cancelled,
+                "acceptance_rate": self.accepted / self.attempts if self.attempts else 0.0,
+                "wasted_prompt_tokens": self.wasted_prompt_tokens,
+                "wasted_completion_tokens": self.wasted_completion_tokens,
+            }
+
+# 추측 생성 통계 (프로세스 전역)
+speculation_stats = SpeculationStats()
+
+# 평가와 병렬로 답변을 생성하기 위한 실행기
+_speculation_executor = ContextThreadPoolExecutor(
+    max_workers=SPECULATIVE_MAX_WORKERS,
+    thread_name_prefix="speculative-generate"
+)
+
+def _stream_answer(question: str, docs: str, cancel_event: threading.Event) -> dict:
+    """
+    취소 신호를 확인하면서 답변을 스트리밍으로 생성합니다.
+    
+    Args:
+        question: 사용자 질문
+        docs: 검색된 문서 내용
+        cancel_event: 설정되면 생성을 중단하는 취소 신호
+    
+    Returns:
+        dict: 생성된 답변, 생성된 토큰 수, 취소 여부
+    """
+    chunks = []
+    cancelled = cancel_event.is_set()
+    
+    if not cancelled:
+        rag_chain = _create_rag_chain()
+        for chunk in rag_chain.stream({"context": docs, "question": question}):
+            if cancel_event.is_set():
+                # 스트림을 닫으면 남은 토큰 생성도 중단됩니다
+                cancelled = True
+                break
+            chunks.append(chunk)
+    
+    return {
+        "answer": "".join(chunks),
+        # OpenAI 스트리밍은 청크 하나가 대략 토큰 하나에 해당합니다
+        "completion_tokens": len(chunks),
+        "cancelled": cancelled,
+    }
+
+def speculative_generate(state: AgentState) -> dict:
+    """
+    추측 생성 노드: 문서 관련성 평가와 답변 생성을 동시에 실행합니다.
+    
+    평가 결과가 'yes'이면 미리 생성된 답변을 사용하고,
+    'no'이면 생성을 취소하고 낭비된 토큰을 기록한 뒤 rewrite로 넘어갑니다.
+    
+    Args:
+        state: 현재 상태
+    
+    Returns:
+        dict: 채택된 답변으로 업데이트된 상태 (취소 시 빈 업데이트)
+    """
+    logger.info("---추측 생성: 평가와 생성 병렬 실행---")
+    
+    question = get_question(state)
+    documents = get_documents(state)
+    docs = join_documents(documents)
+    
+    cancel_event = threading.Event()
+    future = _speculation_executor.submit(_stream_answer, question, docs, cancel_event)
+    
+    if rewrite_limit_reached(state):
+        # 재작성 한도에 도달하면 평가 결과와 관계없이 생성된 답변을 사용합니다
+        logger.info(f"---재작성 한도({count_rewrites(state)}회) 도달, 평가 생략---")
+        score = "yes"
+    else:
+        try:
+            score = _evaluate_relevance(question, docs)
+        except Exception as e:
+            logger.error(f"문서 관련성 평가 중 오류: {str(e)}")
+            # 오류 발생 시 기본적으로 rewrite로 진행
+            score = "no"
+    
+    if score == "yes":
+        logger.info("---결정: 문서 관련성 있음 (추측 답변 채택)---")
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"답변 생성 중 오류: {str(e)}")
+            error_message = AIMessage(
+                content=f"답변 생성 중 오류가 발생했습니다: {str(e)}",
+                response_metadata={"speculative": True, "error": True}
+            )
+            return {"messages": [error_message], "verdict": "yes"}
+        
+        speculation_stats.record_accepted()
+        answer = AIMessage(
+            content=result["answer"],
+            response_metadata={"speculative": True}
+        )
+        return {"messages": [answer], "verdict": "yes"}
+    
+    logger.info("---결정: 문서 관련성 없음 (추측 생성 취소)---")
+    cancel_event.set()
+    
+    if future.cancel():
+        # 실행 전에 취소되어 토큰이 소비되지 않았습니다
+        speculation_stats.record_cancelled(0, 0)
+    else:
+        prompt_tokens = count_tokens(question) + sum(document.tokens for document in documents)
+        
+        def _account(done_future):
+            try:
+                completion_tokens = done_future.result()["completion_tokens"]
+            except Exception:
+                completion_tokens = 0
+            speculation_stats.record_cancelled(prompt_tokens, completion_tokens)
+            logger.info(f"추측 생성 취소: 낭비된 토큰 {prompt_tokens + completion_tokens}개")
+        
+        # 취소된 생성은 기다리지 않고 종료 시점에 낭비 토큰을 집계합니다
+        future.add_done_callback(_account)
+    
+    return {"verdict": "no"}
+
+def route_after_speculation(state: AgentState) -> Literal["end", "rewrite"]:
+    """
+    추측 생성 이후 다음 노드를 결정하는 조건부 함수
+    
+    Args:
+        state: 현재 상태
+    
+    Returns:
+        str: 추측 답변이 채택되었으면 "end", 아니면 "rewrite"
+    """
+    if state.get("verdict") == "yes":
+        return "end"
+    return "rewrite"
+
+class DocumentRelevance(BaseModel):
+    """문서별 관련성 점수."""
+    score: int = Field(
+        description="문서가 질문에 답하는 데 얼마나 관련 있는지 0~10 점수",
+        ge=0,
+        le=10
+    )
+
+def _score_document(question: str, document: str) -> int:
+    """
+    문서 하나의 관련성 점수를 LLM으로 평가합니다.
+    
+    Args:
+        question: 사용자 질문
+        document: 평가할 문서 내용
+    
+    Returns:
+        int: 0~10 사이의 관련성 점수
+    """
+    model = create_chat_model(
+        temperature=0,
+        model=OPENAI_MODEL
+    )
+    
+    prompt = PromptTemplate(
+        template="""당신은 사용자 질문에 대한 검색된 문서의 관련성을 평가하는 평가자입니다.
+        
+        여기 검색된 문서가 있습니다:
+        {document}
+        
+        여기 사용자 질문이 있습니다: {question}
+        
+        문서가 질문에 답하는 데 얼마나 도움이 되는지 0~10 사이 정수로 평가하세요.
+        - 10: 질문에 직접 답하는 정보를 포함
+        - 5: 부분적으로 관련된 정보를 포함
+        - 0: 질문과 관련이 없음
+        
+        점수:""",
+        input_variables=["document", "question"],
+    )
+    
+    result = (prompt | model.with_structured_output(DocumentRelevance)).invoke({
+        "question": question,
+        "document": document
+    })
+    
+    return result.score
+
+# 문서별 평가를 병렬로 실행하기 위한 실행기
+_grading_executor = ContextThreadPoolExecutor(
+    max_workers=DOCUMENT_GRADING_MAX_WORKERS,
+    thread_name_prefix="document-grading"
+)
+
+def grade_each_document(state: AgentState) -> dict:
+    """
+    문서별 평가 노드: 검색된 문서를 하나씩 병렬로 평가하고,
+    관련 있는 문서만 점수 순으로 재정렬합니다.
+    
+    Args:
+        state: 현재 상태 (documents에 검색된 문서 목록)
+    
+    Returns:
+        dict: 평가 점수를 기록해 점수 순으로 재정렬한 documents와 판정(verdict)
+    """
+    logger.info("---문서별 관련성 평가 및 재정렬---")
+    
+    question = get_question(state)
+    documents = get_documents(state)
+    
+    if rewrite_limit_reached(state):
+        # 재작성 한도에 도달하면 평가 없이 검색 순서를 유지합니다
+        logger.info(f"---재작성 한도({count_rewrites(state)}회) 도달, 문서 평가 생략---")
+        scores = [DOCUMENT_RELEVANCE_THRESHOLD] * len(documents)
+    else:
+        futures = [
+            _grading_executor.submit(_score_document, question, document.text)
+            for document in documents
+        ]
+        scores = []
+        for future in futures:
+            try:
+                scores.append(future.result())
+            except Exception as e:
+                logger.error(f"문서 관련성 평가 중 오류: {str(e)}")
+                scores.append(0)
+    
+    # 점수 내림차순, 동점이면 검색 순위 유지 (문서 원문은 참조를 그대로 유지)
+    ranked = sorted(
+        (document._replace(grade=score) for document, score in zip(documents, scores)),
+        key=lambda document: -document.grade
+    )
+    relevant = sum(1 for document in ranked if document.grade >= DOCUMENT_RELEVANCE_THRESHOLD)
+    
+    logger.info(f"---관련 문서 {relevant}/{len(documents)}개---")
+    
+    return {"documents": ranked, "verdict": "yes" if relevant else "no"}
+
+def route_after_document_grading(state: AgentState) -> Literal["generate", "rewrite"]:
+    """
+    문서별 평가 이후 다음 노드를 결정하는 조건부 함수
+    
+    Args:
+        state: 현재 상태
+    
+    Returns:
+        str: 관련 문서가 있거나 재작성 한도에 도달했으면 "generate", 아니면 "rewrite"
+    """
+    if state.get("verdict") == "yes" or rewrite_limit_reached(state):
+        logger.info("---결정: 관련 문서로 답변 생성---")
+        return "generate"
+    
+    logger.info("---결정: 관련 문서 없음---")
+    return "rewrite"
+
+def create_error_handler(error_message: str = "처리 중 오류가 발생했습니다."):
+    """
+    오류 처리를 위한 핸들러 함수를 생성합니다.
+    
+    Args:
+        error_message: 오류 메시지
+        
+    Returns:
+        function: 오류 처리 함수
+    """
+    def error_handler(state: AgentState) -> dict:
+        logger.error(f"워크플로우 오류: {error_message}")
+        error_response = AIMessage(content=error_message, response_metadata={"error": True})
+        return {"messages": [error_response]}
+    
+    return error_handler